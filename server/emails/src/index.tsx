@@ -1,27 +1,106 @@
 import { render } from 'react-email'
 import { Command } from 'commander'
+import { createInterface } from 'node:readline'
 
 import emails from './emails'
 
+const renderTemplate = async (
+  template: string,
+  props: Record<string, unknown>,
+): Promise<string> => {
+  const TemplateComponent = emails[template]
+  if (!TemplateComponent) {
+    throw new Error(`Template ${template} not found`)
+  }
+  const Component = TemplateComponent as React.FC<Record<string, unknown>>
+  return render(<Component {...props} />)
+}
+
+interface ServeRequest {
+  id: number
+  template?: string
+  props?: Record<string, unknown>
+  ping?: boolean
+}
+
+const writeStdout = process.stdout.write.bind(process.stdout)
+
+const respond = (response: Record<string, unknown>): void => {
+  writeStdout(`${JSON.stringify(response)}\n`)
+}
+
+// Long-lived mode: render newline-delimited JSON requests read from stdin,
+// one at a time, until stdin is closed.
+const serve = async (): Promise<void> => {
+  // Keep stdout for the protocol only: anything templates or libraries log
+  // through `console.log`/`console.info` would corrupt the responses, send it
+  // to stderr instead.
+  process.stdout.write = process.stderr.write.bind(
+    process.stderr,
+  ) as typeof process.stdout.write
+  const lines = createInterface({ input: process.stdin, crlfDelay: Infinity })
+  for await (const line of lines) {
+    if (!line.trim()) {
+      continue
+    }
+    let request: ServeRequest
+    try {
+      request = JSON.parse(line)
+    } catch (error) {
+      respond({ id: null, error: `Invalid request: ${error}` })
+      continue
+    }
+    if (request.ping) {
+      respond({ id: request.id, pong: true })
+      continue
+    }
+    try {
+      const html = await renderTemplate(
+        request.template ?? '',
+        request.props ?? {},
+      )
+      respond({ id: request.id, html })
+    } catch (error) {
+      respond({ id: request.id, error: String(error) })
+    }
+  }
+}
+
 const program = new Command()
 
 program
-  .argument('<template>', 'name of the email template')
-  .argument('<props>', 'props to pass to the email template, as a JSON string')
-  .action((template: string, props: string) => {
-    try {
-      const parsedProps = JSON.parse(props)
-      const TemplateComponent = emails[template]
-      if (!TemplateComponent) {
-        console.error(`Template ${template} not found`)
+  .argument('[template]', 'name of the email template')
+  .argument('[props]', 'props to pass to the email template, as a JSON string')
+  .option('--serve', 'render requests read from stdin as newline-delimited JSON')
+  .action(
+    (
+      template: string | undefined,
+      props: string | undefined,
+      options: { serve?: boolean },
+    ) => {
+      if (options.serve) {
+        serve().catch((error) => {
+          console.error('Error in renderer:', error)
+          process.exit(1)
+        })
+        return
+      }
+      if (template === undefined || props === undefined) {
+        program.help({ error: true })
+        return
+      }
+      try {
+        const parsedProps = JSON.parse(props)
+        if (!emails[template]) {
+          console.error(`Template ${template} not found`)
+          process.exit(1)
+        }
+        renderTemplate(template, parsedProps).then((html) => console.log(html))
+      } catch (error) {
+        console.error('Error parsing JSON string:', error)
         process.exit(1)
       }
-      const Component = TemplateComponent as React.FC<Record<string, unknown>>
-      render(<Component {...parsedProps} />).then((html) => console.log(html))
-    } catch (error) {
-      console.error('Error parsing JSON string:', error)
-      process.exit(1)
-    }
-  })
+    },
+  )
 
 program.parse(process.argv)
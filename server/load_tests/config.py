@@ -7,6 +7,7 @@ Environment variables:
 - LOAD_TEST_PRODUCT_ID: Product ID for checkout tests
 - LOAD_TEST_EVENT_EXTERNAL_CUSTOMER_IDS: Comma-separated list of external customer IDs
 - LOAD_TEST_EVENT_BATCH_SIZE: Number of events per batch (default: 10)
+- LOAD_TEST_EVENTSTREAM_HOLD_SECONDS: How long each SSE client stays connected (default: 60)
 """
 
 import os
@@ -40,6 +41,11 @@ class LoadTestConfig:
     )
     event_batch_size: int = int(os.getenv("LOAD_TEST_EVENT_BATCH_SIZE", "7"))
 
+    # Eventstream Configuration
+    eventstream_hold_seconds: int = int(
+        os.getenv("LOAD_TEST_EVENTSTREAM_HOLD_SECONDS", "60")
+    )
+
     # Performance Thresholds (milliseconds)
     max_checkout_creation_time_ms: int = int(
         os.getenv("LOAD_TEST_CHECKOUT_CREATE_THRESHOLD", "2000")
@@ -18,10 +18,28 @@ Usage:
     locust -f load_tests/locustfile.py --host=http://127.0.0.1:8000 \
            --users 10 --spawn-rate 2 --run-time 5m CheckoutUser
 
+    # Run checkout polling scenario (open checkouts fetched and updated)
+    locust -f load_tests/locustfile.py --host=http://127.0.0.1:8000 \
+           --users 50 --spawn-rate 5 --run-time 5m CheckoutPollingUser
+
+    # Run eventstream scenario (long-lived SSE connections)
+    locust -f load_tests/locustfile.py --host=http://127.0.0.1:8000 \
+           --users 1000 --spawn-rate 50 --run-time 10m EventStreamUser
+
 Environment variables:
     See load_tests/config.py for configuration options
 """
 
-from load_tests.scenarios import CheckoutUser, EventIngestionUser
-
-__all__ = ["CheckoutUser", "EventIngestionUser"]
+from load_tests.scenarios import (
+    CheckoutPollingUser,
+    CheckoutUser,
+    EventIngestionUser,
+    EventStreamUser,
+)
+
+__all__ = [
+    "CheckoutPollingUser",
+    "CheckoutUser",
+    "EventIngestionUser",
+    "EventStreamUser",
+]
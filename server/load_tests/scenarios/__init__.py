@@ -1,6 +1,12 @@
 """Load test scenarios for different user workflows."""
 
-from load_tests.scenarios.checkout import CheckoutUser
+from load_tests.scenarios.checkout import CheckoutPollingUser, CheckoutUser
 from load_tests.scenarios.event_ingestion import EventIngestionUser
+from load_tests.scenarios.eventstream import EventStreamUser
 
-__all__ = ["CheckoutUser", "EventIngestionUser"]
+__all__ = [
+    "CheckoutPollingUser",
+    "CheckoutUser",
+    "EventIngestionUser",
+    "EventStreamUser",
+]
@@ -7,7 +7,7 @@ checkout and payment processing flow.
 
 import logging
 
-from locust import HttpUser, SequentialTaskSet, between, task
+from locust import HttpUser, SequentialTaskSet, TaskSet, between, task
 
 from load_tests.common import (
     generate_checkout_confirmation_data,
@@ -162,3 +162,76 @@ class CheckoutUser(HttpUser):
         """Initialize user session."""
         if not config.product_id:
             pass
+
+
+class CheckoutPollingTaskSet(TaskSet):
+    """
+    Task set for an open checkout, repeatedly fetched and updated.
+
+    Simulates the checkout page while the customer fills it: the client
+    polls the checkout and updates it field by field, without confirming.
+    Products are served from the checkout product cache after the first
+    request: compare the "[Checkout Polling]" latencies against a server
+    started with `POLAR_CHECKOUT_PRODUCT_CACHE_MAX_SIZE=0` to measure the gain.
+    """
+
+    client_secret: str | None = None
+
+    def on_start(self):
+        """Create the checkout polled by this user."""
+        with self.client.post(
+            "/v1/checkouts/client/",
+            json=generate_checkout_data(),
+            headers=get_auth_headers(),
+            catch_response=True,
+            name="[Checkout Polling] Create Checkout",
+        ) as response:
+            if response.status_code == 201:
+                self.client_secret = response.json().get("client_secret")
+                response.success()
+            else:
+                response.failure(f"Failed to create checkout: {response.text}")
+
+    @task(3)
+    def get_checkout(self):
+        if not self.client_secret:
+            return
+
+        with self.client.get(
+            f"/v1/checkouts/client/{self.client_secret}",
+            headers=get_auth_headers(),
+            catch_response=True,
+            name="[Checkout Polling] Get",
+        ) as response:
+            if response.status_code == 200:
+                response.success()
+            else:
+                response.failure(f"Failed to get checkout: {response.status_code}")
+
+    @task(1)
+    def update_checkout(self):
+        if not self.client_secret:
+            return
+
+        with self.client.patch(
+            f"/v1/checkouts/client/{self.client_secret}",
+            json={"customer_name": generate_customer_data()["name"]},
+            headers=get_auth_headers(),
+            catch_response=True,
+            name="[Checkout Polling] Update",
+        ) as response:
+            if response.status_code == 200:
+                response.success()
+            else:
+                response.failure(f"Failed to update checkout: {response.text}")
+
+
+class CheckoutPollingUser(HttpUser):
+    """
+    User keeping a checkout open and polling it.
+
+    Measures the checkout read/update hot path, without order processing.
+    """
+
+    wait_time = between(0.5, 2)
+    tasks = [CheckoutPollingTaskSet]
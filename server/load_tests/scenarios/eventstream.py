@@ -0,0 +1,81 @@
+"""
+Eventstream load test scenarios.
+
+Simulates many clients holding Server-Sent Events connections open, like
+checkout pages waiting for the payment confirmation. Each Locust user opens
+a checkout, then keeps its stream open for a while before reconnecting.
+
+Since every API process shares a single Redis Pub/Sub connection across its
+SSE clients, the number of Redis connections should stay flat while the
+number of users grows.
+"""
+
+import logging
+import time
+
+from locust import HttpUser, TaskSet, between, task
+
+from load_tests.common import generate_checkout_data, get_auth_headers
+from load_tests.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class EventStreamTaskSet(TaskSet):
+    """Task set holding a checkout event stream open."""
+
+    client_secret: str | None = None
+
+    def on_start(self) -> None:
+        """Create the checkout whose stream will be listened to."""
+        with self.client.post(
+            "/v1/checkouts/client/",
+            json=generate_checkout_data(),
+            headers=get_auth_headers(),
+            catch_response=True,
+            name="[Eventstream] Create Checkout",
+        ) as response:
+            if response.status_code == 201:
+                self.client_secret = response.json().get("client_secret")
+                response.success()
+            else:
+                response.failure(f"Failed to create checkout: {response.text}")
+
+    @task
+    def listen(self) -> None:
+        """Open the stream and consume it for the configured duration."""
+        if not self.client_secret:
+            self.interrupt()
+            return
+
+        start = time.perf_counter()
+        try:
+            with self.client.get(
+                f"/v1/checkouts/client/{self.client_secret}/stream",
+                stream=True,
+                timeout=config.eventstream_hold_seconds + 5,
+                catch_response=True,
+                name="[Eventstream] Checkout Stream",
+            ) as response:
+                if response.status_code != 200:
+                    response.failure(f"Failed to open stream: {response.status_code}")
+                    return
+
+                for _ in response.iter_lines():
+                    if time.perf_counter() - start >= config.eventstream_hold_seconds:
+                        break
+                response.success()
+        except Exception:
+            logger.exception("Eventstream connection failed")
+
+
+class EventStreamUser(HttpUser):
+    """
+    Long-lived SSE client.
+
+    Scale the number of users to simulate open checkout pages and dashboards:
+    each user holds one connection for `LOAD_TEST_EVENTSTREAM_HOLD_SECONDS`.
+    """
+
+    wait_time = between(0.5, 2)
+    tasks = [EventStreamTaskSet]
@@ -0,0 +1,61 @@
+"""add ancestors to events
+
+Revision ID: 4255a1e28142
+Revises: a83cf131398d
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "4255a1e28142"
+down_revision = "a83cf131398d"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+INDEX_NAME = "ix_events_ancestors"
+
+
+def upgrade() -> None:
+    # Ensures we don't break app by applying a deadlock-inducing migration
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.add_column(
+        "events",
+        sa.Column("ancestors", postgresql.ARRAY(sa.Uuid()), nullable=True),
+    )
+
+    with op.get_context().autocommit_block():
+        # Drop any INVALID leftover from an interrupted concurrent build first.
+        op.drop_index(
+            INDEX_NAME,
+            table_name="events",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.create_index(
+            INDEX_NAME,
+            "events",
+            ["ancestors"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            INDEX_NAME,
+            table_name="events",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.drop_column("events", "ancestors")
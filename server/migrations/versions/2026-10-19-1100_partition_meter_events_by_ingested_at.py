@@ -0,0 +1,202 @@
+"""partition meter_events by ingested_at
+
+Revision ID: f2275ef8fea8
+Revises: 4255a1e28142
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+
+from datetime import UTC, datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "f2275ef8fea8"
+down_revision = "4255a1e28142"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+TABLE_NAME = "meter_events"
+LEGACY_TABLE_NAME = "meter_events_legacy"
+LEGACY_PRIMARY_KEY_INDEX_NAME = "meter_events_legacy_meter_id_event_id_ingested_at_key"
+LEGACY_RANGE_CONSTRAINT_NAME = "meter_events_legacy_range"
+DEFAULT_TABLE_NAME = "meter_events_default"
+INDEXES = {
+    "ix_meter_events_event_id": ["event_id"],
+    "ix_meter_events_meter_customer_ingested": [
+        "meter_id",
+        "customer_id",
+        "ingested_at",
+    ],
+    "ix_meter_events_meter_external_customer_ingested": [
+        "meter_id",
+        "external_customer_id",
+        "ingested_at",
+    ],
+    "ix_meter_events_meter_ingested": ["meter_id", "ingested_at", "event_id"],
+}
+COLUMNS = (
+    "meter_id",
+    "event_id",
+    "customer_id",
+    "external_customer_id",
+    "organization_id",
+    "ingested_at",
+    "timestamp",
+)
+# Partitions created along the legacy one, the scheduled task takes over after
+PARTITIONS_AHEAD = 3
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _get_legacy_index_name(index_name: str) -> str:
+    return index_name.replace("ix_meter_events_", "ix_meter_events_legacy_")
+
+
+def upgrade() -> None:
+    # The existing table becomes the first partition, holding everything ingested
+    # until the end of the current month: no data is copied.
+    current_month = datetime.now(UTC).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    legacy_end = _add_months(current_month, 1)
+
+    with op.get_context().autocommit_block():
+        # The partitioned primary key includes the partition key: build a
+        # matching unique index beforehand, so attaching only adopts it.
+        op.drop_index(
+            LEGACY_PRIMARY_KEY_INDEX_NAME,
+            table_name=TABLE_NAME,
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.create_index(
+            LEGACY_PRIMARY_KEY_INDEX_NAME,
+            TABLE_NAME,
+            ["meter_id", "event_id", "ingested_at"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # A valid constraint matching the partition bounds spares the full scan
+        # under lock when attaching. Validating doesn't block writes.
+        op.execute(
+            f"ALTER TABLE {TABLE_NAME} "
+            f"DROP CONSTRAINT IF EXISTS {LEGACY_RANGE_CONSTRAINT_NAME}"
+        )
+        op.execute(
+            f"ALTER TABLE {TABLE_NAME} ADD CONSTRAINT {LEGACY_RANGE_CONSTRAINT_NAME} "
+            f"CHECK (ingested_at < '{legacy_end.isoformat()}') NOT VALID"
+        )
+        op.execute(
+            f"ALTER TABLE {TABLE_NAME} "
+            f"VALIDATE CONSTRAINT {LEGACY_RANGE_CONSTRAINT_NAME}"
+        )
+
+    # Ensures we don't break app by applying a deadlock-inducing migration
+    op.execute("SET LOCAL lock_timeout = '5s'")
+
+    op.rename_table(TABLE_NAME, LEGACY_TABLE_NAME)
+    op.execute(
+        f"ALTER TABLE {LEGACY_TABLE_NAME} "
+        f"RENAME CONSTRAINT meter_events_pkey TO meter_events_legacy_pkey"
+    )
+    for index_name in INDEXES:
+        op.execute(
+            f"ALTER INDEX {index_name} RENAME TO {_get_legacy_index_name(index_name)}"
+        )
+
+    op.create_table(
+        TABLE_NAME,
+        sa.Column("meter_id", sa.Uuid(), nullable=False),
+        sa.Column("event_id", sa.Uuid(), nullable=False),
+        sa.Column("customer_id", sa.Uuid(), nullable=True),
+        sa.Column("external_customer_id", sa.String(), nullable=True),
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column("ingested_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("timestamp", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["customer_id"],
+            ["customers.id"],
+            name=op.f("meter_events_customer_id_fkey"),
+            ondelete="set null",
+        ),
+        sa.ForeignKeyConstraint(
+            ["event_id"],
+            ["events.id"],
+            name=op.f("meter_events_event_id_fkey"),
+            ondelete="cascade",
+        ),
+        sa.ForeignKeyConstraint(
+            ["meter_id"],
+            ["meters.id"],
+            name=op.f("meter_events_meter_id_fkey"),
+            ondelete="cascade",
+        ),
+        sa.ForeignKeyConstraint(
+            ["organization_id"],
+            ["organizations.id"],
+            name=op.f("meter_events_organization_id_fkey"),
+            ondelete="cascade",
+        ),
+        sa.PrimaryKeyConstraint(
+            "meter_id", "event_id", "ingested_at", name=op.f("meter_events_pkey")
+        ),
+        postgresql_partition_by="RANGE (ingested_at)",
+    )
+    for index_name, columns in INDEXES.items():
+        op.create_index(index_name, TABLE_NAME, columns, unique=False)
+
+    op.execute(
+        f"ALTER TABLE {TABLE_NAME} ATTACH PARTITION {LEGACY_TABLE_NAME} "
+        f"FOR VALUES FROM (MINVALUE) TO ('{legacy_end.isoformat()}')"
+    )
+    op.execute(
+        f"ALTER TABLE {LEGACY_TABLE_NAME} "
+        f"DROP CONSTRAINT {LEGACY_RANGE_CONSTRAINT_NAME}"
+    )
+
+    for offset in range(PARTITIONS_AHEAD):
+        start = _add_months(legacy_end, offset)
+        end = _add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE {TABLE_NAME}_y{start.year:04d}m{start.month:02d} "
+            f"PARTITION OF {TABLE_NAME} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+    # Catches the rows past the last partition, should the scheduled task fall
+    # behind, instead of failing their insertion
+    op.execute(f"CREATE TABLE {DEFAULT_TABLE_NAME} PARTITION OF {TABLE_NAME} DEFAULT")
+
+
+def downgrade() -> None:
+    op.execute("SET LOCAL lock_timeout = '5s'")
+
+    # Move the rows of the monthly and default partitions back into the legacy
+    # table. Partitions detached for cold storage are left out.
+    op.execute(f"ALTER TABLE {TABLE_NAME} DETACH PARTITION {LEGACY_TABLE_NAME}")
+    columns = ", ".join(COLUMNS)
+    op.execute(
+        f"INSERT INTO {LEGACY_TABLE_NAME} ({columns}) "
+        f"SELECT {columns} FROM {TABLE_NAME}"
+    )
+    op.drop_table(TABLE_NAME)
+
+    op.rename_table(LEGACY_TABLE_NAME, TABLE_NAME)
+    op.execute(
+        f"ALTER TABLE {TABLE_NAME} "
+        f"RENAME CONSTRAINT meter_events_legacy_pkey TO meter_events_pkey"
+    )
+    for index_name in INDEXES:
+        op.execute(
+            f"ALTER INDEX {_get_legacy_index_name(index_name)} RENAME TO {index_name}"
+        )
+    op.drop_index(LEGACY_PRIMARY_KEY_INDEX_NAME, table_name=TABLE_NAME)
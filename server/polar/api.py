@@ -23,6 +23,7 @@ from polar.email_update.endpoints import router as email_update_router
 from polar.event.endpoints import router as event_router
 from polar.event_type.endpoints import router as event_type_router
 from polar.eventstream.endpoints import router as stream_router
+from polar.export.endpoints import router as export_router
 from polar.feedback.endpoints import router as feedback_router
 from polar.file.endpoints import router as files_router
 from polar.integrations.chargeback_stop.endpoints import (
@@ -127,6 +128,8 @@ router.include_router(checkout_router)
 router.include_router(cli_router)
 # /files
 router.include_router(files_router)
+# /exports
+router.include_router(export_router)
 # /metrics
 router.include_router(metrics_router)
 # /compass
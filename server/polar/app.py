@@ -16,6 +16,7 @@ from polar.backoffice import app as backoffice_app
 from polar.checkout import ip_geolocation
 from polar.checkout_link.app import app as checkout_link_redirect_app
 from polar.config import settings
+from polar.eventstream.pubsub import close_multiplexer
 from polar.exception_handlers import add_exception_handlers
 from polar.health.endpoints import router as health_router
 from polar.kit.cors import CORSConfig, CORSMatcherMiddleware, Scope
@@ -27,6 +28,7 @@ from polar.kit.db.postgres import (
     create_async_sessionmaker,
     create_sync_sessionmaker,
 )
+from polar.kit.subprocess_pool import close_pools
 from polar.kit.versioning import VERSION_HEADER, add_versioned_routers
 from polar.logfire import (
     configure_logfire,
@@ -182,6 +184,8 @@ async def lifespan(app: FastAPI) -> AsyncIterator[State]:
     stop_slo_metrics()
     stop_remote_write_pusher()
 
+    await close_pools()
+    await close_multiplexer(redis)
     await redis.close(True)
     rate_limit_redis = getattr(app.state, "rate_limit_redis", None)
     if rate_limit_redis is not None:
@@ -0,0 +1,233 @@
+"""
+Concurrency lanes for the benefit grant tasks.
+
+Benefit strategies calling third-party APIs run on their own lane: a cap on the
+number of tasks running at once across all workers, and a token bucket matching
+the rate limits of the integration. When a lane is saturated, the task is
+deferred instead of waiting, so a slow integration doesn't hold worker threads
+needed by the other benefits.
+
+Strategies only touching our database run on an unbounded lane.
+"""
+
+import contextlib
+import dataclasses
+import random
+import time
+import uuid
+from collections.abc import AsyncIterator
+from typing import Literal
+
+import structlog
+from dramatiq import Retry
+from redis.exceptions import RedisError
+
+from polar.config import settings
+from polar.logging import Logger
+from polar.models.benefit import BenefitType
+from polar.observability import (
+    BENEFIT_GRANT_TASK_DURATION,
+    BENEFIT_GRANT_TASK_TOTAL,
+)
+from polar.redis import Redis
+from polar.worker import Defer
+
+from ..strategies import BenefitRetriableError
+
+log: Logger = structlog.get_logger()
+
+type BenefitTask = Literal["grant", "revoke", "update", "cycle", "delete"]
+
+
+@dataclasses.dataclass(frozen=True)
+class BenefitLane:
+    name: str
+    max_concurrency: int | None = None
+    "Maximum number of tasks running at once across all workers."
+    rate: float | None = None
+    "Number of tasks started per second, on average."
+    burst: int = 1
+    "Number of tasks that can be started at once when the lane is idle."
+
+    @property
+    def is_bounded(self) -> bool:
+        return self.max_concurrency is not None or self.rate is not None
+
+
+DATABASE_LANE = BenefitLane("database")
+
+_LANES: dict[BenefitType, BenefitLane] = {
+    # GitHub secondary rate limits on content creation, e.g. repository invitations
+    BenefitType.github_repository: BenefitLane(
+        "github", max_concurrency=10, rate=1.0, burst=10
+    ),
+    BenefitType.discord: BenefitLane(
+        "discord", max_concurrency=10, rate=10.0, burst=20
+    ),
+    # Slack Web API Tier 2 methods: ~20 requests per minute
+    BenefitType.slack_shared_channel: BenefitLane(
+        "slack", max_concurrency=5, rate=0.3, burst=5
+    ),
+}
+
+BATCHED_BENEFIT_TYPES: set[BenefitType] = {
+    benefit_type for benefit_type in BenefitType if benefit_type not in _LANES
+}
+"Benefit types only touching our database, which can be granted in batches."
+
+
+def get_lane(benefit_type: BenefitType) -> BenefitLane:
+    return _LANES.get(benefit_type, DATABASE_LANE)
+
+
+# Leases outlive the task time limit, so a crashed worker doesn't hold
+# a slot forever.
+_LEASE_TTL_SECONDS = 120
+_CONCURRENCY_DEFER_MILLISECONDS = 5_000
+
+# Returns the number of milliseconds to wait before retrying and the reason,
+# or 0 if the lease was acquired.
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local max_concurrency = tonumber(ARGV[3])
+local rate = tonumber(ARGV[4])
+local burst = tonumber(ARGV[5])
+local lease_ttl = tonumber(ARGV[6])
+
+local tokens = burst
+if rate > 0 then
+    local bucket = redis.call('HMGET', KEYS[2], 'tokens', 'updated_at')
+    tokens = tonumber(bucket[1]) or burst
+    local updated_at = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+    if tokens < 1 then
+        return {math.ceil((1 - tokens) / rate * 1000), 'rate'}
+    end
+end
+
+if max_concurrency > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+    if redis.call('ZCARD', KEYS[1]) >= max_concurrency then
+        return {-1, 'concurrency'}
+    end
+    redis.call('ZADD', KEYS[1], now + lease_ttl, ARGV[2])
+    redis.call('EXPIRE', KEYS[1], lease_ttl)
+end
+
+if rate > 0 then
+    redis.call('HSET', KEYS[2], 'tokens', tostring(tokens - 1), 'updated_at', ARGV[1])
+    redis.call('EXPIRE', KEYS[2], math.ceil(burst / rate) + 1)
+end
+
+return {0, ''}
+"""
+
+
+def _get_leases_key(lane: BenefitLane) -> str:
+    return f"benefit:lane:{lane.name}:leases"
+
+
+def _get_bucket_key(lane: BenefitLane) -> str:
+    return f"benefit:lane:{lane.name}:bucket"
+
+
+async def _acquire(redis: Redis, lane: BenefitLane, lease_id: str) -> int:
+    """
+    Try to acquire a lease on the lane.
+
+    Returns:
+        0 if acquired, else the number of milliseconds to wait before retrying.
+    """
+    wait, reason = await redis.eval(
+        _ACQUIRE_SCRIPT,
+        2,
+        _get_leases_key(lane),
+        _get_bucket_key(lane),
+        str(time.time()),
+        lease_id,
+        str(lane.max_concurrency or 0),
+        str(lane.rate or 0),
+        str(lane.burst),
+        str(_LEASE_TTL_SECONDS),
+    )  # type: ignore[misc]
+    wait = int(wait)
+    if wait < 0:
+        # No way to know when a slot frees up: spread the retries
+        wait = _CONCURRENCY_DEFER_MILLISECONDS + random.randint(
+            0, _CONCURRENCY_DEFER_MILLISECONDS
+        )
+    if wait > 0:
+        log.info(
+            "benefit.lane.throttled",
+            lane=lane.name,
+            reason=reason.decode() if isinstance(reason, bytes) else reason,
+            defer_milliseconds=wait,
+        )
+    return wait
+
+
+async def _release(redis: Redis, lane: BenefitLane, lease_id: str) -> None:
+    if lane.max_concurrency is None:
+        return
+    try:
+        await redis.zrem(_get_leases_key(lane), lease_id)
+    except RedisError as e:
+        log.warning("benefit.lane.release_failed", lane=lane.name, error=str(e))
+
+
+@contextlib.asynccontextmanager
+async def benefit_lane(
+    redis: Redis, benefit_type: BenefitType, task: BenefitTask
+) -> AsyncIterator[None]:
+    """
+    Run a benefit task on the lane of its strategy, and record its metrics.
+
+    Raises:
+        Defer: The lane is saturated, the task should run later.
+    """
+    lane = get_lane(benefit_type)
+    lease_id = uuid.uuid4().hex
+    acquired = False
+    if settings.BENEFIT_LANES_ENABLED and lane.is_bounded:
+        try:
+            wait = await _acquire(redis, lane, lease_id)
+        except RedisError as e:
+            # Don't block grants if Redis is unavailable
+            log.warning("benefit.lane.acquire_failed", lane=lane.name, error=str(e))
+        else:
+            if wait > 0:
+                BENEFIT_GRANT_TASK_TOTAL.labels(
+                    benefit_type=benefit_type, task=task, outcome="throttled"
+                ).inc()
+                # Being throttled isn't a failure: don't spend a retry
+                raise Defer(wait)
+            acquired = True
+
+    outcome = "success"
+    start = time.perf_counter()
+    try:
+        yield
+    except BenefitRetriableError, Retry:
+        outcome = "retry"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        BENEFIT_GRANT_TASK_DURATION.labels(
+            benefit_type=benefit_type, task=task
+        ).observe(time.perf_counter() - start)
+        BENEFIT_GRANT_TASK_TOTAL.labels(
+            benefit_type=benefit_type, task=task, outcome=outcome
+        ).inc()
+        if acquired:
+            await _release(redis, lane, lease_id)
+
+
+__all__ = [
+    "BATCHED_BENEFIT_TYPES",
+    "BenefitLane",
+    "BenefitTask",
+    "benefit_lane",
+    "get_lane",
+]
@@ -0,0 +1,74 @@
+"""
+Progress of the bulk updates of benefit grants, stored in Redis.
+
+A bulk update goes through the grants of a benefit chunk by chunk, one task per
+chunk. The ID of the last grant of each committed chunk is recorded here, so a
+failed or interrupted update resumes where it stopped instead of starting over.
+
+Each update is identified by the time it was requested: a newer update of the
+same benefit supersedes the one in progress, which stops at its next chunk.
+"""
+
+import dataclasses
+from datetime import datetime
+from uuid import UUID
+
+from polar.redis import Redis
+
+_KEY_PREFIX = "benefit:bulk_update"
+_TTL_SECONDS = 60 * 60 * 24 * 7
+
+
+@dataclasses.dataclass
+class BulkUpdateProgress:
+    requested_at: datetime
+    cursor: UUID | None = None
+    "ID of the last updated grant."
+    updated: int = 0
+    "Number of grants updated so far."
+    completed: bool = False
+
+
+def _get_key(benefit_id: UUID) -> str:
+    return f"{_KEY_PREFIX}:{benefit_id}"
+
+
+def _decode(value: str | bytes) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+async def get_progress(redis: Redis, benefit_id: UUID) -> BulkUpdateProgress | None:
+    data = {
+        _decode(key): _decode(value)
+        for key, value in (await redis.hgetall(_get_key(benefit_id))).items()
+    }
+    if "requested_at" not in data:
+        return None
+    cursor = data.get("cursor")
+    return BulkUpdateProgress(
+        requested_at=datetime.fromisoformat(data["requested_at"]),
+        cursor=UUID(cursor) if cursor else None,
+        updated=int(data.get("updated", 0)),
+        completed=data.get("completed") == "1",
+    )
+
+
+async def save_progress(
+    redis: Redis, benefit_id: UUID, progress: BulkUpdateProgress
+) -> None:
+    key = _get_key(benefit_id)
+    async with redis.pipeline(transaction=True) as pipeline:
+        pipeline.hset(
+            key,
+            mapping={
+                "requested_at": progress.requested_at.isoformat(),
+                "cursor": str(progress.cursor) if progress.cursor else "",
+                "updated": progress.updated,
+                "completed": "1" if progress.completed else "0",
+            },
+        )
+        pipeline.expire(key, _TTL_SECONDS)
+        await pipeline.execute()
+
+
+__all__ = ["BulkUpdateProgress", "get_progress", "save_progress"]
@@ -2,8 +2,10 @@ from collections.abc import Sequence
 from typing import Unpack
 from uuid import UUID
 
-from sqlalchemy import Select, func, select
+from sqlalchemy import Select, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from polar.authz.types import AccessibleOrganizationID
 from polar.kit.repository import (
@@ -14,6 +16,7 @@ from polar.kit.repository import (
     RepositorySortingMixin,
     SortingClause,
 )
+from polar.kit.utils import generate_uuid, utc_now
 from polar.models import (
     Benefit,
     BenefitGrant,
@@ -27,6 +30,8 @@ from polar.models.benefit_grant import BenefitGrantScope
 
 from .sorting import BenefitGrantSortProperty
 
+_STATE_ATTRIBUTES = ("granted_at", "revoked_at", "error", "properties")
+
 
 class BenefitGrantRepository(
     RepositorySortingMixin[BenefitGrant, BenefitGrantSortProperty],
@@ -65,6 +70,101 @@ class BenefitGrantRepository(
             statement = statement.with_for_update(of=BenefitGrant)
         return await self.get_one_or_none(statement)
 
+    async def insert_missing_by_benefits_and_scope(
+        self,
+        customer: Customer,
+        benefits: Sequence[Benefit],
+        member: Member | None = None,
+        **scope: Unpack[BenefitGrantScope],
+    ) -> None:
+        """
+        Insert the grants of the benefits not existing yet for the scope,
+        with a single statement. Existing grants are left untouched.
+        """
+        subscription = scope.get("subscription")
+        order = scope.get("order")
+        now = utc_now()
+        statement = (
+            pg_insert(BenefitGrant)
+            .values(
+                [
+                    {
+                        # Column defaults are only applied on flush
+                        "id": generate_uuid(),
+                        "created_at": now,
+                        "customer_id": customer.id,
+                        "benefit_id": benefit.id,
+                        "member_id": member.id if member else None,
+                        "subscription_id": subscription.id if subscription else None,
+                        "order_id": order.id if order else None,
+                        "properties": {},
+                    }
+                    for benefit in benefits
+                ]
+            )
+            .on_conflict_do_nothing(
+                index_elements=[
+                    BenefitGrant.customer_id,
+                    BenefitGrant.benefit_id,
+                    BenefitGrant.member_id,
+                    BenefitGrant.subscription_id,
+                    BenefitGrant.order_id,
+                ],
+                index_where=BenefitGrant.deleted_at.is_(None),
+            )
+        )
+        await self.session.execute(statement)
+
+    async def list_by_benefits_and_scope(
+        self,
+        customer: Customer,
+        benefits: Sequence[Benefit],
+        member: Member | None = None,
+        *,
+        for_update: bool = False,
+        options: Options = (),
+        **scope: Unpack[BenefitGrantScope],
+    ) -> Sequence[BenefitGrant]:
+        statement = (
+            self.get_base_statement()
+            .where(
+                BenefitGrant.customer_id == customer.id,
+                BenefitGrant.benefit_id.in_([benefit.id for benefit in benefits]),
+                BenefitGrant.member_id == (member.id if member else None),
+                ~BenefitGrant.is_deleted,
+                BenefitGrant.scope == scope,
+            )
+            .options(*options)
+        )
+        if for_update:
+            statement = statement.with_for_update(of=BenefitGrant)
+        return await self.get_all(statement)
+
+    async def update_states(self, grants: Sequence[BenefitGrant]) -> None:
+        """
+        Write the state and properties of the grants with a single UPDATE
+        statement, executed in bulk by primary key.
+
+        The written values are marked as committed on the grants, so the unit of
+        work doesn't update them again on flush.
+        """
+        if not grants:
+            return
+        now = utc_now()
+        values = [
+            {
+                "id": grant.id,
+                "modified_at": now,
+                **{key: getattr(grant, key) for key in _STATE_ATTRIBUTES},
+            }
+            for grant in grants
+        ]
+        with self.session.no_autoflush:
+            await self.session.execute(update(BenefitGrant), values)
+        for grant, grant_values in zip(grants, values, strict=True):
+            for key in ("modified_at", *_STATE_ATTRIBUTES):
+                set_committed_value(grant, key, grant_values[key])
+
     async def list_granted_by_scope(
         self, **scope: Unpack[BenefitGrantScope]
     ) -> Sequence[BenefitGrant]:
@@ -92,6 +192,30 @@ class BenefitGrantRepository(
         )
         return await self.get_all(statement)
 
+    async def list_granted_by_benefit_chunk(
+        self,
+        benefit: Benefit,
+        *,
+        after: UUID | None,
+        limit: int,
+        options: Options = (),
+    ) -> Sequence[BenefitGrant]:
+        """List granted grants of the benefit by ascending ID, after the given one."""
+        statement = (
+            self.get_base_statement()
+            .where(
+                BenefitGrant.benefit_id == benefit.id,
+                BenefitGrant.is_granted,
+                ~BenefitGrant.is_deleted,
+            )
+            .order_by(BenefitGrant.id.asc())
+            .limit(limit)
+            .options(*options)
+        )
+        if after is not None:
+            statement = statement.where(BenefitGrant.id > after)
+        return await self.get_all(statement)
+
     async def list_granted_by_customer(
         self,
         customer_id: UUID,
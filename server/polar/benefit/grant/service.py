@@ -19,6 +19,7 @@ from polar.eventstream.service import publish as eventstream_publish
 from polar.exceptions import PolarError
 from polar.kit.pagination import PaginationParams, paginate
 from polar.kit.sorting import Sorting
+from polar.kit.utils import utc_now
 from polar.logging import Logger
 from polar.member.repository import MemberRepository
 from polar.models import (
@@ -171,7 +172,139 @@ class BenefitGrantService:
         elif grant.is_granted:
             return grant
 
-        previous_properties = grant.properties
+        properties, error = await self._run_grant_strategy(
+            session,
+            redis,
+            grant,
+            benefit,
+            customer,
+            member=member,
+            attempt=attempt,
+            scope=scope,
+        )
+        self._set_grant_result(grant, properties, error)
+
+        session.add(grant)
+        await session.flush()
+
+        loaded = await repository.get_by_id(
+            grant.id, options=repository.get_eager_options()
+        )
+        assert loaded is not None
+        await self._publish_granted(session, customer, benefit.organization, [loaded])
+        return grant
+
+    async def grant_benefits(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        customer: Customer,
+        benefits: Sequence[Benefit],
+        *,
+        member: Member | None = None,
+        attempt: int = 1,
+        **scope: Unpack[BenefitGrantScope],
+    ) -> Sequence[BenefitGrant]:
+        """
+        Grant several benefits of the same organization, like `grant_benefit`.
+
+        Missing grants are inserted and the grants are updated with set-based
+        statements. Meant for benefit types only touching our database: their
+        strategies still run one after the other.
+
+        A benefit whose strategy fails is left out of the batch and granted on
+        its own by the `benefit.grant` task, so it doesn't fail the others.
+        """
+        if not benefits:
+            return []
+
+        organization = benefits[0].organization
+        log.info(
+            "Granting benefits",
+            benefit_ids=[str(benefit.id) for benefit in benefits],
+            customer_id=str(customer.id),
+            member_id=str(member.id) if member else None,
+        )
+
+        repository = BenefitGrantRepository.from_session(session)
+        await repository.insert_missing_by_benefits_and_scope(
+            customer, benefits, member=member, **scope
+        )
+        grants = await repository.list_by_benefits_and_scope(
+            customer,
+            benefits,
+            member=member,
+            for_update=True,
+            options=repository.get_eager_options(),
+            **scope,
+        )
+
+        # Strategies may query the database: only touch the grants once they're
+        # all done, so autoflush doesn't write them one by one.
+        results: list[
+            tuple[
+                BenefitGrant, BenefitGrantProperties, BenefitActionRequiredError | None
+            ]
+        ] = []
+        for grant in grants:
+            if grant.is_granted:
+                continue
+            try:
+                properties, error = await self._run_grant_strategy(
+                    session,
+                    redis,
+                    grant,
+                    grant.benefit,
+                    customer,
+                    member=member,
+                    attempt=attempt,
+                    scope=scope,
+                )
+            except Exception as e:
+                log.warning(
+                    "Failed to grant benefit in batch; granting it on its own",
+                    error=str(e),
+                    benefit_id=str(grant.benefit_id),
+                    customer_id=str(customer.id),
+                )
+                enqueue_job(
+                    "benefit.grant",
+                    customer_id=customer.id,
+                    benefit_id=grant.benefit_id,
+                    member_id=member.id if member else None,
+                    **scope_to_args(scope),
+                )
+                continue
+            results.append((grant, properties, error))
+
+        granted_grants: list[BenefitGrant] = []
+        for grant, properties, error in results:
+            self._set_grant_result(grant, properties, error)
+            granted_grants.append(grant)
+        await repository.update_states(granted_grants)
+
+        await self._publish_granted(session, customer, organization, granted_grants)
+
+        return grants
+
+    async def _run_grant_strategy(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        grant: BenefitGrant,
+        benefit: Benefit,
+        customer: Customer,
+        *,
+        member: Member | None,
+        attempt: int,
+        scope: BenefitGrantScope,
+    ) -> tuple[BenefitGrantProperties, BenefitActionRequiredError | None]:
+        """
+        Run the grant logic of the benefit, without touching the grant.
+
+        Returns:
+            The new grant properties, and the error if an action is required.
+        """
         benefit_strategy = get_benefit_strategy(benefit.type, session, redis)
         try:
             properties = await benefit_strategy.grant(
@@ -184,46 +317,69 @@ class BenefitGrantService:
             )
         except BenefitActionRequiredError as e:
             if e.grant_properties is not None:
-                grant.properties = e.grant_properties
-            grant.set_grant_failed(e)
+                return e.grant_properties, e
+            return grant.properties, e
+        return properties, None
+
+    def _set_grant_result(
+        self,
+        grant: BenefitGrant,
+        properties: BenefitGrantProperties,
+        error: BenefitActionRequiredError | None,
+    ) -> None:
+        grant.previous_properties = grant.properties
+        grant.properties = properties
+        if error is not None:
+            grant.set_grant_failed(error)
         else:
-            grant.properties = properties
             grant.set_granted()
 
-        session.add(grant)
-        await session.flush()
+    async def _publish_granted(
+        self,
+        session: AsyncSession,
+        customer: Customer,
+        organization: Organization,
+        grants: Sequence[BenefitGrant],
+    ) -> None:
+        """
+        Notify that the grants were granted: eventstream, system events
+        and webhooks.
 
-        await eventstream_publish(
-            "benefit.granted",
-            {"benefit_id": benefit.id, "benefit_type": benefit.type},
-            customer_id=customer.id,
-        )
+        The grants are expected to be loaded with their benefit.
+        """
+        if not grants:
+            return
 
-        await event_service.create_event(
+        for grant in grants:
+            await eventstream_publish(
+                "benefit.granted",
+                {"benefit_id": grant.benefit_id, "benefit_type": grant.benefit.type},
+                customer_id=customer.id,
+            )
+
+        await event_service.create_events(
             session,
-            build_system_event(
-                SystemEvent.benefit_granted,
-                customer=customer,
-                organization=benefit.organization,
-                metadata=self._build_benefit_grant_metadata(grant, benefit),
-            ),
+            [
+                build_system_event(
+                    SystemEvent.benefit_granted,
+                    customer=customer,
+                    organization=organization,
+                    metadata=self._build_benefit_grant_metadata(grant, grant.benefit),
+                )
+                for grant in grants
+            ],
         )
 
         log.info(
-            "Benefit granted",
-            benefit_id=str(benefit.id),
+            "Benefits granted",
             customer_id=str(customer.id),
-            grant_id=str(grant.id),
+            grant_ids=[str(grant.id) for grant in grants],
         )
 
-        await self._send_webhook(
-            session,
-            benefit,
-            grant,
-            event_type=WebhookEventType.benefit_grant_created,
-            previous_grant_properties=previous_properties,
+        await webhook_service.send_many(
+            session, organization, WebhookEventType.benefit_grant_created, grants
         )
-        return grant
+        enqueue_job("customer.state_changed", customer.id)
 
     async def revoke_benefit(
         self,
@@ -424,11 +580,88 @@ class BenefitGrantService:
         if not await benefit_strategy.requires_update(benefit, previous_properties):
             return
 
+        if benefit_strategy.can_update_in_bulk:
+            enqueue_job(
+                "benefit.update_bulk",
+                benefit_id=benefit.id,
+                requested_at=utc_now().isoformat(),
+            )
+            return
+
         repository = BenefitGrantRepository.from_session(session)
         grants = await repository.list_granted_by_benefit(benefit)
         for grant in grants:
             enqueue_job("benefit.update", benefit_grant_id=grant.id)
 
+    async def update_benefit_grants_in_bulk(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        benefit: Benefit,
+        *,
+        after: UUID | None,
+        limit: int,
+    ) -> Sequence[BenefitGrant]:
+        """
+        Update a chunk of the granted grants of the benefit, with set-based queries.
+
+        Only for benefit types which `can_update_in_bulk`. Grants the strategy
+        can't update in bulk are enqueued for an individual update.
+
+        Args:
+            after: ID of the last grant of the previous chunk, if any.
+            limit: Maximum number of grants in the chunk.
+
+        Returns:
+            The grants of the chunk, by ascending ID.
+        """
+        repository = BenefitGrantRepository.from_session(session)
+        grants = await repository.list_granted_by_benefit_chunk(
+            benefit, after=after, limit=limit, options=repository.get_eager_options()
+        )
+        # Deleted customer, don't update the grant
+        active_grants = [grant for grant in grants if not grant.customer.is_deleted]
+        if not active_grants:
+            return grants
+
+        benefit_strategy = get_benefit_strategy(benefit.type, session, redis)
+        properties = await benefit_strategy.update_in_bulk(benefit, active_grants)
+
+        updated_grants: list[BenefitGrant] = []
+        for grant in active_grants:
+            if grant.id not in properties:
+                enqueue_job("benefit.update", benefit_grant_id=grant.id)
+                continue
+            grant.previous_properties = grant.properties
+            grant.properties = properties[grant.id]
+            grant.set_granted()
+            updated_grants.append(grant)
+        await session.flush()
+
+        await event_service.create_events(
+            session,
+            [
+                build_system_event(
+                    SystemEvent.benefit_updated,
+                    customer=grant.customer,
+                    organization=benefit.organization,
+                    metadata=self._build_benefit_grant_metadata(grant, benefit),
+                )
+                for grant in updated_grants
+            ],
+        )
+
+        await webhook_service.send_many(
+            session,
+            benefit.organization,
+            WebhookEventType.benefit_grant_updated,
+            updated_grants,
+        )
+        for customer_id in {grant.customer_id for grant in updated_grants}:
+            enqueue_job("customer.state_changed", customer_id)
+
+        return grants
+
     async def update_benefit_grant(
         self,
         session: AsyncSession,
@@ -43,6 +43,14 @@ class BenefitRepository(
         )
         return await self.get_one_or_none(statement)
 
+    async def get_all_by_ids(
+        self, ids: Sequence[UUID], *, options: Options = ()
+    ) -> Sequence[Benefit]:
+        statement = (
+            self.get_base_statement().where(Benefit.id.in_(ids)).options(*options)
+        )
+        return await self.get_all(statement)
+
     async def list_by_slack_integration_id(
         self,
         organization_id: UUID,
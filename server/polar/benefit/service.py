@@ -21,6 +21,8 @@ from polar.models import Benefit, Organization, ProductBenefit, User
 from polar.models.benefit import BenefitType
 from polar.models.webhook_endpoint import WebhookEventType
 from polar.organization.resolver import get_payload_organization
+from polar.product.cache import invalidate_cached_products
+from polar.product.repository import ProductRepository
 from polar.redis import Redis
 from polar.webhook.service import webhook as webhook_service
 from polar.worker import enqueue_job
@@ -274,6 +276,11 @@ class BenefitService:
             setattr(benefit, key, value)
         session.add(benefit)
 
+        product_repository = ProductRepository.from_session(session)
+        invalidate_cached_products(
+            await product_repository.get_ids_by_benefit(benefit.id)
+        )
+
         await benefit_grant_service.enqueue_benefit_grant_updates(
             session, redis, benefit, previous_properties
         )
@@ -297,6 +304,11 @@ class BenefitService:
         if not benefit.deletable:
             raise NotPermitted()
 
+        product_repository = ProductRepository.from_session(session)
+        invalidate_cached_products(
+            await product_repository.get_ids_by_benefit(benefit.id)
+        )
+
         repository = BenefitRepository.from_session(session)
         await repository.soft_delete(benefit)
         statement = delete(ProductBenefit).where(
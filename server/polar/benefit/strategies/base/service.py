@@ -1,8 +1,10 @@
+from collections.abc import Sequence
 from typing import Any, Protocol, Unpack, cast
+from uuid import UUID
 
 from polar.auth.models import AuthSubject
 from polar.exceptions import PolarError, PolarRequestValidationError, ValidationError
-from polar.models import Benefit, Customer, Member, Organization, User
+from polar.models import Benefit, BenefitGrant, Customer, Member, Organization, User
 from polar.models.benefit_grant import BenefitGrantScopeArgs
 from polar.postgres import AsyncSession
 from polar.redis import Redis
@@ -84,6 +86,8 @@ class BenefitServiceProtocol[BP: BenefitProperties, BGP: BenefitGrantProperties]
     redis: Redis
 
     should_revoke_individually: bool = False
+    can_update_in_bulk: bool = False
+    "Whether `update_in_bulk` is implemented for this benefit type."
 
     def __init__(self, session: AsyncSession, redis: Redis) -> None:
         self.session = session
@@ -208,6 +212,27 @@ class BenefitServiceProtocol[BP: BenefitProperties, BGP: BenefitGrantProperties]
         """
         ...
 
+    async def update_in_bulk(
+        self, benefit: Benefit, grants: Sequence[BenefitGrant]
+    ) -> dict[UUID, BGP]:
+        """
+        Applies a benefit update to a chunk of its grants at once.
+
+        Only implemented by benefit types whose update is a pure transformation
+        of our database, i.e. `can_update_in_bulk` is `True`. It should issue
+        set-based queries rather than one per grant.
+
+        Args:
+            benefit: The updated Benefit.
+            grants: The granted grants to update, with their customer and member
+            loaded.
+
+        Returns:
+            The new properties, by grant ID. Grants missing from the result
+            couldn't be updated in bulk and will go through `grant` individually.
+        """
+        ...
+
     async def validate_properties(
         self,
         auth_subject: AuthSubject[User | Organization],
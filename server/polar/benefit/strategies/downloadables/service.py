@@ -5,6 +5,7 @@ from uuid import UUID
 import structlog
 
 from polar.auth.models import AuthSubject
+from polar.customer_portal.repository.downloadable import DownloadableRepository
 from polar.customer_portal.service.downloadables import (
     downloadable as downloadable_service,
 )
@@ -12,7 +13,15 @@ from polar.exceptions import ValidationError
 from polar.file.repository import FileRepository
 from polar.kit.pagination import PaginationParams
 from polar.logging import Logger
-from polar.models import Benefit, Customer, File, Member, Organization, User
+from polar.models import (
+    Benefit,
+    BenefitGrant,
+    Customer,
+    File,
+    Member,
+    Organization,
+    User,
+)
 from polar.models.benefit_grant import BenefitGrantScopeArgs
 from polar.postgres import AsyncReadSession
 
@@ -68,6 +77,8 @@ class BenefitDownloadablesService(
         BenefitDownloadablesProperties, BenefitGrantDownloadablesProperties
     ]
 ):
+    can_update_in_bulk = True
+
     async def grant(
         self,
         benefit: Benefit,
@@ -138,6 +149,47 @@ class BenefitDownloadablesService(
         )
         return {}
 
+    async def update_in_bulk(
+        self, benefit: Benefit, grants: Sequence[BenefitGrant]
+    ) -> dict[UUID, BenefitGrantDownloadablesProperties]:
+        properties = self._get_properties(benefit)
+        file_ids = get_active_file_ids(properties)
+
+        # Revoke everything for the grants whose set of files changed, as `grant` does
+        changed_grants = [
+            grant
+            for grant in grants
+            if grant.properties
+            and {UUID(f) for f in grant.properties.get("files", [])} != set(file_ids)
+        ]
+        repository = DownloadableRepository.from_session(self.session)
+        await repository.revoke_many(
+            benefit_id=benefit.id,
+            scopes=[(grant.customer_id, grant.member_id) for grant in changed_grants],
+        )
+
+        if not file_ids:
+            return {grant.id: {} for grant in grants}
+
+        file_repository = FileRepository.from_session(self.session)
+        files = await file_repository.get_all(
+            file_repository.get_base_statement().where(File.id.in_(file_ids))
+        )
+        existing_file_ids = {file.id for file in files}
+        granted_file_ids = [
+            file_id for file_id in file_ids if file_id in existing_file_ids
+        ]
+        await repository.upsert_granted_many(
+            benefit_id=benefit.id,
+            file_ids=granted_file_ids,
+            scopes=[(grant.customer_id, grant.member_id) for grant in grants],
+        )
+
+        return {
+            grant.id: {"files": [str(file_id) for file_id in granted_file_ids]}
+            for grant in grants
+        }
+
     async def requires_update(
         self, benefit: Benefit, previous_properties: BenefitDownloadablesProperties
     ) -> bool:
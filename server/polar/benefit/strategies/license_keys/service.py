@@ -1,12 +1,15 @@
+from collections.abc import Sequence
 from typing import Any, Unpack, cast
 from uuid import UUID
 
 import structlog
 
 from polar.auth.models import AuthSubject
+from polar.license_key.repository import LicenseKeyRepository
+from polar.license_key.schemas import LicenseKeyCreate
 from polar.license_key.service import license_key as license_key_service
 from polar.logging import Logger
-from polar.models import Benefit, Customer, Member, Organization, User
+from polar.models import Benefit, BenefitGrant, Customer, Member, Organization, User
 from polar.models.benefit_grant import BenefitGrantScopeArgs
 
 from ..base.service import BenefitServiceProtocol
@@ -21,6 +24,7 @@ class BenefitLicenseKeysService(
     ]
 ):
     should_revoke_individually = True
+    can_update_in_bulk = True
 
     async def grant(
         self,
@@ -114,6 +118,61 @@ class BenefitLicenseKeysService(
         diff_usage = c.get("limit_usage", None) != pre.get("limit_usage", None)
         return diff_expires or diff_activations or diff_usage
 
+    async def update_in_bulk(
+        self, benefit: Benefit, grants: Sequence[BenefitGrant]
+    ) -> dict[UUID, BenefitGrantLicenseKeysProperties]:
+        properties = self._get_properties(benefit)
+
+        expires_at = None
+        if expires := properties.get("expires", None):
+            ttl = expires.get("ttl", None)
+            timeframe = expires.get("timeframe", None)
+            if ttl and timeframe:
+                expires_at = LicenseKeyCreate.generate_expiration_dt(ttl, timeframe)
+        activations = properties.get("activations", None)
+
+        # Subscription-backed keys never expire; they follow the subscription.
+        subscription_license_keys: list[tuple[UUID, UUID, UUID | None]] = []
+        license_keys: list[tuple[UUID, UUID, UUID | None]] = []
+        license_key_grants: dict[UUID, BenefitGrant] = {}
+        for grant in grants:
+            grant_properties = cast(BenefitGrantLicenseKeysProperties, grant.properties)
+            # No license key yet: it has to be created by the regular grant logic
+            if "license_key_id" not in grant_properties:
+                continue
+            license_key_id = UUID(grant_properties["license_key_id"])
+            license_key = (license_key_id, grant.customer_id, grant.member_id)
+            if grant.subscription_id is not None:
+                subscription_license_keys.append(license_key)
+            else:
+                license_keys.append(license_key)
+            license_key_grants[license_key_id] = grant
+
+        repository = LicenseKeyRepository.from_session(self.session)
+        updated: dict[UUID, BenefitGrantLicenseKeysProperties] = {}
+        for grant_license_keys, grant_license_keys_expires_at in (
+            (subscription_license_keys, None),
+            (license_keys, expires_at),
+        ):
+            updated_ids = await repository.update_limits(
+                benefit.organization_id,
+                benefit.id,
+                grant_license_keys,
+                limit_activations=activations.get("limit", None)
+                if activations
+                else None,
+                limit_usage=properties.get("limit_usage", None),
+                expires_at=grant_license_keys_expires_at,
+            )
+            # Keys not updated go through the regular grant logic, which fails
+            # loudly on a mismatching license key
+            for license_key_id in updated_ids:
+                grant = license_key_grants[license_key_id]
+                updated[grant.id] = cast(
+                    BenefitGrantLicenseKeysProperties, grant.properties
+                )
+        return updated
+
     async def validate_properties(
         self,
         auth_subject: AuthSubject[User | Organization],
@@ -1,3 +1,4 @@
+import contextlib
 import datetime
 import uuid
 from typing import Literal, Unpack
@@ -7,10 +8,13 @@ from dramatiq import Retry
 
 from polar.benefit.grant.repository import BenefitGrantRepository
 from polar.benefit.repository import BenefitRepository
+from polar.config import settings
 from polar.customer.repository import CustomerRepository
 from polar.exceptions import PolarTaskError
 from polar.logging import Logger
-from polar.models.benefit_grant import BenefitGrantScopeArgs
+from polar.models import Benefit, Customer
+from polar.models.benefit_grant import BenefitGrantScope, BenefitGrantScopeArgs
+from polar.postgres import AsyncSession
 from polar.product.repository import ProductRepository
 from polar.worker import (
     AsyncSessionMaker,
@@ -22,6 +26,8 @@ from polar.worker import (
     get_retries,
 )
 
+from .grant.lanes import BATCHED_BENEFIT_TYPES, benefit_lane
+from .grant.progress import BulkUpdateProgress, get_progress, save_progress
 from .grant.scope import resolve_member, resolve_scope
 from .grant.service import benefit_grant as benefit_grant_service
 from .strategies import BenefitRetriableError
@@ -106,7 +112,33 @@ async def benefit_enqueue_grants(
     member_id: uuid.UUID | None = None,
     **scope: Unpack[BenefitGrantScopeArgs],
 ) -> None:
+    if not grant_benefit_ids:
+        return
+
+    async with AsyncSessionMaker() as session:
+        benefit_repository = BenefitRepository.from_session(session)
+        benefits = await benefit_repository.get_all_by_ids(grant_benefit_ids)
+
+    # Benefits only touching our database are granted together, in one task
+    batched_benefit_ids = {
+        benefit.id for benefit in benefits if benefit.type in BATCHED_BENEFIT_TYPES
+    }
+    if batched_benefit_ids:
+        enqueue_job(
+            "benefit.grant_batch",
+            customer_id=customer_id,
+            benefit_ids=[
+                benefit_id
+                for benefit_id in grant_benefit_ids
+                if benefit_id in batched_benefit_ids
+            ],
+            member_id=member_id,
+            **scope,
+        )
+
     for benefit_id in grant_benefit_ids:
+        if benefit_id in batched_benefit_ids:
+            continue
         enqueue_job(
             "benefit.grant",
             customer_id=customer_id,
@@ -137,41 +169,133 @@ async def benefit_grant(
             raise BenefitDoesNotExist(benefit_id)
 
         resolved_scope = await resolve_scope(session, scope)
+        await _grant_benefit(session, customer, benefit, member_id, resolved_scope)
 
-        product = None
-        if subscription := resolved_scope.get("subscription"):
-            product = subscription.product
-        elif order := resolved_scope.get("order"):
-            product = order.product
-        is_seat_based = product.has_seat_based_price if product else False
 
-        member = await resolve_member(
-            session,
-            customer_id=customer_id,
-            organization=benefit.organization,
-            member_id=member_id,
-            is_seat_based=is_seat_based,
+@actor(actor_name="benefit.grant_batch", priority=TaskPriority.MEDIUM)
+async def benefit_grant_batch(
+    customer_id: uuid.UUID,
+    benefit_ids: list[uuid.UUID],
+    member_id: uuid.UUID | None = None,
+    **scope: Unpack[BenefitGrantScopeArgs],
+) -> None:
+    """
+    Grant several benefits in one go.
+
+    Meant for benefits only touching our database: they're granted in a single
+    transaction, with set-based statements. A benefit failing to grant is handed
+    over to the `benefit.grant` task, so it doesn't hold back the others.
+    """
+    async with AsyncSessionMaker() as session:
+        customer_repository = CustomerRepository.from_session(session)
+        customer = await customer_repository.get_by_id(customer_id)
+        if customer is None:
+            raise CustomerDoesNotExist(customer_id)
+
+        benefit_repository = BenefitRepository.from_session(session)
+        benefits = await benefit_repository.get_all_by_ids(
+            benefit_ids, options=benefit_repository.get_eager_options()
         )
+        if len(benefits) < len(set(benefit_ids)):
+            found_ids = {benefit.id for benefit in benefits}
+            for benefit_id in benefit_ids:
+                if benefit_id not in found_ids:
+                    log.warning(
+                        "Benefit to grant in batch does not exist; skipping",
+                        benefit_id=str(benefit_id),
+                        customer_id=str(customer_id),
+                    )
 
-        try:
+        resolved_scope = await resolve_scope(session, scope)
+        is_seat_based = _is_seat_based(resolved_scope)
+        benefits_by_organization: dict[uuid.UUID, list[Benefit]] = {}
+        for benefit in benefits:
+            benefits_by_organization.setdefault(benefit.organization_id, []).append(
+                benefit
+            )
+
+        redis = RedisMiddleware.get()
+        for organization_benefits in benefits_by_organization.values():
+            member = await resolve_member(
+                session,
+                customer_id=customer.id,
+                organization=organization_benefits[0].organization,
+                member_id=member_id,
+                is_seat_based=is_seat_based,
+            )
+            try:
+                async with contextlib.AsyncExitStack() as stack:
+                    for benefit_type in {
+                        benefit.type for benefit in organization_benefits
+                    }:
+                        await stack.enter_async_context(
+                            benefit_lane(redis, benefit_type, "grant")
+                        )
+                    await benefit_grant_service.grant_benefits(
+                        session,
+                        redis,
+                        customer,
+                        organization_benefits,
+                        member=member,
+                        attempt=get_retries(),
+                        **resolved_scope,
+                    )
+            except BenefitRetriableError as e:
+                log.warning(
+                    "Retriable error encountered while granting benefits",
+                    error=str(e),
+                    defer_seconds=e.defer_seconds,
+                    benefit_ids=[str(benefit.id) for benefit in organization_benefits],
+                    customer_id=str(customer.id),
+                )
+                raise Retry(delay=e.defer_milliseconds) from e
+
+
+def _is_seat_based(scope: BenefitGrantScope) -> bool:
+    product = None
+    if subscription := scope.get("subscription"):
+        product = subscription.product
+    elif order := scope.get("order"):
+        product = order.product
+    return product.has_seat_based_price if product else False
+
+
+async def _grant_benefit(
+    session: AsyncSession,
+    customer: Customer,
+    benefit: Benefit,
+    member_id: uuid.UUID | None,
+    scope: BenefitGrantScope,
+) -> None:
+    member = await resolve_member(
+        session,
+        customer_id=customer.id,
+        organization=benefit.organization,
+        member_id=member_id,
+        is_seat_based=_is_seat_based(scope),
+    )
+
+    redis = RedisMiddleware.get()
+    try:
+        async with benefit_lane(redis, benefit.type, "grant"):
             await benefit_grant_service.grant_benefit(
                 session,
-                RedisMiddleware.get(),
+                redis,
                 customer,
                 benefit,
                 member=member,
                 attempt=get_retries(),
-                **resolved_scope,
-            )
-        except BenefitRetriableError as e:
-            log.warning(
-                "Retriable error encountered while granting benefit",
-                error=str(e),
-                defer_seconds=e.defer_seconds,
-                benefit_id=str(benefit_id),
-                customer_id=str(customer_id),
+                **scope,
             )
-            raise Retry(delay=e.defer_milliseconds) from e
+    except BenefitRetriableError as e:
+        log.warning(
+            "Retriable error encountered while granting benefit",
+            error=str(e),
+            defer_seconds=e.defer_seconds,
+            benefit_id=str(benefit.id),
+            customer_id=str(customer.id),
+        )
+        raise Retry(delay=e.defer_milliseconds) from e
 
 
 @actor(actor_name="benefit.revoke", priority=TaskPriority.MEDIUM)
@@ -228,16 +352,18 @@ async def benefit_revoke(
             include_deleted=True,
         )
 
+        redis = RedisMiddleware.get()
         try:
-            await benefit_grant_service.revoke_benefit(
-                session,
-                RedisMiddleware.get(),
-                customer,
-                benefit,
-                member=member,
-                attempt=get_retries(),
-                **resolved_scope,
-            )
+            async with benefit_lane(redis, benefit.type, "revoke"):
+                await benefit_grant_service.revoke_benefit(
+                    session,
+                    redis,
+                    customer,
+                    benefit,
+                    member=member,
+                    attempt=get_retries(),
+                    **resolved_scope,
+                )
         except BenefitRetriableError as e:
             log.warning(
                 "Retriable error encountered while revoking benefit",
@@ -261,10 +387,12 @@ async def benefit_update(benefit_grant_id: uuid.UUID) -> None:
         if benefit_grant is None:
             raise BenefitGrantDoesNotExist(benefit_grant_id)
 
+        redis = RedisMiddleware.get()
         try:
-            await benefit_grant_service.update_benefit_grant(
-                session, RedisMiddleware.get(), benefit_grant, attempt=get_retries()
-            )
+            async with benefit_lane(redis, benefit_grant.benefit.type, "update"):
+                await benefit_grant_service.update_benefit_grant(
+                    session, redis, benefit_grant, attempt=get_retries()
+                )
         except BenefitRetriableError as e:
             log.warning(
                 "Retriable error encountered while updating benefit",
@@ -275,6 +403,62 @@ async def benefit_update(benefit_grant_id: uuid.UUID) -> None:
             raise Retry(delay=e.defer_milliseconds) from e
 
 
+@actor(actor_name="benefit.update_bulk", priority=TaskPriority.LOW)
+async def benefit_update_bulk(benefit_id: uuid.UUID, requested_at: str) -> None:
+    """
+    Apply an update of the benefit to its grants, one chunk at a time.
+
+    Each run handles a chunk and enqueues the next one, recording its progress
+    so a failed chunk is retried from where the update stopped.
+    """
+    redis = RedisMiddleware.get()
+    requested_at_dt = datetime.datetime.fromisoformat(requested_at)
+
+    progress = await get_progress(redis, benefit_id)
+    if progress is None or progress.requested_at < requested_at_dt:
+        progress = BulkUpdateProgress(requested_at=requested_at_dt)
+    elif progress.requested_at > requested_at_dt:
+        log.info(
+            "Bulk benefit update superseded by a newer one; stopping",
+            benefit_id=str(benefit_id),
+            requested_at=requested_at,
+        )
+        return
+    elif progress.completed:
+        return
+
+    async with AsyncSessionMaker() as session:
+        benefit_repository = BenefitRepository.from_session(session)
+        benefit = await benefit_repository.get_by_id(
+            benefit_id, options=benefit_repository.get_eager_options()
+        )
+        if benefit is None:
+            raise BenefitDoesNotExist(benefit_id)
+
+        limit = settings.BENEFIT_BULK_UPDATE_CHUNK_SIZE
+        grants = await benefit_grant_service.update_benefit_grants_in_bulk(
+            session, redis, benefit, after=progress.cursor, limit=limit
+        )
+
+    # Committed: record the progress before moving to the next chunk
+    if grants:
+        progress.cursor = grants[-1].id
+        progress.updated += len(grants)
+    progress.completed = len(grants) < limit
+    await save_progress(redis, benefit_id, progress)
+
+    log.info(
+        "Bulk benefit update progressed",
+        benefit_id=str(benefit_id),
+        updated=progress.updated,
+        completed=progress.completed,
+    )
+    if not progress.completed:
+        enqueue_job(
+            "benefit.update_bulk", benefit_id=benefit_id, requested_at=requested_at
+        )
+
+
 @actor(actor_name="benefit.enqueue_benefit_grant_cycles", priority=TaskPriority.MEDIUM)
 async def enqueue_benefit_grant_cycles(**scope: Unpack[BenefitGrantScopeArgs]) -> None:
     async with AsyncSessionMaker() as session:
@@ -296,10 +480,12 @@ async def benefit_cycle(benefit_grant_id: uuid.UUID) -> None:
         if benefit_grant is None:
             raise BenefitGrantDoesNotExist(benefit_grant_id)
 
+        redis = RedisMiddleware.get()
         try:
-            await benefit_grant_service.cycle_benefit_grant(
-                session, RedisMiddleware.get(), benefit_grant, attempt=get_retries()
-            )
+            async with benefit_lane(redis, benefit_grant.benefit.type, "cycle"):
+                await benefit_grant_service.cycle_benefit_grant(
+                    session, redis, benefit_grant, attempt=get_retries()
+                )
         except BenefitRetriableError as e:
             log.warning(
                 "Retriable error encountered while cycling benefit",
@@ -350,10 +536,12 @@ async def benefit_delete_grant(benefit_grant_id: uuid.UUID) -> None:
         if benefit_grant is None:
             raise BenefitGrantDoesNotExist(benefit_grant_id)
 
+        redis = RedisMiddleware.get()
         try:
-            await benefit_grant_service.delete_benefit_grant(
-                session, RedisMiddleware.get(), benefit_grant, attempt=get_retries()
-            )
+            async with benefit_lane(redis, benefit_grant.benefit.type, "delete"):
+                await benefit_grant_service.delete_benefit_grant(
+                    session, redis, benefit_grant, attempt=get_retries()
+                )
         except BenefitRetriableError as e:
             log.warning(
                 "Retriable error encountered while deleting benefit grant",
@@ -1,9 +1,10 @@
 from collections.abc import AsyncGenerator, Sequence
 from datetime import datetime
 from itertools import batched
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import Select, and_, func, or_, select, update
+from sqlalchemy import Select, and_, func, insert, inspect, or_, select, update
 from sqlalchemy.orm.strategy_options import contains_eager, joinedload
 
 from polar.config import settings
@@ -14,11 +15,13 @@ from polar.kit.repository import (
     RepositorySoftDeletionIDMixin,
     RepositorySoftDeletionMixin,
 )
+from polar.kit.utils import generate_uuid, utc_now
 from polar.models import BillingEntry
 from polar.models.billing_entry import BillingEntryType
 from polar.models.product_price import ProductPrice, ProductPriceMeteredUnit
 
 _LINK_PENDING_BATCH_SIZE = 5_000
+_INSERT_BATCH_SIZE = 1_000
 
 
 class BillingEntryRepository(
@@ -46,6 +49,31 @@ class BillingEntryRepository(
             )
             await self.session.execute(statement)
 
+    async def insert_batch(self, billing_entries: Sequence[BillingEntry]) -> None:
+        """
+        Insert billing entries with multi-row INSERT statements.
+
+        Unlike `create`, the entries aren't added to the session: it's meant for
+        large batches, where the unit of work would track and flush each of them.
+        """
+        mapper = inspect(self.model)
+        now = utc_now()
+        values: list[dict[str, Any]] = []
+        for billing_entry in billing_entries:
+            # Column defaults are only applied on flush
+            if billing_entry.id is None:
+                billing_entry.id = generate_uuid()
+            if billing_entry.created_at is None:
+                billing_entry.created_at = now
+            values.append(
+                {
+                    attribute.key: getattr(billing_entry, attribute.key)
+                    for attribute in mapper.column_attrs
+                }
+            )
+        for batch in batched(values, _INSERT_BATCH_SIZE):
+            await self.session.execute(insert(self.model).values(batch))
+
     async def get_all_by_subscription(
         self, subscription_id: UUID
     ) -> Sequence[BillingEntry]:
@@ -214,9 +214,10 @@ async def update(
 async def client_get(
     client_secret: CheckoutClientSecret,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """Get a checkout session by client secret."""
-    return await checkout_service.get_by_client_secret(session, client_secret)
+    return await checkout_service.get_by_client_secret(session, redis, client_secret)
 
 
 @inner_router.patch(
@@ -235,10 +236,11 @@ async def client_update(
     checkout_update: CheckoutUpdatePublic,
     ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """Update a checkout session by client secret."""
     checkout = await checkout_service.get_by_client_secret(
-        session, client_secret, for_update=True
+        session, redis, client_secret, for_update=True
     )
 
     return await checkout_service.update(
@@ -263,6 +265,7 @@ async def client_confirm(
     checkout_confirm: CheckoutConfirm,
     auth_subject: auth.CheckoutWeb,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """
     Confirm a checkout session by client secret.
@@ -270,7 +273,7 @@ async def client_confirm(
     Orders and subscriptions will be processed.
     """
     checkout = await checkout_service.get_by_client_secret(
-        session, client_secret, for_update=True
+        session, redis, client_secret, for_update=True
     )
 
     return await checkout_service.confirm(
@@ -294,11 +297,14 @@ async def client_opened(
     client_secret: CheckoutClientSecret,
     checkout_opened: CheckoutOpened,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """
     Mark a checkout session as opened by client for analytics/experiment purposes.
     """
-    checkout = await checkout_service.get_by_client_secret(session, client_secret)
+    checkout = await checkout_service.get_by_client_secret(
+        session, redis, client_secret
+    )
     return await checkout_service.mark_opened(
         session, checkout, checkout_opened.distinct_id
     )
@@ -311,7 +317,9 @@ async def client_stream(
     session: AsyncSession = Depends(get_db_session),
     redis: Redis = Depends(get_redis),
 ) -> EventSourceResponse:
-    checkout = await checkout_service.get_by_client_secret(session, client_secret)
+    checkout = await checkout_service.get_by_client_secret(
+        session, redis, client_secret
+    )
     # Release the DB session before entering the long-lived SSE stream.
     # The session is no longer needed after the checkout lookup.
     await session.commit()
@@ -1,13 +1,23 @@
 import argparse
+import functools
+import os
 import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
 from typing import Annotated, cast
 
 import httpx
 import ipinfo_db
 import ipinfo_db.reader
+import structlog
 from fastapi import Depends, Request
 
 from polar.config import settings
+from polar.logging import Logger
+
+log: Logger = structlog.get_logger()
 
 DOWNLOAD_PATH = "https://ipinfo.io/data/free/country_asn.mmdb?token={token}"
 DATABASE_PATH = (
@@ -16,14 +26,98 @@ DATABASE_PATH = (
 )
 
 
+def _get_file_id(path: Path) -> tuple[int, int, int]:
+    stat = path.stat()
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _warm_page_cache(path: Path) -> None:
+    """Ask the kernel to read the database ahead, so first lookups don't fault."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+class _Generation:
+    """An opened database file, along with the cache of its lookups."""
+
+    def __init__(self, path: Path, cache_size: int) -> None:
+        self.file_id = _get_file_id(path)
+        _warm_page_cache(path)
+        # The database is memory-mapped read-only: its pages are shared
+        # with the other processes of the host through the page cache.
+        client = ipinfo_db.Client(path=path)
+
+        def _get_country(ip: str) -> str | None:
+            ret = cast(str | None, client.getCountry(ip))
+            # Convert empty str into None response to ease empty case checking
+            if ret == "":
+                return None
+            return ret
+
+        self.client = client
+        self.get_country = functools.lru_cache(maxsize=cache_size)(_get_country)
+
+
+class IPGeolocationDatabase:
+    """
+    IP to country database, with an LRU cache of recent lookups.
+
+    The database file is checked for changes at most every
+    `reload_check_interval` seconds. When a new file is moved in place,
+    it's opened and swapped with the current one at once, without a restart.
+    """
+
+    def __init__(
+        self, path: Path, *, cache_size: int, reload_check_interval: float
+    ) -> None:
+        self.path = path
+        self.cache_size = cache_size
+        self.reload_check_interval = reload_check_interval
+        self._generation = _Generation(path, cache_size)
+        self._next_reload_check = time.monotonic() + reload_check_interval
+        self._reload_lock = threading.Lock()
+
+    def get_country(self, ip: str) -> str | None:
+        if time.monotonic() >= self._next_reload_check:
+            self._maybe_reload()
+        return self._generation.get_country(ip)
+
+    def close(self) -> None:
+        self._generation.client.close()
+
+    def _maybe_reload(self) -> None:
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_reload_check = time.monotonic() + self.reload_check_interval
+            try:
+                if _get_file_id(self.path) == self._generation.file_id:
+                    return
+                generation = _Generation(self.path, self.cache_size)
+            except Exception as e:
+                # Keep serving from the current file
+                log.warning("ip_geolocation.reload_failed", error=str(e))
+                return
+            # The previous file is unmapped once in-flight lookups release it
+            self._generation = generation
+            log.info("ip_geolocation.reloaded", path=str(self.path))
+        finally:
+            self._reload_lock.release()
+
+
 async def _get_client_dependency(request: Request) -> "IPGeolocationClient | None":
     """
-    Retrieve the IPInfo database client from the FastAPI request state.
+    Retrieve the IP geolocation database from the FastAPI request state.
     """
     return request.state.ip_geolocation_client
 
 
-IPGeolocationClient = Annotated[ipinfo_db.Client, Depends(_get_client_dependency)]
+IPGeolocationClient = Annotated[IPGeolocationDatabase, Depends(_get_client_dependency)]
 
 
 def _download_database(access_token: str) -> None:
@@ -31,18 +125,30 @@ def _download_database(access_token: str) -> None:
     Download the IP to Country ASN database.
 
     This should not be called when starting the server or during a request but
-    at build time.
+    at build time, or to refresh the database of running servers.
+
+    It's downloaded to a temporary file, then moved in place at once, so it's
+    never read while partially written.
 
     Args:
         access_token: IPInfo access token.
     """
-    with open(DATABASE_PATH, "wb") as db_file:
-        with httpx.Client() as http_client:
-            with http_client.stream(
-                "GET", DOWNLOAD_PATH.format(token=access_token), follow_redirects=True
-            ) as response:
-                response.raise_for_status()
-                db_file.writelines(response.iter_bytes())
+    with tempfile.NamedTemporaryFile(
+        dir=DATABASE_PATH.parent, prefix=f".{DATABASE_PATH.name}.", delete=False
+    ) as db_file:
+        try:
+            with httpx.Client() as http_client:
+                with http_client.stream(
+                    "GET",
+                    DOWNLOAD_PATH.format(token=access_token),
+                    follow_redirects=True,
+                ) as response:
+                    response.raise_for_status()
+                    db_file.writelines(response.iter_bytes())
+        except BaseException:
+            os.unlink(db_file.name)
+            raise
+    os.replace(db_file.name, DATABASE_PATH)
 
 
 def get_client() -> IPGeolocationClient:
@@ -50,14 +156,18 @@ def get_client() -> IPGeolocationClient:
     Open the IP to Country ASN database.
 
     Returns:
-        IPInfo database client.
+        IP geolocation database.
     """
     if not DATABASE_PATH.exists():
         raise FileNotFoundError(
             f"Database not found at {DATABASE_PATH}. "
             "Please run `python -m polar.checkout.ip_geolocation ACCESS_TOKEN`."
         )
-    return ipinfo_db.Client(path=DATABASE_PATH)
+    return IPGeolocationDatabase(
+        DATABASE_PATH,
+        cache_size=settings.IP_GEOLOCATION_CACHE_SIZE,
+        reload_check_interval=settings.IP_GEOLOCATION_RELOAD_CHECK_INTERVAL_SECONDS,
+    )
 
 
 def get_ip_country(client: IPGeolocationClient, ip: str) -> str | None:
@@ -65,20 +175,16 @@ def get_ip_country(client: IPGeolocationClient, ip: str) -> str | None:
     Get the country alpha-2 code for the given IP address, if available.
 
     Args:
-        client: IPInfo database client.
+        client: IP geolocation database.
         ip: IP address.
 
     Returns:
         Country alpha-2 code.
     """
     try:
-        ret = cast(str | None, client.getCountry(ip))
+        return client.get_country(ip)
     except ValueError:
         return None
-    # Convert empty str into None response to ease empty case checking
-    if ret == "":
-        return None
-    return ret
 
 
 if __name__ == "__main__":
@@ -91,4 +197,9 @@ if __name__ == "__main__":
     _download_database(args.access_token)
     sys.stdout.write(f"Database downloaded to {DATABASE_PATH}\n")
 
-__all__ = ["IPGeolocationClient", "get_client", "get_ip_country"]
+__all__ = [
+    "IPGeolocationClient",
+    "IPGeolocationDatabase",
+    "get_client",
+    "get_ip_country",
+]
@@ -5,7 +5,7 @@ from typing import cast
 from uuid import UUID
 
 from sqlalchemy import Select, func, select, update
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm import joinedload, raiseload, selectinload
 
 from polar.authz.types import AccessibleOrganizationID
 from polar.kit.repository import (
@@ -143,6 +143,21 @@ class CheckoutRepository(
             joinedload(Checkout.product_price),
         )
 
+    def get_eager_options_without_products(self) -> Options:
+        """
+        Eager options of checkouts whose products, and selected price,
+        are attached separately.
+        """
+        return (
+            joinedload(Checkout.organization).joinedload(Organization.account),
+            joinedload(Checkout.customer),
+            selectinload(Checkout.checkout_products).options(
+                raiseload(CheckoutProduct.product)
+            ),
+            joinedload(Checkout.subscription),
+            joinedload(Checkout.discount),
+        )
+
     def get_sorting_clause(self, property: CheckoutSortProperty) -> SortingClause:
         match property:
             case CheckoutSortProperty.created_at:
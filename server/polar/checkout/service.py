@@ -12,6 +12,7 @@ from pydantic import ValidationError as PydanticValidationError
 from sqlalchemy import func, select
 from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import contains_eager, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from polar.auth.models import Anonymous, AuthSubject
 from polar.auth.permission import OrganizationPermission
@@ -95,6 +96,7 @@ from polar.order.service import order as order_service
 from polar.organization.embed_hosts import match_origin, parse_origin
 from polar.postgres import AsyncReadSession, AsyncSession
 from polar.posthog import posthog
+from polar.product.cache import product_cache
 from polar.product.custom_price import validate_custom_price_amount
 from polar.product.guard import (
     CustomPrice,
@@ -112,6 +114,7 @@ from polar.product.price_set import (
 from polar.product.repository import ProductPriceRepository, ProductRepository
 from polar.product.schemas import ProductPriceCreateList
 from polar.product.service import product as product_service
+from polar.redis import Redis
 from polar.subscription.repository import SubscriptionRepository
 from polar.subscription.service import subscription as subscription_service
 from polar.tax.calculation import TaxCode
@@ -1608,16 +1611,21 @@ class CheckoutService:
         return checkout
 
     async def get_by_client_secret(
-        self, session: AsyncSession, client_secret: str, *, for_update: bool = False
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        client_secret: str,
+        *,
+        for_update: bool = False,
     ) -> Checkout:
         repository = CheckoutRepository.from_session(session)
+        # Products are attached from the product cache below: checkouts are
+        # fetched repeatedly while they're open, and their products rarely change.
+        options = repository.get_eager_options_without_products()
         if for_update:
             try:
                 checkout = await repository.get_by_client_secret(
-                    client_secret,
-                    options=repository.get_eager_options(),
-                    for_update=True,
-                    nowait=True,
+                    client_secret, options=options, for_update=True, nowait=True
                 )
             except DBAPIError as e:
                 if is_lock_not_available_error(e):
@@ -1625,7 +1633,7 @@ class CheckoutService:
                 raise
         else:
             checkout = await repository.get_by_client_secret(
-                client_secret, options=repository.get_eager_options()
+                client_secret, options=options
             )
         if checkout is None:
             raise ResourceNotFound()
@@ -1635,6 +1643,8 @@ class CheckoutService:
 
         if not checkout.organization.can_authenticate:
             raise NotPermitted()
+
+        await self._attach_cached_products(session, redis, checkout)
         return checkout
 
     async def mark_opened(
@@ -3071,6 +3081,35 @@ class CheckoutService:
             session, checkout.organization, WebhookEventType.checkout_expired, checkout
         )
 
+    async def _attach_cached_products(
+        self, session: AsyncSession, redis: Redis, checkout: Checkout
+    ) -> None:
+        product_ids = [
+            checkout_product.product_id
+            for checkout_product in checkout.checkout_products
+        ]
+        if checkout.product_id is not None and checkout.product_id not in product_ids:
+            product_ids.append(checkout.product_id)
+
+        products = await product_cache.get(session, redis, product_ids)
+        for product in products.values():
+            set_committed_value(product, "organization", checkout.organization)
+        for checkout_product in checkout.checkout_products:
+            set_committed_value(
+                checkout_product, "product", products[checkout_product.product_id]
+            )
+        set_committed_value(
+            checkout,
+            "product",
+            products[checkout.product_id] if checkout.product_id else None,
+        )
+
+        # Usually one of the cached product prices, already in the identity map
+        product_price: ProductPrice | None = None
+        if checkout.product_price_id is not None:
+            product_price = await session.get(ProductPrice, checkout.product_price_id)
+        set_committed_value(checkout, "product_price", product_price)
+
     async def _eager_load_product(
         self, session: AsyncSession, product: Product
     ) -> Product:
@@ -14,7 +14,7 @@ from pydantic_ai.providers.gateway import gateway_provider
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from sqlalchemy import URL
 
-from polar.enums import EmailSender, TaxProcessor
+from polar.enums import EmailSender, TaxProcessor, TinybirdBackend
 from polar.kit.address import Address, CountryAlpha2
 from polar.kit.jwk import JWKSFile
 
@@ -100,6 +100,12 @@ class Settings(BaseSettings):
     CUSTOMER_METER_UPDATE_DEBOUNCE_MIN_THRESHOLD: timedelta = timedelta(seconds=15)
     CUSTOMER_METER_UPDATE_DEBOUNCE_MAX_THRESHOLD: timedelta = timedelta(minutes=180)
 
+    # Monthly partitions of `meter_events` created ahead of the current month
+    METER_EVENTS_PARTITIONS_AHEAD_MONTHS: int = 3
+    # Partitions of `meter_events` older than this are detached for cold storage,
+    # once exported to Tinybird and billed. Never detached when unset.
+    METER_EVENTS_PARTITION_RETENTION_MONTHS: int | None = None
+
     SECRET: str = "super secret jwt secret"
     JWKS: JWKSFile = Field(default="./.jwks.json")
     CURRENT_JWK_KID: str = "polar_dev"
@@ -168,8 +174,16 @@ class Settings(BaseSettings):
 
     # Checkout
     CHECKOUT_TTL_SECONDS: int = 60 * 60 * 24  # 24 hours
+    # Products of open checkouts are kept in-process for this long,
+    # unless they're updated. Changes to their benefits or custom fields
+    # may take this long to show up in open checkouts.
+    CHECKOUT_PRODUCT_CACHE_TTL_SECONDS: int = 60
+    CHECKOUT_PRODUCT_CACHE_MAX_SIZE: int = 1_000
     IP_GEOLOCATION_DATABASE_DIRECTORY_PATH: DirectoryPath = Path(__file__).parent.parent
     IP_GEOLOCATION_DATABASE_NAME: str = "ip-geolocation.mmdb"
+    IP_GEOLOCATION_CACHE_SIZE: int = 65_536
+    # A new database file moved in place is picked up within this delay
+    IP_GEOLOCATION_RELOAD_CHECK_INTERVAL_SECONDS: float = 60.0
 
     # Database
     POSTGRES_USER: str = "polar"
@@ -215,6 +229,11 @@ class Settings(BaseSettings):
         / "bin"
         / f"react-email-pkg{file_extension}"
     )
+    # Emails are rendered by long-lived renderer processes; 0 spawns one per email
+    EMAIL_RENDERER_POOL_SIZE: int = 2
+    EMAIL_RENDERER_MAX_RENDERS_PER_PROCESS: int = 1000
+    EMAIL_RENDERER_TIMEOUT: float = 30.0
+    EMAIL_RENDERER_HEALTH_CHECK_INTERVAL: float = 60.0
     EMAIL_SENDER: EmailSender = EmailSender.logger
     RESEND_API_KEY: str = ""
     RESEND_API_BASE_URL: str = "https://api.resend.com"
@@ -312,6 +331,9 @@ class Settings(BaseSettings):
     POSTHOG_PROJECT_API_KEY: str = ""
 
     # Tinybird
+    TINYBIRD_BACKEND: TinybirdBackend = TinybirdBackend.tinybird
+    # Directory of the events stored by the local backend
+    TINYBIRD_LOCAL_DIRECTORY: str = ".tinybird-local"
     TINYBIRD_API_URL: str = "http://localhost:7181"
     TINYBIRD_API_TOKEN: str | None = None
     TINYBIRD_READ_TOKEN: str | None = None
@@ -320,6 +342,17 @@ class Settings(BaseSettings):
     TINYBIRD_CLICKHOUSE_TOKEN: str | None = None
     TINYBIRD_WORKSPACE: str | None = None
     TINYBIRD_BRANCH: str | None = None
+    # Events ingested less than this long ago aren't reconciled yet
+    TINYBIRD_RECONCILE_LAG_SECONDS: int = 600
+    # Longest time range reconciled by a single run of `tinybird.reconcile`
+    TINYBIRD_RECONCILE_MAX_WINDOW_SECONDS: int = 3600
+    # Cached results of queries on windows ended before the ingestion watermark
+    TINYBIRD_QUERY_CACHE_HISTORICAL_TTL_SECONDS: int = 3600
+    # Cached results of queries on windows still receiving events
+    TINYBIRD_QUERY_CACHE_RECENT_TTL_SECONDS: int = 30
+    # Windows ending within this delay of the newest ingested event aren't
+    # historical yet: events arriving slightly out of order still land there
+    TINYBIRD_QUERY_CACHE_GRACE_SECONDS: int = 300
     # Logo.dev (for company logo avatars)
     LOGO_DEV_PUBLISHABLE_KEY: str | None = None
     PERSONAL_EMAIL_DOMAINS: set[str] = {
@@ -377,6 +410,26 @@ class Settings(BaseSettings):
     AWS_KMS_KEY_ID: str | None = None
     ENCRYPTION_LOCAL_KEY: str = "super secret encryption key"
 
+    # Benefits
+    # Grants calling third-party APIs are capped and rate limited per integration,
+    # see polar.benefit.grant.lanes.
+    BENEFIT_LANES_ENABLED: bool = True
+    # Benefit-wide updates of database-only benefits are applied to this many
+    # grants per task, see benefit.update_bulk.
+    BENEFIT_BULK_UPDATE_CHUNK_SIZE: int = 500
+
+    # License keys
+    # Read-only validations are served from a snapshot of the license key cached
+    # for this long: revocations and other changes may take as long to apply.
+    LICENSE_KEY_VALIDATION_CACHE_TTL_SECONDS: int = 10
+
+    # Subscription scheduler
+    # Due subscriptions are claimed in batches of this size, up to the per-tick
+    # cap; the remainder is picked up by the next tick, possibly by another
+    # scheduler instance.
+    SUBSCRIPTION_SCHEDULER_CLAIM_BATCH_SIZE: int = 500
+    SUBSCRIPTION_SCHEDULER_MAX_CLAIMS_PER_TICK: int = 5000
+
     # Worker SQS/Lambda execution engine (POC)
     # When enabled, jobs enqueued for an allowlisted actor are routed to an
     # SQS queue consumed by the Lambda worker instead of Redis.
@@ -397,6 +450,8 @@ class Settings(BaseSettings):
     S3_FILES_BUCKET_NAME: str = "polar-s3"
     S3_FILES_PUBLIC_BUCKET_NAME: str = "polar-s3-public"
     S3_FILES_PRESIGN_TTL: int = 3600  # 60 minutes
+    # Presigned download URLs are reused for the first half of their lifetime
+    S3_PRESIGNED_URL_CACHE_MAX_SIZE: int = 10_000
     S3_FILES_DOWNLOAD_SECRET: str = "supersecret"
     S3_FILES_DOWNLOAD_SALT: str = "saltysalty"
     # Override to http://127.0.0.1:9000 in .env during development
@@ -465,9 +520,24 @@ class Settings(BaseSettings):
     INVOICES_ADDITIONAL_INFO: str | None = "[support@polar.sh](mailto:support@polar.sh)"
     INVOICES_VAT_NUMBERS: dict[str, str] = {}
     PAYOUT_INVOICES_PREFIX: str = "POLAR-"
+    # Invoices are rendered by long-lived processes; 0 spawns one process per invoice
+    INVOICE_RENDERER_POOL_SIZE: int = 2
+    INVOICE_RENDERER_MAX_RENDERS_PER_PROCESS: int = 200
+    INVOICE_RENDERER_TIMEOUT: float = 60.0
+
+    # Eventstream
+    # Publish events to Redis when the request or task completes,
+    # instead of going through the `eventstream.publish` worker task.
+    EVENTSTREAM_DIRECT_PUBLISH: bool = True
+
+    # Exports
+    S3_EXPORTS_BUCKET_NAME: str = "polar-exports"
+    S3_EXPORTS_PRESIGN_TTL: int = 60 * 60 * 24  # 24 hours
 
     # Application behaviours
     API_PAGINATION_MAX_LIMIT: int = 100
+    # Above this number of rows, estimated counts are taken from the query planner
+    API_PAGINATION_EXACT_COUNT_THRESHOLD: int = 10_000
     API_MAX_REQUEST_BODY_SIZE: int = 10 * 1024 * 1024
 
     ACCOUNT_PAYOUT_DELAY: timedelta = timedelta(seconds=1)
@@ -595,6 +665,12 @@ class Settings(BaseSettings):
 
     TAX_PROCESSORS: list[TaxProcessor] = [TaxProcessor.stripe]
     TAX_RECORD_PROCESSOR: TaxProcessor = TaxProcessor.stripe
+    # Successful calculations are reused for identical inputs during this delay
+    TAX_CALCULATION_CACHE_TTL_SECONDS: int = 300
+    TAX_CALCULATION_CACHE_MAX_SIZE: int = 10_000
+    # When set, the next processor is started if the current one hasn't
+    # answered after this delay, and the first successful calculation wins.
+    TAX_CALCULATION_HEDGE_DELAY_SECONDS: float | None = None
 
     model_config = SettingsConfigDict(
         env_prefix="polar_",
@@ -31,6 +31,8 @@ from polar.models import CustomField, Organization, User
 from polar.models.custom_field import CustomFieldType
 from polar.organization.resolver import get_payload_organization
 from polar.postgres import AsyncReadSession, AsyncSession
+from polar.product.cache import invalidate_cached_products
+from polar.product.repository import ProductRepository
 
 from .attachment import attached_custom_fields_models
 from .data import custom_field_data_models
@@ -214,6 +216,12 @@ class CustomFieldService(ResourceServiceReader[CustomField]):
                 await session.execute(update_statement)
 
         session.add(custom_field)
+
+        product_repository = ProductRepository.from_session(session)
+        invalidate_cached_products(
+            await product_repository.get_ids_by_custom_field(custom_field.id)
+        )
+
         return custom_field
 
     async def delete(
@@ -231,6 +239,11 @@ class CustomFieldService(ResourceServiceReader[CustomField]):
         custom_field.set_deleted_at()
         session.add(custom_field)
 
+        product_repository = ProductRepository.from_session(session)
+        invalidate_cached_products(
+            await product_repository.get_ids_by_custom_field(custom_field.id)
+        )
+
         # Delete row with this custom field from all association tables
         for model in attached_custom_fields_models:
             delete_statement = delete(model).where(
@@ -1,19 +1,22 @@
-import json
-from collections.abc import AsyncGenerator, Sequence
+from collections.abc import Sequence
 from datetime import datetime
 
 from fastapi import Depends, Query
 from pydantic import TypeAdapter
 
 from polar.auth.permission import OrganizationPermission
-from polar.authz.service import (
-    assert_resource_permission,
-    get_accessible_org_ids,
-)
+from polar.authz.service import assert_resource_permission
 from polar.exceptions import ResourceNotFound
-from polar.kit.csv import CSVStreamingResponse, IterableCSVWriter
+from polar.export.schemas import ExportJob, ExportJobType
+from polar.export.service import export_job as export_job_service
+from polar.kit.csv import CSVStreamingResponse
 from polar.kit.metadata import MetadataQuery, get_metadata_query_openapi_schema
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.pagination import (
+    CursorPaginationParamsQuery,
+    ListResource,
+    ListResourceWithCursorPagination,
+    PaginationParamsQuery,
+)
 from polar.kit.schemas import MultipleQueryFilter
 from polar.kit.time_queries import TimeInterval
 from polar.models import Customer, PaymentMethod
@@ -30,6 +33,7 @@ from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth, sorting
+from .export import CustomerExportParameters, generate_csv, get_filename
 from .repository import CustomerRepository
 from .schemas.customer import (
     CustomerCreate,
@@ -69,12 +73,14 @@ CustomerNotFound = {
 @router.get(
     "/",
     summary="List Customers",
-    response_model=ListResource[CustomerSchema],
+    response_model=ListResource[CustomerSchema]
+    | ListResourceWithCursorPagination[CustomerSchema],
     openapi_extra={"parameters": [get_metadata_query_openapi_schema()]},
 )
 async def list(
     auth_subject: auth.CustomerRead,
     pagination: PaginationParamsQuery,
+    cursor_pagination: CursorPaginationParamsQuery,
     sorting: sorting.ListSorting,
     metadata: MetadataQuery,
     organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
@@ -92,9 +98,9 @@ async def list(
         ),
     ),
     session: AsyncReadSession = Depends(get_db_read_session),
-) -> ListResource[CustomerSchema]:
+) -> ListResource[CustomerSchema] | ListResourceWithCursorPagination[CustomerSchema]:
     """List customers."""
-    results, count = await customer_service.list(
+    statement = await customer_service.get_list_statement(
         session,
         auth_subject,
         organization_id=organization_id,
@@ -102,17 +108,37 @@ async def list(
         metadata=metadata,
         query=query,
         active=active,
-        pagination=pagination,
         sorting=sorting,
     )
+    repository = CustomerRepository.from_session(session)
+
+    if cursor_pagination is not None:
+        results, next_cursor = await repository.paginate_keyset(
+            statement,
+            keys=repository.get_keyset_keys(sorting),
+            pagination=cursor_pagination,
+        )
+        return ListResourceWithCursorPagination.from_results(
+            [
+                _CustomerAdapter.validate_python(result, from_attributes=True)
+                for result in results
+            ],
+            next_cursor is not None,
+            next_cursor,
+        )
+
+    results, total_count = await repository.paginate_estimated(
+        statement, limit=pagination.limit, page=pagination.page
+    )
 
     return ListResource.from_paginated_results(
         [
             _CustomerAdapter.validate_python(result, from_attributes=True)
             for result in results
         ],
-        count,
+        total_count.count,
         pagination,
+        total_count_estimated=total_count.estimated,
     )
 
 
@@ -125,58 +151,37 @@ async def export(
     session: AsyncReadSession = Depends(get_db_read_session),
 ) -> CSVStreamingResponse:
     """Export customers as a CSV file."""
+    return CSVStreamingResponse(
+        generate_csv(session, auth_subject, organization_id=organization_id),
+        get_filename(),
+    )
 
-    async def create_csv() -> AsyncGenerator[str]:
-        csv_writer = IterableCSVWriter(dialect="excel")
-
-        yield csv_writer.getrow(
-            (
-                "ID",
-                "External ID",
-                "Created At",
-                "Email",
-                "Name",
-                "Tax ID",
-                "Billing Address Line 1",
-                "Billing Address Line 2",
-                "Billing Address City",
-                "Billing Address State",
-                "Billing Address Zip",
-                "Billing Address Country",
-                "Metadata",
-            )
-        )
 
-        repository = CustomerRepository.from_session(session)
-        org_ids = await get_accessible_org_ids(
-            session, auth_subject, permission=OrganizationPermission.customers_read
-        )
-        stream = repository.stream_by_organization(org_ids, organization_id)
-
-        async for customer in stream:
-            billing_address = customer.billing_address
-
-            yield csv_writer.getrow(
-                (
-                    customer.id,
-                    customer.external_id,
-                    customer.created_at.isoformat(),
-                    customer.email,
-                    customer.name,
-                    customer.tax_id,
-                    billing_address.line1 if billing_address else None,
-                    billing_address.line2 if billing_address else None,
-                    billing_address.city if billing_address else None,
-                    billing_address.state if billing_address else None,
-                    billing_address.postal_code if billing_address else None,
-                    billing_address.country if billing_address else None,
-                    json.dumps(customer.user_metadata)
-                    if customer.user_metadata
-                    else None,
-                )
-            )
-
-    return CSVStreamingResponse(create_csv(), "polar-customers.csv")
+@router.post(
+    "/export",
+    summary="Create Customers Export Job",
+    response_model=ExportJob,
+    status_code=202,
+    tags=[APITag.private],
+)
+async def create_export_job(
+    parameters: CustomerExportParameters,
+    auth_subject: auth.CustomerRead,
+    redis: Redis = Depends(get_redis),
+) -> ExportJob:
+    """
+    Export customers as a compressed CSV file, generated in the background.
+
+    Progress is reported on the event stream, and the download URL is available
+    from the export job once it has succeeded.
+    """
+    return await export_job_service.create(
+        redis,
+        auth_subject,
+        ExportJobType.customers,
+        filename=get_filename(),
+        parameters=parameters,
+    )
 
 
 @router.get(
@@ -0,0 +1,75 @@
+import json
+from collections.abc import AsyncGenerator, Sequence
+
+from polar.auth.models import AuthSubject, Organization, User
+from polar.auth.permission import OrganizationPermission
+from polar.authz.service import get_accessible_org_ids
+from polar.kit.csv import IterableCSVWriter
+from polar.kit.db.postgres import AsyncReadSession
+from polar.kit.schemas import Schema
+from polar.organization.schemas import OrganizationID
+
+from .repository import CustomerRepository
+
+CUSTOMER_EXPORT_HEADERS: tuple[str, ...] = (
+    "ID",
+    "External ID",
+    "Created At",
+    "Email",
+    "Name",
+    "Tax ID",
+    "Billing Address Line 1",
+    "Billing Address Line 2",
+    "Billing Address City",
+    "Billing Address State",
+    "Billing Address Zip",
+    "Billing Address Country",
+    "Metadata",
+)
+
+
+class CustomerExportParameters(Schema):
+    """Parameters of a customers export, as stored on a background export job."""
+
+    organization_id: list[OrganizationID] | None = None
+
+
+def get_filename() -> str:
+    return "polar-customers.csv"
+
+
+async def generate_csv(
+    session: AsyncReadSession,
+    auth_subject: AuthSubject[User | Organization],
+    *,
+    organization_id: Sequence[OrganizationID] | None,
+) -> AsyncGenerator[str]:
+    csv_writer = IterableCSVWriter(dialect="excel")
+    yield csv_writer.getrow(CUSTOMER_EXPORT_HEADERS)
+
+    repository = CustomerRepository.from_session(session)
+    org_ids = await get_accessible_org_ids(
+        session, auth_subject, permission=OrganizationPermission.customers_read
+    )
+    stream = repository.stream_by_organization(org_ids, organization_id)
+
+    async for customer in stream:
+        billing_address = customer.billing_address
+
+        yield csv_writer.getrow(
+            (
+                customer.id,
+                customer.external_id,
+                customer.created_at.isoformat(),
+                customer.email,
+                customer.name,
+                customer.tax_id,
+                billing_address.line1 if billing_address else None,
+                billing_address.line2 if billing_address else None,
+                billing_address.city if billing_address else None,
+                billing_address.state if billing_address else None,
+                billing_address.postal_code if billing_address else None,
+                billing_address.country if billing_address else None,
+                json.dumps(customer.user_metadata) if customer.user_metadata else None,
+            )
+        )
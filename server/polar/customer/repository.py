@@ -30,6 +30,8 @@ from polar.kit.repository import (
     RepositoryBase,
     RepositorySoftDeletionIDMixin,
     RepositorySoftDeletionMixin,
+    RepositorySortingMixin,
+    SortingClause,
 )
 from polar.kit.time_queries import TimeInterval, get_timestamp_series_cte
 from polar.models import Customer, Subscription
@@ -38,6 +40,8 @@ from polar.models.subscription import SubscriptionStatus
 from polar.models.webhook_endpoint import WebhookEventType
 from polar.worker import enqueue_job
 
+from .sorting import CustomerSortProperty
+
 
 def _get_changed_value(
     inspection: InstanceState[Customer], attr_name: str
@@ -62,6 +66,7 @@ def _get_changed_value(
 
 
 class CustomerRepository(
+    RepositorySortingMixin[Customer, CustomerSortProperty],
     RepositorySoftDeletionIDMixin[Customer, UUID],
     RepositorySoftDeletionMixin[Customer],
     RepositoryBase[Customer],
@@ -404,6 +409,15 @@ class CustomerRepository(
         )
         return subscription_exists if active else ~subscription_exists
 
+    def get_sorting_clause(self, property: CustomerSortProperty) -> SortingClause:
+        match property:
+            case CustomerSortProperty.created_at:
+                return Customer.created_at
+            case CustomerSortProperty.email:
+                return Customer.email
+            case CustomerSortProperty.customer_name:
+                return Customer.name
+
     async def increment_invoice_next_number(self, customer_id: UUID) -> int:
         """
         Atomically increment invoice_next_number and return the value before increment.
@@ -5,7 +5,7 @@ from typing import Any
 
 import structlog
 from pydantic import TypeAdapter
-from sqlalchemy import UnaryExpression, asc, desc, func, or_
+from sqlalchemy import Select, func, or_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 
@@ -92,6 +92,35 @@ class CustomerService:
             (CustomerSortProperty.created_at, True),
         ),
     ) -> tuple[Sequence[Customer], int]:
+        repository = CustomerRepository.from_session(session)
+        statement = await self.get_list_statement(
+            session,
+            auth_subject,
+            organization_id=organization_id,
+            email=email,
+            metadata=metadata,
+            query=query,
+            active=active,
+            sorting=sorting,
+        )
+        return await repository.paginate(
+            statement, limit=pagination.limit, page=pagination.page
+        )
+
+    async def get_list_statement(
+        self,
+        session: AsyncReadSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        organization_id: Sequence[uuid.UUID] | None = None,
+        email: str | None = None,
+        metadata: MetadataQuery | None = None,
+        query: str | None = None,
+        active: bool | None = None,
+        sorting: Sequence[Sorting[CustomerSortProperty]] = (
+            (CustomerSortProperty.created_at, True),
+        ),
+    ) -> Select[tuple[Customer]]:
         repository = CustomerRepository.from_session(session)
         org_ids = await get_accessible_org_ids(
             session, auth_subject, permission=OrganizationPermission.customers_read
@@ -120,20 +149,9 @@ class CustomerService:
         if active is not None:
             statement = statement.where(repository.get_active_clause(active))
 
-        order_by_clauses: list[UnaryExpression[Any]] = []
-        for criterion, is_desc in sorting:
-            clause_function = desc if is_desc else asc
-            if criterion == CustomerSortProperty.created_at:
-                order_by_clauses.append(clause_function(Customer.created_at))
-            elif criterion == CustomerSortProperty.email:
-                order_by_clauses.append(clause_function(Customer.email))
-            elif criterion == CustomerSortProperty.customer_name:
-                order_by_clauses.append(clause_function(Customer.name))
-        statement = statement.order_by(*order_by_clauses)
+        statement = repository.apply_sorting(statement, sorting)
 
-        return await repository.paginate(
-            statement, limit=pagination.limit, page=pagination.page
-        )
+        return statement
 
     async def get_growth(
         self,
@@ -1,10 +1,12 @@
+from collections.abc import Sequence
 from uuid import UUID
 
-from sqlalchemy import Select
+from sqlalchemy import Select, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from polar.auth.models import AuthSubject, Customer, Member, is_member
 from polar.kit.repository import RepositoryBase
+from polar.kit.utils import utc_now
 from polar.models.downloadable import Downloadable, DownloadableStatus
 from polar.models.file import File
 from polar.postgres import sql
@@ -48,6 +50,85 @@ class DownloadableRepository(RepositoryBase[Downloadable]):
         result = await self.session.execute(statement)
         return result.scalars().one()
 
+    async def upsert_granted_many(
+        self,
+        *,
+        benefit_id: UUID,
+        file_ids: Sequence[UUID],
+        scopes: Sequence[tuple[UUID, UUID | None]],
+    ) -> None:
+        """
+        Grant files to several customers at once, like `upsert_granted`.
+
+        Args:
+            benefit_id: The benefit granting the files.
+            file_ids: The files to grant.
+            scopes: The customer ID and member ID, if any, to grant the files to.
+        """
+        if not file_ids or not scopes:
+            return
+
+        insert_statement = pg_insert(Downloadable)
+        statement = insert_statement.on_conflict_do_update(
+            index_elements=[
+                Downloadable.customer_id,
+                Downloadable.member_id,
+                Downloadable.file_id,
+                Downloadable.benefit_id,
+            ],
+            index_where=Downloadable.deleted_at.is_(None),
+            set_={"status": insert_statement.excluded.status},
+        )
+        await self.session.execute(
+            statement,
+            [
+                {
+                    "file_id": file_id,
+                    "customer_id": customer_id,
+                    "benefit_id": benefit_id,
+                    "member_id": member_id,
+                    "status": DownloadableStatus.granted,
+                }
+                for customer_id, member_id in scopes
+                for file_id in file_ids
+            ],
+        )
+
+    async def revoke_many(
+        self, *, benefit_id: UUID, scopes: Sequence[tuple[UUID, UUID | None]]
+    ) -> None:
+        """
+        Revoke the files granted by a benefit to several customers at once.
+
+        Like a single revocation, a member-level scope only revokes that member's
+        rows, a customer-level scope only the shared ones.
+        """
+        customer_ids = [
+            customer_id for customer_id, member_id in scopes if not member_id
+        ]
+        member_ids = [member_id for _, member_id in scopes if member_id]
+
+        statement = (
+            update(Downloadable)
+            .where(
+                Downloadable.benefit_id == benefit_id,
+                Downloadable.status == DownloadableStatus.granted,
+                Downloadable.deleted_at.is_(None),
+            )
+            .values(status=DownloadableStatus.revoked, modified_at=utc_now())
+        )
+        if customer_ids:
+            await self.session.execute(
+                statement.where(
+                    Downloadable.customer_id.in_(customer_ids),
+                    Downloadable.member_id.is_(None),
+                )
+            )
+        if member_ids:
+            await self.session.execute(
+                statement.where(Downloadable.member_id.in_(member_ids))
+            )
+
     def get_customer_statement(
         self, auth_subject: AuthSubject[Customer | Member]
     ) -> Select[tuple[Downloadable]]:
@@ -1,5 +1,5 @@
 from collections.abc import Sequence
-from datetime import timedelta
+from datetime import datetime, timedelta
 from uuid import UUID
 
 import structlog
@@ -16,6 +16,7 @@ from polar.exceptions import (
 from polar.file.repository import FileRepository
 from polar.file.schemas import FileDownload
 from polar.file.service import file as file_service
+from polar.integrations.aws.s3 import presigned_url_cache
 from polar.kit.pagination import PaginationParams, paginate
 from polar.kit.services import ResourceServiceReader
 from polar.kit.utils import utc_now
@@ -168,22 +169,36 @@ class DownloadableService(
         )
 
     def create_download_token(self, downloadable: Downloadable) -> DownloadableURL:
-        expires_at = utc_now() + timedelta(seconds=settings.S3_FILES_PRESIGN_TTL)
-
         last_downloaded_at = 0.0
         if downloadable.last_downloaded_at:
             last_downloaded_at = downloadable.last_downloaded_at.timestamp()
 
-        token = token_serializer.dumps(
-            {
-                "id": str(downloadable.id),
-                # Not used initially, but good for future rate limiting
-                "downloaded": downloadable.downloaded,
-                "last_downloaded_at": last_downloaded_at,
-            }
+        def _sign() -> tuple[str, datetime]:
+            expires_at = utc_now() + timedelta(seconds=settings.S3_FILES_PRESIGN_TTL)
+            token = token_serializer.dumps(
+                {
+                    "id": str(downloadable.id),
+                    # Not used initially, but good for future rate limiting
+                    "downloaded": downloadable.downloaded,
+                    "last_downloaded_at": last_downloaded_at,
+                }
+            )
+            redirect_to = (
+                f"{settings.BASE_URL}/v1/customer-portal/downloadables/{token}"
+            )
+            return redirect_to, expires_at
+
+        url, expires_at = presigned_url_cache.get_or_sign(
+            (
+                "downloadable",
+                downloadable.id,
+                downloadable.downloaded,
+                last_downloaded_at,
+            ),
+            settings.S3_FILES_PRESIGN_TTL,
+            _sign,
         )
-        redirect_to = f"{settings.BASE_URL}/v1/customer-portal/downloadables/{token}"
-        return DownloadableURL(url=redirect_to, expires_at=expires_at)
+        return DownloadableURL(url=url, expires_at=expires_at)
 
     async def get_from_token_or_raise(
         self, session: AsyncSession, token: str
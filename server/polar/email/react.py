@@ -1,14 +1,24 @@
+import asyncio
+import dataclasses
+import itertools
+import json
 import re
-from typing import TYPE_CHECKING
+import time
+from typing import TYPE_CHECKING, Any
 
 import anyio
 
 from polar.config import settings
+from polar.kit.subprocess_pool import SubprocessPool, SubprocessPoolError
+from polar.observability import EMAIL_RENDER_DURATION
 
 if TYPE_CHECKING:
     from .schemas import Email
 
 
+class EmailRenderError(Exception): ...
+
+
 def _transform_avatar_urls_for_email(props_json: str) -> str:
     """Transform logo.dev avatar URLs to use monogram fallback instead of 404."""
     return re.sub(
@@ -18,7 +28,84 @@ def _transform_avatar_urls_for_email(props_json: str) -> str:
     )
 
 
-async def render_from_json(template: str, props_json: str) -> str:
+_request_ids = itertools.count()
+
+
+@dataclasses.dataclass(frozen=True)
+class EmailRenderRequest:
+    template: str
+    props_json: str
+    id: int = dataclasses.field(default_factory=lambda: next(_request_ids))
+
+
+class EmailRendererPool(SubprocessPool[EmailRenderRequest, dict[str, Any]]):
+    """
+    Pool of react-email renderers started with `--serve`.
+
+    They speak newline-delimited JSON over their stdin/stdout:
+    each request is a `{"id", "template", "props"}` line, answered by
+    a `{"id", "html"}` or `{"id", "error"}` line.
+    """
+
+    name = "email_renderer"
+
+    def get_command(self) -> list[str]:
+        return [str(settings.EMAIL_RENDERER_BINARY_PATH), "--serve"]
+
+    async def write_request(
+        self, stdin: asyncio.StreamWriter, request: EmailRenderRequest
+    ) -> None:
+        self._write(
+            stdin,
+            {
+                "id": request.id,
+                "template": request.template,
+                "props": json.loads(request.props_json),
+            },
+        )
+
+    async def read_response(self, stdout: asyncio.StreamReader) -> dict[str, Any]:
+        line = await stdout.readline()
+        if not line:
+            raise asyncio.IncompleteReadError(line, None)
+        return json.loads(line)
+
+    def check_response(
+        self, request: EmailRenderRequest, response: dict[str, Any]
+    ) -> None:
+        self._check_id(request.id, response)
+
+    async def check_health(
+        self, stdin: asyncio.StreamWriter, stdout: asyncio.StreamReader
+    ) -> None:
+        request_id = next(_request_ids)
+        self._write(stdin, {"id": request_id, "ping": True})
+        await stdin.drain()
+        response = await self.read_response(stdout)
+        self._check_id(request_id, response)
+        if not response.get("pong"):
+            raise ValueError(f"Unexpected health check response: {response}")
+
+    def _check_id(self, request_id: int, response: dict[str, Any]) -> None:
+        if response.get("id") != request_id:
+            raise ValueError(
+                f"Response to request {response.get('id')}, expected {request_id}"
+            )
+
+    def _write(self, stdin: asyncio.StreamWriter, message: dict[str, Any]) -> None:
+        stdin.write(json.dumps(message, separators=(",", ":")).encode("utf-8"))
+        stdin.write(b"\n")
+
+
+renderer_pool = EmailRendererPool(
+    size=settings.EMAIL_RENDERER_POOL_SIZE,
+    max_requests_per_process=settings.EMAIL_RENDERER_MAX_RENDERS_PER_PROCESS,
+    timeout=settings.EMAIL_RENDERER_TIMEOUT,
+    health_check_interval=settings.EMAIL_RENDERER_HEALTH_CHECK_INTERVAL,
+)
+
+
+async def _render_process(template: str, props_json: str) -> str:
     process = await anyio.run_process(
         [
             settings.EMAIL_RENDERER_BINARY_PATH,
@@ -29,13 +116,39 @@ async def render_from_json(template: str, props_json: str) -> str:
     )
     if process.returncode != 0:
         assert process.stderr is not None
-        raise Exception(
+        raise EmailRenderError(
             f"Error in react-email process: {process.stderr.decode('utf-8')}"
         )
     assert process.stdout is not None
     return process.stdout.decode("utf-8")
 
 
+async def _render_pooled(template: str, props_json: str) -> str:
+    try:
+        response = await renderer_pool.request(EmailRenderRequest(template, props_json))
+    except SubprocessPoolError as e:
+        raise EmailRenderError(f"Error in react-email process: {e}") from e
+    if "error" in response:
+        raise EmailRenderError(f"Error in react-email process: {response['error']}")
+    return response["html"]
+
+
+async def render_from_json(template: str, props_json: str) -> str:
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        if settings.EMAIL_RENDERER_POOL_SIZE > 0:
+            html = await _render_pooled(template, props_json)
+        else:
+            html = await _render_process(template, props_json)
+        outcome = "success"
+        return html
+    finally:
+        EMAIL_RENDER_DURATION.labels(template=template, outcome=outcome).observe(
+            time.perf_counter() - start
+        )
+
+
 def serialize_email_props(email: "Email") -> str:
     props_json = email.props.model_dump_json()
     return _transform_avatar_urls_for_email(props_json)
@@ -45,4 +158,9 @@ async def render_email_template(email: "Email") -> str:
     return await render_from_json(email.template, serialize_email_props(email))
 
 
-__all__ = ["render_email_template", "render_from_json", "serialize_email_props"]
+__all__ = [
+    "EmailRenderError",
+    "render_email_template",
+    "render_from_json",
+    "serialize_email_props",
+]
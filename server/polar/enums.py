@@ -152,6 +152,11 @@ class EmailSender(StrEnum):
     plain = "plain"
 
 
+class TinybirdBackend(StrEnum):
+    tinybird = "tinybird"
+    local = "local"
+
+
 class RateLimitGroup(StrEnum):
     web = "web"
     restricted = "restricted"
@@ -27,6 +27,7 @@ from polar.models.event import EventSource
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.postgres import AsyncSession, get_db_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth, sorting
@@ -246,6 +247,7 @@ async def get_statistics_by_property(
     ),
     limit: int = Query(default=200, le=1000),
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis | None = Depends(get_redis),
 ) -> ListPropertyGroupStats:
     """
     Get aggregate statistics grouped by distinct values of a metadata property.
@@ -264,6 +266,7 @@ async def get_statistics_by_property(
         external_customer_id=external_customer_id,
         aggregate_fields=tuple(aggregate_fields),
         limit=limit,
+        redis=redis,
     )
 
 
@@ -298,6 +301,7 @@ async def get_statistics_by_customer(
     ),
     limit: int = Query(default=200, le=1000),
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis | None = Depends(get_redis),
 ) -> ListCustomerStats:
     """
     Get aggregate statistics ranked by customer.
@@ -316,6 +320,7 @@ async def get_statistics_by_customer(
         external_customer_id=external_customer_id,
         aggregate_fields=tuple(aggregate_fields),
         limit=limit,
+        redis=redis,
     )
 
 
@@ -353,6 +358,7 @@ async def get_statistics_by_variance(
     ),
     limit: int = Query(default=100, le=1000),
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis | None = Depends(get_redis),
 ) -> ListVarianceEvents:
     """
     Get root events whose aggregate value is at or above the p99 for their event name.
@@ -372,6 +378,7 @@ async def get_statistics_by_variance(
         name=name,
         aggregate_fields=tuple(aggregate_fields),
         limit=limit,
+        redis=redis,
     )
 
 
@@ -436,6 +443,7 @@ async def list_statistics_timeseries(
         description="Metadata field paths to aggregate (e.g., '_cost.amount', 'duration_ns'). Use dot notation for nested fields.",
     ),
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis | None = Depends(get_redis),
 ) -> ListStatisticsTimeseries:
     """
     Get aggregate statistics grouped by root event name over time.
@@ -511,6 +519,7 @@ async def list_statistics_timeseries(
         query=query,
         aggregate_fields=tuple(aggregate_fields),
         hierarchy_stats_sorting=hierarchy_sorting,
+        redis=redis,
     )
 
 
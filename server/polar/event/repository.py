@@ -1,4 +1,6 @@
-from collections.abc import Collection, Sequence
+import contextlib
+import time
+from collections.abc import Collection, Iterator, Sequence
 from datetime import datetime, timedelta
 from typing import Any
 from uuid import UUID
@@ -7,26 +9,31 @@ from sqlalchemy import (
     UUID as SA_UUID,
 )
 from sqlalchemy import (
+    BigInteger,
     ColumnElement,
     ColumnExpressionArgument,
+    FromClause,
     Select,
     String,
+    Update,
     and_,
+    case,
     cast,
     func,
     literal,
+    null,
     or_,
     select,
     tuple_,
+    union_all,
     update,
 )
-from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.dialects.postgresql import BIT, aggregate_order_by, insert
 from sqlalchemy.orm import joinedload
 
 from polar.authz.types import AccessibleOrganizationID
 from polar.kit.repository import RepositoryBase, RepositoryIDMixin
 from polar.kit.repository.base import Options
-from polar.kit.time_queries import TimeInterval, get_timestamp_series_cte
 from polar.kit.utils import generate_uuid
 from polar.models import (
     BillingEntry,
@@ -37,6 +44,7 @@ from polar.models import (
 )
 from polar.models.event import EventSource
 from polar.models.product_price import ProductPriceMeteredUnit
+from polar.observability import EVENT_PARENT_RESOLUTION_DURATION
 
 from .system import SystemEvent
 
@@ -47,6 +55,125 @@ from .system import SystemEvent
 _MAX_RESOLVE_DEPTH = 100
 
 
+def _get_child_ancestors(parent: FromClause) -> ColumnElement[list[UUID] | None]:
+    # Unknown if the parent's own path isn't materialized yet
+    return case(
+        (
+            parent.c.ancestors.is_not(None),
+            func.array_prepend(
+                parent.c.id, parent.c.ancestors, type_=Event.ancestors.type
+            ),
+        ),
+        else_=null(),
+    )
+
+
+# Canonical or hyphen-less UUIDs, which Postgres can cast. Other refs can
+# only be external IDs.
+_UUID_PATTERN = r"^[0-9a-f]{8}-?([0-9a-f]{4}-?){3}[0-9a-f]{12}$"
+
+
+@contextlib.contextmanager
+def _time_parent_resolution(statement: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        EVENT_PARENT_RESOLUTION_DURATION.labels(statement=statement).observe(
+            time.perf_counter() - start
+        )
+
+
+def _get_link_pending_parents_statement(inserted_ids: Sequence[UUID]) -> Update:
+    child = Event.__table__.alias("child")
+    parent = Event.__table__.alias("parent")
+    pending_ref = child.c.pending_parent_external_id
+    by_external_id = parent.c.external_id == pending_ref
+    # Guard the cast: an invalid UUID would fail the whole statement
+    by_uuid = parent.c.id == case(
+        (pending_ref.regexp_match(_UUID_PATTERN, flags="i"), cast(pending_ref, SA_UUID))
+    )
+    by_uuid_string = pending_ref == cast(parent.c.id, String)
+
+    def _match(
+        on: ColumnElement[bool], priority: int, batch: ColumnElement[bool]
+    ) -> Select[Any]:
+        return (
+            select(
+                child.c.id.label("child_id"),
+                parent.c.id.label("parent_id"),
+                literal(priority).label("priority"),
+            )
+            .select_from(
+                child.join(
+                    parent,
+                    and_(parent.c.organization_id == child.c.organization_id, on),
+                )
+            )
+            .where(batch, pending_ref.is_not(None), child.c.id != parent.c.id)
+        )
+
+    child_in_batch = child.c.id.in_(inserted_ids)
+    parent_in_batch = parent.c.id.in_(inserted_ids)
+    matches = union_all(
+        _match(by_external_id, 0, child_in_batch),
+        _match(by_uuid, 1, child_in_batch),
+        _match(by_external_id, 0, parent_in_batch),
+        _match(by_uuid_string, 1, parent_in_batch),
+    ).subquery("matches")
+    links = (
+        select(matches.c.child_id, matches.c.parent_id)
+        .distinct(matches.c.child_id)
+        .order_by(matches.c.child_id, matches.c.priority)
+        .cte("links")
+    )
+    return (
+        update(Event)
+        .values(parent_id=links.c.parent_id, pending_parent_external_id=None)
+        .where(
+            Event.id == links.c.child_id,
+            Event.pending_parent_external_id.is_not(None),
+        )
+    )
+
+
+def _get_propagate_roots_statement(inserted_ids: Sequence[UUID]) -> Update:
+    child = Event.__table__.alias("child")
+    parent = Event.__table__.alias("parent")
+    rooted = (
+        select(
+            child.c.id,
+            parent.c.root_id,
+            _get_child_ancestors(parent).label("ancestors"),
+            literal(1).label("depth"),
+        )
+        .select_from(child.join(parent, child.c.parent_id == parent.c.id))
+        .where(
+            or_(child.c.id.in_(inserted_ids), child.c.parent_id.in_(inserted_ids)),
+            child.c.root_id.is_(None),
+            parent.c.root_id.is_not(None),
+        )
+        .cte("rooted", recursive=True)
+    )
+    descendant = Event.__table__.alias("descendant")
+    rooted = rooted.union_all(
+        select(
+            descendant.c.id,
+            rooted.c.root_id,
+            _get_child_ancestors(rooted),
+            rooted.c.depth + 1,
+        )
+        .select_from(rooted.join(descendant, descendant.c.parent_id == rooted.c.id))
+        .where(descendant.c.root_id.is_(None), rooted.c.depth < _MAX_RESOLVE_DEPTH)
+    )
+    return (
+        update(Event)
+        .values(root_id=rooted.c.root_id, ancestors=rooted.c.ancestors)
+        .where(Event.id == rooted.c.id, Event.root_id.is_(None))
+        .returning(Event.id)
+    )
+
+
 class EventRepository(RepositoryBase[Event], RepositoryIDMixin[Event, UUID]):
     model = Event
 
@@ -98,6 +225,7 @@ class EventRepository(RepositoryBase[Event], RepositoryIDMixin[Event, UUID]):
                 event["id"] = generate_uuid()
             if event.get("pending_parent_external_id") is None:
                 event["root_id"] = event["id"]
+                event["ancestors"] = []
 
         statement = (
             insert(Event)
@@ -122,122 +250,38 @@ class EventRepository(RepositoryBase[Event], RepositoryIDMixin[Event, UUID]):
         just set (chain now reaches a real root).
 
         All work is scoped to the batch — only edges with one side in the
-        batch can be newly resolvable.
+        batch can be newly resolvable. It runs as two statements, so row
+        locks are taken in as few round trips as possible:
 
         Step 1: link parent_id wherever a pending ref now matches a parent
-        row. Run as four UPDATEs to keep each plan cleanly indexed:
-          1a — child in batch, parent in DB, ref by external_id
-          1c — child in batch, parent in DB, ref by Polar ID (UUID)
-          1b — parent in batch, child pending in DB, ref by external_id
-          1d — parent in batch, child pending in DB, ref by Polar ID (UUID)
+        row, with a single UPDATE. Its CTE matches in four indexed branches:
+          a — child in batch, parent in DB, ref by external_id
+          b — child in batch, parent in DB, ref by Polar ID (UUID)
+          c — parent in batch, child pending in DB, ref by external_id
+          d — parent in batch, child pending in DB, ref by Polar ID (UUID)
+        A ref matching both an external_id and a Polar ID links to the
+        former.
 
         Step 2: propagate root_id along parent_id edges with a single
-        iterative UPDATE. Each round roots every event whose immediate
-        parent is already rooted. Starting frontier = the batch; each
-        subsequent round shifts the frontier to the events just rooted,
-        so the scope stays bounded and we only touch relevant descendants.
-        This covers both directions in one pass: batch events inherit
-        root_id from rooted ancestors, and DB orphans inherit it from
-        ancestors that just arrived in this batch.
+        recursive UPDATE. Its CTE starts from the events of the batch, or
+        their children, whose parent is already rooted, and walks down to
+        their descendants. This covers both directions at once: batch events
+        inherit root_id from rooted ancestors, and DB orphans inherit it
+        from ancestors that just arrived in this batch. The same UPDATE sets
+        the ancestors path, by prepending the parent to its own path.
         """
         if not inserted_ids:
             return []
 
-        # parent_1a, parent_1b, parent_1c, parent_1d
-        # are all four ways we can resolve pending_parent_id to parent_id
-        # (pointing to a internal event ID).
-        parent_1a = Event.__table__.alias("parent_1a")
-        await self.session.execute(
-            update(Event)
-            .values(parent_id=parent_1a.c.id, pending_parent_external_id=None)
-            .where(
-                Event.organization_id == parent_1a.c.organization_id,
-                Event.pending_parent_external_id == parent_1a.c.external_id,
-                Event.id.in_(inserted_ids),
-                Event.id != parent_1a.c.id,
-            )
-        )
-
-        batch_pending_rows = await self.session.execute(
-            select(Event.id, Event.pending_parent_external_id).where(
-                Event.id.in_(inserted_ids),
-                Event.pending_parent_external_id.is_not(None),
-            )
-        )
-        uuid_pending_in_batch: list[UUID] = []
-        for event_id, pending_ref in batch_pending_rows.all():
-            try:
-                UUID(pending_ref)
-            except ValueError, TypeError:
-                continue
-            uuid_pending_in_batch.append(event_id)
-
-        if uuid_pending_in_batch:
-            parent_1b = Event.__table__.alias("parent_1b")
+        with _time_parent_resolution("link"):
             await self.session.execute(
-                update(Event)
-                .values(parent_id=parent_1b.c.id, pending_parent_external_id=None)
-                .where(
-                    Event.organization_id == parent_1b.c.organization_id,
-                    cast(Event.pending_parent_external_id, SA_UUID) == parent_1b.c.id,
-                    Event.id.in_(uuid_pending_in_batch),
-                    Event.id != parent_1b.c.id,
-                )
-            )
-
-        parent_1c = Event.__table__.alias("parent_1c")
-        await self.session.execute(
-            update(Event)
-            .values(parent_id=parent_1c.c.id, pending_parent_external_id=None)
-            .where(
-                Event.organization_id == parent_1c.c.organization_id,
-                Event.pending_parent_external_id.is_not(None),
-                Event.pending_parent_external_id == parent_1c.c.external_id,
-                parent_1c.c.id.in_(inserted_ids),
-                Event.id != parent_1c.c.id,
+                _get_link_pending_parents_statement(inserted_ids)
             )
-        )
-
-        # Pending refs are matched against the canonical lowercase string of
-        # batch ids; non-canonical (e.g. uppercase) refs won't link here, but
-        # `str(uuid.uuid4())` is always lowercase and that's what callers emit.
-        parent_1d = Event.__table__.alias("parent_1d")
-        await self.session.execute(
-            update(Event)
-            .values(parent_id=parent_1d.c.id, pending_parent_external_id=None)
-            .where(
-                Event.organization_id == parent_1d.c.organization_id,
-                Event.pending_parent_external_id.is_not(None),
-                Event.pending_parent_external_id == cast(parent_1d.c.id, String),
-                parent_1d.c.id.in_(inserted_ids),
-                Event.id != parent_1d.c.id,
-            )
-        )
-
-        frontier: set[UUID] = set(inserted_ids)
-        newly_rooted: list[UUID] = []
-        for _ in range(_MAX_RESOLVE_DEPTH):
-            if not frontier:
-                break
-            parent_alias = Event.__table__.alias("p_root")
+        with _time_parent_resolution("propagate"):
             result = await self.session.execute(
-                update(Event)
-                .values(root_id=parent_alias.c.root_id)
-                .where(
-                    or_(Event.id.in_(frontier), Event.parent_id.in_(frontier)),
-                    Event.root_id.is_(None),
-                    Event.parent_id == parent_alias.c.id,
-                    parent_alias.c.root_id.is_not(None),
-                )
-                .returning(Event.id)
+                _get_propagate_roots_statement(inserted_ids)
             )
-            newly = [row[0] for row in result.all()]
-            if not newly:
-                break
-            newly_rooted.extend(newly)
-            frontier = set(newly)
-
-        return newly_rooted
+        return [row[0] for row in result.all()]
 
     async def get_latest_polar_self_ingestion_timestamp(
         self, organization_id: UUID
@@ -346,7 +390,10 @@ class EventRepository(RepositoryBase[Event], RepositoryIDMixin[Event, UUID]):
             assert after_event_id is not None
             page_statement = page_statement.where(
                 tuple_(MeterEvent.ingested_at, MeterEvent.event_id)
-                > (after_ingested_at, after_event_id)
+                > (after_ingested_at, after_event_id),
+                # Redundant with the row comparison, but lets Postgres prune
+                # the partitions before the watermark
+                MeterEvent.ingested_at >= after_ingested_at,
             )
 
         event_page = page_statement.cte("meter_billing_event_page")
@@ -535,8 +582,147 @@ class EventRepository(RepositoryBase[Event], RepositoryIDMixin[Event, UUID]):
         order = {id: i for i, id in enumerate(ids)}
         return sorted(results, key=lambda e: order.get(e.id, 0))
 
+    async def get_ingestion_digests(
+        self, start: datetime, end: datetime, bucket_milliseconds: int
+    ) -> dict[int, tuple[int, int]]:
+        """
+        Summarize the events ingested in a time range, per time bucket.
+
+        Only events with a complete chain, i.e. sent to Tinybird, are counted.
+        Buckets are numbered from the epoch: `bucket = epoch_ms // bucket_ms`.
+
+        Returns:
+            For each non-empty bucket, the number of events and the sum of the
+            last 32 bits of their IDs.
+        """
+        bucket = cast(
+            func.floor(
+                func.extract("epoch", Event.ingested_at) * 1000 / bucket_milliseconds
+            ),
+            BigInteger,
+        ).label("bucket")
+        id_hash = cast(
+            cast(
+                literal("x").concat(func.substr(cast(Event.id, String), 29, 8)), BIT(32)
+            ),
+            BigInteger,
+        )
+        statement = (
+            select(bucket, func.count(), func.sum(id_hash))
+            .where(
+                Event.ingested_at >= start,
+                Event.ingested_at < end,
+                Event.root_id.is_not(None),
+            )
+            .group_by(bucket)
+        )
+        result = await self.session.execute(statement)
+        return {row[0]: (row[1], int(row[2])) for row in result.all()}
+
+    async def get_ingested_ids(
+        self,
+        start: datetime,
+        end: datetime,
+        *,
+        after: tuple[datetime, UUID] | None = None,
+        limit: int,
+    ) -> Sequence[tuple[datetime, UUID]]:
+        """
+        List the `(ingested_at, id)` of the events ingested in a time range.
+
+        Only events with a complete chain, i.e. sent to Tinybird, are listed.
+        Paginate by passing the last returned pair as `after`.
+        """
+        statement = (
+            select(Event.ingested_at, Event.id)
+            .where(
+                Event.ingested_at >= start,
+                Event.ingested_at < end,
+                Event.root_id.is_not(None),
+            )
+            .order_by(Event.ingested_at, Event.id)
+            .limit(limit)
+        )
+        if after is not None:
+            statement = statement.where(tuple_(Event.ingested_at, Event.id) > after)
+        result = await self.session.execute(statement)
+        return [(row[0], row[1]) for row in result.all()]
+
+    def get_descendants_statement(self, ancestor_id: UUID) -> Select[tuple[Event]]:
+        """Select the descendants of an event, using the GIN index on its path."""
+        return self.get_base_statement().where(Event.ancestors.contains([ancestor_id]))
+
     async def get_ancestors_batch(
         self, event_ids: Sequence[UUID]
+    ) -> dict[UUID, list[str]]:
+        """
+        Get the ancestors of events, from their parent up to their root.
+
+        They're read from the materialized `ancestors` path. Events without it
+        yet fall back to walking up the `parent_id` chain.
+        """
+        if not event_ids:
+            return {}
+
+        result = await self.session.execute(
+            select(Event.id, Event.parent_id, Event.ancestors).where(
+                Event.id.in_(event_ids)
+            )
+        )
+        ancestors_by_event: dict[UUID, list[str]] = {}
+        unresolved: list[UUID] = []
+        for event_id, parent_id, ancestors in result.all():
+            if ancestors is None:
+                if parent_id is not None:
+                    unresolved.append(event_id)
+            elif ancestors:
+                ancestors_by_event[event_id] = [str(aid) for aid in ancestors]
+
+        if unresolved:
+            ancestors_by_event.update(await self._walk_ancestors_batch(unresolved))
+        return ancestors_by_event
+
+    async def backfill_ancestors(
+        self, *, after: UUID | None, limit: int
+    ) -> UUID | None:
+        """
+        Materialize the ancestors path of rooted events predating it.
+
+        Events are visited by ID: pass the returned ID as `after` to process
+        the next page, until it returns `None`.
+        """
+        statement = (
+            select(Event.id, Event.parent_id)
+            .where(Event.ancestors.is_(None), Event.root_id.is_not(None))
+            .order_by(Event.id)
+            .limit(limit)
+        )
+        if after is not None:
+            statement = statement.where(Event.id > after)
+        result = await self.session.execute(statement)
+        rows = result.all()
+        if not rows:
+            return None
+
+        ancestors_by_event = await self._walk_ancestors_batch(
+            [event_id for event_id, parent_id in rows if parent_id is not None]
+        )
+        await self.session.execute(
+            update(Event).execution_options(synchronize_session=False),
+            [
+                {
+                    "id": event_id,
+                    "ancestors": [
+                        UUID(aid) for aid in ancestors_by_event.get(event_id, [])
+                    ],
+                }
+                for event_id, _ in rows
+            ],
+        )
+        return rows[-1][0] if len(rows) == limit else None
+
+    async def _walk_ancestors_batch(
+        self, event_ids: Sequence[UUID]
     ) -> dict[UUID, list[str]]:
         if not event_ids:
             return {}
@@ -572,13 +758,3 @@ class EventRepository(RepositoryBase[Event], RepositoryIDMixin[Event, UUID]):
         return {
             row.event_id: [str(aid) for aid in row.ancestors] for row in result.all()
         }
-
-    async def get_timestamp_series(
-        self,
-        start_timestamp: datetime,
-        end_timestamp: datetime,
-        interval: TimeInterval,
-    ) -> list[datetime]:
-        cte = get_timestamp_series_cte(start_timestamp, end_timestamp, interval)
-        result = await self.session.execute(select(cte.c.timestamp))
-        return [row[0] for row in result.all()]
@@ -1,8 +1,9 @@
 import uuid
 from collections.abc import Sequence
 
-from polar.worker import AsyncSessionMaker, TaskPriority, actor
+from polar.worker import AsyncSessionMaker, TaskPriority, actor, enqueue_job
 
+from .repository import EventRepository
 from .service import event as event_service
 
 
@@ -15,3 +16,18 @@ from .service import event as event_service
 async def event_ingested(event_ids: Sequence[uuid.UUID]) -> None:
     async with AsyncSessionMaker() as session:
         await event_service.ingested(session, event_ids)
+
+
+BACKFILL_ANCESTORS_BATCH_SIZE = 1000
+
+
+@actor(actor_name="event.backfill_ancestors", priority=TaskPriority.LOW)
+async def event_backfill_ancestors(last_event_id: uuid.UUID | None = None) -> None:
+    """Backfill the ancestors path of events created before it was materialized."""
+    async with AsyncSessionMaker() as session:
+        repository = EventRepository.from_session(session)
+        last_event_id = await repository.backfill_ancestors(
+            after=last_event_id, limit=BACKFILL_ANCESTORS_BATCH_SIZE
+        )
+        if last_event_id is not None:
+            enqueue_job("event.backfill_ancestors", last_event_id=last_event_id)
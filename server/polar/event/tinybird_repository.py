@@ -2,6 +2,7 @@ from collections.abc import Sequence
 from datetime import datetime
 from uuid import UUID
 
+from polar.integrations.tinybird.cache import TinybirdQueryCache
 from polar.integrations.tinybird.service import (
     TinybirdCustomerStat,
     TinybirdEventsQuery,
@@ -15,11 +16,15 @@ from polar.kit.metadata import MetadataQuery
 from polar.meter.filter import Filter
 from polar.models import Meter
 from polar.models.event import EventSource
+from polar.redis import Redis
 
 type EventNameStats = tuple[str, EventSource, int, datetime, datetime]
 
 
 class TinybirdEventRepository:
+    def __init__(self, redis: Redis | None = None) -> None:
+        self._cache = TinybirdQueryCache(redis) if redis is not None else None
+
     async def get_name_stats(
         self,
         *,
@@ -320,7 +325,7 @@ class TinybirdEventRepository:
         if not organization_ids:
             return []
 
-        tinybird_query = TinybirdEventsQuery(organization_ids)
+        tinybird_query = TinybirdEventsQuery(organization_ids, cache=self._cache)
         if start_timestamp is not None or end_timestamp is not None:
             tinybird_query.filter_timestamp_range(start_timestamp, end_timestamp)
         if customer_id or external_customer_id:
@@ -347,7 +352,7 @@ class TinybirdEventRepository:
         if not organization_ids:
             return []
 
-        tinybird_query = TinybirdEventsQuery(organization_ids)
+        tinybird_query = TinybirdEventsQuery(organization_ids, cache=self._cache)
         if start_timestamp is not None or end_timestamp is not None:
             tinybird_query.filter_timestamp_range(start_timestamp, end_timestamp)
         if customer_id or external_customer_id:
@@ -376,7 +381,7 @@ class TinybirdEventRepository:
         if not organization_ids:
             return []
 
-        tinybird_query = TinybirdEventsQuery(organization_ids)
+        tinybird_query = TinybirdEventsQuery(organization_ids, cache=self._cache)
         if start_timestamp is not None or end_timestamp is not None:
             tinybird_query.filter_timestamp_range(start_timestamp, end_timestamp)
         if customer_id or external_customer_id:
@@ -389,8 +394,8 @@ class TinybirdEventRepository:
             property, aggregate_fields, limit
         )
 
-    @staticmethod
     def _build_filtered_query(
+        self,
         organization_ids: tuple[UUID, ...],
         *,
         start_timestamp: datetime | None = None,
@@ -407,7 +412,7 @@ class TinybirdEventRepository:
         matching_external_customer_ids: Sequence[str] | None = None,
         numeric_metadata_property: str | None = None,
     ) -> TinybirdEventsQuery:
-        tinybird_query = TinybirdEventsQuery(organization_ids)
+        tinybird_query = TinybirdEventsQuery(organization_ids, cache=self._cache)
         if start_timestamp is not None or end_timestamp is not None:
             tinybird_query.filter_timestamp_range(start_timestamp, end_timestamp)
         if customer_id or external_customer_id:
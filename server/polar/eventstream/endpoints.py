@@ -4,7 +4,6 @@ from typing import Any
 
 import structlog
 from fastapi import Depends, Request
-from redis.exceptions import ConnectionError
 from sse_starlette.sse import EventSourceResponse
 from uvicorn import Server
 
@@ -16,6 +15,7 @@ from polar.postgres import AsyncSession, get_db_session
 from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
+from .pubsub import SlowConsumer, get_multiplexer
 from .service import Receivers
 
 router = APIRouter(prefix="/stream", tags=["stream"], include_in_schema=False)
@@ -52,6 +52,10 @@ def _uvicorn_should_exit() -> bool:
 # long-lived connections holding DB sessions and Redis subscriptions indefinitely.
 MAX_SSE_CONNECTION_LIFETIME = 10 * 60  # 10 minutes
 
+# Longest wait for a message before checking for shutdown and calling
+# `on_iteration`, which must be shorter than the TTL it refreshes.
+ITERATION_INTERVAL = 1.0
+
 
 async def subscribe(
     redis: Redis,
@@ -59,47 +63,53 @@ async def subscribe(
     request: Request,
     on_iteration: Callable[[], Awaitable[None]] | None = None,
 ) -> AsyncGenerator[Any, Any]:
+    """
+    Stream the messages published on the channels.
+
+    Client disconnections aren't polled: `EventSourceResponse` listens for them
+    once per connection and cancels the stream, which closes the subscription.
+    """
     deadline = asyncio.get_event_loop().time() + MAX_SSE_CONNECTION_LIFETIME
 
-    async with redis.pubsub() as pubsub:
-        await pubsub.subscribe(*channels)
+    # Channels are subscribed on the connection shared by the whole process
+    subscription = await get_multiplexer(redis).subscribe(channels)
+
+    endpoint = get_path_template(request.scope)
+    if endpoint is not None:
+        HTTP_SSE_CONNECTIONS_OPENED.labels(endpoint=endpoint).inc()
 
-        endpoint = get_path_template(request.scope)
+    try:
+        while not _uvicorn_should_exit():
+            # Enforce maximum connection lifetime
+            remaining = deadline - asyncio.get_event_loop().time()
+            if remaining <= 0:
+                yield '{"type": "reconnect"}'
+                break
+
+            if on_iteration is not None:
+                await on_iteration()
+
+            try:
+                message = await subscription.get(
+                    timeout=min(ITERATION_INTERVAL, remaining)
+                )
+            except SlowConsumer:
+                # We dropped messages: have the client reconnect and refetch
+                yield '{"type": "reconnect"}'
+                break
+            except Exception as e:
+                # The shared connection was lost or its reader failed:
+                # have the client reconnect on a fresh subscription
+                log.warning("eventstream.subscription_error", error=str(e))
+                yield '{"type": "reconnect"}'
+                break
+
+            if message is not None:
+                yield message
+    finally:
+        await subscription.close()
         if endpoint is not None:
-            HTTP_SSE_CONNECTIONS_OPENED.labels(endpoint=endpoint).inc()
-
-        try:
-            while not _uvicorn_should_exit():
-                if await request.is_disconnected():
-                    break
-
-                # Enforce maximum connection lifetime
-                remaining = deadline - asyncio.get_event_loop().time()
-                if remaining <= 0:
-                    yield '{"type": "reconnect"}'
-                    break
-
-                if on_iteration is not None:
-                    await on_iteration()
-
-                try:
-                    message = await pubsub.get_message(
-                        ignore_subscribe_messages=True,
-                        # Waits for up to 1s for a new message (shorter interval
-                        # reduces disconnect detection latency from 10s to ~1s)
-                        timeout=min(1.0, remaining),
-                    )
-
-                    if message is not None:
-                        log.debug("redis.pubsub", message=message["data"])
-                        yield message["data"]
-                except asyncio.CancelledError:
-                    raise
-                except ConnectionError:
-                    raise
-        finally:
-            if endpoint is not None:
-                HTTP_SSE_CONNECTIONS_OPENED.labels(endpoint=endpoint).dec()
+            HTTP_SSE_CONNECTIONS_OPENED.labels(endpoint=endpoint).dec()
 
 
 @router.get("/user")
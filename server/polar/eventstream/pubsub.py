@@ -0,0 +1,271 @@
+"""
+Per-process Redis Pub/Sub multiplexer for the eventstream.
+
+Instead of opening one Pub/Sub connection per SSE client, every client of the
+process shares a single connection. It's subscribed to the union of the
+channels clients are interested in, and each message is dispatched to the
+in-memory queue of the matching subscriptions.
+"""
+
+import asyncio
+import weakref
+from collections.abc import Iterable
+from typing import Any
+
+import structlog
+from redis.asyncio.client import PubSub
+from redis.exceptions import ConnectionError
+
+from polar.logging import Logger
+from polar.observability import (
+    EVENTSTREAM_CHANNELS,
+    EVENTSTREAM_EVICTIONS_TOTAL,
+    EVENTSTREAM_MESSAGES_TOTAL,
+    EVENTSTREAM_SUBSCRIBERS,
+)
+from polar.redis import Redis
+
+log: Logger = structlog.get_logger()
+
+SUBSCRIPTION_QUEUE_SIZE = 256
+"""
+Messages buffered per subscription.
+
+A client that falls this far behind is evicted and asked to reconnect,
+so a single slow consumer can't grow the process memory unbounded.
+"""
+
+READ_TIMEOUT = 1.0
+"""Maximum time the reader waits for a message before checking its state."""
+
+
+class SubscriptionClosed(Exception):
+    """The subscription was closed by the multiplexer."""
+
+    def __init__(self, reason: str) -> None:
+        self.reason = reason
+        super().__init__(f"Subscription closed: {reason}")
+
+
+class SlowConsumer(SubscriptionClosed):
+    def __init__(self) -> None:
+        super().__init__("slow_consumer")
+
+
+class Subscription:
+    def __init__(self, multiplexer: "PubSubMultiplexer", channels: list[str]) -> None:
+        self.multiplexer = multiplexer
+        self.channels = channels
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(SUBSCRIPTION_QUEUE_SIZE)
+        self._error: BaseException | None = None
+
+    async def get(self, timeout: float) -> Any | None:
+        """
+        Wait for the next message for up to `timeout` seconds.
+
+        Returns:
+            The message data, or `None` if no message arrived in time.
+
+        Raises:
+            SubscriptionClosed: The multiplexer evicted this subscription.
+            ConnectionError: The shared Redis connection was lost.
+            Exception: The reader failed, with the error it raised.
+        """
+        if self._error is not None:
+            raise self._error
+        try:
+            message = await asyncio.wait_for(self._queue.get(), timeout)
+        except TimeoutError:
+            return None
+        if self._error is not None:
+            raise self._error
+        return message
+
+    async def close(self) -> None:
+        await self.multiplexer.unsubscribe(self)
+
+    def _put(self, data: Any) -> bool:
+        if self._error is not None:
+            return False
+        try:
+            self._queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            self._close(SlowConsumer())
+            EVENTSTREAM_EVICTIONS_TOTAL.labels(reason="slow_consumer").inc()
+            return False
+
+    def _close(self, error: BaseException) -> None:
+        self._error = error
+        # Wake up a pending `get()`
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+
+class PubSubMultiplexer:
+    def __init__(self, redis: Redis) -> None:
+        self.redis = redis
+        self._subscriptions: dict[str, set[Subscription]] = {}
+        self._pubsub: PubSub | None = None
+        self._reader: asyncio.Task[None] | None = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, channels: Iterable[str]) -> Subscription:
+        subscription = Subscription(self, list(dict.fromkeys(channels)))
+        async with self._lock:
+            new_channels = [
+                channel
+                for channel in subscription.channels
+                if channel not in self._subscriptions
+            ]
+            for channel in subscription.channels:
+                self._subscriptions.setdefault(channel, set()).add(subscription)
+            try:
+                if new_channels:
+                    pubsub = await self._get_pubsub()
+                    await pubsub.subscribe(*new_channels)
+                    EVENTSTREAM_CHANNELS.inc(len(new_channels))
+            except BaseException:
+                self._remove(subscription)
+                raise
+            self._ensure_reader()
+        EVENTSTREAM_SUBSCRIBERS.inc()
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        async with self._lock:
+            if not self._remove(subscription):
+                return
+            EVENTSTREAM_SUBSCRIBERS.dec()
+            orphan_channels = [
+                channel
+                for channel in subscription.channels
+                if channel not in self._subscriptions
+            ]
+            if orphan_channels and self._pubsub is not None:
+                EVENTSTREAM_CHANNELS.dec(len(orphan_channels))
+                try:
+                    await self._pubsub.unsubscribe(*orphan_channels)
+                except ConnectionError:
+                    # The reader will notice it and reset the connection
+                    pass
+
+    async def close(self) -> None:
+        reader = self._reader
+        if reader is not None:
+            reader.cancel()
+            try:
+                await reader
+            except asyncio.CancelledError:
+                pass
+        await self._reset(ConnectionError("Eventstream multiplexer closed"))
+
+    def _remove(self, subscription: Subscription) -> bool:
+        removed = False
+        for channel in subscription.channels:
+            subscribers = self._subscriptions.get(channel)
+            if subscribers is None or subscription not in subscribers:
+                continue
+            removed = True
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscriptions[channel]
+        return removed
+
+    async def _get_pubsub(self) -> PubSub:
+        if self._pubsub is None:
+            self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        return self._pubsub
+
+    def _ensure_reader(self) -> None:
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        pubsub = self._pubsub
+        assert pubsub is not None
+        try:
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=READ_TIMEOUT
+                )
+                if message is not None:
+                    self._dispatch(message)
+        except ConnectionError as e:
+            log.warning("eventstream.pubsub.connection_error", error=str(e))
+            async with self._lock:
+                await self._reset(e)
+        except Exception as e:
+            # Don't leave subscribers waiting on a dead reader: close them so
+            # clients reconnect, on a new connection.
+            log.exception("eventstream.pubsub.reader_error", error=str(e))
+            async with self._lock:
+                await self._reset(e)
+
+    def _dispatch(self, message: dict[str, Any]) -> None:
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8")
+        data = message["data"]
+        log.debug("redis.pubsub", message=data)
+        for subscription in list(self._subscriptions.get(channel, ())):
+            if subscription._put(data):
+                EVENTSTREAM_MESSAGES_TOTAL.labels(outcome="delivered").inc()
+            else:
+                EVENTSTREAM_MESSAGES_TOTAL.labels(outcome="dropped").inc()
+
+    async def _reset(self, error: BaseException) -> None:
+        """Close every subscription and drop the shared connection."""
+        subscriptions = {
+            subscription
+            for subscribers in self._subscriptions.values()
+            for subscription in subscribers
+        }
+        for subscription in subscriptions:
+            subscription._close(error)
+        if subscriptions:
+            EVENTSTREAM_EVICTIONS_TOTAL.labels(reason="connection_error").inc(
+                len(subscriptions)
+            )
+            EVENTSTREAM_SUBSCRIBERS.dec(len(subscriptions))
+        EVENTSTREAM_CHANNELS.dec(len(self._subscriptions))
+        self._subscriptions = {}
+
+        pubsub, self._pubsub = self._pubsub, None
+        self._reader = None
+        if pubsub is not None:
+            try:
+                await pubsub.aclose()
+            except ConnectionError:
+                pass
+
+
+_multiplexers: weakref.WeakKeyDictionary[Redis, PubSubMultiplexer] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_multiplexer(redis: Redis) -> PubSubMultiplexer:
+    """Return the multiplexer sharing a Pub/Sub connection of this Redis client."""
+    multiplexer = _multiplexers.get(redis)
+    if multiplexer is None:
+        multiplexer = PubSubMultiplexer(redis)
+        _multiplexers[redis] = multiplexer
+    return multiplexer
+
+
+async def close_multiplexer(redis: Redis) -> None:
+    multiplexer = _multiplexers.pop(redis, None)
+    if multiplexer is not None:
+        await multiplexer.close()
+
+
+__all__ = [
+    "PubSubMultiplexer",
+    "SlowConsumer",
+    "Subscription",
+    "SubscriptionClosed",
+    "close_multiplexer",
+    "get_multiplexer",
+]
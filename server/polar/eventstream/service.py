@@ -1,13 +1,15 @@
+import time
 from typing import Any
 from uuid import UUID
 
 import structlog
 from pydantic import BaseModel
 
+from polar.config import settings
 from polar.kit.utils import generate_uuid
 from polar.logging import Logger
 from polar.redis import Redis
-from polar.worker import enqueue_job
+from polar.worker import enqueue_eventstream_event, enqueue_job
 
 log: Logger = structlog.get_logger()
 
@@ -47,8 +49,10 @@ class Event(BaseModel):
 
 
 async def send_event(redis: Redis, event_json: str, channels: list[str]) -> None:
-    for channel in channels:
-        await redis.publish(channel, event_json)
+    async with redis.pipeline(transaction=False) as pipeline:
+        for channel in channels:
+            pipeline.publish(channel, event_json)
+        await pipeline.execute()
     log.debug(
         "Published event to eventstream", event_json=event_json, channels=channels
     )
@@ -75,4 +79,7 @@ async def publish(
         payload=payload,
     ).model_dump_json()
 
-    enqueue_job("eventstream.publish", event, channels)
+    if settings.EVENTSTREAM_DIRECT_PUBLISH:
+        enqueue_eventstream_event(event, channels)
+    else:
+        enqueue_job("eventstream.publish", event, channels, enqueued_at=time.time())
@@ -1,8 +1,17 @@
+import time
+
+from polar.observability import EVENTSTREAM_PUBLISH_DURATION
 from polar.worker import RedisMiddleware, TaskPriority, actor
 
 from .service import send_event
 
 
 @actor(actor_name="eventstream.publish", priority=TaskPriority.HIGH)
-async def eventstream_publish(event: str, channels: list[str]) -> None:
+async def eventstream_publish(
+    event: str, channels: list[str], enqueued_at: float | None = None
+) -> None:
     await send_event(RedisMiddleware.get(), event, channels)
+    if enqueued_at is not None:
+        EVENTSTREAM_PUBLISH_DURATION.labels(mode="worker").observe(
+            time.time() - enqueued_at
+        )
@@ -0,0 +1,18 @@
+from typing import Annotated
+
+from fastapi import Depends
+
+from polar.auth.dependencies import Authenticator
+from polar.auth.models import AuthSubject, Organization, User
+from polar.auth.scope import Scope
+
+_ExportsRead = Authenticator(
+    required_scopes={
+        Scope.orders_read,
+        Scope.subscriptions_read,
+        Scope.customers_read,
+        Scope.transactions_read,
+    },
+    allowed_subjects={User, Organization},
+)
+ExportsRead = Annotated[AuthSubject[User | Organization], Depends(_ExportsRead)]
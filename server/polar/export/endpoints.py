@@ -0,0 +1,37 @@
+from fastapi import Depends
+from pydantic import UUID4
+
+from polar.exceptions import ResourceNotFound
+from polar.openapi import APITag
+from polar.redis import Redis, get_redis
+from polar.routing import APIRouter
+
+from . import auth
+from .schemas import ExportJob
+from .service import export_job as export_job_service
+
+router = APIRouter(prefix="/exports", tags=["exports", APITag.private])
+
+
+ExportJobNotFound = {
+    "description": "Export job not found.",
+    "model": ResourceNotFound.schema(),
+}
+
+
+@router.get(
+    "/{id}",
+    summary="Get Export Job",
+    response_model=ExportJob,
+    responses={404: ExportJobNotFound},
+)
+async def get(
+    id: UUID4,
+    auth_subject: auth.ExportsRead,
+    redis: Redis = Depends(get_redis),
+) -> ExportJob:
+    """Get the status of an export job, and its download URL once it's ready."""
+    job = await export_job_service.get(redis, auth_subject, id)
+    if job is None:
+        raise ResourceNotFound()
+    return job
@@ -0,0 +1,59 @@
+from datetime import datetime
+from enum import StrEnum
+from typing import Any
+
+from pydantic import UUID4, Field
+
+from polar.kit.schemas import Schema
+
+
+class ExportJobType(StrEnum):
+    orders = "orders"
+    subscriptions = "subscriptions"
+    customers = "customers"
+    transactions = "transactions"
+
+
+class ExportJobStatus(StrEnum):
+    pending = "pending"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class ExportJob(Schema):
+    """An export generated in the background and delivered as a download link."""
+
+    id: UUID4 = Field(description="The ID of the export job.")
+    type: ExportJobType = Field(description="The kind of resource being exported.")
+    status: ExportJobStatus = Field(description="The status of the export job.")
+    filename: str = Field(description="Name of the file that will be delivered.")
+    row_count: int = Field(description="Number of rows exported so far.")
+    url: str | None = Field(
+        description="Presigned download URL, once the export has succeeded."
+    )
+    url_expires_at: datetime | None = Field(
+        description="Expiration date of the download URL."
+    )
+    created_at: datetime = Field(description="Creation timestamp of the export job.")
+
+
+class ExportJobState(ExportJob):
+    """
+    Internal representation of an export job, as stored in Redis.
+
+    Holds what the worker needs to rebuild the authenticated subject and the
+    export parameters, which are never exposed through the API.
+    """
+
+    subject_type: str
+    subject_id: UUID4
+    scopes: list[str]
+    organization_ids: list[UUID4] | None
+    parameters: dict[str, Any]
+    path: str | None = None
+
+    def to_export_job(self) -> ExportJob:
+        return ExportJob.model_validate(
+            self.model_dump(include=set(ExportJob.model_fields))
+        )
@@ -0,0 +1,325 @@
+import asyncio
+import gzip
+import tempfile
+import uuid
+from collections.abc import AsyncIterable
+from typing import IO, Any
+from zoneinfo import ZoneInfo
+
+import structlog
+
+from polar.account.service import account as account_service
+from polar.auth.models import AuthSubject, Organization, User, is_organization
+from polar.auth.permission import OrganizationPermission
+from polar.auth.scope import Scope
+from polar.config import settings
+from polar.customer import export as customer_export
+from polar.eventstream.service import Event, Receivers, send_event
+from polar.exceptions import PolarError, ResourceNotFound
+from polar.integrations.aws.s3 import S3Service
+from polar.kit.db.postgres import AsyncReadSession
+from polar.kit.schemas import Schema
+from polar.kit.utils import generate_uuid, utc_now
+from polar.logging import Logger
+from polar.order import export as order_export
+from polar.organization.repository import OrganizationRepository
+from polar.redis import Redis
+from polar.subscription import export as subscription_export
+from polar.transaction import export as transaction_export
+from polar.user.repository import UserRepository
+from polar.worker import enqueue_job
+
+from .schemas import ExportJob, ExportJobState, ExportJobStatus, ExportJobType
+
+log: Logger = structlog.get_logger()
+
+EXPORT_JOB_KEY_PREFIX = "export_job"
+EXPORT_JOB_TTL = 60 * 60 * 24 * 2  # 48 hours, longer than the download URL
+EXPORT_PROGRESS_INTERVAL = 5000
+"""Number of rows between two progress updates."""
+EXPORT_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+"""Compressed bytes kept in memory before spilling the export to disk."""
+
+
+class ExportJobError(PolarError): ...
+
+
+class ExportJobDoesNotExist(ExportJobError):
+    def __init__(self, job_id: uuid.UUID) -> None:
+        self.job_id = job_id
+        message = f"The export job with id {job_id} does not exist."
+        super().__init__(message)
+
+
+class ExportJobSubjectDoesNotExist(ExportJobError):
+    def __init__(self, job_id: uuid.UUID) -> None:
+        self.job_id = job_id
+        message = f"The subject of export job {job_id} does not exist anymore."
+        super().__init__(message)
+
+
+EXPORT_JOB_TYPE_SCOPES: dict[ExportJobType, set[Scope]] = {
+    ExportJobType.orders: {Scope.orders_read},
+    ExportJobType.subscriptions: {Scope.subscriptions_read, Scope.subscriptions_write},
+    ExportJobType.customers: {Scope.customers_read, Scope.customers_write},
+    ExportJobType.transactions: {Scope.transactions_read},
+}
+"""Scopes allowing to read an export job, matching those required to create it."""
+
+
+def _get_key(job_id: uuid.UUID) -> str:
+    return f"{EXPORT_JOB_KEY_PREFIX}:{job_id}"
+
+
+class ExportJobService:
+    async def create(
+        self,
+        redis: Redis,
+        auth_subject: AuthSubject[User | Organization],
+        type: ExportJobType,
+        *,
+        filename: str,
+        parameters: Schema,
+    ) -> ExportJob:
+        job = ExportJobState(
+            id=generate_uuid(),
+            type=type,
+            status=ExportJobStatus.pending,
+            filename=f"{filename}.gz",
+            row_count=0,
+            url=None,
+            url_expires_at=None,
+            created_at=utc_now(),
+            subject_type="organization" if is_organization(auth_subject) else "user",
+            subject_id=auth_subject.subject.id,
+            scopes=sorted(auth_subject.scopes),
+            organization_ids=(
+                sorted(auth_subject.organization_ids)
+                if auth_subject.organization_ids is not None
+                else None
+            ),
+            parameters=parameters.model_dump(mode="json"),
+        )
+        await self._save(redis, job)
+        enqueue_job("export.generate", job_id=job.id)
+        return job.to_export_job()
+
+    async def get(
+        self,
+        redis: Redis,
+        auth_subject: AuthSubject[User | Organization],
+        id: uuid.UUID,
+    ) -> ExportJob | None:
+        job = await self._load(redis, id)
+        if job is None or job.subject_id != auth_subject.subject.id:
+            return None
+        if not auth_subject.scopes & EXPORT_JOB_TYPE_SCOPES[job.type]:
+            return None
+        return job.to_export_job()
+
+    async def generate(
+        self, session: AsyncReadSession, redis: Redis, job_id: uuid.UUID
+    ) -> ExportJob:
+        job = await self._load(redis, job_id)
+        if job is None:
+            raise ExportJobDoesNotExist(job_id)
+
+        try:
+            auth_subject = await self._get_auth_subject(session, job)
+        except ExportJobSubjectDoesNotExist:
+            # Retrying won't bring the subject back: fail the job so clients
+            # stop polling it.
+            log.info("export.subject_deleted", job_id=job.id)
+            await self._fail(redis, job)
+            return job.to_export_job()
+
+        job.status = ExportJobStatus.running
+        await self._save(redis, job)
+
+        s3 = S3Service(
+            settings.S3_EXPORTS_BUCKET_NAME,
+            presign_ttl=settings.S3_EXPORTS_PRESIGN_TTL,
+        )
+        path = f"{job.subject_type}/{job.subject_id}/{job.id}/{job.filename}"
+
+        try:
+            with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE) as file:
+                lines = await self._get_lines(session, auth_subject, job)
+                await self._write(redis, job, lines, file)
+                file.seek(0)
+                await asyncio.to_thread(
+                    s3.upload_fileobj, file, path, "application/gzip"
+                )
+        except Exception:
+            await self._fail(redis, job)
+            raise
+
+        url, expires_at = s3.generate_presigned_download_url(
+            path=path, filename=job.filename, mime_type="application/gzip"
+        )
+        job.status = ExportJobStatus.succeeded
+        job.path = path
+        job.url = url
+        job.url_expires_at = expires_at
+        await self._save(redis, job)
+        await self._publish(redis, job, "export.succeeded")
+
+        log.info(
+            "export.generated",
+            job_id=job.id,
+            type=job.type,
+            row_count=job.row_count,
+        )
+        return job.to_export_job()
+
+    async def _fail(self, redis: Redis, job: ExportJobState) -> None:
+        job.status = ExportJobStatus.failed
+        await self._save(redis, job)
+        await self._publish(redis, job, "export.failed")
+
+    async def _write(
+        self,
+        redis: Redis,
+        job: ExportJobState,
+        lines: AsyncIterable[str],
+        file: IO[bytes],
+    ) -> None:
+        # The first line is the CSV header, don't count it as a row
+        row_count = -1
+        with gzip.GzipFile(fileobj=file, mode="wb") as gzip_file:
+            async for line in lines:
+                gzip_file.write(line.encode("utf-8"))
+                row_count += 1
+                if row_count > 0 and row_count % EXPORT_PROGRESS_INTERVAL == 0:
+                    job.row_count = row_count
+                    await self._save(redis, job)
+                    await self._publish(redis, job, "export.progress")
+        job.row_count = max(row_count, 0)
+
+    async def _get_lines(
+        self,
+        session: AsyncReadSession,
+        auth_subject: AuthSubject[User | Organization],
+        job: ExportJobState,
+    ) -> AsyncIterable[str]:
+        match job.type:
+            case ExportJobType.orders:
+                orders = order_export.OrderExportParameters.model_validate(
+                    job.parameters
+                )
+                return order_export.generate_csv(
+                    session,
+                    auth_subject,
+                    organization_id=orders.organization_id,
+                    product_id=orders.product_id,
+                    status=orders.status,
+                    created_after=orders.created_after,
+                    created_before=orders.created_before,
+                    timezone=ZoneInfo(orders.timezone),
+                    columns=orders.columns,
+                )
+            case ExportJobType.subscriptions:
+                subscriptions = (
+                    subscription_export.SubscriptionExportParameters.model_validate(
+                        job.parameters
+                    )
+                )
+                return subscription_export.generate_csv(
+                    session,
+                    auth_subject,
+                    organization_id=subscriptions.organization_id,
+                    product_id=subscriptions.product_id,
+                    status=subscriptions.status,
+                    cancel_at_period_end=subscriptions.cancel_at_period_end,
+                    started_after=subscriptions.started_after,
+                    started_before=subscriptions.started_before,
+                    timezone=ZoneInfo(subscriptions.timezone),
+                    columns=subscriptions.columns,
+                )
+            case ExportJobType.customers:
+                customers = customer_export.CustomerExportParameters.model_validate(
+                    job.parameters
+                )
+                return customer_export.generate_csv(
+                    session,
+                    auth_subject,
+                    organization_id=customers.organization_id,
+                )
+            case ExportJobType.transactions:
+                transactions = (
+                    transaction_export.TransactionExportParameters.model_validate(
+                        job.parameters
+                    )
+                )
+                # Access is checked when the job is created, but the subject
+                # may have lost it since then.
+                account = await account_service.get(
+                    session,
+                    auth_subject,
+                    transactions.account_id,
+                    permission=OrganizationPermission.finance_read,
+                )
+                if account is None:
+                    raise ResourceNotFound()
+                return transaction_export.generate_csv(
+                    session,
+                    account,
+                    type=transactions.type,
+                    exclude_platform_fees=transactions.exclude_platform_fees,
+                    created_after=transactions.created_after,
+                    created_before=transactions.created_before,
+                    timezone=ZoneInfo(transactions.timezone),
+                    columns=transactions.columns,
+                )
+
+    async def _get_auth_subject(
+        self, session: AsyncReadSession, job: ExportJobState
+    ) -> AuthSubject[User | Organization]:
+        subject: User | Organization | None
+        if job.subject_type == "organization":
+            subject = await OrganizationRepository.from_session(session).get_by_id(
+                job.subject_id
+            )
+        else:
+            subject = await UserRepository.from_session(session).get_by_id(
+                job.subject_id
+            )
+        if subject is None:
+            raise ExportJobSubjectDoesNotExist(job.id)
+
+        return AuthSubject(
+            subject,
+            {Scope(scope) for scope in job.scopes},
+            None,
+            frozenset(job.organization_ids)
+            if job.organization_ids is not None
+            else None,
+        )
+
+    async def _publish(self, redis: Redis, job: ExportJobState, key: str) -> None:
+        # Publish directly instead of going through the `eventstream.publish`
+        # actor: jobs enqueued from an actor are only flushed once it returns,
+        # which would deliver all progress events at the very end.
+        receivers = (
+            Receivers(organization_id=job.subject_id)
+            if job.subject_type == "organization"
+            else Receivers(user_id=job.subject_id)
+        )
+        event = Event(
+            id=generate_uuid(),
+            key=key,
+            payload=job.to_export_job().model_dump(mode="json"),
+        )
+        await send_event(redis, event.model_dump_json(), receivers.get_channels())
+
+    async def _load(self, redis: Redis, job_id: uuid.UUID) -> ExportJobState | None:
+        raw: Any = await redis.get(_get_key(job_id))
+        if raw is None:
+            return None
+        return ExportJobState.model_validate_json(raw)
+
+    async def _save(self, redis: Redis, job: ExportJobState) -> None:
+        await redis.set(_get_key(job.id), job.model_dump_json(), ex=EXPORT_JOB_TTL)
+
+
+export_job = ExportJobService()
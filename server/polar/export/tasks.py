@@ -0,0 +1,17 @@
+import uuid
+
+from polar.worker import AsyncReadSessionMaker, RedisMiddleware, TaskPriority, actor
+
+from .service import export_job as export_job_service
+
+
+@actor(
+    actor_name="export.generate",
+    priority=TaskPriority.LOW,
+    # Large exports can take several minutes to stream and upload.
+    time_limit=1_800_000,
+    max_retries=2,
+)
+async def export_generate(job_id: uuid.UUID) -> None:
+    async with AsyncReadSessionMaker() as session:
+        await export_job_service.generate(session, RedisMiddleware.get(), job_id)
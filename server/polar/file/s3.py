@@ -1,5 +1,5 @@
 from polar.config import settings
-from polar.integrations.aws.s3 import S3Service
+from polar.integrations.aws.s3 import S3Service, presigned_url_cache
 from polar.models.file import FileServiceTypes
 
 
@@ -7,6 +7,7 @@ def _get_s3_service(bucket: str) -> S3Service:
     return S3Service(
         bucket=bucket,
         presign_ttl=settings.S3_FILES_PRESIGN_TTL,
+        presign_cache=presigned_url_cache,
     )
 
 
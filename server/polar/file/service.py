@@ -19,6 +19,8 @@ from polar.notifications.notification import (
 from polar.notifications.service import PartialNotification
 from polar.notifications.service import notifications as notifications_service
 from polar.postgres import AsyncReadSession, AsyncSession, sql
+from polar.product.cache import invalidate_cached_products
+from polar.product.repository import ProductRepository
 
 from .repository import FileRepository
 from .s3 import S3_SERVICES
@@ -97,6 +99,12 @@ class FileService:
 
         session.add(file)
         await session.flush()
+
+        product_repository = ProductRepository.from_session(session)
+        invalidate_cached_products(
+            await product_repository.get_ids_by_media_file(file.id)
+        )
+
         return file
 
     async def generate_presigned_upload(
@@ -175,6 +183,11 @@ class FileService:
         session.add(file)
         assert file.is_deleted
 
+        product_repository = ProductRepository.from_session(session)
+        invalidate_cached_products(
+            await product_repository.get_ids_by_media_file(file.id)
+        )
+
         # Delete ProductMedia association table records
         statement = sql.delete(ProductMedia).where(ProductMedia.file_id == file.id)
         await session.execute(statement)
@@ -1,4 +1,5 @@
+from .cache import PresignedURLCache, presigned_url_cache
 from .exceptions import S3FileError
 from .service import S3Service
 
-__all__ = ("S3FileError", "S3Service")
+__all__ = ("PresignedURLCache", "S3FileError", "S3Service", "presigned_url_cache")
@@ -0,0 +1,57 @@
+"""
+In-process cache of presigned download URLs.
+
+Customer portal pages list many files and invoices, and each of them comes with
+a freshly signed URL. Signed URLs are instead reused for the first half of their
+lifetime: time is cut in buckets of half the TTL, and a URL signed during a
+bucket is served until the bucket ends. A URL is thus never handed out with
+less than half of its lifetime left.
+"""
+
+import time
+from collections.abc import Callable, Hashable
+from datetime import datetime
+
+from polar.config import settings
+from polar.kit.ttl_cache import TTLCache
+
+type SignedURL = tuple[str, datetime]
+
+
+class PresignedURLCache:
+    def __init__(self, maxsize: int) -> None:
+        self._cache = TTLCache[tuple[Hashable, int], SignedURL](maxsize)
+
+    def get_or_sign(
+        self, key: Hashable, ttl: int, sign: Callable[[], SignedURL]
+    ) -> SignedURL:
+        """
+        Get a cached URL signed for `key`, or sign a new one.
+
+        Args:
+            key: Identifies what the URL gives access to, e.g. the bucket and path.
+            ttl: Lifetime of the URLs returned by `sign`, in seconds.
+            sign: Signs a new URL, returning it with its expiration time.
+        """
+        if ttl <= 0:
+            return sign()
+
+        bucket_duration = ttl / 2
+        now = time.time()
+        bucket = int(now // bucket_duration)
+        cached = self._cache.get((key, bucket))
+        if cached is not None:
+            return cached
+
+        signed = sign()
+        self._cache.set((key, bucket), signed, (bucket + 1) * bucket_duration - now)
+        return signed
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+presigned_url_cache = PresignedURLCache(settings.S3_PRESIGNED_URL_CACHE_MAX_SIZE)
+
+
+__all__ = ["PresignedURLCache", "SignedURL", "presigned_url_cache"]
@@ -1,6 +1,6 @@
 import base64
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Any, cast
+from typing import IO, TYPE_CHECKING, Any, cast
 
 import botocore
 import structlog
@@ -10,6 +10,7 @@ from polar.config import settings
 from polar.kit.http import get_content_disposition
 from polar.kit.utils import generate_uuid, utc_now
 
+from .cache import PresignedURLCache
 from .client import client, get_client
 from .exceptions import S3FileError
 from .schemas import (
@@ -35,10 +36,12 @@ class S3Service:
         bucket: str,
         presign_ttl: int = 600,
         client: "S3Client" = client,
+        presign_cache: PresignedURLCache | None = None,
     ):
         self.bucket = bucket
         self.presign_ttl = presign_ttl
         self.client = client
+        self.presign_cache = presign_cache
         self._presign_client = get_client(endpoint_url=settings.s3_presign_endpoint_url)
         self._unsigned_presign_client = get_client(
             signature_version=botocore.UNSIGNED,
@@ -77,6 +80,18 @@ class S3Service:
         response = self.client.put_object(**request)
         return path
 
+    def upload_fileobj(self, fileobj: IO[bytes], path: str, mime_type: str) -> str:
+        """
+        Uploads a file-like object to S3.
+
+        Unlike `upload`, the content doesn't need to fit in memory:
+        boto3 switches to a multipart upload for large files.
+        """
+        self.client.upload_fileobj(
+            fileobj, self.bucket, path, ExtraArgs={"ContentType": mime_type}
+        )
+        return path
+
     def create_multipart_upload(
         self, data: S3FileCreate, namespace: str = ""
     ) -> S3FileUpload:
@@ -221,6 +236,25 @@ class S3Service:
         path: str,
         filename: str,
         mime_type: str,
+    ) -> tuple[str, datetime]:
+        if self.presign_cache is not None:
+            return self.presign_cache.get_or_sign(
+                (self.bucket, path, filename, mime_type),
+                self.presign_ttl,
+                lambda: self._generate_presigned_download_url(
+                    path=path, filename=filename, mime_type=mime_type
+                ),
+            )
+        return self._generate_presigned_download_url(
+            path=path, filename=filename, mime_type=mime_type
+        )
+
+    def _generate_presigned_download_url(
+        self,
+        *,
+        path: str,
+        filename: str,
+        mime_type: str,
     ) -> tuple[str, datetime]:
         expires_in = self.presign_ttl
         presign_from = utc_now()
@@ -0,0 +1,209 @@
+"""
+Cache of Tinybird query results, stored in Redis.
+
+Results are keyed by the compiled SQL and its parameters, along with the
+ingestion state of the queried organizations, which the ingestion paths of
+`polar.integrations.tinybird.service` update once events are ingested:
+
+* `watermark`: latest ingested event timestamp, minus a grace period for events
+  arriving slightly out of order.
+* `ingested_at`: time of the latest ingestion.
+* `backfilled_at`: time of the latest ingestion with events older than the
+  watermark.
+
+A time window ending before the watermark of all its organizations is
+historical: only a backfill can change its results, so they're keyed by
+`backfilled_at` and cached for long. Other windows are keyed by `ingested_at`,
+so each ingestion invalidates them, and cached shortly, to catch up with events
+ingested without recording it.
+"""
+
+import hashlib
+import json
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timedelta
+from typing import Any
+from uuid import UUID
+
+import structlog
+from pydantic import TypeAdapter, ValidationError
+from redis.exceptions import RedisError
+
+from polar.config import settings
+from polar.logging import Logger
+from polar.redis import Redis
+
+log: Logger = structlog.get_logger()
+
+_CACHE_KEY_PREFIX = "tinybird:query:v1"
+_STATE_KEY_PREFIX = "tinybird:query:organization"
+_STATE_TTL_SECONDS = 60 * 60 * 24 * 7
+
+# KEYS[1]: state of the organization
+# ARGV: now, oldest event timestamp and new watermark, in milliseconds, TTL of
+# the state in seconds
+_RECORD_INGESTION_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'watermark'))
+
+if current ~= nil and tonumber(ARGV[2]) < current then
+    redis.call('HSET', KEYS[1], 'backfilled_at', ARGV[1])
+end
+if current == nil or tonumber(ARGV[3]) > current then
+    redis.call('HSET', KEYS[1], 'watermark', ARGV[3])
+end
+redis.call('HSET', KEYS[1], 'ingested_at', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+"""
+
+
+def _get_state_key(organization_id: UUID | str) -> str:
+    return f"{_STATE_KEY_PREFIX}:{organization_id}"
+
+
+def _to_milliseconds(dt: datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+
+def _decode(value: str | bytes | None) -> str | None:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+async def record_ingestion(
+    redis: Redis,
+    organization_id: UUID | str,
+    *,
+    oldest: datetime,
+    newest: datetime,
+    now: datetime,
+) -> None:
+    """
+    Record that events of an organization were ingested, invalidating its cached
+    query results.
+
+    Args:
+        oldest: Timestamp of the oldest ingested event.
+        newest: Timestamp of the newest ingested event.
+        now: Time of the ingestion.
+    """
+    watermark = newest - timedelta(seconds=settings.TINYBIRD_QUERY_CACHE_GRACE_SECONDS)
+    await redis.eval(
+        _RECORD_INGESTION_SCRIPT,
+        1,
+        _get_state_key(organization_id),
+        str(_to_milliseconds(now)),
+        str(_to_milliseconds(oldest)),
+        str(_to_milliseconds(watermark)),
+        str(_STATE_TTL_SECONDS),
+    )  # type: ignore[misc]
+
+
+async def record_ingestions(
+    redis: Redis,
+    organizations: Mapping[str, tuple[datetime, datetime]],
+    *,
+    now: datetime,
+) -> None:
+    """
+    Record the ingestion of events of several organizations, like
+    `record_ingestion`.
+
+    Failures are logged and ignored: the events are ingested, and the cached
+    query results expire anyway.
+
+    Args:
+        organizations: Oldest and newest event timestamps, by organization ID.
+    """
+    for organization_id, (oldest, newest) in organizations.items():
+        try:
+            await record_ingestion(
+                redis, organization_id, oldest=oldest, newest=newest, now=now
+            )
+        except RedisError as e:
+            log.warning(
+                "tinybird.ingest.record_ingestion_failed",
+                organization_id=organization_id,
+                error=str(e),
+            )
+
+
+class TinybirdQueryCache:
+    def __init__(self, redis: Redis) -> None:
+        self.redis = redis
+
+    async def get_key(
+        self,
+        sql: str,
+        params: Mapping[str, Any],
+        *,
+        organization_ids: Sequence[str],
+        end: datetime | None,
+    ) -> tuple[str, int] | None:
+        """
+        Get the cache key and TTL of a query.
+
+        Args:
+            organization_ids: Organizations the query is restricted to.
+            end: End of the queried time window, `None` if it's unbounded.
+
+        Returns:
+            The key and its TTL in seconds, or `None` if the query can't be cached.
+        """
+        if not organization_ids:
+            return None
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipeline:
+                for organization_id in organization_ids:
+                    pipeline.hmget(
+                        _get_state_key(organization_id),
+                        ["watermark", "ingested_at", "backfilled_at"],
+                    )
+                states: list[list[str | bytes | None]] = await pipeline.execute()
+        except RedisError as exc:
+            log.warning("tinybird.query_cache.state_failed", error=str(exc))
+            return None
+
+        historical = end is not None and all(
+            watermark is not None and _to_milliseconds(end) <= int(watermark)
+            for watermark, _, _ in states
+        )
+        if historical:
+            version = [_decode(backfilled_at) for _, _, backfilled_at in states]
+            ttl = settings.TINYBIRD_QUERY_CACHE_HISTORICAL_TTL_SECONDS
+        else:
+            version = [_decode(ingested_at) for _, ingested_at, _ in states]
+            ttl = settings.TINYBIRD_QUERY_CACHE_RECENT_TTL_SECONDS
+
+        canonical = json.dumps(
+            {"sql": sql, "params": params, "version": version},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return f"{_CACHE_KEY_PREFIX}:{digest}", ttl
+
+    async def get[T](self, key: str, adapter: TypeAdapter[T]) -> T | None:
+        try:
+            cached = await self.redis.get(key)
+        except RedisError as exc:
+            log.warning("tinybird.query_cache.get_failed", error=str(exc))
+            return None
+        if cached is None:
+            return None
+        try:
+            return adapter.validate_json(cached)
+        except ValidationError as exc:
+            log.warning("tinybird.query_cache.deserialize_failed", error=str(exc))
+            return None
+
+    async def set[T](
+        self, key: str, ttl: int, adapter: TypeAdapter[T], value: T
+    ) -> None:
+        try:
+            await self.redis.set(key, adapter.dump_json(value), ex=ttl)
+        except RedisError as exc:
+            log.warning("tinybird.query_cache.set_failed", error=str(exc))
+
+
+__all__ = ["TinybirdQueryCache", "record_ingestion"]
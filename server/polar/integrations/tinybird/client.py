@@ -1,6 +1,6 @@
 import asyncio
 import json
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from urllib.parse import urlparse
 
 import clickhouse_connect
@@ -10,10 +10,14 @@ import structlog
 from opentelemetry import trace
 
 from polar.config import settings
+from polar.enums import TinybirdBackend
 from polar.logging import Logger
 
 from .schemas import TinybirdEvent
 
+if TYPE_CHECKING:
+    from .local import LocalTinybirdClient
+
 log: Logger = structlog.get_logger()
 tracer = trace.get_tracer("polar.integrations.tinybird")
 
@@ -246,7 +250,17 @@ class TinybirdClient:
             return
 
         ndjson = "\n".join(json.dumps(e) for e in events)
-        payload_size = len(ndjson.encode("utf-8"))
+        await self.ingest_ndjson(datasource, ndjson, wait=wait)
+
+    async def ingest_ndjson(
+        self, datasource: str, ndjson: str, *, wait: bool = True
+    ) -> None:
+        if not ndjson:
+            return
+
+        payload = ndjson.encode("utf-8")
+        payload_size = len(payload)
+        event_count = ndjson.count("\n") + 1
 
         if payload_size > MAX_PAYLOAD_BYTES:
             raise TinybirdPayloadTooLargeError(payload_size, MAX_PAYLOAD_BYTES)
@@ -254,14 +268,14 @@ class TinybirdClient:
         log.debug(
             "tinybird.ingest",
             datasource=datasource,
-            event_count=len(events),
+            event_count=event_count,
             payload_bytes=payload_size,
         )
 
         with logfire.span(
             "INSERT tinybird {datasource}",
             datasource=datasource,
-            event_count=len(events),
+            event_count=event_count,
             payload_bytes=payload_size,
         ) as span:
             span.set_attribute("db.system", "tinybird")
@@ -272,7 +286,7 @@ class TinybirdClient:
                 "/v0/events",
                 endpoint_name=datasource,
                 params={"name": datasource, "wait": str(wait).lower()},
-                content=ndjson,
+                content=payload,
                 headers={"Content-Type": "application/x-ndjson"},
             )
             if not response.is_success:
@@ -340,14 +354,23 @@ class TinybirdClient:
         return response.json()
 
 
-client = TinybirdClient(
-    api_url=settings.TINYBIRD_API_URL,
-    clickhouse_url=settings.TINYBIRD_CLICKHOUSE_URL,
-    api_token=settings.TINYBIRD_API_TOKEN,
-    read_token=settings.TINYBIRD_READ_TOKEN,
-    clickhouse_username=settings.TINYBIRD_CLICKHOUSE_USERNAME,
-    clickhouse_token=settings.TINYBIRD_CLICKHOUSE_TOKEN,
-)
+def _get_client() -> "TinybirdClient | LocalTinybirdClient":
+    if settings.TINYBIRD_BACKEND == TinybirdBackend.local:
+        # Imported lazily: it builds on this module, and loads DuckDB
+        from .local import LocalTinybirdClient
+
+        return LocalTinybirdClient(directory=settings.TINYBIRD_LOCAL_DIRECTORY)
+    return TinybirdClient(
+        api_url=settings.TINYBIRD_API_URL,
+        clickhouse_url=settings.TINYBIRD_CLICKHOUSE_URL,
+        api_token=settings.TINYBIRD_API_TOKEN,
+        read_token=settings.TINYBIRD_READ_TOKEN,
+        clickhouse_username=settings.TINYBIRD_CLICKHOUSE_USERNAME,
+        clickhouse_token=settings.TINYBIRD_CLICKHOUSE_TOKEN,
+    )
+
+
+client = _get_client()
 
 __all__ = [
     "TinybirdError",
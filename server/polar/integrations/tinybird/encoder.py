@@ -0,0 +1,277 @@
+"""
+NDJSON encoder of the events sent to Tinybird.
+
+Each event is encoded once, straight to its NDJSON line, and lines are grouped
+in chunks by their byte offset. The lines are the JSON serialization of the
+`TinybirdEvent` built by `event_to_tinybird`, without its null columns:
+
+* the columns denormalized from the metadata are planned per event source.
+  Only system events have them: for other events, they're all null, and
+  written as a pre-encoded fragment.
+* the metadata is only copied when some of its keys are denormalized.
+
+Lines are ASCII-only, so their length in characters is their size in bytes.
+"""
+
+import json
+from collections.abc import Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any, cast
+from uuid import UUID
+
+from polar.models import Event
+from polar.models.event import EventSource
+
+from .schemas import TinybirdEvent
+
+# Columns read from the metadata of system events
+SYSTEM_METADATA_COLUMNS: tuple[str, ...] = (
+    "meter_id",
+    "units",
+    "rollover",
+    "product_id",
+    "subscription_id",
+    "order_id",
+    "order_created_at",
+    "benefit_id",
+    "benefit_grant_id",
+    "checkout_id",
+    "transaction_id",
+    "refund_id",
+    "dispute_id",
+    "discount_id",
+    "amount",
+    "currency",
+    "net_amount",
+    "tax_amount",
+    "discount_amount",
+    "applied_balance_amount",
+    "platform_fee",
+    "fee",
+    "exchange_rate",
+    "refunded_amount",
+    "refundable_amount",
+    "presentment_amount",
+    "presentment_currency",
+    "recurring_interval",
+    "recurring_interval_count",
+    "old_product_id",
+    "new_product_id",
+    "old_seats",
+    "new_seats",
+    "started_at",
+    "canceled_at",
+    "ends_at",
+    "old_period_end",
+    "new_period_end",
+    "cancel_at_period_end",
+    "customer_cancellation_reason",
+    "customer_cancellation_comment",
+    "proration_behavior",
+    "trial_end",
+    "seats",
+    "billing_period_end",
+    "benefit_type",
+    "billing_type",
+    "checkout_status",
+    "customer_email",
+    "customer_name",
+    "tax_state",
+    "tax_country",
+)
+
+_COST_KEY = "_cost"
+_LLM_KEY = "_llm"
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+@dataclass(frozen=True)
+class _FieldPlan:
+    metadata_columns: tuple[str, ...]
+    "Columns read from the metadata."
+    excluded_metadata_keys: frozenset[str]
+    "Metadata keys not kept in `user_metadata`."
+    null_fragment: str
+    "Pre-encoded columns which are always null."
+
+
+def _get_field_plan(source: EventSource) -> _FieldPlan:
+    if source == EventSource.system:
+        return _FieldPlan(
+            metadata_columns=SYSTEM_METADATA_COLUMNS,
+            excluded_metadata_keys=frozenset(
+                (*SYSTEM_METADATA_COLUMNS, _COST_KEY, _LLM_KEY)
+            ),
+            null_fragment="",
+        )
+    return _FieldPlan(
+        metadata_columns=(),
+        excluded_metadata_keys=frozenset((_COST_KEY, _LLM_KEY)),
+        null_fragment=",".join(
+            f"{_encode(column)}:null" for column in SYSTEM_METADATA_COLUMNS
+        ),
+    )
+
+
+_FIELD_PLANS: dict[str, _FieldPlan] = {
+    source: _get_field_plan(source) for source in EventSource
+}
+
+
+def _denormalized_value(value: Any) -> Any:
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _truncate_datetime_to_millis(dt_str: str | None) -> str | None:
+    if dt_str is None:
+        return None
+    try:
+        dt = datetime.fromisoformat(dt_str)
+        return dt.isoformat(timespec="milliseconds")
+    except ValueError, TypeError:
+        return dt_str
+
+
+def _build_row(
+    event: Event, ancestors: Sequence[str] | None, plan: _FieldPlan
+) -> dict[str, Any]:
+    """Build the columns of the event, except the ones always null by `plan`."""
+    metadata: dict[str, Any] = event.user_metadata or {}
+    cost = metadata.get(_COST_KEY) or {}
+    llm = metadata.get(_LLM_KEY) or {}
+
+    row: dict[str, Any] = {
+        "id": str(event.id),
+        "ingested_at": event.ingested_at.isoformat(),
+        "timestamp": event.timestamp.isoformat(),
+        "name": event.name,
+        "source": event.source,
+        "organization_id": str(event.organization_id),
+        "customer_id": str(event.customer_id) if event.customer_id else None,
+        "external_customer_id": event.external_customer_id,
+        "member_id": str(event.member_id) if event.member_id else None,
+        "external_member_id": event.external_member_id,
+        "external_id": event.external_id,
+        "parent_id": str(event.parent_id) if event.parent_id else None,
+        "root_id": str(event.root_id) if event.root_id else None,
+        "event_type_id": str(event.event_type_id) if event.event_type_id else None,
+        "cost_amount": cost.get("amount"),
+        "cost_currency": cost.get("currency"),
+        "llm_vendor": llm.get("vendor"),
+        "llm_model": llm.get("model"),
+        "llm_input_tokens": llm.get("input_tokens"),
+        "llm_output_tokens": llm.get("output_tokens"),
+        "ancestors": list(ancestors) if ancestors else [],
+    }
+    for column in plan.metadata_columns:
+        row[column] = _denormalized_value(metadata.get(column))
+    if plan.metadata_columns:
+        row["order_created_at"] = _truncate_datetime_to_millis(row["order_created_at"])
+
+    excluded = plan.excluded_metadata_keys
+    if any(key in excluded for key in metadata):
+        metadata = {k: v for k, v in metadata.items() if k not in excluded}
+    row["user_metadata"] = _encode(metadata) if metadata else "{}"
+    return row
+
+
+def event_to_tinybird(
+    event: Event, ancestors: Sequence[str] | None = None
+) -> TinybirdEvent:
+    """Build the row of the event in the Tinybird events datasource."""
+    plan = _FIELD_PLANS[event.source]
+    row = _build_row(event, ancestors, plan)
+    if plan.null_fragment:
+        row.update(dict.fromkeys(SYSTEM_METADATA_COLUMNS))
+    return cast(TinybirdEvent, row)
+
+
+def encode_event(event: Event, ancestors: Sequence[str] | None = None) -> str:
+    """Encode an event as a NDJSON line, without the trailing newline."""
+    plan = _FIELD_PLANS[event.source]
+    line = _encode(_build_row(event, ancestors, plan))
+    if plan.null_fragment:
+        line = f"{line[:-1]},{plan.null_fragment}}}"
+    return line
+
+
+def _escaped_size(line: str) -> int:
+    # Quotes and backslashes are escaped, and the newline becomes `\n`
+    return len(line) + line.count('"') + line.count("\\") + 1
+
+
+# Size of an entry of `organizations`, as sent along a chunk to `tinybird.ingest`
+_MAX_TIMESTAMP = datetime.max.replace(tzinfo=UTC).isoformat()
+ORGANIZATION_BYTES = len(
+    json.dumps({str(UUID(int=0)): [_MAX_TIMESTAMP, _MAX_TIMESTAMP]})
+)
+
+
+@dataclass(frozen=True)
+class EncodedChunk:
+    ndjson: str
+    organizations: dict[str, tuple[datetime, datetime]]
+    "Oldest and newest timestamps of the events of the chunk, by organization ID."
+
+
+def encode_events(
+    events: Sequence[Event],
+    ancestors_by_event: Mapping[UUID, Sequence[str]] | None = None,
+    *,
+    max_chunk_bytes: int,
+    json_escaped: bool = False,
+    organization_bytes: int = 0,
+) -> Iterator[EncodedChunk]:
+    """
+    Encode events as NDJSON chunks of at most `max_chunk_bytes`.
+
+    An event larger than `max_chunk_bytes` is yielded alone in its chunk.
+
+    Args:
+        json_escaped: Size the chunks once embedded in a JSON string, e.g. a job
+        payload, instead of as is.
+        organization_bytes: Size counted for each organization of a chunk, when
+        its `organizations` are sent along, e.g. `ORGANIZATION_BYTES`.
+    """
+    ancestors_by_event = ancestors_by_event or {}
+    lines: list[str] = []
+    organizations: dict[str, tuple[datetime, datetime]] = {}
+    offset = 0
+    for event in events:
+        line = encode_event(event, ancestors_by_event.get(event.id))
+        line_size = _escaped_size(line) if json_escaped else len(line) + 1
+        organization_id = str(event.organization_id)
+        size = line_size
+        if organization_id not in organizations:
+            size += organization_bytes
+        if lines and offset + size > max_chunk_bytes:
+            yield EncodedChunk("\n".join(lines), organizations)
+            lines = []
+            organizations = {}
+            offset = 0
+            size = line_size + organization_bytes
+        lines.append(line)
+        oldest, newest = organizations.get(
+            organization_id, (event.timestamp, event.timestamp)
+        )
+        organizations[organization_id] = (
+            min(oldest, event.timestamp),
+            max(newest, event.timestamp),
+        )
+        offset += size
+    if lines:
+        yield EncodedChunk("\n".join(lines), organizations)
+
+
+__all__ = [
+    "ORGANIZATION_BYTES",
+    "SYSTEM_METADATA_COLUMNS",
+    "EncodedChunk",
+    "encode_event",
+    "encode_events",
+    "event_to_tinybird",
+]
@@ -0,0 +1,721 @@
+"""
+Local analytics backend, standing in for Tinybird.
+
+Events are stored in a local directory as Parquet segments, one per ingested
+chunk, and queried with an embedded DuckDB database, so event analytics run
+offline: when self-hosting, in development or in tests.
+
+* The ClickHouse SQL we send, either compiled by `_ChBindCompiler` or written by
+  hand, is translated to DuckDB: bound parameters and the ClickHouse functions
+  we use are rewritten, the rest is common SQL.
+* Materialized views are plain views, aggregating the events when queried, and
+  the `-Merge` combinators reading them become the matching aggregate.
+* Endpoints are reimplemented in DuckDB SQL. The metrics ones aren't: like an
+  unknown pipe, they fail with a `TinybirdRequestError`.
+
+Segments are compacted once they pile up. It's meant for a single writer, the
+worker: readers of a segment being rewritten retry once.
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+import uuid
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import duckdb
+import structlog
+from opentelemetry import trace
+
+from polar.logging import Logger
+
+from .client import (
+    MAX_PAYLOAD_BYTES,
+    TinybirdPayloadTooLargeError,
+    TinybirdRequestError,
+)
+from .schemas import TinybirdEvent
+
+log: Logger = structlog.get_logger()
+tracer = trace.get_tracer("polar.integrations.tinybird")
+
+DATASOURCES_DIRECTORY = Path(__file__).parents[3] / "tinybird" / "datasources"
+DATASOURCES = ("events_by_ingested_at",)
+MAX_SEGMENTS = 64
+
+# Materialized views, aggregated when queried
+_VIEWS = {
+    "events_by_timestamp": "SELECT * FROM events_by_ingested_at",
+    "event_types": (
+        "SELECT organization_id, name, source, count(*) AS occurrences, "
+        "min(timestamp) AS first_seen, max(timestamp) AS last_seen "
+        "FROM events_by_ingested_at "
+        "GROUP BY organization_id, name, source"
+    ),
+    "event_types_by_customer_id": (
+        "SELECT organization_id, customer_id, name, source, "
+        "count(*) AS occurrences, "
+        "min(timestamp) AS first_seen, max(timestamp) AS last_seen "
+        "FROM events_by_ingested_at "
+        "WHERE customer_id IS NOT NULL "
+        "GROUP BY organization_id, customer_id, name, source"
+    ),
+    "event_types_by_external_customer_id": (
+        "SELECT organization_id, external_customer_id, name, source, "
+        "count(*) AS occurrences, "
+        "min(timestamp) AS first_seen, max(timestamp) AS last_seen "
+        "FROM events_by_ingested_at "
+        "WHERE external_customer_id IS NOT NULL AND external_customer_id != '' "
+        "GROUP BY organization_id, external_customer_id, name, source"
+    ),
+}
+
+_DUCKDB_TYPES = {
+    "UUID": "VARCHAR",
+    "String": "VARCHAR",
+    "Bool": "BOOLEAN",
+    "Float64": "DOUBLE",
+    "Int32": "INTEGER",
+    "Int64": "BIGINT",
+    "UInt64": "UBIGINT",
+    "DateTime": "TIMESTAMP",
+    "DateTime64(3)": "TIMESTAMP",
+}
+
+_SCHEMA_COLUMN_PATTERN = re.compile(r"^\s*`(\w+)` (.+?) `json:", re.MULTILINE)
+
+
+def _get_duckdb_type(clickhouse_type: str) -> str:
+    for wrapper in ("LowCardinality", "Nullable"):
+        if clickhouse_type.startswith(f"{wrapper}("):
+            return _get_duckdb_type(clickhouse_type[len(wrapper) + 1 : -1])
+    if clickhouse_type.startswith("Array("):
+        return f"{_get_duckdb_type(clickhouse_type[len('Array(') : -1])}[]"
+    return _DUCKDB_TYPES[clickhouse_type]
+
+
+def _load_schema(datasource: str) -> dict[str, str]:
+    """Read the columns of a datasource, with their DuckDB type."""
+    definition = (DATASOURCES_DIRECTORY / f"{datasource}.datasource").read_text()
+    return {
+        name: _get_duckdb_type(clickhouse_type)
+        for name, clickhouse_type in _SCHEMA_COLUMN_PATTERN.findall(definition)
+    }
+
+
+def _quote(value: str | Path) -> str:
+    escaped = str(value).replace("'", "''")
+    return f"'{escaped}'"
+
+
+# Translation of ClickHouse SQL
+
+
+_PLACEHOLDER_PATTERN = re.compile(r"\{(\w+):([^{}]+)\}")
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_IN_PATTERN = re.compile(r"\bIN\s*$", re.IGNORECASE)
+_HEX_BYTES_PATTERN = re.compile(r"reverse\(unhex\((.*)\)\)", re.DOTALL)
+
+
+def _scan_quoted(sql: str, start: int) -> int:
+    """Find the end of the string literal or quoted identifier at `start`."""
+    quote = sql[start]
+    index = start + 1
+    while index < len(sql):
+        if sql[index] == "\\":
+            index += 2
+            continue
+        if sql[index] == quote:
+            if sql.startswith(quote, index + 1):
+                index += 2
+                continue
+            return index + 1
+        index += 1
+    raise ValueError(f"Unterminated {quote} at {start}")
+
+
+def _scan_arguments(sql: str, start: int) -> tuple[list[str], int]:
+    """
+    Split the arguments of the call opened by the parenthesis at `start`.
+
+    Returns:
+        The arguments and the index after the closing parenthesis.
+    """
+    arguments: list[str] = []
+    depth = 0
+    argument_start = start + 1
+    index = start + 1
+    while index < len(sql):
+        character = sql[index]
+        if character in "'`\"":
+            index = _scan_quoted(sql, index)
+            continue
+        if character in "([{":
+            depth += 1
+        elif character in ")]}":
+            if depth == 0:
+                arguments.append(sql[argument_start:index].strip())
+                if arguments == [""]:
+                    arguments = []
+                return arguments, index + 1
+            depth -= 1
+        elif character == "," and depth == 0:
+            arguments.append(sql[argument_start:index].strip())
+            argument_start = index + 1
+        index += 1
+    raise ValueError(f"Unbalanced parenthesis at {start}")
+
+
+def _json_pointer(keys: Sequence[str]) -> str:
+    if not keys:
+        return "''"
+    return " || ".join(
+        f"'/' || replace(replace({key}, '~', '~0'), '/', '~1')" for key in keys
+    )
+
+
+def _json_extract_string(arguments: list[str]) -> str:
+    document, pointer = arguments[0], _json_pointer(arguments[1:])
+    return (
+        f"CASE WHEN json_type({document}, {pointer}) = 'VARCHAR' "
+        f"THEN json_extract_string({document}, {pointer}) ELSE '' END"
+    )
+
+
+def _json_extract_float(arguments: list[str]) -> str:
+    document, pointer = arguments[0], _json_pointer(arguments[1:])
+    return (
+        f"CASE WHEN json_type({document}, {pointer}) IN ('BIGINT', 'UBIGINT', 'DOUBLE') "
+        f"THEN CAST(json_extract({document}, {pointer}) AS DOUBLE) ELSE 0 END"
+    )
+
+
+def _json_extract_raw(arguments: list[str]) -> str:
+    document, pointer = arguments[0], _json_pointer(arguments[1:])
+    return f"coalesce(CAST(json_extract({document}, {pointer}) AS VARCHAR), '')"
+
+
+def _date_trunc(arguments: list[str]) -> str:
+    if len(arguments) == 2:
+        return f"date_trunc({arguments[0]}, {arguments[1]})"
+    # Truncate in the time zone, and go back to UTC
+    unit, timestamp, timezone = arguments
+    local = f"timezone({timezone}, timezone('UTC', {timestamp}))"
+    return f"timezone('UTC', timezone({timezone}, date_trunc({unit}, {local})))"
+
+
+def _reinterpret_as_uint32(arguments: list[str]) -> str:
+    # Only as the integer of big-endian hex digits, `reverse(unhex(...))`
+    match = _HEX_BYTES_PATTERN.fullmatch(arguments[0])
+    if match is None:
+        raise ValueError(f"Unsupported reinterpretAsUInt32 of {arguments[0]}")
+    return f"CAST('0x' || {match.group(1)} AS UBIGINT)"
+
+
+_FUNCTIONS: dict[str, Callable[[list[str]], str]] = {
+    "uniqExact": lambda a: f"count(DISTINCT {a[0]})",
+    "toString": lambda a: f"CAST({a[0]} AS VARCHAR)",
+    "toUUID": lambda a: f"CAST({a[0]} AS VARCHAR)",
+    "toFloat64OrNull": lambda a: f"TRY_CAST({a[0]} AS DOUBLE)",
+    "toUnixTimestamp": lambda a: f"CAST(epoch({a[0]}) AS BIGINT)",
+    "toUnixTimestamp64Milli": lambda a: f"epoch_ms({a[0]})",
+    "intDiv": lambda a: f"({a[0]} // {a[1]})",
+    "reinterpretAsUInt32": _reinterpret_as_uint32,
+    "position": lambda a: f"strpos({a[0]}, {a[1]})",
+    "positionCaseInsensitiveUTF8": lambda a: f"strpos(lower({a[0]}), lower({a[1]}))",
+    "indexOf": lambda a: f"coalesce(list_position({a[0]}, {a[1]}), 0)",
+    "arrayIntersect": lambda a: f"list_intersect({a[0]}, {a[1]})",
+    "hasAny": lambda a: f"list_has_any({a[0]}, {a[1]})",
+    "JSONExtractString": _json_extract_string,
+    "JSONExtractFloat": _json_extract_float,
+    "JSONExtractRaw": _json_extract_raw,
+    "date_trunc": _date_trunc,
+    "countMerge": lambda a: f"sum({a[0]})",
+    "minMerge": lambda a: f"min({a[0]})",
+    "maxMerge": lambda a: f"max({a[0]})",
+}
+
+# Parametric aggregates, e.g. `quantile(0.99)(x)`
+_PARAMETRIC_FUNCTIONS: dict[str, Callable[[list[str], list[str]], str]] = {
+    "quantile": lambda p, a: f"quantile_cont({a[0]}, {p[0]})",
+}
+
+_ARRAY_JOIN = "arrayJoin"
+_CLAUSE_PATTERN = re.compile(r"FROM|WHERE|GROUP|HAVING|ORDER|LIMIT", re.IGNORECASE)
+
+
+@dataclass
+class _Translation:
+    bound: set[str] = field(default_factory=set)
+    "Names of the bound parameters."
+    array_joins: list[str] = field(default_factory=list)
+    "Arrays joined to the rows of the statement, by `arrayJoin`."
+
+
+def _skip_spaces(sql: str, index: int) -> int:
+    while index < len(sql) and sql[index].isspace():
+        index += 1
+    return index
+
+
+def _rewrite(sql: str, translation: _Translation, *, nested: bool = False) -> str:
+    output: list[str] = []
+    depth = 0
+    index = 0
+    while index < len(sql):
+        character = sql[index]
+        if character == "'":
+            end = _scan_quoted(sql, index)
+            output.append(sql[index:end])
+            index = end
+        elif character == "`":
+            end = _scan_quoted(sql, index)
+            identifier = sql[index + 1 : end - 1].replace('"', '""')
+            output.append(f'"{identifier}"')
+            index = end
+        elif character == "{" and (match := _PLACEHOLDER_PATTERN.match(sql, index)):
+            name, clickhouse_type = match.groups()
+            translation.bound.add(name)
+            placeholder = f"CAST(${name} AS {_get_duckdb_type(clickhouse_type)})"
+            # `x IN {values:Array(String)}` tests the elements of the array
+            if clickhouse_type.startswith("Array(") and _IN_PATTERN.search(
+                "".join(output[-8:])
+            ):
+                placeholder = f"(SELECT unnest({placeholder}))"
+            output.append(placeholder)
+            index = match.end()
+        elif match := _IDENTIFIER_PATTERN.match(sql, index):
+            name = match.group()
+            index = match.end()
+            call = _skip_spaces(sql, index)
+            qualified = bool(output) and output[-1] == "."
+            if (
+                qualified
+                or call >= len(sql)
+                or sql[call] != "("
+                or (
+                    name not in _FUNCTIONS
+                    and name not in _PARAMETRIC_FUNCTIONS
+                    and name != _ARRAY_JOIN
+                )
+            ):
+                output.append(name)
+                continue
+            arguments, index = _scan_arguments(sql, call)
+            arguments = [
+                _rewrite(argument, translation, nested=True) for argument in arguments
+            ]
+            call = _skip_spaces(sql, index)
+            if name == _ARRAY_JOIN:
+                # Joined in the FROM clause: only supported in the main statement
+                if nested or depth > 0:
+                    raise ValueError("Unsupported arrayJoin in a nested expression")
+                output.append(f"array_join_{len(translation.array_joins)}")
+                translation.array_joins.append(arguments[0])
+            elif name in _PARAMETRIC_FUNCTIONS and call < len(sql) and sql[call] == "(":
+                parameters = arguments
+                arguments, index = _scan_arguments(sql, call)
+                arguments = [
+                    _rewrite(argument, translation, nested=True)
+                    for argument in arguments
+                ]
+                output.append(_PARAMETRIC_FUNCTIONS[name](parameters, arguments))
+            elif name in _FUNCTIONS:
+                output.append(_FUNCTIONS[name](arguments))
+            else:
+                output.append(f"{name}({', '.join(arguments)})")
+        else:
+            if character == "(":
+                depth += 1
+            elif character == ")":
+                depth -= 1
+            output.append(character)
+            index += 1
+    return "".join(output)
+
+
+def _find_from_clause_end(sql: str) -> int:
+    """Find the end of the FROM clause of the main statement."""
+    in_from = False
+    depth = 0
+    index = 0
+    while index < len(sql):
+        character = sql[index]
+        if character in "'\"":
+            index = _scan_quoted(sql, index)
+            continue
+        if character == "(":
+            depth += 1
+        elif character == ")":
+            depth -= 1
+        elif depth == 0 and (match := _IDENTIFIER_PATTERN.match(sql, index)):
+            keyword = match.group()
+            if in_from and _CLAUSE_PATTERN.fullmatch(keyword):
+                return index
+            in_from = in_from or keyword.upper() == "FROM"
+            index = match.end()
+            continue
+        index += 1
+    if not in_from:
+        raise ValueError("Unsupported arrayJoin without a FROM clause")
+    return len(sql)
+
+
+def _translate(
+    sql: str, parameters: dict[str, Any] | None = None
+) -> tuple[str, dict[str, Any]]:
+    """
+    Translate a ClickHouse statement and its parameters to DuckDB.
+
+    Raises:
+        ValueError: The statement can't be translated.
+    """
+    translation = _Translation()
+    translated = _rewrite(sql, translation)
+
+    if translation.array_joins:
+        end = _find_from_clause_end(translated)
+        joins = "".join(
+            f", unnest({array}) AS array_join_{i}(array_join_{i})"
+            for i, array in enumerate(translation.array_joins)
+        )
+        translated = f"{translated[:end].rstrip()}{joins} {translated[end:]}"
+
+    parameters = parameters or {}
+    missing = translation.bound - parameters.keys()
+    if missing:
+        raise ValueError(f"Missing parameters: {', '.join(sorted(missing))}")
+    return translated, {name: parameters[name] for name in translation.bound}
+
+
+# Endpoints
+
+
+_EVENT_TYPES_SORT_COLUMNS = {"name", "first_seen", "last_seen", "occurrences"}
+
+
+def _event_types_endpoint(params: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    parameters: dict[str, Any] = {
+        "organization_id": params.get(
+            "organization_id", "00000000-0000-0000-0000-000000000000"
+        )
+    }
+    source_filter = ""
+    if "source" in params:
+        source_filter = "AND source = $source"
+        parameters["source"] = params["source"]
+    order_by = params.get("order_by")
+    if order_by not in _EVENT_TYPES_SORT_COLUMNS:
+        order_by = "last_seen"
+    direction = "ASC" if params.get("order_direction") == "asc" else "DESC"
+    sql = (
+        "SELECT name, source, occurrences, "
+        "strftime(first_seen, '%Y-%m-%d %H:%M:%S.%g') AS first_seen, "
+        "strftime(last_seen, '%Y-%m-%d %H:%M:%S.%g') AS last_seen "
+        "FROM ("
+        "SELECT name, source, sum(occurrences) AS occurrences, "
+        "min(first_seen) AS first_seen, max(last_seen) AS last_seen "
+        "FROM event_types "
+        f"WHERE organization_id = $organization_id {source_filter} "
+        "GROUP BY name, source"
+        f") ORDER BY {order_by} {direction}"
+    )
+    return sql, parameters
+
+
+def _user_events_count_endpoint(
+    params: dict[str, Any],
+) -> tuple[str, dict[str, Any]]:
+    parameters: dict[str, Any] = {
+        "exclude_organization_id": params.get(
+            "exclude_organization_id", "00000000-0000-0000-0000-000000000000"
+        ),
+        "until": params.get("until", "2024-01-01 00:00:00.000"),
+    }
+    after_filter = ""
+    if "after" in params:
+        after_filter = "AND ingested_at > CAST($after AS TIMESTAMP)"
+        parameters["after"] = params["after"]
+    sql = (
+        "SELECT organization_id, count(DISTINCT id) AS count "
+        "FROM events_by_ingested_at "
+        "WHERE source = 'user' "
+        "AND organization_id != $exclude_organization_id "
+        f"AND ingested_at <= CAST($until AS TIMESTAMP) {after_filter} "
+        "GROUP BY organization_id"
+    )
+    return sql, parameters
+
+
+_ENDPOINTS: dict[str, Callable[[dict[str, Any]], tuple[str, dict[str, Any]]]] = {
+    "event_types_endpoint": _event_types_endpoint,
+    "user_events_count_endpoint": _user_events_count_endpoint,
+}
+
+
+class LocalTinybirdClient:
+    """Client of the local analytics backend, with the API of `TinybirdClient`."""
+
+    def __init__(self, *, directory: str | Path) -> None:
+        self._directory = Path(directory)
+        self._schemas = {
+            datasource: _load_schema(datasource) for datasource in DATASOURCES
+        }
+        self._database: duckdb.DuckDBPyConnection | None = None
+        self._segments: dict[str, list[Path]] = {}
+        self._lock = threading.RLock()
+
+    def _get_database(self) -> duckdb.DuckDBPyConnection:
+        with self._lock:
+            if self._database is None:
+                database = duckdb.connect()
+                database.execute("SET GLOBAL TimeZone = 'UTC'")
+                for datasource in DATASOURCES:
+                    self._create_datasource_view(database, datasource, [])
+                for name, definition in _VIEWS.items():
+                    database.execute(f"CREATE VIEW {name} AS {definition}")
+                self._database = database
+            return self._database
+
+    def _get_datasource_directory(self, datasource: str) -> Path:
+        if datasource not in self._schemas:
+            raise TinybirdRequestError(
+                f"Datasource {datasource} not found",
+                status_code=404,
+                endpoint=datasource,
+            )
+        directory = self._directory / datasource
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    def _list_segments(self, datasource: str) -> list[Path]:
+        return sorted(self._get_datasource_directory(datasource).glob("*.parquet"))
+
+    def _create_datasource_view(
+        self,
+        database: duckdb.DuckDBPyConnection,
+        datasource: str,
+        segments: list[Path],
+    ) -> None:
+        if segments:
+            files = ", ".join(_quote(segment) for segment in segments)
+            definition = f"SELECT * FROM read_parquet([{files}], union_by_name = true)"
+        else:
+            columns = ", ".join(
+                f"CAST(NULL AS {type_}) AS {name}"
+                for name, type_ in self._schemas[datasource].items()
+            )
+            definition = f"SELECT {columns} LIMIT 0"
+        database.execute(f"CREATE OR REPLACE VIEW {datasource} AS {definition}")
+        self._segments[datasource] = segments
+
+    def _refresh_views(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        """Point the datasource views to the segments currently on disk."""
+        with self._lock:
+            for datasource in DATASOURCES:
+                segments = self._list_segments(datasource)
+                if segments != self._segments.get(datasource):
+                    self._create_datasource_view(cursor, datasource, segments)
+
+    def _run(
+        self, cursor: duckdb.DuckDBPyConnection, sql: str, parameters: dict[str, Any]
+    ) -> duckdb.DuckDBPyConnection:
+        self._refresh_views(cursor)
+        return cursor.execute(sql, parameters)
+
+    def _execute(self, sql: str, parameters: dict[str, Any]) -> list[dict[str, Any]]:
+        with self._lock:
+            cursor = self._get_database().cursor()
+        try:
+            try:
+                relation = self._run(cursor, sql, parameters)
+            except duckdb.IOException:
+                # A segment was compacted or rewritten meanwhile
+                relation = self._run(cursor, sql, parameters)
+            columns = [column[0] for column in relation.description or []]
+            return [dict(zip(columns, row)) for row in relation.fetchall()]
+        except duckdb.Error as e:
+            raise TinybirdRequestError(str(e), status_code=400) from e
+        finally:
+            cursor.close()
+
+    def _write_segment(self, datasource: str, ndjson: str) -> None:
+        directory = self._get_datasource_directory(datasource)
+        name = f"{time.time_ns()}-{uuid.uuid4().hex}"
+        source = directory / f"{name}.ndjson.tmp"
+        segment = directory / f"{name}.parquet"
+        schema = self._schemas[datasource]
+
+        read_columns = ", ".join(
+            f"{_quote(name)}: {_quote('VARCHAR' if type_ == 'TIMESTAMP' else type_)}"
+            for name, type_ in schema.items()
+        )
+        select_columns = []
+        for name, type_ in schema.items():
+            if type_ == "TIMESTAMP":
+                # ClickHouse keeps the UTC time, truncated to its precision
+                select_columns.append(
+                    f"date_trunc('millisecond', "
+                    f"CAST(TRY_CAST({name} AS TIMESTAMPTZ) AS TIMESTAMP)) AS {name}"
+                )
+            elif type_.endswith("[]"):
+                select_columns.append(f"coalesce({name}, []) AS {name}")
+            else:
+                select_columns.append(name)
+
+        source.write_text(ndjson, encoding="utf-8")
+        try:
+            with self._lock:
+                database = self._get_database()
+                database.execute(
+                    f"COPY (SELECT {', '.join(select_columns)} "
+                    f"FROM read_json({_quote(source)}, "
+                    f"format = 'newline_delimited', columns = {{{read_columns}}})) "
+                    f"TO {_quote(f'{segment}.tmp')} (FORMAT parquet)"
+                )
+                Path(f"{segment}.tmp").replace(segment)
+                self._compact(database, datasource)
+        finally:
+            source.unlink(missing_ok=True)
+
+    def _compact(self, database: duckdb.DuckDBPyConnection, datasource: str) -> None:
+        """Merge the segments of a datasource once they pile up."""
+        segments = self._list_segments(datasource)
+        if len(segments) <= MAX_SEGMENTS:
+            return
+        merged = segments[-1].with_name(f"{time.time_ns()}-{uuid.uuid4().hex}.parquet")
+        files = ", ".join(_quote(segment) for segment in segments)
+        database.execute(
+            f"COPY (SELECT * FROM read_parquet([{files}], union_by_name = true) "
+            "ORDER BY organization_id, ingested_at, id) "
+            f"TO {_quote(f'{merged}.tmp')} (FORMAT parquet)"
+        )
+        Path(f"{merged}.tmp").replace(merged)
+        for segment in segments:
+            segment.unlink()
+        log.debug(
+            "tinybird.local.compact", datasource=datasource, segments=len(segments)
+        )
+
+    def _delete_rows(self, datasource: str, condition: str) -> int:
+        deleted = 0
+        with self._lock:
+            database = self._get_database()
+            for segment in self._list_segments(datasource):
+                source = f"read_parquet({_quote(segment)})"
+                result = database.execute(
+                    f"SELECT count(*) FROM {source} WHERE {condition}"
+                ).fetchone()
+                matched = result[0] if result is not None else 0
+                if not matched:
+                    continue
+                database.execute(
+                    f"COPY (SELECT * FROM {source} "
+                    f"WHERE NOT coalesce({condition}, false)) "
+                    f"TO {_quote(f'{segment}.tmp')} (FORMAT parquet)"
+                )
+                Path(f"{segment}.tmp").replace(segment)
+                deleted += matched
+        return deleted
+
+    async def endpoint(
+        self,
+        endpoint_name: str,
+        params: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        build = _ENDPOINTS.get(endpoint_name)
+        if build is None:
+            raise TinybirdRequestError(
+                f"Endpoint {endpoint_name} isn't available in the local backend",
+                status_code=404,
+                endpoint=endpoint_name,
+            )
+        sql, parameters = build(params or {})
+        with tracer.start_as_current_span(f"ENDPOINT {endpoint_name}") as span:
+            span.set_attribute("db.system", "duckdb")
+            span.set_attribute("db.operation", "ENDPOINT")
+            return await asyncio.to_thread(self._execute, sql, parameters)
+
+    async def ingest(
+        self, datasource: str, events: list[TinybirdEvent], *, wait: bool = True
+    ) -> None:
+        if not events:
+            return
+
+        ndjson = "\n".join(json.dumps(e) for e in events)
+        await self.ingest_ndjson(datasource, ndjson, wait=wait)
+
+    async def ingest_ndjson(
+        self, datasource: str, ndjson: str, *, wait: bool = True
+    ) -> None:
+        if not ndjson:
+            return
+
+        payload_size = len(ndjson.encode("utf-8"))
+        if payload_size > MAX_PAYLOAD_BYTES:
+            raise TinybirdPayloadTooLargeError(payload_size, MAX_PAYLOAD_BYTES)
+
+        log.debug(
+            "tinybird.local.ingest",
+            datasource=datasource,
+            event_count=ndjson.count("\n") + 1,
+            payload_bytes=payload_size,
+        )
+        try:
+            await asyncio.to_thread(self._write_segment, datasource, ndjson)
+        except duckdb.Error as e:
+            raise TinybirdRequestError(
+                str(e), status_code=400, endpoint=datasource
+            ) from e
+
+    async def query(
+        self,
+        sql: str,
+        parameters: dict[str, Any] | None = None,
+        *,
+        db_statement: str,
+    ) -> list[dict[str, Any]]:
+        operation = sql.strip().split(None, 1)[0].upper() if sql.strip() else "QUERY"
+        with tracer.start_as_current_span(f"{operation} duckdb") as span:
+            span.set_attribute("db.system", "duckdb")
+            span.set_attribute("db.statement", db_statement)
+            try:
+                translated, translated_parameters = _translate(sql, parameters)
+            except ValueError as e:
+                raise TinybirdRequestError(str(e), status_code=400) from e
+            return await asyncio.to_thread(
+                self._execute, translated, translated_parameters
+            )
+
+    async def delete(self, datasource: str, delete_condition: str) -> dict[str, Any]:
+        log.debug(
+            "tinybird.local.delete",
+            datasource=datasource,
+            delete_condition=delete_condition,
+        )
+        try:
+            condition, _ = _translate(delete_condition)
+        except ValueError as e:
+            raise TinybirdRequestError(
+                str(e), status_code=400, endpoint=datasource
+            ) from e
+        try:
+            deleted = await asyncio.to_thread(self._delete_rows, datasource, condition)
+        except duckdb.Error as e:
+            raise TinybirdRequestError(
+                str(e), status_code=400, endpoint=datasource
+            ) from e
+        # Deletions are synchronous: the job is already done
+        job_id = str(uuid.uuid4())
+        return {"id": job_id, "job_id": job_id, "status": "done", "rows": deleted}
+
+    async def get_job(self, job_id: str) -> dict[str, Any]:
+        return {"id": job_id, "job_id": job_id, "status": "done"}
+
+
+__all__ = ["LocalTinybirdClient"]
@@ -1,9 +1,8 @@
 import json
 import math
-from collections.abc import Iterator, Mapping, Sequence
-from dataclasses import dataclass
-from datetime import UTC, date, datetime
-from functools import partial
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
 from typing import Any, Self
 from uuid import UUID
 
@@ -12,6 +11,7 @@ import sqlalchemy
 import structlog
 from clickhouse_connect.cc_sqlalchemy.dialect import ClickHouseDialect
 from clickhouse_connect.cc_sqlalchemy.sql.compiler import ChStatementCompiler
+from pydantic import TypeAdapter
 from sqlalchemy import (
     Column,
     ColumnClause,
@@ -34,14 +34,17 @@ from sqlalchemy.sql.util import ClauseAdapter
 
 from polar.event.repository import EventRepository
 from polar.kit.db.postgres import AsyncReadSession
+from polar.kit.utils import utc_now
 from polar.logging import Logger
 from polar.meter.aggregation import Aggregation, PropertyAggregation
 from polar.meter.filter import Filter, FilterClause, FilterConjunction, FilterOperator
 from polar.models import Event
 from polar.models.event import EventSource
-from polar.worker import MAX_JOB_PAYLOAD_BYTES
+from polar.redis import Redis
 
-from .client import client
+from .cache import TinybirdQueryCache, record_ingestions
+from .client import MAX_PAYLOAD_BYTES, TinybirdPayloadTooLargeError, client
+from .encoder import encode_events, event_to_tinybird
 from .schemas import TinybirdEvent
 
 log: Logger = structlog.get_logger()
@@ -217,109 +220,16 @@ class TinybirdVarianceStat:
     p99: dict[str, float]
 
 
-def _pop_system_metadata(m: dict[str, Any], is_system: bool, key: str) -> Any:
-    v = m.pop(key, None) if is_system else None
-    if isinstance(v, float) and v.is_integer():
-        return int(v)
-    return v
-
-
-def _truncate_datetime_to_millis(dt_str: str | None) -> str | None:
-    if dt_str is None:
-        return None
-    try:
-        dt = datetime.fromisoformat(dt_str)
-        return dt.isoformat(timespec="milliseconds")
-    except ValueError, TypeError:
-        return dt_str
+_TIMESERIES_STATS_ADAPTER = TypeAdapter(list[TinybirdTimeseriesStats])
+_PROPERTY_GROUP_STATS_ADAPTER = TypeAdapter(list[TinybirdPropertyGroupStats])
+_CUSTOMER_STATS_ADAPTER = TypeAdapter(list[TinybirdCustomerStat])
+_VARIANCE_STATS_ADAPTER = TypeAdapter(list[TinybirdVarianceStat])
 
 
 def _event_to_tinybird(
     event: Event, ancestors: Sequence[str] | None = None
 ) -> TinybirdEvent:
-    m = dict(event.user_metadata or {})
-    cost = m.pop("_cost", None) or {}
-    llm = m.pop("_llm", None) or {}
-
-    is_system = event.source == EventSource.system
-    pop = partial(_pop_system_metadata, m, is_system)
-
-    return TinybirdEvent(
-        id=str(event.id),
-        ingested_at=event.ingested_at.isoformat(),
-        timestamp=event.timestamp.isoformat(),
-        name=event.name,
-        source=event.source,
-        organization_id=str(event.organization_id),
-        customer_id=str(event.customer_id) if event.customer_id else None,
-        external_customer_id=event.external_customer_id,
-        member_id=str(event.member_id) if event.member_id else None,
-        external_member_id=event.external_member_id,
-        external_id=event.external_id,
-        parent_id=str(event.parent_id) if event.parent_id else None,
-        root_id=str(event.root_id) if event.root_id else None,
-        event_type_id=str(event.event_type_id) if event.event_type_id else None,
-        meter_id=pop("meter_id"),
-        units=pop("units"),
-        rollover=pop("rollover"),
-        product_id=pop("product_id"),
-        subscription_id=pop("subscription_id"),
-        order_id=pop("order_id"),
-        order_created_at=_truncate_datetime_to_millis(pop("order_created_at")),
-        benefit_id=pop("benefit_id"),
-        benefit_grant_id=pop("benefit_grant_id"),
-        checkout_id=pop("checkout_id"),
-        transaction_id=pop("transaction_id"),
-        refund_id=pop("refund_id"),
-        dispute_id=pop("dispute_id"),
-        discount_id=pop("discount_id"),
-        amount=pop("amount"),
-        currency=pop("currency"),
-        net_amount=pop("net_amount"),
-        tax_amount=pop("tax_amount"),
-        discount_amount=pop("discount_amount"),
-        applied_balance_amount=pop("applied_balance_amount"),
-        platform_fee=pop("platform_fee"),
-        fee=pop("fee"),
-        exchange_rate=pop("exchange_rate"),
-        refunded_amount=pop("refunded_amount"),
-        refundable_amount=pop("refundable_amount"),
-        presentment_amount=pop("presentment_amount"),
-        presentment_currency=pop("presentment_currency"),
-        recurring_interval=pop("recurring_interval"),
-        recurring_interval_count=pop("recurring_interval_count"),
-        old_product_id=pop("old_product_id"),
-        new_product_id=pop("new_product_id"),
-        old_seats=pop("old_seats"),
-        new_seats=pop("new_seats"),
-        started_at=pop("started_at"),
-        canceled_at=pop("canceled_at"),
-        ends_at=pop("ends_at"),
-        old_period_end=pop("old_period_end"),
-        new_period_end=pop("new_period_end"),
-        cancel_at_period_end=pop("cancel_at_period_end"),
-        customer_cancellation_reason=pop("customer_cancellation_reason"),
-        customer_cancellation_comment=pop("customer_cancellation_comment"),
-        proration_behavior=pop("proration_behavior"),
-        trial_end=pop("trial_end"),
-        seats=pop("seats"),
-        billing_period_end=pop("billing_period_end"),
-        benefit_type=pop("benefit_type"),
-        billing_type=pop("billing_type"),
-        checkout_status=pop("checkout_status"),
-        customer_email=pop("customer_email"),
-        customer_name=pop("customer_name"),
-        tax_state=pop("tax_state"),
-        tax_country=pop("tax_country"),
-        cost_amount=cost.get("amount"),
-        cost_currency=cost.get("currency"),
-        llm_vendor=llm.get("vendor"),
-        llm_model=llm.get("model"),
-        llm_input_tokens=llm.get("input_tokens"),
-        llm_output_tokens=llm.get("output_tokens"),
-        user_metadata=json.dumps(m) if m else "{}",
-        ancestors=list(ancestors) if ancestors else [],
-    )
+    return event_to_tinybird(event, ancestors)
 
 
 def events_to_tinybird(
@@ -329,101 +239,247 @@ def events_to_tinybird(
     return [_event_to_tinybird(e, (ancestors_by_event or {}).get(e.id)) for e in events]
 
 
-def chunk_tinybird_events(
-    events: Sequence[TinybirdEvent],
-) -> Iterator[list[TinybirdEvent]]:
-    """Split events into groups that each fit in a single job payload."""
-    chunk: list[TinybirdEvent] = []
-    chunk_bytes = 0
-    for event in events:
-        event_bytes = len(json.dumps(event).encode("utf-8"))
-        if chunk and chunk_bytes + event_bytes > MAX_JOB_PAYLOAD_BYTES:
-            yield chunk
-            chunk = []
-            chunk_bytes = 0
-        chunk.append(event)
-        chunk_bytes += event_bytes
-    if chunk:
-        yield chunk
+async def ingest_batch(events: str | list[TinybirdEvent], *, wait: bool = True) -> None:
+    """
+    Ingest a batch of events, as a NDJSON chunk or rows.
+
+    Batches too large for Tinybird are split in halves, and events too large on
+    their own are dropped.
+    """
+    if not events:
+        return
+
+    try:
+        if isinstance(events, str):
+            await client.ingest_ndjson(DATASOURCE_EVENTS, events, wait=wait)
+        else:
+            await client.ingest(DATASOURCE_EVENTS, events, wait=wait)
+    except TinybirdPayloadTooLargeError as error:
+        halves = _split_in_halves(events)
+        if halves is None:
+            log.error(
+                "tinybird.ingest.event_too_large",
+                event_id=_get_event_id(events),
+                payload_bytes=error.size,
+                max_payload_bytes=error.max_size,
+            )
+            return
+
+        for half in halves:
+            await ingest_batch(half, wait=wait)
+
+
+def _split_in_halves(
+    events: str | list[TinybirdEvent],
+) -> list[str] | list[list[TinybirdEvent]] | None:
+    if isinstance(events, str):
+        lines = events.split("\n")
+        if len(lines) <= 1:
+            return None
+        midpoint = len(lines) // 2
+        return ["\n".join(lines[:midpoint]), "\n".join(lines[midpoint:])]
+
+    if len(events) <= 1:
+        return None
+    midpoint = len(events) // 2
+    return [events[:midpoint], events[midpoint:]]
+
+
+def _get_event_id(events: str | list[TinybirdEvent]) -> str | None:
+    if isinstance(events, str):
+        return json.loads(events).get("id")
+    return events[0].get("id")
 
 
 async def ingest_events(
     events: Sequence[Event],
     ancestors_by_event: Mapping[UUID, Sequence[str]] | None = None,
+    *,
+    redis: Redis,
+    wait: bool = True,
 ) -> None:
-    if not events:
-        return
-
-    tinybird_events = events_to_tinybird(events, ancestors_by_event)
-    await client.ingest(DATASOURCE_EVENTS, tinybird_events)
+    """
+    Ingest events in Tinybird, and record their ingestion, so the cached query
+    results of their organizations are invalidated.
+    """
+    for chunk in encode_events(
+        events, ancestors_by_event, max_chunk_bytes=MAX_PAYLOAD_BYTES
+    ):
+        await ingest_batch(chunk.ndjson, wait=wait)
+        await record_ingestions(redis, chunk.organizations, now=utc_now())
 
 
+RECONCILE_BUCKET_MILLISECONDS = 60_000
+RECONCILE_MIN_BUCKET_MILLISECONDS = 60
+RECONCILE_SPLIT_FACTOR = 10
+RECONCILE_LEAF_SIZE = 1000
 RECONCILE_BATCH_SIZE = 1000
 
+# Digests of the events in Tinybird, in the same shape as
+# `EventRepository.get_ingestion_digests`. Events may be ingested more than once,
+# hence the deduplication.
+_RECONCILE_DIGESTS_SQL = (
+    "SELECT intDiv(toUnixTimestamp64Milli(ingested_at), {bucket:Int64}) AS bucket, "
+    "count() AS count, "
+    "sum(reinterpretAsUInt32(reverse(unhex(substring(toString(id), 29, 8))))) AS hash "
+    "FROM (SELECT DISTINCT id, ingested_at FROM events_by_ingested_at "
+    "WHERE ingested_at >= {start:DateTime64(3)} AND ingested_at < {end:DateTime64(3)}) "
+    "GROUP BY bucket"
+)
+
+# Tinybird stores `ingested_at` with a millisecond precision: widen the range
+# so events on the edges are found.
+_RECONCILE_IDS_MARGIN = timedelta(seconds=1)
+_RECONCILE_IDS_SQL = (
+    "SELECT DISTINCT toString(id) AS id FROM events_by_ingested_at "
+    "WHERE ingested_at >= {start:DateTime64(3)} AND ingested_at < {end:DateTime64(3)} "
+    "AND id IN {ids:Array(UUID)}"
+)
 
-async def reconcile_events(
-    session: AsyncReadSession,
-    start: datetime,
-    end: datetime,
-    *,
-    dry_run: bool = False,
-) -> tuple[int, int, list[str]]:
-    tb_sql = (
-        "SELECT DISTINCT toString(id) AS id "
-        "FROM events_by_ingested_at "
-        "WHERE ingested_at >= {start:DateTime64(3)} "
-        "AND ingested_at < {end:DateTime64(3)}"
+
+async def _get_tinybird_digests(
+    start: datetime, end: datetime, bucket_milliseconds: int
+) -> dict[int, tuple[int, int]]:
+    rows = await client.query(
+        _RECONCILE_DIGESTS_SQL,
+        parameters={"start": start, "end": end, "bucket": bucket_milliseconds},
+        db_statement=_RECONCILE_DIGESTS_SQL,
     )
-    tb_rows = await client.query(
-        tb_sql,
-        parameters={"start": start, "end": end},
-        db_statement="SELECT DISTINCT toString(id) FROM events_by_ingested_at WHERE ingested_at >= {start} AND ingested_at < {end}",
+    return {int(row["bucket"]): (int(row["count"]), int(row["hash"])) for row in rows}
+
+
+async def _get_tinybird_ids(
+    start: datetime, end: datetime, ids: Sequence[UUID]
+) -> set[UUID]:
+    rows = await client.query(
+        _RECONCILE_IDS_SQL,
+        parameters={
+            "start": start - _RECONCILE_IDS_MARGIN,
+            "end": end + _RECONCILE_IDS_MARGIN,
+            "ids": [str(id) for id in ids],
+        },
+        db_statement=_RECONCILE_IDS_SQL,
     )
-    tb_ids = {row["id"] for row in tb_rows}
+    return {UUID(row["id"]) for row in rows}
 
-    repository = EventRepository.from_session(session)
-    base_statement = (
-        repository.get_base_statement()
-        .where(Event.ingested_at >= start, Event.ingested_at < end)
-        .order_by(Event.ingested_at, Event.id)
-    )
 
-    total_checked = 0
-    total_missing = 0
-    missing_ids: list[str] = []
-    offset = 0
+@dataclass
+class _Reconciliation:
+    repository: EventRepository
+    redis: Redis
+    dry_run: bool
+    missing_ids: list[str] = field(default_factory=list)
+
+    async def reconcile_range(
+        self, start: datetime, end: datetime, bucket_milliseconds: int
+    ) -> int:
+        """
+        Compare the digests of both sides, and drill down into mismatching buckets.
+
+        Returns:
+            The number of events in Postgres in the range.
+        """
+        digests = await self.repository.get_ingestion_digests(
+            start, end, bucket_milliseconds
+        )
+        tinybird_digests = await _get_tinybird_digests(start, end, bucket_milliseconds)
+
+        for bucket, digest in sorted(digests.items()):
+            if tinybird_digests.get(bucket) == digest:
+                continue
 
-    while True:
-        statement = base_statement.offset(offset).limit(RECONCILE_BATCH_SIZE)
-        batch = await repository.get_all(statement)
+            bucket_start = max(
+                start,
+                datetime.fromtimestamp(bucket * bucket_milliseconds / 1000, tz=UTC),
+            )
+            bucket_end = min(
+                end,
+                datetime.fromtimestamp(
+                    (bucket + 1) * bucket_milliseconds / 1000, tz=UTC
+                ),
+            )
+            count, _ = digest
+            if (
+                count <= RECONCILE_LEAF_SIZE
+                or bucket_milliseconds <= RECONCILE_MIN_BUCKET_MILLISECONDS
+            ):
+                await self.reconcile_leaf(bucket_start, bucket_end)
+            else:
+                await self.reconcile_range(
+                    bucket_start,
+                    bucket_end,
+                    bucket_milliseconds // RECONCILE_SPLIT_FACTOR,
+                )
 
-        if not batch:
-            break
+        return sum(count for count, _ in digests.values())
+
+    async def reconcile_leaf(self, start: datetime, end: datetime) -> None:
+        """Compare the IDs of both sides, and ingest the missing events."""
+        after: tuple[datetime, UUID] | None = None
+        while True:
+            page = await self.repository.get_ingested_ids(
+                start, end, after=after, limit=RECONCILE_BATCH_SIZE
+            )
+            if not page:
+                break
+
+            ids = [id for _, id in page]
+            tinybird_ids = await _get_tinybird_ids(start, end, ids)
+            missing = [id for id in ids if id not in tinybird_ids]
+            if missing:
+                self.missing_ids.extend(str(id) for id in missing)
+                if not self.dry_run:
+                    await self._ingest(missing)
+
+            if len(page) < RECONCILE_BATCH_SIZE:
+                break
+            after = page[-1]
+
+    async def _ingest(self, ids: Sequence[UUID]) -> None:
+        events = await self.repository.get_all(
+            self.repository.get_base_statement().where(Event.id.in_(ids))
+        )
+        ancestors_by_event = await self.repository.get_ancestors_batch(ids)
+        await ingest_events(events, ancestors_by_event, redis=self.redis)
 
-        total_checked += len(batch)
-        missing = [e for e in batch if str(e.id) not in tb_ids]
-        total_missing += len(missing)
 
-        if missing:
-            missing_ids.extend(str(e.id) for e in missing)
-            if not dry_run:
-                await ingest_events(missing)
+async def reconcile_events(
+    session: AsyncReadSession,
+    redis: Redis,
+    start: datetime,
+    end: datetime,
+    *,
+    dry_run: bool = False,
+) -> tuple[int, int, list[str]]:
+    """
+    Ingest the events of a time range missing from Tinybird.
 
-        if len(batch) < RECONCILE_BATCH_SIZE:
-            break
+    Both sides are summarized in per-minute buckets of `(count, sum of ID hashes)`.
+    Only mismatching buckets are drilled into, first with finer buckets, then by
+    comparing the IDs of their events. Events in Tinybird but not in Postgres are
+    left untouched.
 
-        offset += RECONCILE_BATCH_SIZE
+    Returns:
+        The number of events checked, the number of missing events, and their IDs.
+    """
+    reconciliation = _Reconciliation(
+        EventRepository.from_session(session), redis, dry_run=dry_run
+    )
+    total_checked = await reconciliation.reconcile_range(
+        start, end, RECONCILE_BUCKET_MILLISECONDS
+    )
+    missing_ids = reconciliation.missing_ids
 
     logfire.info(
         "tinybird.reconciliation",
-        missing_count=total_missing,
+        missing_count=len(missing_ids),
         total_checked=total_checked,
         start=start.isoformat(),
         end=end.isoformat(),
         dry_run=dry_run,
     )
 
-    return total_checked, total_missing, missing_ids
+    return total_checked, len(missing_ids), missing_ids
 
 
 def _format_ingested_at(dt: datetime) -> str:
@@ -555,10 +611,17 @@ class TinybirdEventsQuery:
     parent_id, root_events, and source.
     """
 
-    def __init__(self, organization_ids: Sequence[UUID]) -> None:
+    def __init__(
+        self,
+        organization_ids: Sequence[UUID],
+        *,
+        cache: TinybirdQueryCache | None = None,
+    ) -> None:
         self._organization_ids = [str(org_id) for org_id in organization_ids]
         self._filters: list[Any] = []
         self._order_by_clauses: list[Any] = []
+        self._cache = cache
+        self._end_timestamp: datetime | None = None
 
     def _get_organization_filter(self) -> Any:
         if not self._organization_ids:
@@ -631,6 +694,8 @@ class TinybirdEventsQuery:
             self._filters.append(
                 events_table.c.timestamp < end.astimezone(UTC).replace(tzinfo=None)
             )
+            if self._end_timestamp is None or end < self._end_timestamp:
+                self._end_timestamp = end
         return self
 
     def filter_names(self, names: Sequence[str]) -> Self:
@@ -797,6 +862,36 @@ class TinybirdEventsQuery:
         self._order_by_clauses.append(col.desc() if descending else col.asc())
         return self
 
+    async def _cached_query[T](
+        self,
+        statement: Select[Any],
+        adapter: TypeAdapter[list[T]],
+        parse: Callable[[list[dict[str, Any]]], list[T]],
+    ) -> list[T]:
+        sql, params = _compile(statement)
+
+        cache = self._cache
+        cache_key: tuple[str, int] | None = None
+        if cache is not None:
+            cache_key = await cache.get_key(
+                sql,
+                params,
+                organization_ids=self._organization_ids,
+                end=self._end_timestamp,
+            )
+        if cache is not None and cache_key is not None:
+            cached = await cache.get(cache_key[0], adapter)
+            if cached is not None:
+                return cached
+
+        rows = await client.query(sql, parameters=params, db_statement=sql)
+        results = parse(rows)
+
+        if cache is not None and cache_key is not None:
+            key, ttl = cache_key
+            await cache.set(key, ttl, adapter, results)
+        return results
+
     async def get_event_type_stats(self) -> list[TinybirdEventTypeStats]:
         base_filter = self._get_organization_filter()
         statement = (
@@ -1054,27 +1149,29 @@ class TinybirdEventsQuery:
             .order_by(bucket, per_root.c.organization_id, per_root.c.root_name)
         )
 
-        sql, params = _compile(statement)
-        rows = await client.query(sql, parameters=params, db_statement=sql)
-
-        results = []
-        for row in rows:
-            totals, averages, p10, p90, p99 = self._parse_agg_row(row, aggregate_fields)
-            results.append(
-                TinybirdTimeseriesStats(
-                    organization_id=row["organization_id"],
-                    name=row["name"],
-                    bucket=_parse_datetime(row["bucket"]),
-                    occurrences=row["occurrences"],
-                    customers=row["customers"],
-                    totals=totals,
-                    averages=averages,
-                    p10=p10,
-                    p90=p90,
-                    p99=p99,
+        def parse(rows: list[dict[str, Any]]) -> list[TinybirdTimeseriesStats]:
+            results = []
+            for row in rows:
+                totals, averages, p10, p90, p99 = self._parse_agg_row(
+                    row, aggregate_fields
                 )
-            )
-        return results
+                results.append(
+                    TinybirdTimeseriesStats(
+                        organization_id=str(row["organization_id"]),
+                        name=row["name"],
+                        bucket=_parse_datetime(row["bucket"]),
+                        occurrences=row["occurrences"],
+                        customers=row["customers"],
+                        totals=totals,
+                        averages=averages,
+                        p10=p10,
+                        p90=p90,
+                        p99=p99,
+                    )
+                )
+            return results
+
+        return await self._cached_query(statement, _TIMESERIES_STATS_ADAPTER, parse)
 
     async def get_totals_stats(
         self,
@@ -1098,27 +1195,29 @@ class TinybirdEventsQuery:
             .group_by(per_root.c.organization_id, per_root.c.root_name)
         )
 
-        sql, params = _compile(statement)
-        rows = await client.query(sql, parameters=params, db_statement=sql)
-
-        results = []
-        for row in rows:
-            totals, averages, p10, p90, p99 = self._parse_agg_row(row, aggregate_fields)
-            results.append(
-                TinybirdTimeseriesStats(
-                    organization_id=row["organization_id"],
-                    name=row["name"],
-                    bucket=datetime.min.replace(tzinfo=UTC),
-                    occurrences=row["occurrences"],
-                    customers=row["customers"],
-                    totals=totals,
-                    averages=averages,
-                    p10=p10,
-                    p90=p90,
-                    p99=p99,
+        def parse(rows: list[dict[str, Any]]) -> list[TinybirdTimeseriesStats]:
+            results = []
+            for row in rows:
+                totals, averages, p10, p90, p99 = self._parse_agg_row(
+                    row, aggregate_fields
                 )
-            )
-        return results
+                results.append(
+                    TinybirdTimeseriesStats(
+                        organization_id=str(row["organization_id"]),
+                        name=row["name"],
+                        bucket=datetime.min.replace(tzinfo=UTC),
+                        occurrences=row["occurrences"],
+                        customers=row["customers"],
+                        totals=totals,
+                        averages=averages,
+                        p10=p10,
+                        p90=p90,
+                        p99=p99,
+                    )
+                )
+            return results
+
+        return await self._cached_query(statement, _TIMESERIES_STATS_ADAPTER, parse)
 
     async def get_descendant_aggregates(
         self, aggregate_fields: Sequence[str]
@@ -1268,26 +1367,26 @@ class TinybirdEventsQuery:
 
         statement = statement.limit(limit)
 
-        sql, params = _compile(statement)
-        rows = await client.query(sql, parameters=params, db_statement=sql)
-
-        results = []
-        for row in rows:
-            totals = {
-                f.replace(".", "_"): float(
-                    row.get(f"{f.replace('.', '_')}_sum", 0) or 0
-                )
-                for f in aggregate_fields
-            }
-            results.append(
-                TinybirdPropertyGroupStats(
-                    value=str(row["value"]),
-                    occurrences=int(row.get("occurrences", 0) or 0),
-                    customers=int(row.get("customers", 0) or 0),
-                    totals=totals,
+        def parse(rows: list[dict[str, Any]]) -> list[TinybirdPropertyGroupStats]:
+            results = []
+            for row in rows:
+                totals = {
+                    f.replace(".", "_"): float(
+                        row.get(f"{f.replace('.', '_')}_sum", 0) or 0
+                    )
+                    for f in aggregate_fields
+                }
+                results.append(
+                    TinybirdPropertyGroupStats(
+                        value=str(row["value"]),
+                        occurrences=int(row.get("occurrences", 0) or 0),
+                        customers=int(row.get("customers", 0) or 0),
+                        totals=totals,
+                    )
                 )
-            )
-        return results
+            return results
+
+        return await self._cached_query(statement, _PROPERTY_GROUP_STATS_ADAPTER, parse)
 
     async def get_customer_stats(
         self,
@@ -1328,29 +1427,29 @@ class TinybirdEventsQuery:
             sqlalchemy.select(customer_sums, share_col).order_by(order_col).limit(limit)
         )
 
-        sql, params = _compile(statement)
-        rows = await client.query(sql, parameters=params, db_statement=sql)
-
-        results = []
-        for row in rows:
-            totals = {
-                field_path.replace(".", "_"): float(
-                    row.get(f"{field_path.replace('.', '_')}_sum", 0) or 0
-                )
-                for field_path in aggregate_fields
-            }
-            results.append(
-                TinybirdCustomerStat(
-                    customer_id=str(row["customer_id"])
-                    if row.get("customer_id")
-                    else None,
-                    external_customer_id=row.get("external_customer_id") or None,
-                    occurrences=int(row.get("occurrences", 0) or 0),
-                    totals=totals,
-                    share=_finite(row.get("share", 0)),
+        def parse(rows: list[dict[str, Any]]) -> list[TinybirdCustomerStat]:
+            results = []
+            for row in rows:
+                totals = {
+                    field_path.replace(".", "_"): float(
+                        row.get(f"{field_path.replace('.', '_')}_sum", 0) or 0
+                    )
+                    for field_path in aggregate_fields
+                }
+                results.append(
+                    TinybirdCustomerStat(
+                        customer_id=str(row["customer_id"])
+                        if row.get("customer_id")
+                        else None,
+                        external_customer_id=row.get("external_customer_id") or None,
+                        occurrences=int(row.get("occurrences", 0) or 0),
+                        totals=totals,
+                        share=_finite(row.get("share", 0)),
+                    )
                 )
-            )
-        return results
+            return results
+
+        return await self._cached_query(statement, _CUSTOMER_STATS_ADAPTER, parse)
 
     async def get_variance_events(
         self,
@@ -1418,34 +1517,34 @@ class TinybirdEventsQuery:
             .limit(limit)
         )
 
-        sql, params = _compile(statement)
-        rows = await client.query(sql, parameters=params, db_statement=sql)
-
-        results = []
-        for row in rows:
-            values: dict[str, float] = {}
-            averages: dict[str, float] = {}
-            p99: dict[str, float] = {}
-            for field_path in aggregate_fields:
-                fl = field_path.replace(".", "_")
-                values[fl] = float(row.get(f"{fl}_value", 0) or 0)
-                averages[fl] = float(row.get(f"{fl}_avg", 0) or 0)
-                p99[fl] = float(row.get(f"{fl}_p99", 0) or 0)
-            results.append(
-                TinybirdVarianceStat(
-                    event_id=str(row["event_id"]),
-                    name=str(row["name"]),
-                    customer_id=str(row["customer_id"])
-                    if row.get("customer_id")
-                    else None,
-                    external_customer_id=row.get("external_customer_id") or None,
-                    timestamp=_parse_datetime(row["timestamp"]),
-                    values=values,
-                    averages=averages,
-                    p99=p99,
+        def parse(rows: list[dict[str, Any]]) -> list[TinybirdVarianceStat]:
+            results = []
+            for row in rows:
+                values: dict[str, float] = {}
+                averages: dict[str, float] = {}
+                p99: dict[str, float] = {}
+                for field_path in aggregate_fields:
+                    fl = field_path.replace(".", "_")
+                    values[fl] = float(row.get(f"{fl}_value", 0) or 0)
+                    averages[fl] = float(row.get(f"{fl}_avg", 0) or 0)
+                    p99[fl] = float(row.get(f"{fl}_p99", 0) or 0)
+                results.append(
+                    TinybirdVarianceStat(
+                        event_id=str(row["event_id"]),
+                        name=str(row["name"]),
+                        customer_id=str(row["customer_id"])
+                        if row.get("customer_id")
+                        else None,
+                        external_customer_id=row.get("external_customer_id") or None,
+                        timestamp=_parse_datetime(row["timestamp"]),
+                        values=values,
+                        averages=averages,
+                        p99=p99,
+                    )
                 )
-            )
-        return results
+            return results
+
+        return await self._cached_query(statement, _VARIANCE_STATS_ADAPTER, parse)
 
 
 class TinybirdEventTypesQuery:
@@ -1,35 +1,32 @@
+from datetime import datetime, timedelta
+
 import structlog
 
+from polar.config import settings
+from polar.kit.utils import utc_now
+from polar.locker import Locker, TimeoutLockError
 from polar.logging import Logger
-from polar.worker import TaskQueue, actor
+from polar.redis import Redis
+from polar.worker import (
+    AsyncReadSessionMaker,
+    CronTrigger,
+    RedisMiddleware,
+    TaskPriority,
+    TaskQueue,
+    actor,
+    enqueue_job,
+)
 
-from .client import TinybirdPayloadTooLargeError, client
+from .cache import record_ingestions
 from .schemas import TinybirdEvent
-from .service import DATASOURCE_EVENTS
+from .service import ingest_batch, reconcile_events
 
 MAX_BATCH_EVENTS = 5000
 log: Logger = structlog.get_logger()
 
-
-async def _ingest_batch(events: list[TinybirdEvent]) -> None:
-    if not events:
-        return
-
-    try:
-        await client.ingest(DATASOURCE_EVENTS, events)
-    except TinybirdPayloadTooLargeError as error:
-        if len(events) <= 1:
-            log.error(
-                "tinybird.ingest.event_too_large",
-                event_id=events[0].get("id"),
-                payload_bytes=error.size,
-                max_payload_bytes=error.max_size,
-            )
-            return
-
-        midpoint = len(events) // 2
-        await _ingest_batch(events[:midpoint])
-        await _ingest_batch(events[midpoint:])
+RECONCILE_WATERMARK_KEY = "tinybird:reconcile:watermark"
+RECONCILE_LOCK_NAME = "tinybird:reconcile"
+RECONCILE_TIME_LIMIT_MS = 600_000
 
 
 @actor(
@@ -37,6 +34,99 @@ async def _ingest_batch(events: list[TinybirdEvent]) -> None:
     queue_name=TaskQueue.TINYBIRD,
     min_backoff=30_000,
 )
-async def ingest(events: list[TinybirdEvent]) -> None:
-    for index in range(0, len(events), MAX_BATCH_EVENTS):
-        await _ingest_batch(events[index : index + MAX_BATCH_EVENTS])
+async def ingest(
+    events: str | list[TinybirdEvent],
+    organizations: dict[str, list[str]] | None = None,
+) -> None:
+    """
+    Ingest events in Tinybird.
+
+    Args:
+        events: NDJSON chunk from `encode_events`, sized to fit in a job payload.
+        organizations: Oldest and newest event timestamps of the chunk by
+        organization, whose cached queries are invalidated once the events are
+        ingested.
+    """
+    if isinstance(events, str):
+        await ingest_batch(events)
+    else:
+        for index in range(0, len(events), MAX_BATCH_EVENTS):
+            await ingest_batch(events[index : index + MAX_BATCH_EVENTS])
+
+    if organizations:
+        await record_ingestions(
+            RedisMiddleware.get(),
+            {
+                organization_id: (
+                    datetime.fromisoformat(oldest),
+                    datetime.fromisoformat(newest),
+                )
+                for organization_id, (oldest, newest) in organizations.items()
+            },
+            now=utc_now(),
+        )
+
+
+async def get_reconcile_watermark(redis: Redis) -> datetime | None:
+    value = await redis.get(RECONCILE_WATERMARK_KEY)
+    if value is None:
+        return None
+    return datetime.fromisoformat(value.decode() if isinstance(value, bytes) else value)
+
+
+@actor(
+    actor_name="tinybird.reconcile",
+    priority=TaskPriority.LOW,
+    max_retries=0,
+    time_limit=RECONCILE_TIME_LIMIT_MS,
+    cron_trigger=CronTrigger.from_crontab("*/10 * * * *"),
+)
+async def reconcile() -> None:
+    """
+    Ingest the events missing from Tinybird, since the last reconciled time.
+
+    The watermark moves forward after each reconciled window. When it's behind
+    by more than a window, the task enqueues itself until it catches up.
+    """
+    redis = RedisMiddleware.get()
+    locker = Locker(redis)
+    try:
+        async with locker.lock(
+            RECONCILE_LOCK_NAME,
+            timeout=RECONCILE_TIME_LIMIT_MS / 1000,
+            blocking_timeout=0,
+        ):
+            # Events still being processed aren't expected in Tinybird yet
+            target = (
+                utc_now() - timedelta(seconds=settings.TINYBIRD_RECONCILE_LAG_SECONDS)
+            ).replace(second=0, microsecond=0)
+            max_window = timedelta(
+                seconds=settings.TINYBIRD_RECONCILE_MAX_WINDOW_SECONDS
+            )
+
+            start = await get_reconcile_watermark(redis)
+            if start is None:
+                start = target - max_window
+            if start >= target:
+                return
+            end = min(target, start + max_window)
+
+            async with AsyncReadSessionMaker() as session:
+                total_checked, total_missing, _ = await reconcile_events(
+                    session, redis, start, end
+                )
+
+            await redis.set(RECONCILE_WATERMARK_KEY, end.isoformat())
+            log.info(
+                "tinybird.reconcile.progressed",
+                start=start.isoformat(),
+                end=end.isoformat(),
+                total_checked=total_checked,
+                total_missing=total_missing,
+            )
+    except TimeoutLockError:
+        log.info("tinybird.reconcile.already_running")
+        return
+
+    if end < target:
+        enqueue_job("tinybird.reconcile")
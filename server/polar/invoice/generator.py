@@ -342,10 +342,29 @@ class InvoiceGenerator(FPDF):
     totals_table_row_height: ClassVar[int] = 6
     """Height of each row in the totals table in points."""
 
+    _available_font_files: ClassVar[dict[str, tuple[Path, Path]] | None] = None
+    """Font files found by the process, keyed by fpdf family name."""
+
     @classmethod
     def cjk_font_name_for_script(cls, script: str) -> str:
         return f"{cls.cjk_font_name_prefix}{script}"
 
+    @classmethod
+    def get_available_font_files(cls) -> dict[str, tuple[Path, Path]]:
+        """
+        Font files present on disk, looked up once per process.
+
+        CJK fonts are downloaded in the Dockerfile build stage and may be absent
+        in dev/CI, so families whose files aren't present are left out.
+        """
+        if cls._available_font_files is None:
+            cls._available_font_files = {
+                family: (regular, bold)
+                for family, (regular, bold) in cls.font_files.items()
+                if regular.exists() and bold.exists()
+            }
+        return cls._available_font_files
+
     @classmethod
     def has_cjk_fallback_fonts(cls) -> bool:
         return all(
@@ -386,13 +405,9 @@ class InvoiceGenerator(FPDF):
         super().__init__()
 
         # To use a font we first add the font to fpdf, and then we set the
-        # fallback order. Here we load all of the fonts. CJK fonts are
-        # downloaded in the Dockerfile build stage and may be absent in
-        # dev/CI, so skip any family whose files aren't present.
+        # fallback order. Here we load all of the available fonts.
         self.loaded_font_families: set[str] = set()
-        for family, (regular, bold) in self.font_files.items():
-            if not (regular.exists() and bold.exists()):
-                continue
+        for family, (regular, bold) in self.get_available_font_files().items():
             self.add_font(family, fname=regular)
             self.add_font(family, fname=bold, style="B")
             self.loaded_font_families.add(family)
@@ -1,11 +1,18 @@
+import asyncio
 import os
+import struct
 import sys
 import traceback
+from collections.abc import Mapping
 from pathlib import Path
+from typing import BinaryIO
 
 import anyio
 from pydantic import BaseModel
 
+from polar.config import settings
+from polar.kit.subprocess_pool import SubprocessPool, SubprocessPoolError
+
 from .generator import Invoice, InvoiceGenerator
 
 SERVER_DIRECTORY = Path(__file__).resolve().parents[2]
@@ -44,12 +51,55 @@ def build_invoice_renderer_env() -> dict[str, str]:
     }
 
 
+# Renderer processes exchange length-prefixed frames over their stdin/stdout.
+# A request is the JSON payload; a response starts with a status byte,
+# followed by either the PDF or the error traceback.
+REQUEST_HEADER = struct.Struct(">I")
+RESPONSE_HEADER = struct.Struct(">BI")
+RESPONSE_OK = 0
+RESPONSE_ERROR = 1
+
+
+class InvoiceRendererPool(SubprocessPool[bytes, tuple[int, bytes]]):
+    name = "invoice_renderer"
+
+    def get_command(self) -> list[str]:
+        return [sys.executable, "-m", "polar.invoice.render", "--serve"]
+
+    def get_cwd(self) -> Path:
+        return SERVER_DIRECTORY
+
+    def get_env(self) -> Mapping[str, str]:
+        return build_invoice_renderer_env()
+
+    async def write_request(self, stdin: asyncio.StreamWriter, request: bytes) -> None:
+        stdin.write(REQUEST_HEADER.pack(len(request)))
+        stdin.write(request)
+
+    async def read_response(self, stdout: asyncio.StreamReader) -> tuple[int, bytes]:
+        status, length = RESPONSE_HEADER.unpack(
+            await stdout.readexactly(RESPONSE_HEADER.size)
+        )
+        return status, await stdout.readexactly(length)
+
+
+renderer_pool = InvoiceRendererPool(
+    size=settings.INVOICE_RENDERER_POOL_SIZE,
+    max_requests_per_process=settings.INVOICE_RENDERER_MAX_RENDERS_PER_PROCESS,
+    timeout=settings.INVOICE_RENDERER_TIMEOUT,
+)
+
+
 async def render_invoice_pdf(
     invoice: Invoice, *, heading_title: str = "Invoice"
 ) -> bytes:
     payload = InvoiceRenderRequest(
         invoice=invoice, heading_title=heading_title
     ).model_dump_json()
+
+    if settings.INVOICE_RENDERER_POOL_SIZE > 0:
+        return await _render_pooled(payload)
+
     process = await anyio.run_process(
         [sys.executable, "-m", "polar.invoice.render"],
         input=payload.encode("utf-8"),
@@ -67,16 +117,66 @@ async def render_invoice_pdf(
     return process.stdout
 
 
+async def _render_pooled(payload: str) -> bytes:
+    try:
+        status, output = await renderer_pool.request(payload.encode("utf-8"))
+    except SubprocessPoolError as e:
+        raise InvoiceRenderError(f"Invoice renderer failed: {e}") from e
+    if status != RESPONSE_OK:
+        error = output.decode("utf-8").strip() or "unknown invoice renderer error"
+        raise InvoiceRenderError(f"Invoice renderer failed: {error}")
+    return output
+
+
+def _render(payload: bytes) -> bytearray:
+    request = InvoiceRenderRequest.model_validate_json(payload)
+    generator = InvoiceGenerator(request.invoice, heading_title=request.heading_title)
+    generator.generate()
+    output = generator.output()
+    assert isinstance(output, bytearray)
+    return output
+
+
+def _warm_up() -> None:
+    # Look up the font files once for the process lifetime,
+    # so the first render isn't slower than the next ones.
+    InvoiceGenerator.get_available_font_files()
+
+
+def serve() -> int:
+    """Render invoices until stdin is closed, one frame at a time."""
+    # Keep stdout for the protocol only: anything a library prints
+    # would corrupt the frames, send it to stderr instead.
+    output: BinaryIO = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    input = sys.stdin.buffer
+
+    _warm_up()
+    while True:
+        header = input.read(REQUEST_HEADER.size)
+        if len(header) < REQUEST_HEADER.size:
+            return 0
+        (length,) = REQUEST_HEADER.unpack(header)
+        payload = input.read(length)
+
+        status = RESPONSE_OK
+        try:
+            response = bytes(_render(payload))
+        except Exception:
+            status = RESPONSE_ERROR
+            response = traceback.format_exc().encode("utf-8")
+
+        output.write(RESPONSE_HEADER.pack(status, len(response)))
+        output.write(response)
+        output.flush()
+
+
 def main() -> int:
+    if "--serve" in sys.argv[1:]:
+        return serve()
+
     try:
-        payload = InvoiceRenderRequest.model_validate_json(sys.stdin.buffer.read())
-        generator = InvoiceGenerator(
-            payload.invoice, heading_title=payload.heading_title
-        )
-        generator.generate()
-        output = generator.output()
-        assert isinstance(output, bytearray)
-        sys.stdout.buffer.write(output)
+        sys.stdout.buffer.write(_render(sys.stdin.buffer.read()))
     except Exception:
         traceback.print_exc(file=sys.stderr)
         return 1
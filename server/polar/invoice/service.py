@@ -5,7 +5,7 @@ from datetime import datetime
 
 from polar.config import settings
 from polar.exceptions import PolarError
-from polar.integrations.aws.s3 import S3Service
+from polar.integrations.aws.s3 import S3Service, presigned_url_cache
 from polar.kit.utils import utc_now
 from polar.models import Account, Order, Payout
 from polar.models.transaction import PlatformFeeType
@@ -73,7 +73,10 @@ class InvoiceService:
     async def get_order_invoice_url(self, order: Order) -> tuple[str, datetime]:
         invoice_path = order.invoice_path
         assert invoice_path is not None
-        s3 = S3Service(settings.S3_CUSTOMER_INVOICES_BUCKET_NAME)
+        s3 = S3Service(
+            settings.S3_CUSTOMER_INVOICES_BUCKET_NAME,
+            presign_cache=presigned_url_cache,
+        )
         return s3.generate_presigned_download_url(
             path=invoice_path,
             filename=order.invoice_filename,
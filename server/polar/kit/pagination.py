@@ -1,16 +1,38 @@
+import base64
+import binascii
+import json
 import math
+import uuid
 from collections.abc import Sequence
+from datetime import date, datetime
+from decimal import Decimal
+from enum import StrEnum
 from typing import Annotated, Any, NamedTuple, Self, overload
 
 from fastapi import Depends, Query
-from pydantic import BaseModel, GetCoreSchemaHandler
+from pydantic import BaseModel, Field, GetCoreSchemaHandler
 from pydantic._internal._repr import display_as_type
 from pydantic_core import CoreSchema
-from sqlalchemy import Select, func, literal, select
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    and_,
+    asc,
+    desc,
+    false,
+    func,
+    literal,
+    or_,
+    select,
+)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import ClauseElement, Executable
 from sqlalchemy.sql._typing import _ColumnsClauseArgument
+from sqlalchemy.sql.compiler import SQLCompiler
 from sqlalchemy.sql.selectable import Subquery
 
 from polar.config import settings
+from polar.exceptions import PolarRequestValidationError
 from polar.kit.db.models import RecordModel
 from polar.kit.db.models.base import Model
 from polar.kit.db.postgres import AsyncReadSession
@@ -33,6 +55,81 @@ def count_subquery(statement: Select[Any]) -> Subquery:
     return statement.with_only_columns(literal(1)).order_by(None).subquery()
 
 
+class CountStrategy(StrEnum):
+    exact = "exact"
+    """Always run a full `COUNT(*)`."""
+    estimated = "estimated"
+    """
+    Count exactly up to `API_PAGINATION_EXACT_COUNT_THRESHOLD` rows,
+    and fall back to the query planner's estimate above it.
+    """
+
+
+class TotalCount(NamedTuple):
+    count: int
+    estimated: bool = False
+    """Whether the count is the query planner's estimate."""
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select[Any]) -> None:
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler: SQLCompiler, **kw: Any) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+async def _get_planner_estimate(
+    session: AsyncReadSession, statement: Select[Any]
+) -> int:
+    explain = _Explain(statement.with_only_columns(literal(1)).order_by(None))
+    result = await session.execute(explain)
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count(
+    session: AsyncReadSession,
+    statement: Select[Any],
+    *,
+    strategy: CountStrategy = CountStrategy.exact,
+    threshold: int | None = None,
+) -> TotalCount:
+    """
+    Count the rows returned by the statement.
+
+    With the `estimated` strategy, the exact count is bounded by `threshold`,
+    so it stays cheap on large tables. When the bound is reached, the planner's
+    estimate is returned instead, flagged as `estimated`.
+    """
+    if strategy == CountStrategy.exact:
+        count_statement = select(func.count()).select_from(count_subquery(statement))
+        result = await session.execute(count_statement)
+        return TotalCount(result.scalar_one())
+
+    if threshold is None:
+        threshold = settings.API_PAGINATION_EXACT_COUNT_THRESHOLD
+
+    bounded_statement = select(func.count()).select_from(
+        count_subquery(statement.limit(threshold + 1))
+    )
+    result = await session.execute(bounded_statement)
+    bounded_count = result.scalar_one()
+    if bounded_count <= threshold:
+        return TotalCount(bounded_count)
+
+    # The planner may underestimate heavily filtered queries:
+    # never report less than what we know is there.
+    estimate = await _get_planner_estimate(session, statement)
+    return TotalCount(max(estimate, bounded_count), estimated=True)
+
+
 @overload
 async def paginate[RM: RecordModel](
     session: AsyncReadSession,
@@ -78,19 +175,17 @@ async def paginate(
         paginated = paginated.add_columns(count_clause)
         result = await session.execute(paginated)
         results: list[Any] = []
-        count = 0
+        total = 0
         for row in result.unique().all():
             (*queried_data, c) = row._tuple()
-            count = int(c)
+            total = int(c)
             if len(queried_data) == 1:
                 results.append(queried_data[0])
             else:
                 results.append(queried_data)
-        return results, count
+        return results, total
 
-    count_statement = select(func.count()).select_from(count_subquery(statement))
-    count_result = await session.execute(count_statement)
-    count = count_result.scalar_one()
+    total_count = await count(session, statement)
 
     paginated = statement.offset(offset).limit(limit)
     result = await session.execute(paginated)
@@ -102,7 +197,171 @@ async def paginate(
         else:
             results.append(queried_data)
 
-    return results, count
+    return results, total_count.count
+
+
+class CursorPaginationParams(NamedTuple):
+    cursor: str | None
+    limit: int
+
+
+def _encode_cursor_value(value: Any) -> Any:
+    match value:
+        case None | bool() | int() | float() | str():
+            return value
+        case datetime():
+            return {"datetime": value.isoformat()}
+        case date():
+            return {"date": value.isoformat()}
+        case uuid.UUID():
+            return {"uuid": str(value)}
+        case Decimal():
+            return {"decimal": str(value)}
+    raise TypeError(f"Unsupported cursor value type: {type(value)}")
+
+
+def _decode_cursor_value(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    ((kind, raw),) = value.items()
+    match kind:
+        case "datetime":
+            return datetime.fromisoformat(raw)
+        case "date":
+            return date.fromisoformat(raw)
+        case "uuid":
+            return uuid.UUID(raw)
+        case "decimal":
+            return Decimal(raw)
+    raise ValueError(f"Unknown cursor value type: {kind}")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sorting key of the last item of a page into an opaque cursor."""
+    payload = json.dumps(
+        [_encode_cursor_value(value) for value in values], separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(payload, list):
+            raise ValueError("Cursor payload is not a list")
+        return [_decode_cursor_value(value) for value in payload]
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise PolarRequestValidationError(
+            [
+                {
+                    "loc": ("query", "cursor"),
+                    "input": cursor,
+                    "msg": "Invalid cursor.",
+                    "type": "value_error",
+                }
+            ]
+        ) from e
+
+
+type KeysetKey = tuple[ColumnElement[Any], bool]
+"""A column of the sorting key, and whether it's sorted in descending order."""
+
+
+def _get_keyset_keys(
+    keys: Sequence[KeysetKey], tiebreaker: ColumnElement[Any]
+) -> list[KeysetKey]:
+    """Append the tiebreaker to the sorting key, so it's unique across rows."""
+    tiebreaker_desc = keys[-1][1] if keys else False
+    return [*keys, (tiebreaker, tiebreaker_desc)]
+
+
+def _get_keyset_clause(
+    keys: Sequence[KeysetKey], values: Sequence[Any]
+) -> ColumnElement[bool]:
+    """
+    Build the clause selecting the rows strictly after the given sorting key.
+
+    It follows PostgreSQL's default NULL ordering:
+    NULLs come last in ascending order and first in descending order.
+    """
+    clauses: list[ColumnElement[bool]] = []
+    equalities: list[ColumnElement[bool]] = []
+    for (column, is_desc), value in zip(keys, values, strict=True):
+        after: ColumnElement[bool]
+        if value is None:
+            after = column.is_not(None) if is_desc else false()
+            equal = column.is_(None)
+        else:
+            after = column < value if is_desc else or_(column > value, column.is_(None))
+            equal = column == value
+        clauses.append(and_(*equalities, after))
+        equalities.append(equal)
+    return or_(*clauses)
+
+
+async def paginate_keyset(
+    session: AsyncReadSession,
+    statement: Select[Any],
+    *,
+    pagination: CursorPaginationParams,
+    keys: Sequence[KeysetKey],
+    tiebreaker: ColumnElement[Any],
+) -> tuple[Sequence[Any], str | None]:
+    """
+    Paginate a statement using keyset pagination.
+
+    The statement is sorted by `keys`, replacing its ORDER BY clause, with
+    `tiebreaker` (usually the primary key) appended to make the key unique.
+    Contrary to `paginate`, the cost doesn't grow with the page depth and there
+    is no COUNT query.
+
+    Returns:
+        The items of the page and the cursor of the next page,
+        or `None` if it's the last one.
+    """
+    keys = _get_keyset_keys(keys, tiebreaker)
+
+    if pagination.cursor is not None:
+        values = decode_cursor(pagination.cursor)
+        if len(values) != len(keys):
+            raise PolarRequestValidationError(
+                [
+                    {
+                        "loc": ("query", "cursor"),
+                        "input": pagination.cursor,
+                        "msg": "Cursor doesn't match the sorting criteria.",
+                        "type": "value_error",
+                    }
+                ]
+            )
+        statement = statement.where(_get_keyset_clause(keys, values))
+
+    statement = (
+        statement.order_by(None)
+        .order_by(
+            *(desc(column) if is_desc else asc(column) for column, is_desc in keys)
+        )
+        .add_columns(*(column for column, _ in keys))
+        .limit(pagination.limit + 1)
+    )
+    result = await session.execute(statement)
+
+    results: list[Any] = []
+    row_keys: list[Sequence[Any]] = []
+    for row in result.unique().all():
+        row_tuple = row._tuple()
+        queried_data = row_tuple[: -len(keys)]
+        row_keys.append(row_tuple[-len(keys) :])
+        if len(queried_data) == 1:
+            results.append(queried_data[0])
+        else:
+            results.append(queried_data)
+
+    # We fetched one extra row to know if there is a next page
+    if len(results) <= pagination.limit:
+        return results, None
+
+    return results[: pagination.limit], encode_cursor(row_keys[pagination.limit - 1])
 
 
 async def get_pagination_params(
@@ -122,13 +381,50 @@ async def get_pagination_params(
 PaginationParamsQuery = Annotated[PaginationParams, Depends(get_pagination_params)]
 
 
+async def get_cursor_pagination_params(
+    pagination: PaginationParamsQuery,
+    cursor_pagination: bool = Query(
+        False,
+        description=(
+            "Use cursor-based pagination instead of offset pagination. "
+            "Faster for large datasets, but doesn't return the total count."
+        ),
+        include_in_schema=False,
+    ),
+    cursor: str | None = Query(
+        None,
+        description=(
+            "Cursor returned by the previous page, as `pagination.next_cursor`. "
+            "Implies cursor-based pagination."
+        ),
+        include_in_schema=False,
+    ),
+) -> CursorPaginationParams | None:
+    if not cursor_pagination and cursor is None:
+        return None
+    return CursorPaginationParams(cursor, pagination.limit)
+
+
+CursorPaginationParamsQuery = Annotated[
+    CursorPaginationParams | None, Depends(get_cursor_pagination_params)
+]
+
+
 class Pagination(Schema):
     total_count: int
     max_page: int
+    total_count_estimated: bool = Field(
+        default=False,
+        description=(
+            "Whether `total_count` and `max_page` are estimates. "
+            "This happens on large collections, where counting every row is too slow."
+        ),
+    )
 
 
 class CursorPagination(Schema):
     has_next_page: bool
+    next_cursor: str | None = None
 
 
 class ListResource[T: Any](BaseModel):
@@ -137,13 +433,19 @@ class ListResource[T: Any](BaseModel):
 
     @classmethod
     def from_paginated_results(
-        cls, items: Sequence[T], total_count: int, pagination_params: PaginationParams
+        cls,
+        items: Sequence[T],
+        total_count: int,
+        pagination_params: PaginationParams,
+        *,
+        total_count_estimated: bool = False,
     ) -> Self:
         return cls(
             items=list(items),
             pagination=Pagination(
                 total_count=total_count,
                 max_page=math.ceil(total_count / pagination_params.limit),
+                total_count_estimated=total_count_estimated,
             ),
         )
 
@@ -187,10 +489,13 @@ class ListResourceWithCursorPagination[T: Any](BaseModel):
         cls,
         items: Sequence[T],
         has_next_page: bool,
+        next_cursor: str | None = None,
     ) -> Self:
         return cls(
             items=list(items),
-            pagination=CursorPagination(has_next_page=has_next_page),
+            pagination=CursorPagination(
+                has_next_page=has_next_page, next_cursor=next_cursor
+            ),
         )
 
     @classmethod
@@ -1,9 +1,9 @@
 from collections.abc import AsyncGenerator, Sequence
 from datetime import datetime
 from enum import StrEnum
-from typing import Any, Literal, Protocol, Self, overload
+from typing import Any, Literal, Protocol, Self, cast, overload
 
-from sqlalchemy import Select, UnaryExpression, asc, desc, func, select
+from sqlalchemy import ColumnElement, Select, UnaryExpression, asc, desc, func, select
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm.attributes import flag_modified
 from sqlalchemy.sql.base import ExecutableOption
@@ -11,7 +11,14 @@ from sqlalchemy.sql.expression import ColumnExpressionArgument
 
 from polar.config import settings
 from polar.kit.db.postgres import AsyncReadSession, AsyncSession
-from polar.kit.pagination import count_subquery
+from polar.kit.pagination import (
+    CountStrategy,
+    CursorPaginationParams,
+    KeysetKey,
+    TotalCount,
+    count,
+    paginate_keyset,
+)
 from polar.kit.sorting import Sorting
 from polar.kit.utils import utc_now
 
@@ -106,17 +113,55 @@ class RepositoryBase[M: ModelIDProtocol[Any]]:
     async def paginate(
         self, statement: Select[tuple[M]], *, limit: int, page: int
     ) -> tuple[list[M], int]:
-        offset = (page - 1) * limit
+        total_count = await count(self.session, statement)
+        items = await self._get_page(statement, limit=limit, page=page)
+        return items, total_count.count
 
-        count_statement = select(func.count()).select_from(count_subquery(statement))
-        count_result = await self.session.execute(count_statement)
-        count = count_result.scalar_one()
+    async def paginate_estimated(
+        self, statement: Select[tuple[M]], *, limit: int, page: int
+    ) -> tuple[list[M], TotalCount]:
+        """
+        Like `paginate`, but with the `estimated` count strategy,
+        for collections too large to count every row.
+        """
+        total_count = await count(
+            self.session, statement, strategy=CountStrategy.estimated
+        )
+        items = await self._get_page(statement, limit=limit, page=page)
+        return items, total_count
 
+    async def _get_page(
+        self, statement: Select[tuple[M]], *, limit: int, page: int
+    ) -> list[M]:
+        offset = (page - 1) * limit
         paginated_statement = statement.limit(limit).offset(offset)
         # Streaming can't be applied here, since we need to call ORM's unique()
         results = await self.session.execute(paginated_statement)
-        items = list(results.unique().scalars().all())
-        return items, count
+        return list(results.unique().scalars().all())
+
+    async def paginate_keyset(
+        self,
+        statement: Select[tuple[M]],
+        *,
+        keys: Sequence[KeysetKey],
+        pagination: CursorPaginationParams,
+    ) -> tuple[list[M], str | None]:
+        """
+        Paginate the statement using keyset pagination on the sorting `keys`,
+        with the model's ID as tiebreaker.
+
+        Returns:
+            The items of the page and the cursor of the next page,
+            or `None` if it's the last one.
+        """
+        items, next_cursor = await paginate_keyset(
+            self.session,
+            statement,
+            pagination=pagination,
+            keys=keys,
+            tiebreaker=self.model.id,
+        )
+        return list(items), next_cursor
 
     def get_base_statement(self) -> Select[tuple[M]]:
         return select(self.model)
@@ -297,5 +342,12 @@ class RepositorySortingMixin[M, PE: StrEnum]:
             order_by_clauses.append(clause_function(self.get_sorting_clause(criterion)))
         return statement.order_by(*order_by_clauses)
 
+    def get_keyset_keys(self, sorting: Sequence[Sorting[PE]]) -> list[KeysetKey]:
+        """Sorting keys matching `apply_sorting`, to paginate with `paginate_keyset`."""
+        return [
+            (cast(ColumnElement[Any], self.get_sorting_clause(criterion)), is_desc)
+            for criterion, is_desc in sorting
+        ]
+
     def get_sorting_clause(self, property: PE) -> SortingClause:
         raise NotImplementedError()
@@ -0,0 +1,273 @@
+"""
+Pool of long-lived helper processes answering requests over their pipes.
+
+Some rendering work runs in a separate process, for isolation from the main
+process and its memory. Spawning a fresh interpreter per request is costly,
+so instead each process of the pool serves requests one at a time over its
+stdin/stdout, until it has served `max_requests_per_process` of them and is
+replaced by a fresh one, like `ProcessPoolExecutor(max_tasks_per_child=...)`.
+
+Subclasses define how to start the process and the wire protocol.
+"""
+
+import asyncio
+import contextlib
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+
+import structlog
+
+from polar.logging import Logger
+
+log: Logger = structlog.get_logger()
+
+DEFAULT_STREAM_LIMIT = 64 * 1024 * 1024
+"""Largest line `StreamReader.readline` accepts from a helper process."""
+
+
+class SubprocessPoolError(Exception):
+    """The helper process crashed, timed out or broke the protocol."""
+
+
+_PROCESS_ERRORS = (TimeoutError, OSError, asyncio.IncompleteReadError, ValueError)
+
+_pools: "weakref.WeakSet[SubprocessPool[Any, Any]]" = weakref.WeakSet()
+
+
+class _PooledProcess:
+    __slots__ = ("last_used_at", "process", "requests")
+
+    def __init__(self, process: asyncio.subprocess.Process) -> None:
+        self.process = process
+        self.requests = 0
+        self.last_used_at = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    @property
+    def stdin(self) -> asyncio.StreamWriter:
+        assert self.process.stdin is not None
+        return self.process.stdin
+
+    @property
+    def stdout(self) -> asyncio.StreamReader:
+        assert self.process.stdout is not None
+        return self.process.stdout
+
+    def kill(self) -> None:
+        if self.alive:
+            with contextlib.suppress(ProcessLookupError):
+                self.process.kill()
+
+
+class SubprocessPool[Req, Res](ABC):
+    name: str
+
+    def __init__(
+        self,
+        *,
+        size: int,
+        max_requests_per_process: int,
+        timeout: float,
+        health_check_interval: float | None = None,
+        stream_limit: int = DEFAULT_STREAM_LIMIT,
+    ) -> None:
+        self.size = size
+        self.max_requests_per_process = max_requests_per_process
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.stream_limit = stream_limit
+        self._idle: list[_PooledProcess] = []
+        self._processes: set[_PooledProcess] = set()
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        _pools.add(self)
+
+    @abstractmethod
+    def get_command(self) -> list[str]: ...
+
+    def get_cwd(self) -> Path | None:
+        return None
+
+    def get_env(self) -> Mapping[str, str] | None:
+        return None
+
+    @abstractmethod
+    async def write_request(self, stdin: asyncio.StreamWriter, request: Req) -> None:
+        """Send a request to the process. `stdin` is drained afterwards."""
+
+    @abstractmethod
+    async def read_response(self, stdout: asyncio.StreamReader) -> Res:
+        """
+        Read the response of the last request.
+
+        Errors reported by the process should be part of the response:
+        any exception raised here discards the process.
+        """
+
+    def check_response(self, request: Req, response: Res) -> None:
+        """
+        Check that the response answers the request.
+
+        Raising `ValueError` discards the process, as it's out of sync with us.
+        """
+
+    async def check_health(
+        self, stdin: asyncio.StreamWriter, stdout: asyncio.StreamReader
+    ) -> None:
+        """
+        Check that an idle process still answers, before handing it a request.
+
+        Called when the process has been idle for more than
+        `health_check_interval`. Raising discards the process.
+        """
+
+    async def request(self, request: Req) -> Res:
+        semaphore = self._get_semaphore()
+        async with semaphore:
+            pooled = await self._acquire()
+            try:
+                async with asyncio.timeout(self.timeout):
+                    await self.write_request(pooled.stdin, request)
+                    await pooled.stdin.drain()
+                    response = await self.read_response(pooled.stdout)
+                    self.check_response(request, response)
+            except _PROCESS_ERRORS as e:
+                await self._discard(pooled)
+                raise SubprocessPoolError(
+                    f"{self.name} process failed: {type(e).__name__} {e}"
+                ) from e
+            except BaseException:
+                # Cancelled mid-request: the stream is in an unknown state
+                pooled.kill()
+                self._processes.discard(pooled)
+                raise
+
+            pooled.requests += 1
+            pooled.last_used_at = time.monotonic()
+            if pooled.requests >= self.max_requests_per_process:
+                self._retire(pooled)
+            else:
+                self._idle.append(pooled)
+            return response
+
+    async def start(self) -> None:
+        """Spawn the processes ahead of the first request."""
+        self._get_semaphore()
+        while len(self._processes) < self.size:
+            self._idle.append(await self._spawn())
+
+    async def close(self) -> None:
+        processes = list(self._processes)
+        self._processes.clear()
+        self._idle = []
+        for pooled in processes:
+            pooled.kill()
+        await asyncio.gather(*(pooled.process.wait() for pooled in processes))
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Processes and their pipes are bound to the event loop they were
+        # created in: start over if we're called from another one.
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            for pooled in self._processes:
+                pooled.kill()
+            self._processes.clear()
+            self._idle = []
+            self._semaphore = asyncio.Semaphore(self.size)
+            self._loop = loop
+        return self._semaphore
+
+    async def _acquire(self) -> _PooledProcess:
+        while self._idle:
+            pooled = self._idle.pop()
+            if not pooled.alive:
+                log.warning(
+                    "subprocess_pool.process_died",
+                    pool=self.name,
+                    pid=pooled.process.pid,
+                    returncode=pooled.process.returncode,
+                )
+                await self._discard(pooled)
+                continue
+            if not await self._is_healthy(pooled):
+                await self._discard(pooled)
+                continue
+            return pooled
+        return await self._spawn()
+
+    async def _is_healthy(self, pooled: _PooledProcess) -> bool:
+        if (
+            self.health_check_interval is None
+            or time.monotonic() - pooled.last_used_at < self.health_check_interval
+        ):
+            return True
+        try:
+            async with asyncio.timeout(self.timeout):
+                await self.check_health(pooled.stdin, pooled.stdout)
+        except _PROCESS_ERRORS as e:
+            log.warning(
+                "subprocess_pool.health_check_failed",
+                pool=self.name,
+                pid=pooled.process.pid,
+                error=str(e),
+            )
+            return False
+        pooled.last_used_at = time.monotonic()
+        return True
+
+    async def _spawn(self) -> _PooledProcess:
+        process = await asyncio.create_subprocess_exec(
+            *self.get_command(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=self.get_cwd(),
+            env=self.get_env(),
+            limit=self.stream_limit,
+        )
+        pooled = _PooledProcess(process)
+        self._processes.add(pooled)
+        log.debug("subprocess_pool.process_spawned", pool=self.name, pid=process.pid)
+        return pooled
+
+    def _retire(self, pooled: _PooledProcess) -> None:
+        """Let the process exit on its own, by closing its input."""
+        self._processes.discard(pooled)
+        pooled.stdin.close()
+
+    async def _discard(self, pooled: _PooledProcess) -> None:
+        self._processes.discard(pooled)
+        with contextlib.suppress(ValueError):
+            self._idle.remove(pooled)
+        pooled.kill()
+        await pooled.process.wait()
+
+
+async def start_pools(*pools: SubprocessPool[Any, Any]) -> None:
+    """
+    Spawn the processes of the given pools ahead of their first request, in the
+    current event loop.
+
+    Other pools spawn their processes on demand. A pool failing to start is only
+    logged: it spawns its processes on demand too.
+    """
+    for pool in pools:
+        if pool.size <= 0:
+            continue
+        try:
+            await pool.start()
+        except OSError as e:
+            log.warning("subprocess_pool.start_failed", pool=pool.name, error=str(e))
+
+
+async def close_pools() -> None:
+    await asyncio.gather(*(pool.close() for pool in list(_pools)))
+
+
+__all__ = ["SubprocessPool", "SubprocessPoolError", "close_pools", "start_pools"]
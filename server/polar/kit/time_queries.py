@@ -1,6 +1,7 @@
-from datetime import UTC, date, datetime
+from datetime import UTC, date, datetime, timedelta
 from enum import StrEnum
 
+from dateutil.relativedelta import relativedelta
 from sqlalchemy import (
     CTE,
     Function,
@@ -28,6 +29,19 @@ class TimeInterval(StrEnum):
     ) -> Function[datetime]:
         return func.date_trunc(self.value, column)
 
+    def step(self) -> timedelta | relativedelta:
+        match self:
+            case TimeInterval.year:
+                return relativedelta(years=1)
+            case TimeInterval.month:
+                return relativedelta(months=1)
+            case TimeInterval.week:
+                return timedelta(weeks=1)
+            case TimeInterval.day:
+                return timedelta(days=1)
+            case TimeInterval.hour:
+                return timedelta(hours=1)
+
 
 def get_timestamp_series_cte(
     start_timestamp: datetime | SQLColumnExpression[datetime],
@@ -43,6 +57,26 @@ def get_timestamp_series_cte(
     )
 
 
+def get_timestamp_series(
+    start_timestamp: datetime, end_timestamp: datetime, interval: TimeInterval
+) -> list[datetime]:
+    """
+    Generate the timestamps between two bounds, both included, in UTC.
+
+    Equivalent to `get_timestamp_series_cte` on a UTC database session, without
+    the round trip: each step is added to the previous timestamp, so month ends
+    are clamped the same way.
+    """
+    step = interval.step()
+    timestamp = start_timestamp.astimezone(UTC)
+    end_timestamp = end_timestamp.astimezone(UTC)
+    timestamps: list[datetime] = []
+    while timestamp <= end_timestamp:
+        timestamps.append(timestamp)
+        timestamp = timestamp + step
+    return timestamps
+
+
 MIN_DATETIME = datetime(
     2023, 1, 1, tzinfo=UTC
 )  # Before that, Polar didn't even exist! 🚀
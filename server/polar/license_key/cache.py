@@ -0,0 +1,185 @@
+"""
+Redis state backing the license key validation hot path.
+
+Read-only validations are served from a short-lived snapshot of the license key,
+deleted whenever the license key or its activations change, and their `validations`/`last_validated_at` counters are accumulated in Redis
+instead of being written to the license key row on each request. They're
+flushed to the database periodically by `license_key.flush_validations`.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+import structlog
+from redis.exceptions import RedisError
+
+from polar.config import settings
+from polar.logging import Logger
+from polar.models import LicenseKey
+from polar.redis import Redis
+from polar.worker import invalidate_cache_keys
+
+from .schemas import LicenseKeyActivationBase, LicenseKeyRead
+
+log: Logger = structlog.get_logger()
+
+_CACHE_KEY_PREFIX = "license_key:validation:v1"
+PENDING_VALIDATIONS_KEY = "license_key:pending_validations"
+PENDING_LAST_VALIDATED_AT_KEY = "license_key:pending_last_validated_at"
+
+
+class CachedLicenseKeyActivation(LicenseKeyActivationBase):
+    conditions: dict[str, Any]
+
+
+class CachedLicenseKey(LicenseKeyRead):
+    activations: list[CachedLicenseKeyActivation]
+
+
+def build_cache_key(organization_id: UUID, key: str) -> str:
+    # Don't store license keys in clear in Redis
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return f"{_CACHE_KEY_PREFIX}:{organization_id}:{digest}"
+
+
+async def get_cached_license_key(
+    redis: Redis, organization_id: UUID, key: str
+) -> CachedLicenseKey | None:
+    try:
+        cached = await redis.get(build_cache_key(organization_id, key))
+    except RedisError as exc:
+        log.warning("license_key.cache.get_failed", error=str(exc))
+        return None
+    if cached is None:
+        return None
+    try:
+        return CachedLicenseKey.model_validate_json(cached)
+    except ValueError as exc:
+        log.warning("license_key.cache.deserialize_failed", error=str(exc))
+        return None
+
+
+async def set_cached_license_key(redis: Redis, license_key: LicenseKey) -> None:
+    """
+    Cache a snapshot of the license key.
+
+    The license key should be loaded with its customer and activations.
+    """
+    ttl = settings.LICENSE_KEY_VALIDATION_CACHE_TTL_SECONDS
+    if ttl <= 0:
+        return
+    snapshot = CachedLicenseKey.model_validate(license_key)
+    try:
+        await redis.set(
+            build_cache_key(license_key.organization_id, license_key.key),
+            snapshot.model_dump_json(),
+            ex=ttl,
+        )
+    except RedisError as exc:
+        log.warning("license_key.cache.set_failed", error=str(exc))
+
+
+async def invalidate_cached_license_key(
+    redis: Redis, organization_id: UUID, key: str
+) -> None:
+    try:
+        await redis.delete(build_cache_key(organization_id, key))
+    except RedisError as exc:
+        log.warning("license_key.cache.invalidate_failed", error=str(exc))
+
+
+def invalidate_cached_license_key_on_commit(organization_id: UUID, key: str) -> None:
+    """
+    Delete the snapshot of the license key once the unit of work is committed,
+    so a validation running meanwhile can't cache the previous state again.
+    """
+    invalidate_cache_keys(build_cache_key(organization_id, key))
+
+
+async def record_validation(
+    redis: Redis, license_key_id: UUID, validated_at: datetime
+) -> int:
+    """
+    Count a validation of the license key, to be flushed to the database later.
+
+    Returns:
+        The number of validations of this license key not flushed yet.
+    """
+    try:
+        async with redis.pipeline(transaction=False) as pipeline:
+            pipeline.hincrby(PENDING_VALIDATIONS_KEY, str(license_key_id), 1)
+            pipeline.hset(
+                PENDING_LAST_VALIDATED_AT_KEY,
+                str(license_key_id),
+                validated_at.isoformat(),
+            )
+            pending, _ = await pipeline.execute()
+    except RedisError as exc:
+        log.warning(
+            "license_key.record_validation_failed",
+            license_key_id=license_key_id,
+            error=str(exc),
+        )
+        return 0
+    return int(pending)
+
+
+async def pop_pending_validations(
+    redis: Redis,
+) -> dict[UUID, tuple[int, datetime]]:
+    """
+    Atomically take the validations counted since the last call.
+
+    Returns:
+        The number of validations and last validation time, by license key ID.
+    """
+    async with redis.pipeline(transaction=True) as pipeline:
+        pipeline.hgetall(PENDING_VALIDATIONS_KEY)
+        pipeline.hgetall(PENDING_LAST_VALIDATED_AT_KEY)
+        pipeline.delete(PENDING_VALIDATIONS_KEY, PENDING_LAST_VALIDATED_AT_KEY)
+        counts, timestamps, _ = await pipeline.execute()
+
+    pending: dict[UUID, tuple[int, datetime]] = {}
+    for license_key_id, count in counts.items():
+        timestamp = timestamps.get(license_key_id)
+        if timestamp is None:
+            continue
+        pending[UUID(_decode(license_key_id))] = (
+            int(count),
+            datetime.fromisoformat(_decode(timestamp)),
+        )
+    return pending
+
+
+async def restore_pending_validations(
+    redis: Redis, pending: dict[UUID, tuple[int, datetime]]
+) -> None:
+    """Put back validations taken by `pop_pending_validations` that weren't flushed."""
+    async with redis.pipeline(transaction=False) as pipeline:
+        for license_key_id, (count, last_validated_at) in pending.items():
+            pipeline.hincrby(PENDING_VALIDATIONS_KEY, str(license_key_id), count)
+            # Don't overwrite a more recent validation counted in the meantime
+            pipeline.hsetnx(
+                PENDING_LAST_VALIDATED_AT_KEY,
+                str(license_key_id),
+                last_validated_at.isoformat(),
+            )
+        await pipeline.execute()
+
+
+def _decode(value: str | bytes) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+__all__ = [
+    "CachedLicenseKey",
+    "get_cached_license_key",
+    "invalidate_cached_license_key",
+    "invalidate_cached_license_key_on_commit",
+    "pop_pending_validations",
+    "record_validation",
+    "restore_pending_validations",
+    "set_cached_license_key",
+]
@@ -16,6 +16,7 @@ from polar.models.license_key import LicenseKeyStatus
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.postgres import get_db_read_session, get_db_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth
@@ -209,23 +210,14 @@ async def validate(
     auth_subject: auth.LicenseKeysWrite,
     validate: LicenseKeyValidate,
     session: AsyncSession = Depends(get_db_session),
-) -> LicenseKey:
+    redis: Redis = Depends(get_redis),
+) -> LicenseKey | ValidatedLicenseKey:
     """Validate a license key."""
-    repository = LicenseKeyRepository.from_session(session)
     org_ids = await get_accessible_org_ids(session, auth_subject)
-    license_key = await repository.get_readable_by_key(
-        validate.key,
-        validate.organization_id,
-        org_ids,
-        options=repository.get_eager_options(),
-    )
-
-    if license_key is None:
+    if validate.organization_id not in org_ids:
         raise ResourceNotFound()
 
-    return await license_key_service.validate(
-        session, license_key=license_key, validate=validate
-    )
+    return await license_key_service.validate_by_key(session, redis, validate=validate)
 
 
 @router.post(
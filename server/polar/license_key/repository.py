@@ -1,6 +1,17 @@
+from collections.abc import Mapping, Sequence
+from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import Select
+from sqlalchemy import (
+    TIMESTAMP,
+    Integer,
+    Select,
+    Uuid,
+    column,
+    func,
+    update,
+    values,
+)
 from sqlalchemy.orm import joinedload
 
 from polar.auth.models import (
@@ -81,6 +92,110 @@ class LicenseKeyRepository(
         )
         return await self.get_one_or_none(statement)
 
+    async def increment_usage(self, license_key_id: UUID, increment: int) -> int:
+        """
+        Atomically increment the usage of a license key and return the new usage.
+        """
+        statement = (
+            update(LicenseKey)
+            .where(LicenseKey.id == license_key_id)
+            .values(usage=LicenseKey.usage + increment)
+            .returning(LicenseKey.usage)
+        )
+        result = await self.session.execute(statement)
+        return result.scalar_one()
+
+    async def increment_validations(
+        self, validations: Mapping[UUID, tuple[int, datetime]]
+    ) -> None:
+        """
+        Add validations counted outside of the database to the license keys.
+
+        Args:
+            validations: Number of validations and last validation time,
+            by license key ID.
+        """
+        if not validations:
+            return
+
+        new_values = values(
+            column("license_key_id", Uuid),
+            column("count", Integer),
+            column("last_validated_at", TIMESTAMP(timezone=True)),
+            name="new_validations",
+        ).data(
+            [
+                (license_key_id, count, last_validated_at)
+                for license_key_id, (count, last_validated_at) in validations.items()
+            ]
+        )
+
+        statement = (
+            update(LicenseKey)
+            .where(LicenseKey.id == new_values.c.license_key_id)
+            .values(
+                validations=LicenseKey.validations + new_values.c.count,
+                last_validated_at=func.greatest(
+                    LicenseKey.last_validated_at, new_values.c.last_validated_at
+                ),
+                modified_at=LicenseKey.modified_at,
+            )
+        )
+        await self.session.execute(statement)
+
+    async def update_limits(
+        self,
+        organization_id: UUID,
+        benefit_id: UUID,
+        license_keys: Sequence[tuple[UUID, UUID, UUID | None]],
+        *,
+        limit_activations: int | None,
+        limit_usage: int | None,
+        expires_at: datetime | None,
+    ) -> set[UUID]:
+        """
+        Apply the limits of a license keys benefit to some of its license keys.
+
+        Like a regular grant update, license keys not belonging to the customer
+        of their grant or to the organization are left untouched, and the member
+        is set on license keys not having one yet.
+
+        Args:
+            license_keys: License key ID, customer ID and member ID of each grant.
+
+        Returns:
+            The IDs of the updated license keys.
+        """
+        if not license_keys:
+            return set()
+
+        grant_values = values(
+            column("license_key_id", Uuid),
+            column("customer_id", Uuid),
+            column("member_id", Uuid),
+            name="grant_license_keys",
+        ).data(list(license_keys))
+
+        statement = (
+            update(LicenseKey)
+            .where(
+                LicenseKey.id == grant_values.c.license_key_id,
+                LicenseKey.customer_id == grant_values.c.customer_id,
+                LicenseKey.organization_id == organization_id,
+                LicenseKey.benefit_id == benefit_id,
+                LicenseKey.deleted_at.is_(None),
+            )
+            .values(
+                limit_activations=limit_activations,
+                limit_usage=limit_usage,
+                expires_at=expires_at,
+                member_id=func.coalesce(LicenseKey.member_id, grant_values.c.member_id),
+            )
+            .returning(LicenseKey.id)
+        )
+        result = await self.session.execute(statement)
+        return set(result.scalars().all())
+
     def get_eager_options(self) -> Options:
         return (
             joinedload(LicenseKey.customer),
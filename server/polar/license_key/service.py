@@ -1,10 +1,11 @@
 from collections.abc import Sequence
-from typing import cast
+from typing import Any, cast
 from uuid import UUID
 
 import structlog
 from sqlalchemy import Select, func, select
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from polar.auth.models import AuthSubject, Customer, Member
 from polar.auth.permission import OrganizationPermission
@@ -16,6 +17,7 @@ from polar.benefit.strategies.license_keys.properties import (
 from polar.exceptions import BadRequest, NotPermitted, PolarError, ResourceNotFound
 from polar.kit.pagination import PaginationParams, paginate
 from polar.kit.utils import utc_now
+from polar.logging import Logger
 from polar.models import (
     Benefit,
     LicenseKey,
@@ -25,8 +27,18 @@ from polar.models import (
 )
 from polar.models.license_key import LicenseKeyStatus
 from polar.postgres import AsyncReadSession, AsyncSession
+from polar.redis import Redis
 from polar.worker import enqueue_job
 
+from .cache import (
+    CachedLicenseKey,
+    CachedLicenseKeyActivation,
+    get_cached_license_key,
+    invalidate_cached_license_key,
+    invalidate_cached_license_key_on_commit,
+    record_validation,
+    set_cached_license_key,
+)
 from .repository import LicenseKeyRepository
 from .schemas import (
     LicenseKeyActivate,
@@ -34,9 +46,10 @@ from .schemas import (
     LicenseKeyDeactivate,
     LicenseKeyUpdate,
     LicenseKeyValidate,
+    ValidatedLicenseKey,
 )
 
-log = structlog.get_logger()
+log: Logger = structlog.get_logger()
 
 ROTATABLE_STATUSES: frozenset[LicenseKeyStatus] = frozenset(
     {
@@ -181,6 +194,9 @@ class LicenseKeyService:
 
         session.add(license_key)
         await session.flush()
+        invalidate_cached_license_key_on_commit(
+            license_key.organization_id, license_key.key
+        )
         return license_key
 
     async def rotate(
@@ -217,6 +233,7 @@ class LicenseKeyService:
             }
             session.add(grant)
         await session.flush()
+        invalidate_cached_license_key_on_commit(license_key.organization_id, old_key)
 
         log.info(
             "license_key.rotate",
@@ -251,9 +268,43 @@ class LicenseKeyService:
 
         enqueue_job("license_key.sync_benefit_grant", license_key_id=license_key.id)
 
+    async def validate_by_key(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        *,
+        validate: LicenseKeyValidate,
+    ) -> LicenseKey | ValidatedLicenseKey:
+        """
+        Validate a license key given its key.
+
+        Read-only validations, i.e. without `increment_usage`, are checked against
+        a short-lived snapshot of the license key, without hitting the database.
+        """
+        if not validate.increment_usage:
+            cached = await get_cached_license_key(
+                redis, validate.organization_id, validate.key
+            )
+            # An activation created after the snapshot was taken isn't in it
+            if cached is not None and (
+                validate.activation_id is None
+                or self._get_cached_activation(cached, validate.activation_id)
+            ):
+                return await self._validate_cached(redis, cached, validate)
+
+        license_key = await self.get_or_raise_by_key(
+            session, organization_id=validate.organization_id, key=validate.key
+        )
+        if not validate.increment_usage:
+            await set_cached_license_key(redis, license_key)
+        return await self.validate(
+            session, redis, license_key=license_key, validate=validate
+        )
+
     async def validate(
         self,
         session: AsyncSession,
+        redis: Redis,
         *,
         license_key: LicenseKey,
         validate: LicenseKeyValidate,
@@ -264,24 +315,22 @@ class LicenseKeyService:
             customer_id=license_key.customer_id,
             benefit_id=license_key.benefit_id,
         )
-        await session.refresh(
-            license_key,
-            attribute_names=[
-                "status",
-                "expires_at",
-                "usage",
-                "limit_usage",
-                "validations",
-            ],
-            with_for_update=True,
-        )
-        if not license_key.is_active():
-            bound_logger.info("license_key.validate.invalid_status")
-            raise ResourceNotFound("License key is no longer active.")
-
-        if license_key.expires_at and utc_now() >= license_key.expires_at:
-            bound_logger.info("license_key.validate.invalid_ttl")
-            raise ResourceNotFound("License key has expired.")
+        # Only lock the row when usage has to be checked against its limit
+        limited_usage = bool(validate.increment_usage and license_key.limit_usage)
+        if limited_usage:
+            await session.refresh(
+                license_key,
+                attribute_names=[
+                    "status",
+                    "expires_at",
+                    "usage",
+                    "limit_usage",
+                    "validations",
+                    "last_validated_at",
+                ],
+                with_for_update=True,
+            )
+        self._check_validity(license_key, validate, bound_logger)
 
         if validate.activation_id:
             activation = await self.get_activation_or_raise(
@@ -289,12 +338,115 @@ class LicenseKeyService:
                 license_key=license_key,
                 activation_id=validate.activation_id,
             )
-            if activation.conditions and validate.conditions != activation.conditions:
-                # Skip logging UGC conditions
-                bound_logger.info("license_key.validate.invalid_conditions")
-                raise ResourceNotFound("License key does not match required conditions")
+            self._check_activation_conditions(
+                activation.conditions, validate, bound_logger
+            )
             license_key.activation = activation
 
+        if validate.increment_usage:
+            if limited_usage:
+                assert license_key.limit_usage is not None
+                remaining = license_key.limit_usage - license_key.usage
+                if validate.increment_usage > remaining:
+                    bound_logger.info(
+                        "license_key.validate.insufficient_usage",
+                        usage_remaining=remaining,
+                        usage_requested=validate.increment_usage,
+                    )
+                    raise BadRequest(f"License key only has {remaining} more usages.")
+                license_key.usage += validate.increment_usage
+                session.add(license_key)
+            else:
+                repository = LicenseKeyRepository.from_session(session)
+                usage = await repository.increment_usage(
+                    license_key.id, validate.increment_usage
+                )
+                set_committed_value(license_key, "usage", usage)
+            await invalidate_cached_license_key(
+                redis, license_key.organization_id, license_key.key
+            )
+
+        validated_at = utc_now()
+        pending_validations = await record_validation(
+            redis, license_key.id, validated_at
+        )
+        # Reflect the validation in the response without writing the row:
+        # the counters are flushed to the database by a periodic task.
+        set_committed_value(
+            license_key, "validations", license_key.validations + pending_validations
+        )
+        set_committed_value(license_key, "last_validated_at", validated_at)
+
+        bound_logger.info("license_key.validate")
+        return license_key
+
+    async def _validate_cached(
+        self,
+        redis: Redis,
+        license_key: CachedLicenseKey,
+        validate: LicenseKeyValidate,
+    ) -> ValidatedLicenseKey:
+        bound_logger = log.bind(
+            license_key_id=license_key.id,
+            organization_id=license_key.organization_id,
+            customer_id=license_key.customer_id,
+            benefit_id=license_key.benefit_id,
+            cached=True,
+        )
+        self._check_validity(license_key, validate, bound_logger)
+
+        activation: CachedLicenseKeyActivation | None = None
+        if validate.activation_id:
+            activation = self._get_cached_activation(
+                license_key, validate.activation_id
+            )
+            if activation is None:
+                raise ResourceNotFound()
+            self._check_activation_conditions(
+                activation.conditions, validate, bound_logger
+            )
+
+        validated_at = utc_now()
+        pending_validations = await record_validation(
+            redis, license_key.id, validated_at
+        )
+
+        bound_logger.info("license_key.validate")
+        return ValidatedLicenseKey.model_validate(
+            {
+                **license_key.model_dump(exclude={"activations"}),
+                "validations": license_key.validations + pending_validations,
+                "last_validated_at": validated_at,
+                "activation": (
+                    activation.model_dump(exclude={"conditions"})
+                    if activation is not None
+                    else None
+                ),
+            }
+        )
+
+    def _get_cached_activation(
+        self, license_key: CachedLicenseKey, activation_id: UUID
+    ) -> CachedLicenseKeyActivation | None:
+        for activation in license_key.activations:
+            if activation.id == activation_id:
+                return activation
+        return None
+
+    def _check_validity(
+        self,
+        license_key: LicenseKey | CachedLicenseKey,
+        validate: LicenseKeyValidate,
+        bound_logger: Logger,
+    ) -> None:
+        if license_key.status != LicenseKeyStatus.granted:
+            bound_logger.info("license_key.validate.invalid_status")
+            raise ResourceNotFound("License key is no longer active.")
+
+        if license_key.expires_at and utc_now() >= license_key.expires_at:
+            bound_logger.info("license_key.validate.invalid_ttl")
+            raise ResourceNotFound("License key has expired.")
+
         if validate.benefit_id and validate.benefit_id != license_key.benefit_id:
             bound_logger.info("license_key.validate.invalid_benefit")
             raise ResourceNotFound("License key does not match given benefit.")
@@ -306,20 +458,16 @@ class LicenseKeyService:
             )
             raise ResourceNotFound("License key does not match given user.")
 
-        if validate.increment_usage and license_key.limit_usage:
-            remaining = license_key.limit_usage - license_key.usage
-            if validate.increment_usage > remaining:
-                bound_logger.info(
-                    "license_key.validate.insufficient_usage",
-                    usage_remaining=remaining,
-                    usage_requested=validate.increment_usage,
-                )
-                raise BadRequest(f"License key only has {remaining} more usages.")
-
-        license_key.mark_validated(increment_usage=validate.increment_usage)
-        session.add(license_key)
-        bound_logger.info("license_key.validate")
-        return license_key
+    def _check_activation_conditions(
+        self,
+        conditions: dict[str, Any],
+        validate: LicenseKeyValidate,
+        bound_logger: Logger,
+    ) -> None:
+        if conditions and validate.conditions != conditions:
+            # Skip logging UGC conditions
+            bound_logger.info("license_key.validate.invalid_conditions")
+            raise ResourceNotFound("License key does not match required conditions")
 
     async def get_activation_count(
         self,
@@ -414,6 +562,9 @@ class LicenseKeyService:
         session.add(activation)
         await session.flush()
         assert activation.is_deleted
+        invalidate_cached_license_key_on_commit(
+            license_key.organization_id, license_key.key
+        )
         log.info(
             "license_key.deactivate",
             license_key_id=license_key.id,
@@ -517,6 +668,7 @@ class LicenseKeyService:
         session.add(key)
         await session.flush()
         assert key.id is not None
+        invalidate_cached_license_key_on_commit(key.organization_id, key.key)
         log.info(
             "license_key.grant.update",
             license_key_id=key.id,
@@ -564,6 +716,7 @@ class LicenseKeyService:
         key.mark_revoked()
         session.add(key)
         await session.flush()
+        invalidate_cached_license_key_on_commit(key.organization_id, key.key)
         log.info(
             "license_key.revoke",
             license_key_id=key.id,
@@ -11,8 +11,15 @@ from polar.exceptions import PolarTaskError
 from polar.logging import Logger
 from polar.member.repository import MemberRepository
 from polar.models.license_key import LicenseKeyStatus
-from polar.worker import AsyncSessionMaker, RedisMiddleware, TaskPriority, actor
+from polar.worker import (
+    AsyncSessionMaker,
+    CronTrigger,
+    RedisMiddleware,
+    TaskPriority,
+    actor,
+)
 
+from .cache import pop_pending_validations, restore_pending_validations
 from .repository import LicenseKeyRepository
 
 log: Logger = structlog.get_logger()
@@ -86,3 +93,27 @@ async def sync_benefit_grant(license_key_id: uuid.UUID) -> None:
             member=member,
             **scope,
         )
+
+
+@actor(
+    actor_name="license_key.flush_validations",
+    cron_trigger=CronTrigger(minute="*"),
+    priority=TaskPriority.LOW,
+    max_retries=0,
+)
+async def flush_validations() -> None:
+    redis = RedisMiddleware.get()
+    pending = await pop_pending_validations(redis)
+    if not pending:
+        return
+
+    try:
+        async with AsyncSessionMaker() as session:
+            repository = LicenseKeyRepository.from_session(session)
+            await repository.increment_validations(pending)
+    except Exception:
+        # Keep them for the next run instead of losing them
+        await restore_pending_validations(redis, pending)
+        raise
+
+    log.info("license_key.flush_validations", count=len(pending))
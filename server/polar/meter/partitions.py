@@ -0,0 +1,199 @@
+"""
+Monthly range partitions of `meter_events`, by `ingested_at`.
+
+Partitions are created ahead of time by a scheduled task, so ingestion never
+hits a missing range. Should it fall behind, the rows land in the default
+partition, and are moved to their partition once it's created. Old partitions
+are detached, leaving standalone tables that can be archived to cold storage,
+once their events have been exported to Tinybird and billed.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from sqlalchemy import column, or_, select, table, text
+
+from polar.models import Event, Meter, MeterEvent
+from polar.postgres import AsyncSession
+
+PARENT_TABLE = MeterEvent.__tablename__
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+_PARTITION_BOUND_PATTERN = re.compile(
+    r"FOR VALUES FROM \((?:MINVALUE|'(?P<start>[^']+)')\) TO \('(?P<end>[^']+)'\)"
+)
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    start: datetime | None
+    """Inclusive lower bound, `None` for the legacy partition without one."""
+    end: datetime
+    """Exclusive upper bound."""
+
+
+def get_month_start(value: datetime) -> datetime:
+    return value.astimezone(UTC).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def get_partition_name(month: datetime) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def _parse_bound(value: str) -> datetime:
+    return datetime.fromisoformat(value).astimezone(UTC)
+
+
+async def list_partitions(session: AsyncSession) -> list[Partition]:
+    """List the attached partitions, ordered by range."""
+    result = await session.execute(
+        text(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits "
+            "JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    partitions: list[Partition] = []
+    for name, bound in result.all():
+        match = _PARTITION_BOUND_PATTERN.fullmatch(bound)
+        if match is None:
+            continue
+        start = match.group("start")
+        partitions.append(
+            Partition(
+                name=name,
+                start=_parse_bound(start) if start is not None else None,
+                end=_parse_bound(match.group("end")),
+            )
+        )
+    return sorted(partitions, key=lambda partition: partition.end)
+
+
+async def create_partitions(
+    session: AsyncSession, *, now: datetime, months_ahead: int
+) -> list[str]:
+    """
+    Create the partitions of the current month and the `months_ahead` next ones.
+
+    Months already covered by a partition are skipped, so it's safe to run
+    repeatedly.
+
+    Returns:
+        The names of the created partitions.
+    """
+    partitions = await list_partitions(session)
+    current_month = get_month_start(now)
+    created: list[str] = []
+    await session.execute(text("SET LOCAL lock_timeout = '5s'"))
+    for offset in range(months_ahead + 1):
+        start = add_months(current_month, offset)
+        end = add_months(start, 1)
+        if any(
+            (partition.start is None or partition.start < end) and start < partition.end
+            for partition in partitions
+        ):
+            continue
+        name = get_partition_name(start)
+        await _create_partition(session, name, start, end)
+        created.append(name)
+    return created
+
+
+async def _create_partition(
+    session: AsyncSession, name: str, start: datetime, end: datetime
+) -> None:
+    create_statement = text(
+        f'CREATE TABLE "{name}" PARTITION OF "{PARENT_TABLE}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    in_range = "ingested_at >= :start AND ingested_at < :end"
+    result = await session.execute(
+        text(f'SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE {in_range} LIMIT 1'),
+        {"start": start, "end": end},
+    )
+    if result.first() is None:
+        await session.execute(create_statement)
+        return
+
+    # The new range can't overlap rows of the default partition: set it aside
+    # while the rows are moved to the new partition.
+    await session.execute(
+        text(f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"')
+    )
+    await session.execute(create_statement)
+    await session.execute(
+        text(
+            f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE {in_range} '
+            f'RETURNING *) INSERT INTO "{name}" SELECT * FROM moved'
+        ),
+        {"start": start, "end": end},
+    )
+    await session.execute(
+        text(
+            f'ALTER TABLE "{PARENT_TABLE}" '
+            f'ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT'
+        )
+    )
+
+
+async def count_default_events(session: AsyncSession) -> int:
+    """Count the rows of the default partition, out of every monthly range."""
+    result = await session.execute(text(f'SELECT count(*) FROM "{DEFAULT_PARTITION}"'))
+    return result.scalar_one()
+
+
+async def _has_unbilled_events(session: AsyncSession, partition: Partition) -> bool:
+    partition_table = table(
+        partition.name, column("meter_id"), column("ingested_at")
+    ).alias("meter_event_partition")
+    statement = (
+        select(partition_table.c.meter_id)
+        .join(Meter, Meter.id == partition_table.c.meter_id)
+        .join(Event, Event.id == Meter.last_billed_event_id, isouter=True)
+        .where(
+            Meter.deleted_at.is_(None),
+            Meter.archived_at.is_(None),
+            or_(
+                Event.id.is_(None),
+                partition_table.c.ingested_at > Event.ingested_at,
+            ),
+        )
+        .limit(1)
+    )
+    result = await session.execute(statement)
+    return result.first() is not None
+
+
+async def detach_partitions(session: AsyncSession, *, before: datetime) -> list[str]:
+    """
+    Detach the partitions ending before `before`.
+
+    Partitions still holding events not billed by an active meter are kept.
+    The detached tables are left in place, to be archived and dropped.
+
+    Returns:
+        The names of the detached partitions.
+    """
+    detached: list[str] = []
+    await session.execute(text("SET LOCAL lock_timeout = '5s'"))
+    for partition in await list_partitions(session):
+        if partition.end > before:
+            break
+        if await _has_unbilled_events(session, partition):
+            break
+        await session.execute(
+            text(f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{partition.name}"')
+        )
+        detached.append(partition.name)
+    return detached
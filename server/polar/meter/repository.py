@@ -1,10 +1,24 @@
+import uuid
+from collections.abc import Sequence
+from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import Select
+from sqlalchemy import (
+    TIMESTAMP,
+    Select,
+    Uuid,
+    func,
+    literal,
+    literal_column,
+    select,
+    true,
+    tuple_,
+)
+from sqlalchemy.orm import aliased, selectinload
 
 from polar.authz.types import AccessibleOrganizationID
 from polar.kit.repository import RepositoryBase, RepositoryIDMixin
-from polar.models import Meter
+from polar.models import Event, Meter, MeterEvent
 
 
 class MeterRepository(RepositoryBase[Meter], RepositoryIDMixin[Meter, UUID]):
@@ -22,3 +36,69 @@ class MeterRepository(RepositoryBase[Meter], RepositoryIDMixin[Meter, UUID]):
     ) -> Meter | None:
         statement = self.get_statement_by_org_ids(org_ids).where(Meter.id == id)
         return await self.get_one_or_none(statement)
+
+    async def get_for_billing(self, id: UUID) -> Meter | None:
+        """
+        Lock the meter and load its billing watermark.
+
+        The watermark is loaded after acquiring the lock, and refreshes an
+        already loaded meter, since another task may have moved it meanwhile.
+        """
+        statement = (
+            self.get_base_statement()
+            .where(Meter.id == id)
+            .options(selectinload(Meter.last_billed_event))
+            .with_for_update(of=Meter)
+            .execution_options(populate_existing=True)
+        )
+        return await self.get_one_or_none(statement)
+
+    async def get_billing_backlogs(
+        self, *, limit: int
+    ) -> Sequence[tuple[UUID, int, datetime]]:
+        """
+        Get the active meters with events not billed yet.
+
+        Each meter comes with its number of pending events, capped at `limit`,
+        and the ingestion time of the oldest one. Idle meters are left out.
+
+        The pending events are counted on the `(meter_id, ingested_at, event_id)`
+        index, from the meter watermark, so it only reads the backlogs.
+        """
+        last_billed_event = aliased(Event)
+        watermark_ingested_at = func.coalesce(
+            last_billed_event.ingested_at,
+            literal_column("'-infinity'", TIMESTAMP(timezone=True)),
+        )
+        watermark_event_id = func.coalesce(
+            last_billed_event.id, literal(uuid.UUID(int=0), Uuid)
+        )
+        pending_events = (
+            select(MeterEvent.ingested_at)
+            .where(
+                MeterEvent.meter_id == Meter.id,
+                tuple_(MeterEvent.ingested_at, MeterEvent.event_id)
+                > tuple_(watermark_ingested_at, watermark_event_id),
+                # Lets Postgres prune the partitions before the watermark
+                MeterEvent.ingested_at >= watermark_ingested_at,
+            )
+            .order_by(MeterEvent.ingested_at.asc(), MeterEvent.event_id.asc())
+            .limit(limit)
+            .lateral("pending_events")
+        )
+        pending_count = func.count()
+        oldest_pending = func.min(pending_events.c.ingested_at)
+        statement = (
+            select(Meter.id, pending_count, oldest_pending)
+            .join(
+                last_billed_event,
+                last_billed_event.id == Meter.last_billed_event_id,
+                isouter=True,
+            )
+            .join(pending_events, true())
+            .where(Meter.archived_at.is_(None))
+            .group_by(Meter.id)
+            .order_by(pending_count.desc(), oldest_pending.asc())
+        )
+        result = await self.session.execute(statement)
+        return [row._tuple() for row in result.all()]
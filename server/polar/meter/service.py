@@ -1,9 +1,11 @@
+import time
 import uuid
 from collections.abc import Sequence
 from datetime import UTC, datetime
 from typing import Any
 from zoneinfo import ZoneInfo
 
+import structlog
 from sqlalchemy import (
     ColumnElement,
     ColumnExpressionArgument,
@@ -37,6 +39,8 @@ from polar.kit.metadata import MetadataQuery, apply_metadata_clause, get_metadat
 from polar.kit.pagination import PaginationParams
 from polar.kit.sorting import Sorting
 from polar.kit.time_queries import TimeInterval, get_timestamp_series_cte
+from polar.kit.utils import utc_now
+from polar.logging import Logger
 from polar.meter.aggregation import AggregationFunction
 from polar.models import (
     Benefit,
@@ -46,19 +50,30 @@ from polar.models import (
     Meter,
     Product,
     ProductPriceMeteredUnit,
-    SubscriptionProductPrice,
 )
+from polar.observability import METER_BILLING_LAG, METER_BILLING_PLANNED_METERS_TOTAL
 from polar.organization.resolver import get_payload_organization
 from polar.postgres import AsyncReadSession, AsyncSession
-from polar.subscription.repository import SubscriptionProductPriceRepository
+from polar.subscription.repository import (
+    CustomerSubscriptionProductPrice,
+    SubscriptionProductPriceRepository,
+)
 from polar.worker import enqueue_job, make_bulk_job_delay_calculator
 
 from .repository import MeterRepository
 from .schemas import MeterCreate, MeterQuantities, MeterQuantity, MeterUpdate
 from .sorting import MeterSortProperty
 
-# Maximum number of events processed by one billing task invocation.
+# Number of events billed per page.
 _BILLING_ENTRY_BATCH_SIZE = 500
+# Time after which a billing task stops draining pages and enqueues itself again,
+# well within the task time limit.
+_BILLING_TIME_BUDGET_SECONDS = 30.0
+# Pending events are counted up to this, to plan billing without reading whole
+# backlogs: above, a meter takes several pages anyway.
+_BILLING_BACKLOG_COUNT_LIMIT = 10_000
+
+log: Logger = structlog.get_logger()
 
 
 class MeterService:
@@ -486,82 +501,113 @@ class MeterService:
         return MeterQuantities(quantities=quantities, total=total)
 
     async def enqueue_billing(self, session: AsyncSession) -> None:
+        """
+        Enqueue the billing of the meters with events not billed yet.
+
+        Idle meters are skipped. The others are enqueued by decreasing backlog,
+        so the largest ones start first while the small ones are spread over the
+        rest of the window.
+        """
         repository = MeterRepository.from_session(session)
+        now = utc_now()
 
-        base_statement = repository.get_base_statement().where(
-            Meter.archived_at.is_(None)
+        active_count = await repository.count(
+            repository.get_base_statement().where(Meter.archived_at.is_(None))
         )
-        count_result = await session.execute(
-            base_statement.with_only_columns(func.count())
+        backlogs = await repository.get_billing_backlogs(
+            limit=_BILLING_BACKLOG_COUNT_LIMIT
         )
 
-        total_count = count_result.scalar_one()
+        # Meters can be archived between both queries
+        idle_count = max(active_count - len(backlogs), 0)
+        METER_BILLING_PLANNED_METERS_TOTAL.labels(state="pending").inc(len(backlogs))
+        METER_BILLING_PLANNED_METERS_TOTAL.labels(state="idle").inc(idle_count)
+        if not backlogs:
+            return
+
         calculate_delay = make_bulk_job_delay_calculator(
-            total_count, max_spread_ms=180_000, allow_spill=False
+            len(backlogs), max_spread_ms=180_000, allow_spill=False
         )
+        for index, (meter_id, _, oldest_pending) in enumerate(backlogs):
+            METER_BILLING_LAG.observe((now - oldest_pending).total_seconds())
+            enqueue_job("meter.billing_entries", meter_id, delay=calculate_delay(index))
 
-        statement = base_statement.order_by(Meter.created_at.asc())
-
-        index = 0
-        async for meter in repository.stream(statement):
-            enqueue_job("meter.billing_entries", meter.id, delay=calculate_delay(index))
-            index += 1
-
-    async def _create_subscription_holder_billing_entry(
-        self,
-        session: AsyncSession,
-        event: Event,
-        customer: "Customer",
-        subscription_product_price: SubscriptionProductPrice,
-    ) -> BillingEntry:
-        billing_entry_repository = BillingEntryRepository.from_session(session)
-        return await billing_entry_repository.create(
-            BillingEntry.from_metered_event(customer, subscription_product_price, event)
+        most_lagging_meter_id, _, oldest_pending = min(
+            backlogs, key=lambda backlog: backlog[2]
+        )
+        log.info(
+            "meter.enqueue_billing.planned",
+            pending_meters=len(backlogs),
+            idle_meters=idle_count,
+            largest_backlog=backlogs[0][1],
+            most_lagging_meter_id=str(most_lagging_meter_id),
+            max_lag_seconds=(now - oldest_pending).total_seconds(),
         )
 
     async def create_billing_entries(
         self, session: AsyncSession, meter: Meter
     ) -> Sequence[BillingEntry]:
-        event_repository = EventRepository.from_session(session)
-        last_billed_event = meter.last_billed_event
-        page = await event_repository.get_meter_billing_page(
-            meter.id,
-            after_ingested_at=(
-                last_billed_event.ingested_at if last_billed_event is not None else None
-            ),
-            after_event_id=(
-                last_billed_event.id if last_billed_event is not None else None
-            ),
-            limit=_BILLING_ENTRY_BATCH_SIZE,
-        )
+        """
+        Bill the events of the meter since its watermark.
+
+        Pages of events are billed until the backlog is drained or the time
+        budget is spent, in which case the task is enqueued again to continue.
 
+        Each page is committed, and the meter lock taken again for the next one,
+        so billed pages are kept should a later one fail, and the lock is only
+        held for a page.
+        """
+        meter_repository = MeterRepository.from_session(session)
+        event_repository = EventRepository.from_session(session)
+        billing_entry_repository = BillingEntryRepository.from_session(session)
         subscription_product_price_repository = (
             SubscriptionProductPriceRepository.from_session(session)
         )
 
+        deadline = time.monotonic() + _BILLING_TIME_BUDGET_SECONDS
+        customer_price_map: dict[
+            uuid.UUID, CustomerSubscriptionProductPrice | None
+        ] = {}
         entries: list[BillingEntry] = []
         updated_subscriptions: set[uuid.UUID] = set()
-        if page:
-            customer_ids = {customer.id for _, customer in page if customer is not None}
-            customer_price_map = (
-                await subscription_product_price_repository.get_by_customers_and_meter(
-                    list(customer_ids), meter.id
+        while True:
+            last_billed_event = meter.last_billed_event
+            page = await event_repository.get_meter_billing_page(
+                meter.id,
+                after_ingested_at=(
+                    last_billed_event.ingested_at
+                    if last_billed_event is not None
+                    else None
+                ),
+                after_event_id=(
+                    last_billed_event.id if last_billed_event is not None else None
+                ),
+                limit=_BILLING_ENTRY_BATCH_SIZE,
+            )
+            if not page:
+                break
+
+            # Prices are kept across pages: only look up the new customers
+            missing_customer_ids = list(
+                dict.fromkeys(
+                    customer.id
+                    for _, customer in page
+                    if customer is not None and customer.id not in customer_price_map
                 )
             )
+            if missing_customer_ids:
+                customer_price_map.update(
+                    await subscription_product_price_repository.get_by_customers_and_meter(
+                        missing_customer_ids, meter.id
+                    )
+                )
 
+            page_entries: list[BillingEntry] = []
             for event, customer in page:
                 if customer is None:
                     continue
 
-                try:
-                    customer_price = customer_price_map[customer.id]
-                except KeyError:
-                    concurrent_customer_prices = await subscription_product_price_repository.get_by_customers_and_meter(
-                        [customer.id], meter.id
-                    )
-                    customer_price = concurrent_customer_prices[customer.id]
-                    customer_price_map[customer.id] = customer_price
-
+                customer_price = customer_price_map[customer.id]
                 if customer_price is None:
                     continue
 
@@ -572,25 +618,36 @@ class MeterService:
                 ):
                     continue
 
-                entry = await self._create_subscription_holder_billing_entry(
-                    session,
-                    event,
-                    subscription.customer,
-                    customer_price.subscription_product_price,
+                page_entries.append(
+                    BillingEntry.from_metered_event(
+                        subscription.customer,
+                        customer_price.subscription_product_price,
+                        event,
+                    )
                 )
-                entries.append(entry)
-                if entry.subscription is not None:
-                    updated_subscriptions.add(entry.subscription.id)
+                updated_subscriptions.add(subscription.id)
+
+            await billing_entry_repository.insert_batch(page_entries)
+            entries.extend(page_entries)
 
             meter.last_billed_event = page[-1][0]
             session.add(meter)
+            await session.commit()
+
+            if len(page) < _BILLING_ENTRY_BATCH_SIZE:
+                break
+            if time.monotonic() >= deadline:
+                enqueue_job("meter.billing_entries", meter.id)
+                break
+
+            locked_meter = await meter_repository.get_for_billing(meter.id)
+            if locked_meter is None or locked_meter.archived_at is not None:
+                break
+            meter = locked_meter
 
         for subscription_id in updated_subscriptions:
             enqueue_job("subscription.update_meters", subscription_id)
 
-        if len(page) == _BILLING_ENTRY_BATCH_SIZE:
-            enqueue_job("meter.billing_entries", meter.id)
-
         return entries
 
     async def get_quantity(
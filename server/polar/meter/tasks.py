@@ -1,17 +1,31 @@
 import uuid
 from datetime import datetime
 
+import structlog
 from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy import and_, or_, select
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.orm import selectinload
 
+from polar.config import settings
 from polar.event.service import event as event_service
 from polar.exceptions import PolarTaskError
+from polar.integrations.tinybird.tasks import get_reconcile_watermark
+from polar.kit.utils import utc_now
+from polar.logging import Logger
 from polar.meter.repository import MeterRepository
 from polar.meter.service import meter as meter_service
-from polar.models import Event, Meter, MeterEvent
-from polar.worker import AsyncSessionMaker, TaskPriority, actor, enqueue_job
+from polar.models import Event, MeterEvent
+from polar.worker import (
+    AsyncSessionMaker,
+    RedisMiddleware,
+    TaskPriority,
+    actor,
+    enqueue_job,
+)
+
+from . import partitions
+
+log: Logger = structlog.get_logger()
 
 
 class MeterTaskError(PolarTaskError): ...
@@ -42,13 +56,7 @@ async def meter_enqueue_billing() -> None:
 async def meter_billing_entries(meter_id: uuid.UUID) -> None:
     async with AsyncSessionMaker() as session:
         repository = MeterRepository.from_session(session)
-        # Load the watermark after acquiring the meter lock. A joinedload can return
-        # the updated meter row with a stale event from the pre-lock snapshot.
-        meter = await repository.get_by_id(
-            meter_id,
-            options=(selectinload(Meter.last_billed_event),),
-            for_update=True,
-        )
+        meter = await repository.get_for_billing(meter_id)
         if meter is None:
             raise MeterDoesNotExist(meter_id)
 
@@ -133,3 +141,61 @@ async def meter_backfill_events(
                 last_ingested_at=last_event.ingested_at.isoformat(),
                 last_event_id=str(last_event.id),
             )
+
+
+@actor(
+    actor_name="meter.create_event_partitions",
+    cron_trigger=CronTrigger.from_crontab("0 3 * * *"),
+    priority=TaskPriority.LOW,
+)
+async def meter_create_event_partitions() -> None:
+    """
+    Create the monthly partitions of `meter_events` ahead of time.
+
+    Rows left in the default partition, out of every monthly range, are reported.
+    """
+    async with AsyncSessionMaker() as session:
+        created = await partitions.create_partitions(
+            session,
+            now=utc_now(),
+            months_ahead=settings.METER_EVENTS_PARTITIONS_AHEAD_MONTHS,
+        )
+        default_events = await partitions.count_default_events(session)
+    if created:
+        log.info("meter.create_event_partitions.created", partitions=created)
+    if default_events:
+        log.error(
+            "meter.create_event_partitions.default_not_empty",
+            partition=partitions.DEFAULT_PARTITION,
+            events=default_events,
+        )
+
+
+@actor(
+    actor_name="meter.detach_event_partitions",
+    cron_trigger=CronTrigger.from_crontab("30 3 * * *"),
+    priority=TaskPriority.LOW,
+)
+async def meter_detach_event_partitions() -> None:
+    """
+    Detach the `meter_events` partitions past retention, for cold storage.
+
+    Only partitions entirely exported to Tinybird, i.e. before the reconciliation
+    watermark, are detached.
+    """
+    retention_months = settings.METER_EVENTS_PARTITION_RETENTION_MONTHS
+    if retention_months is None:
+        return
+
+    exported_until = await get_reconcile_watermark(RedisMiddleware.get())
+    if exported_until is None:
+        return
+
+    before = min(
+        partitions.add_months(partitions.get_month_start(utc_now()), -retention_months),
+        exported_until,
+    )
+    async with AsyncSessionMaker() as session:
+        detached = await partitions.detach_partitions(session, before=before)
+    if detached:
+        log.info("meter.detach_event_partitions.detached", partitions=detached)
@@ -154,7 +154,11 @@ class BillingEntry(RecordModel):
             type=BillingEntryType.metered,
             direction=BillingEntryDirection.debit,
             customer=customer,
+            customer_id=customer.id,
             product_price=subscription_product_price.product_price,
+            product_price_id=subscription_product_price.product_price_id,
             subscription=subscription_product_price.subscription,
+            subscription_id=subscription_product_price.subscription_id,
             event=event,
+            event_id=event.id,
         )
@@ -25,6 +25,7 @@ from sqlalchemy import (
 from sqlalchemy import (
     cast as sqla_cast,
 )
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import (
     Mapped,
@@ -231,6 +232,7 @@ class Event(Model, MetadataMixin):
             "pending_parent_external_id",
             postgresql_where="pending_parent_external_id IS NOT NULL",
         ),
+        Index("ix_events_ancestors", "ancestors", postgresql_using="gin"),
     )
 
     id: Mapped[UUID] = mapped_column(Uuid, primary_key=True, default=generate_uuid)
@@ -275,6 +277,12 @@ class Event(Model, MetadataMixin):
         String, nullable=True
     )
 
+    # Materialized path, from the parent up to the root. Set once the chain
+    # reaches its root; `None` until then, or for events not backfilled yet.
+    ancestors: Mapped[list[UUID] | None] = mapped_column(
+        ARRAY(Uuid), nullable=True, default=None
+    )
+
     @declared_attr
     def parent(cls) -> Mapped["Event | None"]:
         return relationship(
@@ -14,7 +14,6 @@ from sqlalchemy import (
 from sqlalchemy.orm import Mapped, declared_attr, mapped_column, relationship
 
 from polar.kit.db.models import RecordModel
-from polar.kit.utils import utc_now
 
 from .benefit import Benefit
 from .customer import Customer
@@ -140,11 +139,5 @@ class LicenseKey(RecordModel):
     def mark_granted(self) -> None:
         self.status = LicenseKeyStatus.granted
 
-    def mark_validated(self, increment_usage: int | None = None) -> None:
-        self.validations += 1
-        self.last_validated_at = utc_now()
-        if increment_usage:
-            self.usage += increment_usage
-
     def is_active(self) -> bool:
         return self.status == LicenseKeyStatus.granted
@@ -24,6 +24,8 @@ class MeterEvent(Model):
             "ingested_at",
         ),
         Index("ix_meter_events_event_id", "event_id"),
+        # Monthly partitions, managed by `polar.meter.partitions`
+        {"postgresql_partition_by": "RANGE (ingested_at)"},
     )
 
     meter_id: Mapped[UUID] = mapped_column(
@@ -40,7 +42,7 @@ class MeterEvent(Model):
         Uuid, ForeignKey("organizations.id", ondelete="cascade"), nullable=False
     )
     ingested_at: Mapped[datetime] = mapped_column(
-        TIMESTAMP(timezone=True), nullable=False
+        TIMESTAMP(timezone=True), nullable=False, primary_key=True
     )
     timestamp: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), nullable=False
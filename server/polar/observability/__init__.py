@@ -1,13 +1,34 @@
+from polar.observability.benefit_metrics import (
+    BENEFIT_GRANT_TASK_DURATION,
+    BENEFIT_GRANT_TASK_TOTAL,
+)
 from polar.observability.checkout_metrics import (
     CHECKOUT_CREATED_TOTAL,
+    CHECKOUT_PRODUCT_CACHE_TOTAL,
     CHECKOUT_SUCCEEDED_TOTAL,
 )
+from polar.observability.email_metrics import EMAIL_RENDER_DURATION
+from polar.observability.event_metrics import (
+    EVENT_PARENT_RESOLUTION_DURATION,
+    EVENT_STATISTICS_STAGE_DURATION,
+)
+from polar.observability.eventstream_metrics import (
+    EVENTSTREAM_CHANNELS,
+    EVENTSTREAM_EVICTIONS_TOTAL,
+    EVENTSTREAM_MESSAGES_TOTAL,
+    EVENTSTREAM_PUBLISH_DURATION,
+    EVENTSTREAM_SUBSCRIBERS,
+)
 from polar.observability.http_metrics import (
     HTTP_REQUEST_DURATION_SECONDS,
     HTTP_REQUEST_TOTAL,
     HTTP_SSE_CONNECTIONS_OPENED,
     METRICS_DENY_LIST,
 )
+from polar.observability.meter_metrics import (
+    METER_BILLING_LAG,
+    METER_BILLING_PLANNED_METERS_TOTAL,
+)
 from polar.observability.metrics import (
     TASK_DEBOUNCE_DELAY,
     TASK_DEBOUNCED,
@@ -16,19 +37,50 @@ from polar.observability.metrics import (
     TASK_RETRIES,
 )
 from polar.observability.operational_errors import OPERATIONAL_ERROR_TOTAL
-from polar.observability.tax_metrics import TAX_CALCULATION_TOTAL
+from polar.observability.subscription_scheduler_metrics import (
+    SUBSCRIPTION_SCHEDULER_CAPPED_TICKS_TOTAL,
+    SUBSCRIPTION_SCHEDULER_CLAIM_LAG,
+    SUBSCRIPTION_SCHEDULER_CLAIMED_TOTAL,
+)
+from polar.observability.tax_metrics import (
+    TAX_CALCULATION_CACHE_TOTAL,
+    TAX_CALCULATION_TOTAL,
+)
 
 __all__ = [
+    # Benefit grant metrics (worker)
+    "BENEFIT_GRANT_TASK_DURATION",
+    "BENEFIT_GRANT_TASK_TOTAL",
     # Checkout metrics (anomaly detection)
     "CHECKOUT_CREATED_TOTAL",
+    "CHECKOUT_PRODUCT_CACHE_TOTAL",
     "CHECKOUT_SUCCEEDED_TOTAL",
+    # Email metrics
+    "EMAIL_RENDER_DURATION",
+    # Eventstream metrics (API server)
+    "EVENTSTREAM_CHANNELS",
+    "EVENTSTREAM_EVICTIONS_TOTAL",
+    "EVENTSTREAM_MESSAGES_TOTAL",
+    "EVENTSTREAM_PUBLISH_DURATION",
+    "EVENTSTREAM_SUBSCRIBERS",
+    # Event metrics
+    "EVENT_PARENT_RESOLUTION_DURATION",
+    "EVENT_STATISTICS_STAGE_DURATION",
     # HTTP metrics (API server)
     "HTTP_REQUEST_DURATION_SECONDS",
     "HTTP_REQUEST_TOTAL",
     "HTTP_SSE_CONNECTIONS_OPENED",
+    # Meter billing metrics (worker)
+    "METER_BILLING_LAG",
+    "METER_BILLING_PLANNED_METERS_TOTAL",
+    # Endpoints excluded from the HTTP metrics
     "METRICS_DENY_LIST",
     # Operational error metrics
     "OPERATIONAL_ERROR_TOTAL",
+    # Subscription scheduler metrics
+    "SUBSCRIPTION_SCHEDULER_CAPPED_TICKS_TOTAL",
+    "SUBSCRIPTION_SCHEDULER_CLAIMED_TOTAL",
+    "SUBSCRIPTION_SCHEDULER_CLAIM_LAG",
     # Task metrics (worker)
     "TASK_DEBOUNCED",
     "TASK_DEBOUNCE_DELAY",
@@ -36,5 +88,6 @@ __all__ = [
     "TASK_EXECUTIONS",
     "TASK_RETRIES",
     # Tax metrics
+    "TAX_CALCULATION_CACHE_TOTAL",
     "TAX_CALCULATION_TOTAL",
 ]
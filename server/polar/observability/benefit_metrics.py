@@ -0,0 +1,33 @@
+"""
+Benefit grant metrics for tracking the throughput and latency of each strategy.
+
+Metrics:
+- polar_benefit_grant_task_total: Counter of benefit tasks by benefit type,
+  task and outcome (success, retry, error or throttled)
+- polar_benefit_grant_task_duration_seconds: Histogram of benefit task durations
+  by benefit type and task
+"""
+
+import os
+
+from polar.config import settings
+
+# Setup multiprocess prometheus directory before importing prometheus_client
+prometheus_dir = settings.WORKER_PROMETHEUS_DIR
+prometheus_dir.mkdir(parents=True, exist_ok=True)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(prometheus_dir))
+
+from prometheus_client import Counter, Histogram
+
+BENEFIT_GRANT_TASK_TOTAL = Counter(
+    "polar_benefit_grant_task_total",
+    "Total number of benefit grant tasks",
+    ["benefit_type", "task", "outcome"],
+)
+
+BENEFIT_GRANT_TASK_DURATION = Histogram(
+    "polar_benefit_grant_task_duration_seconds",
+    "Duration of benefit grant tasks",
+    ["benefit_type", "task"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
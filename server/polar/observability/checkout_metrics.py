@@ -7,6 +7,7 @@ enabling Grafana ML-based anomaly detection for payment flow health.
 Metrics:
 - polar_checkout_created_total: Counter of checkouts created
 - polar_checkout_succeeded_total: Counter of successful checkouts
+- polar_checkout_product_cache_total: Counter of product cache lookups
 """
 
 import os
@@ -30,3 +31,9 @@ CHECKOUT_SUCCEEDED_TOTAL = Counter(
     "polar_checkout_succeeded_total",
     "Total number of checkouts that succeeded (payment completed)",
 )
+
+CHECKOUT_PRODUCT_CACHE_TOTAL = Counter(
+    "polar_checkout_product_cache_total",
+    "Total number of product lookups from the checkout product cache",
+    ["outcome"],
+)
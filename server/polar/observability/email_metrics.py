@@ -0,0 +1,25 @@
+"""
+Email rendering metrics.
+
+Metrics:
+- polar_email_render_duration_seconds: Histogram of react-email render latency,
+  by template and outcome. Its count gives the render throughput.
+"""
+
+import os
+
+from polar.config import settings
+
+# Setup multiprocess prometheus directory before importing prometheus_client
+prometheus_dir = settings.WORKER_PROMETHEUS_DIR
+prometheus_dir.mkdir(parents=True, exist_ok=True)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(prometheus_dir))
+
+from prometheus_client import Histogram
+
+EMAIL_RENDER_DURATION = Histogram(
+    "polar_email_render_duration_seconds",
+    "Duration of react-email template renders",
+    ["template", "outcome"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
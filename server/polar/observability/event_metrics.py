@@ -0,0 +1,36 @@
+"""
+Event statistics metrics.
+
+Metrics:
+- polar_event_statistics_stage_duration_seconds: Histogram of the duration of
+  each stage of the event statistics endpoints, e.g. the Tinybird queries or the
+  lookups in Postgres, by endpoint and stage.
+- polar_event_parent_resolution_duration_seconds: Histogram of the duration of
+  the statements resolving pending parents, which lock the events they update,
+  by statement.
+"""
+
+import os
+
+from polar.config import settings
+
+# Setup multiprocess prometheus directory before importing prometheus_client
+prometheus_dir = settings.WORKER_PROMETHEUS_DIR
+prometheus_dir.mkdir(parents=True, exist_ok=True)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(prometheus_dir))
+
+from prometheus_client import Histogram
+
+EVENT_STATISTICS_STAGE_DURATION = Histogram(
+    "polar_event_statistics_stage_duration_seconds",
+    "Duration of the stages of the event statistics endpoints",
+    ["endpoint", "stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+EVENT_PARENT_RESOLUTION_DURATION = Histogram(
+    "polar_event_parent_resolution_duration_seconds",
+    "Duration of the statements resolving pending event parents",
+    ["statement"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
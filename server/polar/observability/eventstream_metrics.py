@@ -0,0 +1,51 @@
+"""
+Eventstream metrics for the per-process Redis Pub/Sub multiplexer.
+
+Metrics:
+- polar_eventstream_subscribers: Gauge of SSE clients attached to the multiplexer
+- polar_eventstream_channels: Gauge of Redis channels the multiplexer listens to
+- polar_eventstream_messages_total: Counter of messages by delivery outcome
+- polar_eventstream_evictions_total: Counter of subscribers closed by the server
+- polar_eventstream_publish_duration_seconds: Histogram of the delay between an
+  event being published by the application and it reaching Redis, by mode
+"""
+
+import os
+
+from polar.config import settings
+
+# Setup multiprocess prometheus directory before importing prometheus_client
+prometheus_dir = settings.WORKER_PROMETHEUS_DIR
+prometheus_dir.mkdir(parents=True, exist_ok=True)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(prometheus_dir))
+
+from prometheus_client import Counter, Gauge, Histogram
+
+EVENTSTREAM_SUBSCRIBERS = Gauge(
+    "polar_eventstream_subscribers",
+    "Number of SSE clients attached to the eventstream multiplexer",
+)
+
+EVENTSTREAM_CHANNELS = Gauge(
+    "polar_eventstream_channels",
+    "Number of Redis channels the eventstream multiplexer is subscribed to",
+)
+
+EVENTSTREAM_MESSAGES_TOTAL = Counter(
+    "polar_eventstream_messages_total",
+    "Total number of eventstream messages dispatched to subscribers",
+    ["outcome"],
+)
+
+EVENTSTREAM_EVICTIONS_TOTAL = Counter(
+    "polar_eventstream_evictions_total",
+    "Total number of eventstream subscribers closed by the server",
+    ["reason"],
+)
+
+EVENTSTREAM_PUBLISH_DURATION = Histogram(
+    "polar_eventstream_publish_duration_seconds",
+    "Delay between an eventstream event being published and reaching Redis",
+    ["mode"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
@@ -0,0 +1,33 @@
+"""
+Meter billing metrics.
+
+Metrics:
+- polar_meter_billing_lag_seconds: Histogram of the age of the oldest unbilled
+  event of each meter with a backlog, observed when billing is enqueued.
+- polar_meter_billing_planned_meters_total: Counter of meters considered when
+  enqueuing billing, by whether they had a backlog and were enqueued or were
+  idle and skipped.
+"""
+
+import os
+
+from polar.config import settings
+
+# Setup multiprocess prometheus directory before importing prometheus_client
+prometheus_dir = settings.WORKER_PROMETHEUS_DIR
+prometheus_dir.mkdir(parents=True, exist_ok=True)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(prometheus_dir))
+
+from prometheus_client import Counter, Histogram
+
+METER_BILLING_LAG = Histogram(
+    "polar_meter_billing_lag_seconds",
+    "Age of the oldest unbilled event of meters with a billing backlog",
+    buckets=(60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0, 21600.0, 86400.0),
+)
+
+METER_BILLING_PLANNED_METERS_TOTAL = Counter(
+    "polar_meter_billing_planned_meters_total",
+    "Total number of meters considered when enqueuing billing",
+    ["state"],
+)
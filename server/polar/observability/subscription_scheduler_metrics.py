@@ -0,0 +1,41 @@
+"""
+Subscription scheduler metrics for the bulk claim of due subscriptions.
+
+Metrics:
+- polar_subscription_scheduler_claimed_total: Counter of subscriptions claimed
+  and dispatched, by actor
+- polar_subscription_scheduler_claim_lag_seconds: Histogram of the delay between
+  a subscription being due and it being claimed, by actor
+- polar_subscription_scheduler_capped_ticks_total: Counter of scheduler ticks
+  which reached the claim cap, by actor
+"""
+
+import os
+
+from polar.config import settings
+
+# Setup multiprocess prometheus directory before importing prometheus_client
+prometheus_dir = settings.WORKER_PROMETHEUS_DIR
+prometheus_dir.mkdir(parents=True, exist_ok=True)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(prometheus_dir))
+
+from prometheus_client import Counter, Histogram
+
+SUBSCRIPTION_SCHEDULER_CLAIMED_TOTAL = Counter(
+    "polar_subscription_scheduler_claimed_total",
+    "Total number of due subscriptions claimed and dispatched by the scheduler",
+    ["actor"],
+)
+
+SUBSCRIPTION_SCHEDULER_CLAIM_LAG = Histogram(
+    "polar_subscription_scheduler_claim_lag_seconds",
+    "Delay between a subscription being due and the scheduler claiming it",
+    ["actor"],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0),
+)
+
+SUBSCRIPTION_SCHEDULER_CAPPED_TICKS_TOTAL = Counter(
+    "polar_subscription_scheduler_capped_ticks_total",
+    "Total number of scheduler ticks that reached the claim cap",
+    ["actor"],
+)
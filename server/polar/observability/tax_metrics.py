@@ -6,6 +6,8 @@ enabling monitoring of tax provider fallback behavior and usage patterns.
 
 Metrics:
 - polar_tax_calculation_total: Counter of tax calculations by provider
+- polar_tax_calculation_cache_total: Counter of tax calculation cache lookups
+  by outcome
 """
 
 import os
@@ -24,3 +26,9 @@ TAX_CALCULATION_TOTAL = Counter(
     "Total number of tax calculations",
     ["provider", "success"],
 )
+
+TAX_CALCULATION_CACHE_TOTAL = Counter(
+    "polar_tax_calculation_cache_total",
+    "Total number of tax calculation cache lookups",
+    ["outcome"],
+)
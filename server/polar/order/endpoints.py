@@ -13,9 +13,16 @@ from polar.authz.service import (
 )
 from polar.customer.schemas.customer import CustomerID, ExternalCustomerID
 from polar.exceptions import ResourceNotFound
+from polar.export.schemas import ExportJob, ExportJobType
+from polar.export.service import export_job as export_job_service
 from polar.kit.csv import CSVStreamingResponse
 from polar.kit.metadata import MetadataQuery, get_metadata_query_openapi_schema
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.pagination import (
+    CursorPaginationParamsQuery,
+    ListResource,
+    ListResourceWithCursorPagination,
+    PaginationParamsQuery,
+)
 from polar.kit.schemas import MultipleQueryFilter
 from polar.models import Order
 from polar.models.order import OrderStatus
@@ -30,16 +37,19 @@ from polar.postgres import (
     get_db_session,
 )
 from polar.product.schemas import ProductID
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 from polar.subscription.schemas import SubscriptionID
 
 from . import auth, sorting
 from .export import (
     OrderExportColumn,
+    OrderExportParameters,
     OrderExportTimezone,
     generate_csv,
     get_filename,
 )
+from .repository import OrderRepository
 from .schemas import Order as OrderSchema
 from .schemas import (
     OrderCreate,
@@ -93,12 +103,14 @@ GET_INVOICE_MINTLIFY_CONTENT = dedent(
 @router.get(
     "/",
     summary="List Orders",
-    response_model=ListResource[OrderSchema],
+    response_model=ListResource[OrderSchema]
+    | ListResourceWithCursorPagination[OrderSchema],
     openapi_extra={"parameters": [get_metadata_query_openapi_schema()]},
 )
 async def list(
     auth_subject: auth.OrdersRead,
     pagination: PaginationParamsQuery,
+    cursor_pagination: CursorPaginationParamsQuery,
     sorting: sorting.ListSorting,
     metadata: MetadataQuery,
     organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
@@ -146,9 +158,9 @@ async def list(
         description="Only include orders created before this date",
     ),
     session: AsyncReadSession = Depends(get_db_read_session),
-) -> ListResource[OrderSchema]:
+) -> ListResource[OrderSchema] | ListResourceWithCursorPagination[OrderSchema]:
     """List orders."""
-    results, count = await order_service.list(
+    statement = await order_service.get_list_statement(
         session,
         auth_subject,
         organization_id=organization_id,
@@ -163,14 +175,31 @@ async def list(
         created_after=created_after,
         created_before=created_before,
         metadata=metadata,
-        pagination=pagination,
         sorting=sorting,
     )
+    repository = OrderRepository.from_session(session)
+
+    if cursor_pagination is not None:
+        results, next_cursor = await repository.paginate_keyset(
+            statement,
+            keys=repository.get_keyset_keys(sorting),
+            pagination=cursor_pagination,
+        )
+        return ListResourceWithCursorPagination.from_results(
+            [OrderSchema.model_validate(result) for result in results],
+            next_cursor is not None,
+            next_cursor,
+        )
+
+    results, total_count = await repository.paginate_estimated(
+        statement, limit=pagination.limit, page=pagination.page
+    )
 
     return ListResource.from_paginated_results(
         [OrderSchema.model_validate(result) for result in results],
-        count,
+        total_count.count,
         pagination,
+        total_count_estimated=total_count.estimated,
     )
 
 
@@ -230,6 +259,37 @@ async def export(
     )
 
 
+@router.post(
+    "/export",
+    summary="Create Orders Export Job",
+    response_model=ExportJob,
+    status_code=202,
+    tags=[APITag.private],
+)
+async def create_export_job(
+    parameters: OrderExportParameters,
+    auth_subject: auth.OrdersRead,
+    redis: Redis = Depends(get_redis),
+) -> ExportJob:
+    """
+    Export orders as a compressed CSV file, generated in the background.
+
+    Progress is reported on the event stream, and the download URL is available
+    from the export job once it has succeeded.
+    """
+    return await export_job_service.create(
+        redis,
+        auth_subject,
+        ExportJobType.orders,
+        filename=get_filename(
+            parameters.created_after,
+            parameters.created_before,
+            ZoneInfo(parameters.timezone),
+        ),
+        parameters=parameters,
+    )
+
+
 @router.get(
     "/{id}",
     summary="Get Order",
@@ -10,6 +10,7 @@ from polar.auth.models import AuthSubject, Organization, User
 from polar.kit.csv import IterableCSVWriter
 from polar.kit.db.postgres import AsyncReadSession
 from polar.kit.pagination import PaginationParams
+from polar.kit.schemas import Schema
 from polar.models import Order
 from polar.models.order import OrderBillingReasonInternal, OrderStatus
 from polar.organization.schemas import OrganizationID
@@ -80,6 +81,18 @@ def _validate_timezone(value: str) -> str:
 OrderExportTimezone = Annotated[str, AfterValidator(_validate_timezone)]
 
 
+class OrderExportParameters(Schema):
+    """Parameters of an orders export, as stored on a background export job."""
+
+    organization_id: list[OrganizationID] | None = None
+    product_id: list[ProductID] | None = None
+    status: list[OrderStatus] | None = None
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    timezone: OrderExportTimezone = "UTC"
+    columns: list[OrderExportColumn] | None = None
+
+
 def _row(order: Order, tz: ZoneInfo) -> dict[OrderExportColumn, str | float | None]:
     return {
         OrderExportColumn.email: order.customer.email,
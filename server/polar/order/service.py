@@ -8,7 +8,7 @@ from urllib.parse import urlencode
 
 import stripe as stripe_lib
 import structlog
-from sqlalchemy import func, select
+from sqlalchemy import Select, func, select
 from sqlalchemy.orm import contains_eager, joinedload
 
 from polar.account.repository import AccountRepository
@@ -390,6 +390,49 @@ class OrderService:
             (OrderSortProperty.created_at, True),
         ),
     ) -> tuple[Sequence[Order], int]:
+        repository = OrderRepository.from_session(session)
+        statement = await self.get_list_statement(
+            session,
+            auth_subject,
+            organization_id=organization_id,
+            product_id=product_id,
+            product_billing_type=product_billing_type,
+            discount_id=discount_id,
+            customer_id=customer_id,
+            external_customer_id=external_customer_id,
+            checkout_id=checkout_id,
+            subscription_id=subscription_id,
+            status=status,
+            created_after=created_after,
+            created_before=created_before,
+            metadata=metadata,
+            sorting=sorting,
+        )
+        return await repository.paginate(
+            statement, limit=pagination.limit, page=pagination.page
+        )
+
+    async def get_list_statement(
+        self,
+        session: AsyncReadSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        organization_id: Sequence[uuid.UUID] | None = None,
+        product_id: Sequence[uuid.UUID] | None = None,
+        product_billing_type: Sequence[ProductBillingType] | None = None,
+        discount_id: Sequence[uuid.UUID] | None = None,
+        customer_id: Sequence[uuid.UUID] | None = None,
+        external_customer_id: Sequence[str] | None = None,
+        checkout_id: Sequence[uuid.UUID] | None = None,
+        subscription_id: Sequence[uuid.UUID] | None = None,
+        status: Sequence[OrderStatus] | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        metadata: MetadataQuery | None = None,
+        sorting: Sequence[Sorting[OrderSortProperty]] = (
+            (OrderSortProperty.created_at, True),
+        ),
+    ) -> Select[tuple[Order]]:
         repository = OrderRepository.from_session(session)
         accessible_org_ids = await get_accessible_org_ids(
             session, auth_subject, permission=OrganizationPermission.sales_read
@@ -456,9 +499,7 @@ class OrderService:
 
         statement = repository.apply_sorting(statement, sorting)
 
-        return await repository.paginate(
-            statement, limit=pagination.limit, page=pagination.page
-        )
+        return statement
 
     async def get(
         self,
@@ -0,0 +1,155 @@
+"""
+In-process cache of the products loaded by checkouts.
+
+Open checkouts are fetched and updated many times while the customer fills them,
+and each time they need the same product graph: prices, benefits, medias and
+custom fields. Loaded graphs are kept detached from any session, and merged into
+the session of the requests needing them, without hitting the database.
+
+Entries are versioned with a token stored in Redis. Updating a product, or a
+benefit, custom field or media file attached to it, deletes its token once the
+unit of work is committed, so every process stops serving the previous graph.
+"""
+
+import uuid
+from collections.abc import Iterable, Sequence
+
+import structlog
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession as _AsyncSession
+from sqlalchemy.orm import selectinload
+
+from polar.config import settings
+from polar.kit.db.postgres import AsyncReadSession, AsyncSession
+from polar.kit.ttl_cache import TTLCache
+from polar.logging import Logger
+from polar.models import Product
+from polar.observability import CHECKOUT_PRODUCT_CACHE_TOTAL
+from polar.redis import Redis
+from polar.worker import invalidate_cache_keys
+
+from .repository import ProductRepository
+
+log: Logger = structlog.get_logger()
+
+_VERSION_KEY_PREFIX = "product:cache_version"
+_VERSION_KEY_TTL_SECONDS = 60 * 60 * 24
+
+
+def get_version_key(product_id: uuid.UUID) -> str:
+    return f"{_VERSION_KEY_PREFIX}:{product_id}"
+
+
+def invalidate_cached_product(product_id: uuid.UUID) -> None:
+    """Evict the product from the cache of every process, once committed."""
+    invalidate_cache_keys(get_version_key(product_id))
+
+
+def invalidate_cached_products(product_ids: Iterable[uuid.UUID]) -> None:
+    """Evict the products from the cache of every process, once committed."""
+    invalidate_cache_keys(*(get_version_key(product_id) for product_id in product_ids))
+
+
+class ProductCache:
+    def __init__(self, maxsize: int) -> None:
+        self._cache = TTLCache[tuple[uuid.UUID, str], Product](maxsize)
+
+    async def get(
+        self, session: AsyncSession, redis: Redis, product_ids: Sequence[uuid.UUID]
+    ) -> dict[uuid.UUID, Product]:
+        """
+        Get products with their prices, benefits, medias and custom fields loaded.
+
+        The products are attached to the session. Their organization isn't loaded:
+        it's up to the caller to set it, as it's usually already at hand.
+        """
+        if not product_ids:
+            return {}
+
+        versions = await self._get_versions(redis, product_ids)
+
+        products: dict[uuid.UUID, Product] = {}
+        missing_ids: list[uuid.UUID] = []
+        for product_id in product_ids:
+            version = versions.get(product_id)
+            cached = self._cache.get((product_id, version)) if version else None
+            if cached is None:
+                missing_ids.append(product_id)
+            else:
+                products[product_id] = cached
+        CHECKOUT_PRODUCT_CACHE_TOTAL.labels(outcome="hit").inc(len(products))
+        CHECKOUT_PRODUCT_CACHE_TOTAL.labels(outcome="miss").inc(len(missing_ids))
+
+        if missing_ids:
+            for product in await self._load(session, missing_ids):
+                version = versions.get(product.id)
+                if version is not None:
+                    self._cache.set(
+                        (product.id, version),
+                        product,
+                        settings.CHECKOUT_PRODUCT_CACHE_TTL_SECONDS,
+                    )
+                products[product.id] = product
+
+        # Cached instances are shared between requests: never hand them out,
+        # but copies attached to the session.
+        return {
+            product_id: await session.merge(product, load=False)
+            for product_id, product in products.items()
+        }
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    async def _load(
+        self, session: AsyncSession, product_ids: Sequence[uuid.UUID]
+    ) -> Sequence[Product]:
+        # Load them in a separate session sharing the same transaction:
+        # its instances are detached once it's closed, and unaffected by
+        # whatever the main session already holds or does next.
+        async with _AsyncSession(
+            bind=await session.connection(), expire_on_commit=False
+        ) as load_session:
+            repository = ProductRepository.from_session(AsyncReadSession(load_session))
+            return await repository.get_all_by_ids(
+                product_ids,
+                options=(
+                    selectinload(Product.product_medias),
+                    selectinload(Product.attached_custom_fields),
+                ),
+            )
+
+    async def _get_versions(
+        self, redis: Redis, product_ids: Sequence[uuid.UUID]
+    ) -> dict[uuid.UUID, str]:
+        try:
+            async with redis.pipeline(transaction=False) as pipeline:
+                for product_id in product_ids:
+                    key = get_version_key(product_id)
+                    pipeline.set(
+                        key, uuid.uuid4().hex, nx=True, ex=_VERSION_KEY_TTL_SECONDS
+                    )
+                    pipeline.get(key)
+                results = await pipeline.execute()
+        except RedisError as e:
+            log.warning("product.cache.get_versions_failed", error=str(e))
+            return {}
+
+        versions: dict[uuid.UUID, str] = {}
+        for product_id, version in zip(product_ids, results[1::2], strict=True):
+            if version is not None:
+                versions[product_id] = (
+                    version.decode() if isinstance(version, bytes) else version
+                )
+        return versions
+
+
+product_cache = ProductCache(settings.CHECKOUT_PRODUCT_CACHE_MAX_SIZE)
+
+
+__all__ = [
+    "ProductCache",
+    "invalidate_cached_product",
+    "invalidate_cached_products",
+    "product_cache",
+]
@@ -17,6 +17,9 @@ from polar.kit.repository import (
 from polar.models import (
     CheckoutProduct,
     Product,
+    ProductBenefit,
+    ProductCustomField,
+    ProductMedia,
     ProductPrice,
     ProductPriceCustom,
     ProductPriceFixed,
@@ -49,6 +52,17 @@ class ProductRepository(
         )
         return await self.get_one_or_none(statement)
 
+    async def get_all_by_ids(
+        self, ids: Sequence[UUID], *, options: Options = ()
+    ) -> Sequence[Product]:
+        """Get products by ID, including deleted ones: they may still be referenced."""
+        statement = (
+            self.get_base_statement(include_deleted=True)
+            .where(Product.id.in_(ids))
+            .options(*options)
+        )
+        return await self.get_all(statement)
+
     async def get_price_currencies(self, organization_id: UUID) -> set[str]:
         """Distinct currencies the organization's active prices are set in."""
         statement = (
@@ -76,6 +90,27 @@ class ProductRepository(
         result = await self.session.execute(statement)
         return {row[0] for row in result.all()}
 
+    async def get_ids_by_benefit(self, benefit_id: UUID) -> Sequence[UUID]:
+        statement = select(ProductBenefit.product_id).where(
+            ProductBenefit.benefit_id == benefit_id
+        )
+        result = await self.session.execute(statement)
+        return result.scalars().all()
+
+    async def get_ids_by_custom_field(self, custom_field_id: UUID) -> Sequence[UUID]:
+        statement = select(ProductCustomField.product_id).where(
+            ProductCustomField.custom_field_id == custom_field_id
+        )
+        result = await self.session.execute(statement)
+        return result.scalars().all()
+
+    async def get_ids_by_media_file(self, file_id: UUID) -> Sequence[UUID]:
+        statement = select(ProductMedia.product_id).where(
+            ProductMedia.file_id == file_id
+        )
+        result = await self.session.execute(statement)
+        return result.scalars().all()
+
     async def get_all_by_organization(
         self,
         organization_id: UUID,
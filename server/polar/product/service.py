@@ -45,6 +45,7 @@ from polar.models.webhook_endpoint import WebhookEventType
 from polar.organization.repository import OrganizationRepository
 from polar.organization.resolver import get_payload_organization
 from polar.organization_review.schemas import ReviewContext
+from polar.product.cache import invalidate_cached_product
 from polar.product.guard import (
     is_custom_price,
     is_fixed_price,
@@ -862,6 +863,7 @@ class ProductService:
     async def _after_product_updated(
         self, session: AsyncSession, product: Product
     ) -> None:
+        invalidate_cached_product(product.id)
         await self._send_webhook(session, product, WebhookEventType.product_updated)
 
     def _enqueue_organization_review(self, product: Product) -> None:
@@ -11,9 +11,16 @@ from polar.authz.service import assert_resource_permission
 from polar.customer.schemas.customer import CustomerID, ExternalCustomerID
 from polar.discount.schemas import DiscountID
 from polar.exceptions import ResourceNotFound
+from polar.export.schemas import ExportJob, ExportJobType
+from polar.export.service import export_job as export_job_service
 from polar.kit.csv import CSVStreamingResponse
 from polar.kit.metadata import MetadataQuery, get_metadata_query_openapi_schema
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.pagination import (
+    CursorPaginationParamsQuery,
+    ListResource,
+    ListResourceWithCursorPagination,
+    PaginationParamsQuery,
+)
 from polar.kit.schemas import MultipleQueryFilter
 from polar.models import Subscription
 from polar.models.subscription import CustomerCancellationReason, SubscriptionStatus
@@ -27,15 +34,18 @@ from polar.postgres import (
     get_db_session,
 )
 from polar.product.schemas import ProductID
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth, sorting
 from .export import (
     SubscriptionExportColumn,
+    SubscriptionExportParameters,
     SubscriptionExportTimezone,
     generate_csv,
     get_filename,
 )
+from .repository import SubscriptionRepository
 from .schemas import Subscription as SubscriptionSchema
 from .schemas import (
     SubscriptionCancelPreview,
@@ -68,13 +78,15 @@ SubscriptionNotFound = {
 
 @router.get(
     "/",
-    response_model=ListResource[SubscriptionSchema],
+    response_model=ListResource[SubscriptionSchema]
+    | ListResourceWithCursorPagination[SubscriptionSchema],
     summary="List Subscriptions",
     openapi_extra={"parameters": [get_metadata_query_openapi_schema()]},
 )
 async def list(
     auth_subject: auth.SubscriptionsRead,
     pagination: PaginationParamsQuery,
+    cursor_pagination: CursorPaginationParamsQuery,
     sorting: sorting.ListSorting,
     metadata: MetadataQuery,
     organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
@@ -129,9 +141,12 @@ async def list(
         description="Only include subscriptions started before this date.",
     ),
     session: AsyncReadSession = Depends(get_db_read_session),
-) -> ListResource[SubscriptionSchema]:
+) -> (
+    ListResource[SubscriptionSchema]
+    | ListResourceWithCursorPagination[SubscriptionSchema]
+):
     """List subscriptions."""
-    results, count = await subscription_service.list(
+    statement = await subscription_service.get_list_statement(
         session,
         auth_subject,
         organization_id=organization_id,
@@ -148,14 +163,31 @@ async def list(
         started_after=started_after,
         started_before=started_before,
         metadata=metadata,
-        pagination=pagination,
         sorting=sorting,
     )
+    repository = SubscriptionRepository.from_session(session)
+
+    if cursor_pagination is not None:
+        results, next_cursor = await repository.paginate_keyset(
+            statement,
+            keys=repository.get_keyset_keys(sorting),
+            pagination=cursor_pagination,
+        )
+        return ListResourceWithCursorPagination.from_results(
+            [SubscriptionSchema.model_validate(result) for result in results],
+            next_cursor is not None,
+            next_cursor,
+        )
+
+    results, total_count = await repository.paginate_estimated(
+        statement, limit=pagination.limit, page=pagination.page
+    )
 
     return ListResource.from_paginated_results(
         [SubscriptionSchema.model_validate(result) for result in results],
-        count,
+        total_count.count,
         pagination,
+        total_count_estimated=total_count.estimated,
     )
 
 
@@ -224,6 +256,37 @@ async def export(
     )
 
 
+@router.post(
+    "/export",
+    summary="Create Subscriptions Export Job",
+    response_model=ExportJob,
+    status_code=202,
+    tags=[APITag.private],
+)
+async def create_export_job(
+    parameters: SubscriptionExportParameters,
+    auth_subject: auth.SubscriptionsRead,
+    redis: Redis = Depends(get_redis),
+) -> ExportJob:
+    """
+    Export subscriptions as a compressed CSV file, generated in the background.
+
+    Progress is reported on the event stream, and the download URL is available
+    from the export job once it has succeeded.
+    """
+    return await export_job_service.create(
+        redis,
+        auth_subject,
+        ExportJobType.subscriptions,
+        filename=get_filename(
+            parameters.started_after,
+            parameters.started_before,
+            ZoneInfo(parameters.timezone),
+        ),
+        parameters=parameters,
+    )
+
+
 @router.get(
     "/{id}",
     summary="Get Subscription",
@@ -10,6 +10,7 @@ from polar.auth.models import AuthSubject, Organization, User
 from polar.kit.csv import IterableCSVWriter
 from polar.kit.db.postgres import AsyncReadSession
 from polar.kit.pagination import PaginationParams
+from polar.kit.schemas import Schema
 from polar.models import Subscription
 from polar.models.subscription import SubscriptionStatus
 from polar.organization.schemas import OrganizationID
@@ -90,6 +91,19 @@ def _validate_timezone(value: str) -> str:
 SubscriptionExportTimezone = Annotated[str, AfterValidator(_validate_timezone)]
 
 
+class SubscriptionExportParameters(Schema):
+    """Parameters of a subscriptions export, as stored on a background export job."""
+
+    organization_id: list[OrganizationID] | None = None
+    product_id: list[ProductID] | None = None
+    status: list[SubscriptionStatus] | None = None
+    cancel_at_period_end: bool | None = None
+    started_after: datetime | None = None
+    started_before: datetime | None = None
+    timezone: SubscriptionExportTimezone = "UTC"
+    columns: list[SubscriptionExportColumn] | None = None
+
+
 def _datetime(value: datetime | None, tz: ZoneInfo) -> str | None:
     return value.astimezone(tz).isoformat() if value is not None else None
 
@@ -1,5 +1,6 @@
 import datetime
 import functools
+import uuid
 from collections.abc import Callable
 from typing import ClassVar, cast
 
@@ -11,12 +12,20 @@ from apscheduler.jobstores.base import BaseJobStore
 from apscheduler.triggers.date import DateTrigger
 from sqlalchemy import ColumnElement, Select, func, select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import ReturningUpdate
 
+from polar.config import settings
 from polar.kit.utils import utc_now
 from polar.logging import Logger
 from polar.models import Customer, Organization, Subscription
 from polar.models.subscription import SubscriptionStatus
+from polar.observability import (
+    SUBSCRIPTION_SCHEDULER_CAPPED_TICKS_TOTAL,
+    SUBSCRIPTION_SCHEDULER_CLAIM_LAG,
+    SUBSCRIPTION_SCHEDULER_CLAIMED_TOTAL,
+)
 from polar.postgres import create_sync_engine
+from polar.worker import bulk_send
 
 log: Logger = structlog.get_logger()
 
@@ -52,8 +61,8 @@ def _report_failures[**P, R](method: Callable[P, R]) -> Callable[P, R]:
 
 
 class _SubscriptionScheduleJobStore(BaseJobStore):
-    """APScheduler job store that turns subscription rows into date-triggered jobs,
-    dispatched under an atomic ``scheduler_locked_at`` claim."""
+    """APScheduler job store that dispatches due subscription rows under an atomic
+    ``scheduler_locked_at`` claim."""
 
     job_id_prefix: ClassVar[str]
     actor_name: ClassVar[str]
@@ -75,10 +84,82 @@ class _SubscriptionScheduleJobStore(BaseJobStore):
 
     @_report_failures
     def get_due_jobs(self, now: datetime.datetime) -> list[Job]:
-        statement = self.scheduling_statement().where(self.trigger_column <= now)
-        jobs = self._list_jobs_from_statement(statement)
-        log.debug("Due jobs", count=len(jobs), store=self.job_id_prefix)
-        return jobs
+        """Claim and dispatch due subscriptions in bulk.
+
+        Jobs are dispatched here, so nothing is handed back to APScheduler. At most
+        ``SUBSCRIPTION_SCHEDULER_MAX_CLAIMS_PER_TICK`` subscriptions are claimed
+        per tick: when more are due, ``get_next_run_time`` is already in the
+        past and the scheduler wakes up again immediately.
+        """
+        batch_size = settings.SUBSCRIPTION_SCHEDULER_CLAIM_BATCH_SIZE
+        max_claims = settings.SUBSCRIPTION_SCHEDULER_MAX_CLAIMS_PER_TICK
+        claimed = 0
+        while claimed < max_claims:
+            count = self._claim_and_dispatch(now, min(batch_size, max_claims - claimed))
+            claimed += count
+            if count < batch_size:
+                break
+        else:
+            SUBSCRIPTION_SCHEDULER_CAPPED_TICKS_TOTAL.labels(
+                actor=self.actor_name
+            ).inc()
+        log.debug("Claimed due jobs", count=claimed, store=self.job_id_prefix)
+        return []
+
+    def claim_statement(
+        self, now: datetime.datetime, limit: int
+    ) -> ReturningUpdate[tuple[uuid.UUID, datetime.datetime | None]]:
+        """Claim up to ``limit`` due subscriptions, returning their ID and trigger.
+
+        Rows locked by a concurrent scheduler are skipped rather than waited on,
+        so several schedulers can drain the same backlog without overlapping.
+        """
+        due_statement = (
+            self.scheduling_statement()
+            .where(self.trigger_column <= now)
+            .with_only_columns(Subscription.id)
+            .limit(limit)
+            .with_for_update(of=Subscription, skip_locked=True)
+        )
+        return (
+            update(Subscription)
+            .where(
+                Subscription.id.in_(due_statement),
+                Subscription.scheduler_locked_at.is_(None),
+            )
+            .values(scheduler_locked_at=utc_now())
+            .returning(Subscription.id, self.trigger_column)
+        )
+
+    def _claim_and_dispatch(self, now: datetime.datetime, limit: int) -> int:
+        statement = self.claim_statement(now, limit)
+        with self.engine.begin() as connection:
+            claimed = connection.execute(statement).all()
+            if not claimed:
+                return 0
+            # Dispatch before committing: if it fails, the claims are rolled back
+            # and retried on the next tick instead of staying locked forever.
+            # Workers can't act on the claim early, since they lock the row
+            # we're holding before reading it.
+            bulk_send(
+                dramatiq.get_broker(),
+                self.actor_name,
+                [
+                    {"subscription_id": str(subscription_id)}
+                    for subscription_id, _ in claimed
+                ],
+            )
+
+        claimed_at = utc_now()
+        SUBSCRIPTION_SCHEDULER_CLAIMED_TOTAL.labels(actor=self.actor_name).inc(
+            len(claimed)
+        )
+        for _, run_date in claimed:
+            if run_date is not None:
+                SUBSCRIPTION_SCHEDULER_CLAIM_LAG.labels(actor=self.actor_name).observe(
+                    (claimed_at - run_date).total_seconds()
+                )
+        return len(claimed)
 
     @_report_failures
     def get_next_run_time(self) -> datetime.datetime | None:
@@ -100,23 +181,8 @@ class _SubscriptionScheduleJobStore(BaseJobStore):
         log.debug("All jobs", count=len(jobs), store=self.job_id_prefix)
         return jobs
 
-    @_report_failures
     def remove_job(self, job_id: str) -> None:
-        # Conditional UPDATE dedupes concurrent schedulers: losers see 0 rows.
-        subscription_id = job_id.split(":")[-1]
-        statement = (
-            update(Subscription)
-            .where(
-                Subscription.id == subscription_id,
-                Subscription.scheduler_locked_at.is_(None),
-            )
-            .values(scheduler_locked_at=utc_now())
-        )
-        with self.engine.begin() as connection:
-            if connection.execute(statement).rowcount == 0:
-                return
-        actor = dramatiq.get_broker().get_actor(self.actor_name)
-        actor.send(subscription_id=subscription_id)
+        raise RuntimeError("This job store does not support managing jobs directly.")
 
     def add_job(self, job: Job) -> None:
         raise RuntimeError("This job store does not support managing jobs directly.")
@@ -8,7 +8,7 @@ from typing import Any, Literal, Self, Unpack, cast, overload
 from urllib.parse import urlencode
 
 import structlog
-from sqlalchemy import select
+from sqlalchemy import Select, select
 from sqlalchemy.orm import contains_eager, joinedload, selectinload
 
 from polar.auth.models import AuthSubject
@@ -445,6 +445,54 @@ class SubscriptionService:
             (SubscriptionSortProperty.started_at, True),
         ),
     ) -> tuple[Sequence[Subscription], int]:
+        repository = SubscriptionRepository.from_session(session)
+        statement = await self.get_list_statement(
+            session,
+            auth_subject,
+            organization_id=organization_id,
+            product_id=product_id,
+            customer_id=customer_id,
+            external_customer_id=external_customer_id,
+            discount_id=discount_id,
+            active=active,
+            status=status,
+            cancel_at_period_end=cancel_at_period_end,
+            customer_cancellation_reason=customer_cancellation_reason,
+            canceled_at_after=canceled_at_after,
+            canceled_at_before=canceled_at_before,
+            started_after=started_after,
+            started_before=started_before,
+            metadata=metadata,
+            sorting=sorting,
+        )
+        return await repository.paginate(
+            statement, limit=pagination.limit, page=pagination.page
+        )
+
+    async def get_list_statement(
+        self,
+        session: AsyncReadSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        organization_id: Sequence[uuid.UUID] | None = None,
+        product_id: Sequence[uuid.UUID] | None = None,
+        customer_id: Sequence[uuid.UUID] | None = None,
+        external_customer_id: Sequence[str] | None = None,
+        discount_id: Sequence[uuid.UUID] | None = None,
+        active: bool | None = None,
+        status: Sequence[SubscriptionStatus] | None = None,
+        cancel_at_period_end: bool | None = None,
+        customer_cancellation_reason: Sequence[CustomerCancellationReason]
+        | None = None,
+        canceled_at_after: datetime | None = None,
+        canceled_at_before: datetime | None = None,
+        started_after: datetime | None = None,
+        started_before: datetime | None = None,
+        metadata: MetadataQuery | None = None,
+        sorting: Sequence[Sorting[SubscriptionSortProperty]] = (
+            (SubscriptionSortProperty.started_at, True),
+        ),
+    ) -> Select[tuple[Subscription]]:
         repository = SubscriptionRepository.from_session(session)
         statement = (
             repository.get_readable_statement(auth_subject)
@@ -520,9 +568,7 @@ class SubscriptionService:
             joinedload(Subscription.pending_update),
         )
 
-        return await repository.paginate(
-            statement, limit=pagination.limit, page=pagination.page
-        )
+        return statement
 
     async def get(
         self,
@@ -12,6 +12,7 @@ from polar.email import tasks as email
 from polar.email_update import tasks as email_update
 from polar.event import tasks as event
 from polar.eventstream import tasks as eventstream
+from polar.export import tasks as export
 from polar.external_event import tasks as external_event
 from polar.feedback import tasks as feedback
 from polar.file import tasks as file
@@ -60,6 +61,7 @@ __all__ = [
     "email_update",
     "event",
     "eventstream",
+    "export",
     "external_event",
     "feedback",
     "file",
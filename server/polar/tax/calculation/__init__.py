@@ -1,5 +1,7 @@
+import asyncio
 import uuid
 from datetime import datetime
+from typing import TypedDict
 
 import structlog
 
@@ -8,7 +10,7 @@ from polar.enums import TaxBehavior, TaxBehaviorOption, TaxProcessor
 from polar.kit.address import Address
 from polar.kit.utils import utc_now
 from polar.logging import Logger
-from polar.observability import TAX_CALCULATION_TOTAL
+from polar.observability import TAX_CALCULATION_CACHE_TOTAL, TAX_CALCULATION_TOTAL
 
 from ..tax_id import TaxID
 from .base import (
@@ -24,6 +26,7 @@ from .base import (
     TaxRevertError,
     TaxServiceProtocol,
 )
+from .cache import TaxCalculationCache, build_cache_key
 from .numeral import numeral_tax_service
 from .stripe import stripe_tax_service
 
@@ -64,7 +67,21 @@ def get_tax_behavior_from_option(
 _BACKFILL_REFERENCE_PREFIX = "backfill_"
 
 
+class _CalculationKwargs(TypedDict):
+    identifier: uuid.UUID | str
+    currency: str
+    amount: int
+    tax_behavior: TaxBehavior
+    tax_code: TaxCode
+    address: Address
+    tax_ids: list[TaxID]
+    customer_exempt: bool
+
+
 class TaxCalculationService:
+    def __init__(self) -> None:
+        self.cache = TaxCalculationCache(settings.TAX_CALCULATION_CACHE_MAX_SIZE)
+
     async def calculate(
         self,
         identifier: uuid.UUID | str,
@@ -82,6 +99,13 @@ class TaxCalculationService:
         processor fails with a technical error, it will try the next one until all
         processors have been tried.
 
+        When `TAX_CALCULATION_HEDGE_DELAY_SECONDS` is set, the next processor is
+        also started if the current one hasn't answered after that delay, and the
+        first successful calculation wins.
+
+        Successful calculations are cached for a short time, so repeated
+        calculations with the same inputs don't hit the processors again.
+
         Args:
             identifier: Unique identifier for this tax calculation.
             currency: The currency code.
@@ -98,37 +122,114 @@ class TaxCalculationService:
         Raises:
             TaxCalculationTechnicalError: If all tax processors fail to calculate tax.
         """
+        calculation_kwargs: _CalculationKwargs = {
+            "identifier": identifier,
+            "currency": currency,
+            "amount": amount,
+            "tax_behavior": get_tax_behavior_from_option(tax_behavior, address),
+            "tax_code": tax_code,
+            "address": address,
+            "tax_ids": tax_ids,
+            "customer_exempt": customer_exempt,
+        }
+
+        cache_key = build_cache_key(**calculation_kwargs)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            TAX_CALCULATION_CACHE_TOTAL.labels(outcome="hit").inc()
+            return cached
+        TAX_CALCULATION_CACHE_TOTAL.labels(outcome="miss").inc()
+
+        hedge_delay = settings.TAX_CALCULATION_HEDGE_DELAY_SECONDS
+        if hedge_delay is not None and len(settings.TAX_PROCESSORS) > 1:
+            result, processor = await self._calculate_hedged(
+                calculation_kwargs, hedge_delay
+            )
+        else:
+            result, processor = await self._calculate_sequential(calculation_kwargs)
+
+        self.cache.set(cache_key, result, processor)
+        return result, processor
+
+    async def _calculate_sequential(
+        self, calculation_kwargs: _CalculationKwargs
+    ) -> tuple[TaxCalculation, TaxProcessor]:
         for processor in settings.TAX_PROCESSORS:
-            log.debug("Attempting tax calculation with processor", processor=processor)
-            tax_processor_service = _get_tax_service(processor)
             try:
-                result = await tax_processor_service.calculate(
-                    identifier=identifier,
-                    currency=currency,
-                    amount=amount,
-                    tax_behavior=get_tax_behavior_from_option(tax_behavior, address),
-                    tax_code=tax_code,
-                    address=address,
-                    tax_ids=tax_ids,
-                    customer_exempt=customer_exempt,
+                result = await self._calculate_with_processor(
+                    processor, calculation_kwargs
                 )
-                TAX_CALCULATION_TOTAL.labels(
-                    provider=processor.value, success="true"
-                ).inc()
                 return result, processor
-            except TaxCalculationTechnicalError as e:
-                log.warning(
-                    "Tax calculation failed with technical error, trying next processor",
-                    processor=processor,
-                    error=str(e),
-                )
-                TAX_CALCULATION_TOTAL.labels(
-                    provider=processor.value, success="false"
-                ).inc()
+            except TaxCalculationTechnicalError:
                 continue
 
         raise TaxCalculationTechnicalError("All tax processors failed to calculate tax")
 
+    async def _calculate_hedged(
+        self, calculation_kwargs: _CalculationKwargs, hedge_delay: float
+    ) -> tuple[TaxCalculation, TaxProcessor]:
+        processors = iter(settings.TAX_PROCESSORS)
+        pending: dict[asyncio.Task[TaxCalculation], TaxProcessor] = {}
+
+        def _start_next() -> bool:
+            processor = next(processors, None)
+            if processor is None:
+                return False
+            task = asyncio.create_task(
+                self._calculate_with_processor(processor, calculation_kwargs)
+            )
+            pending[task] = processor
+            return True
+
+        exhausted = not _start_next()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=None if exhausted else hedge_delay,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    log.info(
+                        "Tax calculation is slow, hedging with next processor",
+                        processors=list(pending.values()),
+                    )
+                    exhausted = not _start_next()
+                    continue
+                for task in done:
+                    processor = pending.pop(task)
+                    try:
+                        # Logical errors are definitive: let them propagate
+                        return task.result(), processor
+                    except TaxCalculationTechnicalError:
+                        exhausted = not _start_next()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        raise TaxCalculationTechnicalError("All tax processors failed to calculate tax")
+
+    async def _calculate_with_processor(
+        self, processor: TaxProcessor, calculation_kwargs: _CalculationKwargs
+    ) -> TaxCalculation:
+        log.debug("Attempting tax calculation with processor", processor=processor)
+        tax_processor_service = _get_tax_service(processor)
+        try:
+            result = await tax_processor_service.calculate(**calculation_kwargs)
+        except TaxCalculationTechnicalError as e:
+            log.warning(
+                "Tax calculation failed with technical error, trying next processor",
+                processor=processor,
+                error=str(e),
+            )
+            TAX_CALCULATION_TOTAL.labels(
+                provider=processor.value, success="false"
+            ).inc()
+            raise
+        TAX_CALCULATION_TOTAL.labels(provider=processor.value, success="true").inc()
+        return result
+
     async def record(
         self,
         calculation_processor: TaxProcessor,
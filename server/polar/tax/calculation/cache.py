@@ -0,0 +1,96 @@
+import copy
+import hashlib
+import json
+import uuid
+
+from polar.config import settings
+from polar.enums import TaxBehavior, TaxProcessor
+from polar.kit.address import Address
+from polar.kit.ttl_cache import TTLCache
+
+from ..tax_id import TaxID
+from .base import TaxCalculation, TaxCode
+
+
+def _normalize_address(address: Address) -> dict[str, str | None]:
+    normalized: dict[str, str | None] = {}
+    for field, value in address.model_dump(mode="json").items():
+        normalized[field] = (
+            " ".join(value.split()).casefold() if isinstance(value, str) else value
+        )
+    return normalized
+
+
+def _normalize_tax_ids(tax_ids: list[TaxID]) -> list[tuple[str, str]]:
+    return sorted(
+        ("".join(value.split()).upper(), str(tax_id_format))
+        for value, tax_id_format in tax_ids
+    )
+
+
+def build_cache_key(
+    *,
+    identifier: uuid.UUID | str,
+    currency: str,
+    amount: int,
+    tax_behavior: TaxBehavior,
+    tax_code: TaxCode,
+    address: Address,
+    tax_ids: list[TaxID],
+    customer_exempt: bool,
+) -> str:
+    """
+    Build the cache key of a tax calculation from its normalized inputs.
+
+    The identifier is part of the key: each calculation is later recorded
+    against its own reference, so they're never shared between checkouts
+    or orders.
+    """
+    payload = {
+        "identifier": str(identifier),
+        "currency": currency.lower(),
+        "amount": amount,
+        "tax_behavior": tax_behavior.value,
+        "tax_code": tax_code.value,
+        "address": _normalize_address(address),
+        "tax_ids": _normalize_tax_ids(tax_ids),
+        "customer_exempt": customer_exempt,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class TaxCalculationCache:
+    """
+    Short-lived cache of successful tax calculations.
+
+    Entries keep the calculation's `processor_id` along with the processor which
+    made it, so a cached result can be recorded later exactly like a fresh one.
+    The TTL is kept well below the processors' calculation expiry for that reason.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._cache = TTLCache[str, tuple[TaxCalculation, TaxProcessor]](maxsize)
+
+    def get(self, key: str) -> tuple[TaxCalculation, TaxProcessor] | None:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        calculation, processor = entry
+        # Callers may mutate the breakdown: never hand out the cached instance
+        return copy.deepcopy(calculation), processor
+
+    def set(
+        self, key: str, calculation: TaxCalculation, processor: TaxProcessor
+    ) -> None:
+        self._cache.set(
+            key,
+            (copy.deepcopy(calculation), processor),
+            settings.TAX_CALCULATION_CACHE_TTL_SECONDS,
+        )
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+__all__ = ["TaxCalculationCache", "build_cache_key"]
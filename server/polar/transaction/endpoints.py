@@ -8,6 +8,8 @@ from pydantic_extra_types.timezone_name import TimeZoneName
 from polar.account.service import account as account_service
 from polar.auth.permission import OrganizationPermission
 from polar.exceptions import ResourceNotFound
+from polar.export.schemas import ExportJob, ExportJobType
+from polar.export.service import export_job as export_job_service
 from polar.kit.csv import CSVStreamingResponse
 from polar.kit.pagination import ListResource, PaginationParamsQuery
 from polar.kit.schemas import MultipleQueryFilter
@@ -15,6 +17,7 @@ from polar.kit.sorting import Sorting, SortingGetter
 from polar.models.transaction import TransactionType
 from polar.openapi import APITag
 from polar.postgres import AsyncReadSession, get_db_read_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 from polar.transaction import (
     auth as transactions_auth,
@@ -22,6 +25,7 @@ from polar.transaction import (
 
 from .export import (
     TransactionExportColumn,
+    TransactionExportParameters,
     generate_csv,
     get_filename,
 )
@@ -136,6 +140,47 @@ async def export(
     )
 
 
+@router.post(
+    "/export",
+    summary="Create Transactions Export Job",
+    response_model=ExportJob,
+    status_code=202,
+    tags=[APITag.private],
+)
+async def create_export_job(
+    parameters: TransactionExportParameters,
+    auth_subject: transactions_auth.TransactionsRead,
+    redis: Redis = Depends(get_redis),
+    session: AsyncReadSession = Depends(get_db_read_session),
+) -> ExportJob:
+    """
+    Export transactions as a compressed CSV file, generated in the background.
+
+    Progress is reported on the event stream, and the download URL is available
+    from the export job once it has succeeded.
+    """
+    account = await account_service.get(
+        session,
+        auth_subject,
+        parameters.account_id,
+        permission=OrganizationPermission.finance_read,
+    )
+    if account is None:
+        raise ResourceNotFound()
+
+    return await export_job_service.create(
+        redis,
+        auth_subject,
+        ExportJobType.transactions,
+        filename=get_filename(
+            parameters.created_after,
+            parameters.created_before,
+            ZoneInfo(parameters.timezone),
+        ),
+        parameters=parameters,
+    )
+
+
 @router.get("/summary", response_model=TransactionsSummary)
 async def get_summary(
     auth_subject: transactions_auth.TransactionsRead,
@@ -1,13 +1,16 @@
+import uuid
 from collections.abc import AsyncGenerator, Sequence
 from datetime import datetime, timedelta
 from enum import StrEnum
 from zoneinfo import ZoneInfo
 
+from pydantic_extra_types.timezone_name import TimeZoneName
 from sqlalchemy.orm import selectinload
 
 from polar.kit.csv import IterableCSVWriter
 from polar.kit.currency import get_currency_decimal_factor
 from polar.kit.db.postgres import AsyncReadSession
+from polar.kit.schemas import Schema
 from polar.kit.utils import utc_now
 from polar.models import Account, Order, Transaction
 from polar.models.transaction import TransactionType
@@ -59,6 +62,18 @@ TRANSACTION_EXPORT_DEFAULT_COLUMNS: list[TransactionExportColumn] = [
 ]
 
 
+class TransactionExportParameters(Schema):
+    """Parameters of a transactions export, as stored on a background export job."""
+
+    account_id: uuid.UUID
+    type: TransactionType | None = None
+    exclude_platform_fees: bool = False
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    timezone: TimeZoneName = "UTC"
+    columns: list[TransactionExportColumn] | None = None
+
+
 def _description_type(transaction: Transaction) -> str:
     if transaction.order is not None:
         if transaction.order.subscription_id:
@@ -839,6 +839,39 @@ class WebhookService:
         target: Organization,
         event: WebhookEventType,
         data: object,
+    ) -> list[WebhookEvent]:
+        endpoints = await self._get_event_target_endpoints(
+            session, event=event, target=target
+        )
+        return await self._send(session, target, event, data, endpoints)
+
+    async def send_many(
+        self,
+        session: AsyncSession,
+        target: Organization,
+        event: WebhookEventType,
+        data: Sequence[object],
+    ) -> list[WebhookEvent]:
+        """
+        Send the same event for several objects, like `send`.
+
+        The target endpoints are only looked up once.
+        """
+        endpoints = await self._get_event_target_endpoints(
+            session, event=event, target=target
+        )
+        events: list[WebhookEvent] = []
+        for item in data:
+            events.extend(await self._send(session, target, event, item, endpoints))
+        return events
+
+    async def _send(
+        self,
+        session: AsyncSession,
+        target: Organization,
+        event: WebhookEventType,
+        data: object,
+        endpoints: Sequence[WebhookEndpoint],
     ) -> list[WebhookEvent]:
         now = utc_now()
         payload = WebhookPayloadTypeAdapter.validate_python(
@@ -852,9 +885,7 @@ class WebhookService:
         )
 
         events: list[WebhookEvent] = []
-        for endpoint in await self._get_event_target_endpoints(
-            session, event=event, target=target
-        ):
+        for endpoint in endpoints:
             try:
                 payload_data = payload.get_payload(endpoint.format, target)
                 event_type = WebhookEvent(
@@ -14,12 +14,16 @@ from polar.config import settings
 from polar.observability import metrics as _prometheus_metrics
 
 from ._broker import get_broker
+from ._defer import Defer
 from ._encoder import JSONEncoder
 from ._enqueue import (
     BulkJobDelayCalculator,
     JobQueueManager,
+    bulk_send,
     enqueue_events,
+    enqueue_eventstream_event,
     enqueue_job,
+    invalidate_cache_keys,
     make_bulk_job_delay_calculator,
 )
 from ._httpx import HTTPXMiddleware
@@ -119,16 +123,20 @@ __all__ = [
     "AsyncSessionMaker",
     "BulkJobDelayCalculator",
     "CronTrigger",
+    "Defer",
     "HTTPXMiddleware",
     "JobQueueManager",
     "RedisMiddleware",
     "TaskPriority",
     "TaskQueue",
     "actor",
+    "bulk_send",
     "can_retry",
     "enqueue_events",
+    "enqueue_eventstream_event",
     "enqueue_job",
     "get_message_timestamp",
     "get_retries",
+    "invalidate_cache_keys",
     "make_bulk_job_delay_calculator",
 ]
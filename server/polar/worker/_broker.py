@@ -27,6 +27,7 @@ from polar.redis import REDIS_RETRY_ON_ERRROR, SyncFailoverRedis
 from . import _sqs
 from ._asyncio import MonitoredAsyncIO
 from ._debounce import DebounceMiddleware
+from ._defer import DeferMiddleware
 from ._encoder import JSONEncoder
 from ._enqueue import should_route_to_sqs
 from ._health import HealthMiddleware
@@ -34,6 +35,7 @@ from ._httpx import HTTPXMiddleware
 from ._metrics import PrometheusMiddleware
 from ._redis import RedisMiddleware
 from ._sqlalchemy import SQLAlchemyMiddleware
+from ._subprocess_pool import SubprocessPoolMiddleware
 
 log: Logger = structlog.get_logger()
 
@@ -262,6 +264,7 @@ def get_broker(*, database: bool = True) -> dramatiq.Broker:
         *([SQLAlchemyMiddleware()] if database else []),
         RedisMiddleware(),
         HTTPXMiddleware(),
+        SubprocessPoolMiddleware(),
         HealthMiddleware(database=database),
         scheduler_middleware,
         # Observability (outer layer for message processing)
@@ -277,6 +280,7 @@ def get_broker(*, database: bool = True) -> dramatiq.Broker:
             max_retries=settings.WORKER_MAX_RETRIES,
             min_backoff=settings.WORKER_MIN_BACKOFF_MILLISECONDS,
         ),
+        DeferMiddleware(),
         middleware.AgeLimit(),
         middleware.TimeLimit(time_limit=TASK_TIME_LIMIT_DEFAULT_MS),
         middleware.CurrentMessage(),
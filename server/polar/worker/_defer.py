@@ -0,0 +1,37 @@
+from typing import Any
+
+import dramatiq
+from dramatiq import Retry
+
+
+class Defer(Retry):
+    """
+    Run the task again after `delay` milliseconds, without spending a retry.
+
+    For tasks postponed on purpose, e.g. when a rate limit is hit, rather than
+    because they failed. Unlike enqueuing a new job, the message keeps its
+    options, like the group it's part of.
+    """
+
+    def __init__(self, delay: int) -> None:
+        super().__init__(delay=delay)
+
+
+class DeferMiddleware(dramatiq.Middleware):
+    """
+    Middleware giving back the retry counted by `Retries` for deferred messages.
+
+    Must come after `Retries` in the middleware list: the hooks running after
+    processing are called in reverse order, so it sees the message first.
+    """
+
+    def after_process_message(
+        self,
+        broker: dramatiq.Broker,
+        message: dramatiq.MessageProxy,
+        *,
+        result: Any | None = None,
+        exception: BaseException | None = None,
+    ) -> None:
+        if isinstance(exception, Defer):
+            message.options["retries"] = message.options.get("retries", 0) - 1
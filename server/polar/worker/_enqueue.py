@@ -4,15 +4,18 @@ import itertools
 import time
 import uuid
 from collections import defaultdict
-from collections.abc import AsyncIterator, Callable, Iterable, Mapping
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping, Sequence
 from typing import Any, Self
 
 import dramatiq
 import structlog
+from dramatiq.brokers.redis import RedisBroker
 from dramatiq.common import dq_name
+from redis import RedisError
 
 from polar.config import settings
 from polar.logging import CorrelationID, Logger
+from polar.observability.eventstream_metrics import EVENTSTREAM_PUBLISH_DURATION
 from polar.redis import Redis
 
 from . import _sqs
@@ -45,6 +48,11 @@ EVENT_INGESTED_CHUNK_SIZE = _sqs.MAX_JOB_PAYLOAD_BYTES // UUID_JSON_BYTES
 
 SQS_ACTORS_WILDCARD = "*"
 
+# After a failed direct eventstream publish, events go straight to the
+# `eventstream.publish` actor for this long, instead of hitting Redis again.
+EVENTSTREAM_DIRECT_PUBLISH_BACKOFF_SECONDS = 10.0
+_eventstream_direct_publish_resume_at = 0.0
+
 
 def resolve_sqs_actors() -> set[str]:
     """Expand the allowlist, resolving the wildcard to every declared actor."""
@@ -61,7 +69,12 @@ def should_route_to_sqs(actor_name: str) -> bool:
 
 
 class JobQueueManager:
-    __slots__ = ("_enqueued_jobs", "_ingested_events")
+    __slots__ = (
+        "_enqueued_jobs",
+        "_eventstream_events",
+        "_ingested_events",
+        "_invalidated_cache_keys",
+    )
 
     def __init__(self) -> None:
         self._enqueued_jobs: list[
@@ -73,6 +86,8 @@ class JobQueueManager:
             ]
         ] = []
         self._ingested_events: list[uuid.UUID] = []
+        self._eventstream_events: list[tuple[str, list[str], float]] = []
+        self._invalidated_cache_keys: set[str] = set()
 
     def enqueue_job(
         self,
@@ -87,7 +102,26 @@ class JobQueueManager:
     def enqueue_events(self, *event_ids: uuid.UUID) -> None:
         self._ingested_events.extend(event_ids)
 
+    def enqueue_eventstream_event(self, event: str, channels: list[str]) -> None:
+        self._eventstream_events.append((event, channels, time.time()))
+
+    def invalidate_cache_keys(self, *keys: str) -> None:
+        self._invalidated_cache_keys.update(keys)
+
     async def flush(self, broker: dramatiq.Broker, redis: Redis) -> None:
+        eventstream_events = self._eventstream_events
+        invalidated_cache_keys = self._invalidated_cache_keys
+        # Invalidated first, so a job or client reacting to the change
+        # doesn't read the previous value from the cache.
+        if invalidated_cache_keys:
+            await self._flush_cache_invalidations(redis, invalidated_cache_keys)
+        await self._flush_jobs(broker, redis)
+        # Published last, so clients reacting to an event see the committed
+        # state and the jobs it triggered.
+        if eventstream_events:
+            await self._flush_eventstream_events(broker, redis, eventstream_events)
+
+    async def _flush_jobs(self, broker: dramatiq.Broker, redis: Redis) -> None:
         for chunk in itertools.batched(
             self._ingested_events, EVENT_INGESTED_CHUNK_SIZE
         ):
@@ -188,6 +222,92 @@ class JobQueueManager:
 
         self.reset()
 
+    async def _flush_eventstream_events(
+        self,
+        broker: dramatiq.Broker,
+        redis: Redis,
+        events: list[tuple[str, list[str], float]],
+    ) -> None:
+        """
+        Publish eventstream events directly to Redis, in a single round-trip.
+
+        If it fails, the events are handed over to the `eventstream.publish`
+        actor, so they're still delivered once Redis is reachable again. The
+        next flushes of the process skip the direct publish for
+        `EVENTSTREAM_DIRECT_PUBLISH_BACKOFF_SECONDS`.
+        """
+        global _eventstream_direct_publish_resume_at
+
+        if time.monotonic() < _eventstream_direct_publish_resume_at:
+            await self._flush_eventstream_events_to_worker(broker, redis, events)
+            return
+
+        try:
+            async with redis.pipeline(transaction=False) as pipeline:
+                for event, channels, _ in events:
+                    for channel in channels:
+                        pipeline.publish(channel, event)
+                await pipeline.execute()
+        except RedisError as e:
+            log.warning(
+                "polar.worker.eventstream_publish_failed",
+                error=str(e),
+                count=len(events),
+            )
+            _eventstream_direct_publish_resume_at = (
+                time.monotonic() + EVENTSTREAM_DIRECT_PUBLISH_BACKOFF_SECONDS
+            )
+            await self._flush_eventstream_events_to_worker(broker, redis, events)
+            return
+
+        published_at = time.time()
+        for _, _, enqueued_at in events:
+            EVENTSTREAM_PUBLISH_DURATION.labels(mode="direct").observe(
+                published_at - enqueued_at
+            )
+
+    async def _flush_eventstream_events_to_worker(
+        self,
+        broker: dramatiq.Broker,
+        redis: Redis,
+        events: list[tuple[str, list[str], float]],
+    ) -> None:
+        """
+        Hand eventstream events over to the `eventstream.publish` actor.
+
+        The unit of work is already committed: if the broker is unreachable too,
+        the events are dropped rather than failing it.
+        """
+        for event, channels, enqueued_at in events:
+            self.enqueue_job(
+                "eventstream.publish", event, channels, enqueued_at=enqueued_at
+            )
+        try:
+            await self._flush_jobs(broker, redis)
+        except RedisError as e:
+            log.error(
+                "polar.worker.eventstream_publish_dropped",
+                error=str(e),
+                count=len(events),
+            )
+            self.reset()
+
+    async def _flush_cache_invalidations(self, redis: Redis, keys: set[str]) -> None:
+        """
+        Delete cache keys invalidated by the unit of work, once it's committed.
+
+        Failures are only logged: the caches relying on it bound their staleness
+        with a TTL.
+        """
+        try:
+            await redis.delete(*keys)
+        except RedisError as e:
+            log.warning(
+                "polar.worker.cache_invalidation_failed",
+                error=str(e),
+                count=len(keys),
+            )
+
     async def _batch_hset_messages(
         self,
         redis: Redis,
@@ -214,6 +334,8 @@ class JobQueueManager:
     def reset(self) -> None:
         self._enqueued_jobs = []
         self._ingested_events = []
+        self._eventstream_events = []
+        self._invalidated_cache_keys = set()
 
     @classmethod
     def set(cls) -> "Self":
@@ -269,6 +391,76 @@ def enqueue_events(*event_ids: uuid.UUID) -> None:
     job_queue_manager.enqueue_events(*event_ids)
 
 
+def enqueue_eventstream_event(event: str, channels: list[str]) -> None:
+    """Publish an eventstream event once the current unit of work is flushed."""
+    job_queue_manager = JobQueueManager.get()
+    job_queue_manager.enqueue_eventstream_event(event, channels)
+
+
+def invalidate_cache_keys(*keys: str) -> None:
+    """Delete Redis cache keys once the current unit of work is flushed."""
+    job_queue_manager = JobQueueManager.get()
+    job_queue_manager.invalidate_cache_keys(*keys)
+
+
+def bulk_send(
+    broker: dramatiq.Broker,
+    actor_name: str,
+    kwargs_list: Sequence[dict[str, JSONSerializable]],
+) -> None:
+    """Send a batch of messages to the same actor from synchronous code.
+
+    Unlike `actor.send`, which costs one round-trip per message, Redis messages
+    are written in pipelined batches of `FLUSH_BATCH_SIZE`, the same way
+    `JobQueueManager.flush` does, and SQS messages through batch requests.
+
+    Args:
+        broker: The broker to send the messages through.
+        actor_name: The name of the actor to send the messages to.
+        kwargs_list: Keyword arguments of each message.
+    """
+    if not kwargs_list:
+        return
+
+    correlation_id = CorrelationID.get()
+
+    if should_route_to_sqs(actor_name):
+        _sqs.send_jobs_sync(
+            [
+                _sqs.Job(
+                    actor_name, (), kwargs, None, correlation_id, str(uuid.uuid4())
+                )
+                for kwargs in kwargs_list
+            ]
+        )
+        return
+
+    fn: dramatiq.Actor[Any, Any] = broker.get_actor(actor_name)
+    # Debounced actors need their key set per message: go through the broker
+    if fn.options.get("debounce_key") is not None or not isinstance(
+        broker, RedisBroker
+    ):
+        for kwargs in kwargs_list:
+            fn.send_with_options(kwargs=kwargs, source_correlation_id=correlation_id)
+        return
+
+    for batch in itertools.batched(kwargs_list, FLUSH_BATCH_SIZE):
+        messages: dict[str, bytes] = {}
+        for kwargs in batch:
+            redis_message_id = str(uuid.uuid4())
+            message = fn.message_with_options(
+                kwargs=kwargs,
+                redis_message_id=redis_message_id,
+                source_correlation_id=correlation_id,
+            )
+            messages[redis_message_id] = message.encode()
+        pipeline = broker.client.pipeline(transaction=False)
+        pipeline.hset(f"dramatiq:{fn.queue_name}.msgs", mapping=messages)
+        pipeline.rpush(f"dramatiq:{fn.queue_name}", *messages)
+        pipeline.execute()
+        log.debug("polar.worker.jobs_sent", actor=actor_name, count=len(messages))
+
+
 type BulkJobDelayCalculator = Callable[[int], int | None]
 
 
@@ -19,11 +19,13 @@ from dramatiq.middleware.retries import DEFAULT_MAX_BACKOFF
 
 from polar import tasks  # noqa: F401  (registers all actors with the broker)
 from polar.config import settings
+from polar.kit.subprocess_pool import close_pools
 from polar.logging import CorrelationID, Logger
 
 from . import _sqs
 from ._broker import TASK_TIME_LIMIT_DEFAULT_MS
 from ._debounce import DebounceContext, check_debounce, finalize_debounce
+from ._defer import Defer
 from ._enqueue import resolve_sqs_actors
 from ._httpx import _close_client, setup_httpx
 from ._redis import RedisMiddleware, _close_redis, setup_redis
@@ -144,7 +146,10 @@ def plan_retry(
     scheduler_available: bool,
 ) -> tuple[RetryAction, int]:
     """Decide how to redeliver a failed task and the delay (seconds) to apply."""
-    if receive_count - 1 >= get_actor_max_retries(actor_name):
+    # Deferred tasks didn't fail: they don't spend their retries
+    if not isinstance(exception, Defer) and receive_count - 1 >= get_actor_max_retries(
+        actor_name
+    ):
         return RetryAction.DEAD_LETTER, 0
     backoff_seconds = compute_retry_backoff(actor_name, receive_count, exception)
     if backoff_seconds > _sqs.MAX_VISIBILITY_TIMEOUT_SECONDS and scheduler_available:
@@ -295,6 +300,7 @@ async def shutdown() -> None:
     await dispose_sqlalchemy_engine()
     await _close_redis()
     await _close_client()
+    await close_pools()
 
 
 __all__ = [
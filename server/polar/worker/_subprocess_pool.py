@@ -0,0 +1,36 @@
+import dramatiq
+import structlog
+from dramatiq.asyncio import get_event_loop_thread
+
+from polar.kit.subprocess_pool import close_pools, start_pools
+from polar.logging import Logger
+
+log: Logger = structlog.get_logger()
+
+
+class SubprocessPoolMiddleware(dramatiq.Middleware):
+    """
+    Middleware managing the lifecycle of the helper process pools,
+    like the invoice and email renderers.
+
+    Invoices are only rendered by workers: their pool is started at boot.
+    The others spawn their processes on first use.
+    """
+
+    def before_worker_boot(
+        self, broker: dramatiq.Broker, worker: dramatiq.Worker
+    ) -> None:
+        from polar.invoice.render import renderer_pool as invoice_renderer_pool
+
+        event_loop_thread = get_event_loop_thread()
+        assert event_loop_thread is not None
+        event_loop_thread.run_coroutine(start_pools(invoice_renderer_pool))
+        log.info("Started subprocess pools")
+
+    def after_worker_shutdown(
+        self, broker: dramatiq.Broker, worker: dramatiq.Worker
+    ) -> None:
+        event_loop_thread = get_event_loop_thread()
+        assert event_loop_thread is not None
+        event_loop_thread.run_coroutine(close_pools())
+        log.info("Closed subprocess pools")
@@ -0,0 +1,27 @@
+import asyncio
+
+import dramatiq
+import typer
+
+import polar.tasks  # noqa: F401
+from polar.redis import create_redis
+from polar.worker import JobQueueManager, enqueue_job
+
+
+async def _enqueue() -> None:
+    redis = create_redis("script")
+    try:
+        async with JobQueueManager.open(dramatiq.get_broker(), redis):
+            enqueue_job("event.backfill_ancestors")
+    finally:
+        await redis.close()
+
+
+def main() -> None:
+    """Materialize the ancestors path of existing events, in the background."""
+    asyncio.run(_enqueue())
+    typer.echo("Enqueued event.backfill_ancestors.")
+
+
+if __name__ == "__main__":
+    typer.run(main)
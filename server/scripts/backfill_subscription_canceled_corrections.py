@@ -13,16 +13,13 @@ from sqlalchemy.orm import selectinload
 from polar.config import settings
 from polar.event.repository import EventRepository
 from polar.event.system import SubscriptionCanceledMetadata, SystemEvent
-from polar.integrations.tinybird.client import (
-    TinybirdClient,
-    TinybirdPayloadTooLargeError,
-)
-from polar.integrations.tinybird.service import DATASOURCE_EVENTS, _event_to_tinybird
+from polar.integrations.tinybird.service import ingest_events as tinybird_ingest_events
 from polar.kit.db.postgres import AsyncSession, create_async_sessionmaker
 from polar.kit.db.postgres import create_async_engine as _create_async_engine
 from polar.models import Event, Subscription
 from polar.models.event import EventSource
 from polar.models.subscription import CustomerCancellationReason
+from polar.redis import Redis, create_redis
 
 from .helper import configure_script_logging, typer_async
 
@@ -168,26 +165,6 @@ def _corrective_event_timestamp(subscription: Subscription) -> datetime:
     return subscription.canceled_at
 
 
-async def _ingest_tinybird_batch(
-    client: TinybirdClient,
-    events: list[Event],
-) -> None:
-    if not events:
-        return
-
-    tinybird_events = [_event_to_tinybird(event) for event in events]
-
-    try:
-        await client.ingest(DATASOURCE_EVENTS, tinybird_events, wait=False)
-    except TinybirdPayloadTooLargeError:
-        if len(events) <= 1:
-            raise
-
-        midpoint = len(events) // 2
-        await _ingest_tinybird_batch(client, events[:midpoint])
-        await _ingest_tinybird_batch(client, events[midpoint:])
-
-
 def _is_canonical_event_for_subscription(
     subscription: Subscription, event: Event
 ) -> bool:
@@ -233,16 +210,9 @@ async def run_backfill(
         session = sessionmaker()
         own_session = True
 
-    tinybird_client: TinybirdClient | None = None
+    redis: Redis | None = None
     if not dry_run and ingest_tinybird:
-        tinybird_client = TinybirdClient(
-            api_url=settings.TINYBIRD_API_URL,
-            clickhouse_url=settings.TINYBIRD_CLICKHOUSE_URL,
-            api_token=settings.TINYBIRD_API_TOKEN,
-            read_token=settings.TINYBIRD_READ_TOKEN,
-            clickhouse_username=settings.TINYBIRD_CLICKHOUSE_USERNAME,
-            clickhouse_token=settings.TINYBIRD_CLICKHOUSE_TOKEN,
-        )
+        redis = create_redis("script")
 
     results = {
         "subscriptions_scanned": 0,
@@ -385,15 +355,15 @@ async def run_backfill(
 
                         results["corrective_events_inserted"] += len(inserted_ids)
 
-                        if tinybird_client is not None:
+                        if redis is not None:
                             inserted_events_result = await session.execute(
                                 select(Event).where(Event.id.in_(inserted_ids))
                             )
                             inserted_events = list(
                                 inserted_events_result.scalars().all()
                             )
-                            await _ingest_tinybird_batch(
-                                tinybird_client, inserted_events
+                            await tinybird_ingest_events(
+                                inserted_events, redis=redis, wait=False
                             )
                             results["tinybird_events_ingested"] += len(inserted_events)
 
@@ -420,6 +390,8 @@ async def run_backfill(
             await session.close()
         if engine is not None:
             await engine.dispose()
+        if redis is not None:
+            await redis.close()
 
 
 @cli.command()
@@ -7,39 +7,17 @@ from rich.progress import Progress
 from sqlalchemy import func, select, tuple_
 
 from polar.config import settings
-from polar.integrations.tinybird.client import (
-    TinybirdClient,
-    TinybirdPayloadTooLargeError,
-)
-from polar.integrations.tinybird.service import _event_to_tinybird
+from polar.integrations.tinybird.service import ingest_events
 from polar.kit.db.postgres import create_async_engine as _create_async_engine
 from polar.kit.db.postgres import create_async_sessionmaker
 from polar.models import Event
+from polar.redis import create_redis
 
 from .helper import configure_script_logging, typer_async
 
 cli = typer.Typer()
 
 
-async def _ingest_batch(
-    client: TinybirdClient,
-    events: list[Event],
-) -> None:
-    if not events:
-        return
-
-    tinybird_events = [_event_to_tinybird(e) for e in events]
-
-    try:
-        await client.ingest("events_by_ingested_at", tinybird_events, wait=False)
-    except TinybirdPayloadTooLargeError:
-        if len(events) <= 1:
-            raise
-        mid = len(events) // 2
-        await _ingest_batch(client, events[:mid])
-        await _ingest_batch(client, events[mid:])
-
-
 @cli.command()
 @typer_async
 async def backfill(
@@ -72,14 +50,7 @@ async def backfill(
     )
     sessionmaker = create_async_sessionmaker(engine)
 
-    tb_client = TinybirdClient(
-        api_url=settings.TINYBIRD_API_URL,
-        clickhouse_url=settings.TINYBIRD_CLICKHOUSE_URL,
-        api_token=settings.TINYBIRD_API_TOKEN,
-        read_token=settings.TINYBIRD_READ_TOKEN,
-        clickhouse_username=settings.TINYBIRD_CLICKHOUSE_USERNAME,
-        clickhouse_token=settings.TINYBIRD_CLICKHOUSE_TOKEN,
-    )
+    redis = create_redis("script")
 
     try:
         async with sessionmaker() as session:
@@ -129,7 +100,7 @@ async def backfill(
                 if not events:
                     break
 
-                await _ingest_batch(tb_client, events)
+                await ingest_events(events, redis=redis, wait=False)
 
                 total_sent += len(events)
                 last_ingested_at = events[-1].ingested_at
@@ -149,6 +120,7 @@ async def backfill(
         typer.echo(f"\nDone. Sent {total_sent} events to Tinybird.")
 
     finally:
+        await redis.close()
         await engine.dispose()
 
 
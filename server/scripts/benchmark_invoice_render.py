@@ -0,0 +1,122 @@
+"""
+Compare invoice rendering throughput between one process per invoice and
+the pool of long-lived renderer processes.
+
+    uv run python -m scripts.benchmark_invoice_render --count 200 --concurrency 4
+"""
+
+import asyncio
+import datetime
+import time
+from collections.abc import Awaitable, Callable
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from polar.config import settings
+from polar.invoice.generator import Invoice, InvoiceItem
+from polar.invoice.render import (
+    InvoiceRendererPool,
+    InvoiceRenderRequest,
+    render_invoice_pdf,
+)
+from polar.kit.address import Address, CountryAlpha2
+
+from .helper import configure_script_logging, typer_async
+
+cli = typer.Typer()
+
+
+def _get_invoice() -> Invoice:
+    return Invoice(
+        number="BENCHMARK-0001",
+        date=datetime.datetime.now(datetime.UTC),
+        seller_name="Polar Software Inc",
+        seller_address=Address(
+            line1="123 Polar St",
+            city="San Francisco",
+            state="CA",
+            postal_code="94107",
+            country=CountryAlpha2("US"),
+        ),
+        customer_name="John Doe",
+        customer_address=Address(
+            line1="456 Customer Ave",
+            city="Los Angeles",
+            state="CA",
+            postal_code="90001",
+            country=CountryAlpha2("US"),
+        ),
+        subtotal_amount=100_00,
+        discount_amount=0,
+        tax_amount=0,
+        tax_breakdown=[],
+        net_amount=100_00,
+        currency="usd",
+        items=[
+            InvoiceItem(
+                description="SaaS Subscription",
+                quantity=1,
+                unit_amount=100_00,
+                amount=100_00,
+            )
+        ],
+    )
+
+
+async def _run(
+    render: Callable[[], Awaitable[object]], count: int, concurrency: int
+) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _render() -> None:
+        async with semaphore:
+            await render()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_render() for _ in range(count)))
+    return time.perf_counter() - start
+
+
+@cli.command()
+@typer_async
+async def benchmark(
+    count: int = typer.Option(100, help="Number of invoices to render per mode"),
+    concurrency: int = typer.Option(4, help="Invoices rendered concurrently"),
+    max_renders_per_process: int = typer.Option(
+        settings.INVOICE_RENDERER_MAX_RENDERS_PER_PROCESS,
+        help="Renders served by a pooled process before it's replaced",
+    ),
+) -> None:
+    configure_script_logging()
+    invoice = _get_invoice()
+    console = Console()
+
+    table = Table("Mode", "Invoices", "Seconds", "Invoices/s")
+
+    settings.INVOICE_RENDERER_POOL_SIZE = 0
+    elapsed = await _run(lambda: render_invoice_pdf(invoice), count, concurrency)
+    table.add_row(
+        "process per invoice", str(count), f"{elapsed:.2f}", f"{count / elapsed:.1f}"
+    )
+
+    pool = InvoiceRendererPool(
+        size=concurrency,
+        max_requests_per_process=max_renders_per_process,
+        timeout=settings.INVOICE_RENDERER_TIMEOUT,
+    )
+    payload = InvoiceRenderRequest(invoice=invoice).model_dump_json().encode("utf-8")
+    try:
+        # Spawning is part of the pool's lifetime, not of each render
+        await pool.start()
+        elapsed = await _run(lambda: pool.request(payload), count, concurrency)
+    finally:
+        await pool.close()
+    table.add_row("pool", str(count), f"{elapsed:.2f}", f"{count / elapsed:.1f}")
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,81 @@
+"""
+Measure IP geolocation lookups per second, with and without the LRU cache.
+
+Lookups are drawn from a pool of distinct IPs, so the cache sees the kind of
+repetition checkouts have: the same customers creating and updating them.
+
+    uv run python -m scripts.benchmark_ip_geolocation --lookups 200000 --distinct-ips 5000
+"""
+
+import ipaddress
+import random
+import time
+from pathlib import Path
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from polar.checkout.ip_geolocation import (
+    DATABASE_PATH,
+    IPGeolocationDatabase,
+    get_ip_country,
+)
+from polar.config import settings
+
+from .helper import configure_script_logging
+
+cli = typer.Typer()
+
+
+def _random_ips(count: int, rng: random.Random) -> list[str]:
+    ips: list[str] = []
+    while len(ips) < count:
+        ip = ipaddress.IPv4Address(rng.getrandbits(32))
+        if ip.is_global:
+            ips.append(str(ip))
+    return ips
+
+
+def _run(database: IPGeolocationDatabase, ips: list[str]) -> float:
+    start = time.perf_counter()
+    for ip in ips:
+        get_ip_country(database, ip)
+    return time.perf_counter() - start
+
+
+@cli.command()
+def benchmark(
+    lookups: int = typer.Option(100_000, help="Number of lookups per mode"),
+    distinct_ips: int = typer.Option(5_000, help="Number of distinct IPs looked up"),
+    cache_size: int = typer.Option(
+        settings.IP_GEOLOCATION_CACHE_SIZE, help="Size of the LRU cache"
+    ),
+    path: Path = typer.Option(DATABASE_PATH, help="Path to the MMDB database"),
+    seed: int = typer.Option(0, help="Seed of the random IPs"),
+) -> None:
+    configure_script_logging()
+    console = Console()
+
+    rng = random.Random(seed)
+    pool = _random_ips(distinct_ips, rng)
+    ips = [rng.choice(pool) for _ in range(lookups)]
+
+    table = Table("Mode", "Lookups", "Seconds", "Lookups/s")
+    for mode, size in (("uncached", 0), ("LRU cache", cache_size)):
+        database = IPGeolocationDatabase(
+            path,
+            cache_size=size,
+            reload_check_interval=settings.IP_GEOLOCATION_RELOAD_CHECK_INTERVAL_SECONDS,
+        )
+        try:
+            elapsed = _run(database, ips)
+        finally:
+            database.close()
+        table.add_row(mode, str(lookups), f"{elapsed:.2f}", f"{lookups / elapsed:,.0f}")
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    cli()
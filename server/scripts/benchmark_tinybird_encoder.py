@@ -0,0 +1,139 @@
+"""
+Measure the encoding of events sent to Tinybird, before and after NDJSON encoding.
+
+The legacy path builds a `TinybirdEvent` dictionary per event, serializes each
+of them to size the chunks, then serializes them again in the payload. The
+encoder writes each event once, straight to its NDJSON line.
+
+    uv run python -m scripts.benchmark_tinybird_encoder --events 100000
+"""
+
+import json
+import random
+import time
+import tracemalloc
+import uuid
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from polar.integrations.tinybird.client import MAX_PAYLOAD_BYTES
+from polar.integrations.tinybird.encoder import encode_events
+from polar.integrations.tinybird.service import events_to_tinybird
+from polar.models import Event
+from polar.models.event import EventSource
+
+from .helper import configure_script_logging
+
+cli = typer.Typer()
+
+
+def _random_event(rng: random.Random, organization_id: uuid.UUID) -> Event:
+    timestamp = datetime(2025, 1, 1, tzinfo=UTC) + timedelta(
+        seconds=rng.randrange(365 * 24 * 3600)
+    )
+    metadata: dict[str, Any]
+    if rng.random() < 0.2:
+        source = EventSource.system
+        name = "order.paid"
+        metadata = {
+            "order_id": str(uuid.uuid4()),
+            "product_id": str(uuid.uuid4()),
+            "amount": float(rng.randrange(100, 100_000)),
+            "currency": "usd",
+            "net_amount": rng.randrange(100, 100_000),
+            "tax_amount": rng.randrange(0, 1_000),
+            "order_created_at": timestamp.isoformat(),
+        }
+    else:
+        source = EventSource.user
+        name = "ai_usage"
+        metadata = {
+            "model": "gpt-4o",
+            "tokens": rng.randrange(1, 10_000),
+            "_cost": {"amount": rng.random(), "currency": "usd"},
+            "_llm": {
+                "vendor": "openai",
+                "model": "gpt-4o",
+                "input_tokens": rng.randrange(1, 5_000),
+                "output_tokens": rng.randrange(1, 5_000),
+            },
+        }
+    return Event(
+        id=uuid.uuid4(),
+        ingested_at=timestamp,
+        timestamp=timestamp,
+        name=name,
+        source=source,
+        organization_id=organization_id,
+        customer_id=uuid.uuid4(),
+        user_metadata=metadata,
+    )
+
+
+def _legacy(events: list[Event]) -> int:
+    chunks: list[list[str]] = [[]]
+    size = 0
+    for tinybird_event in events_to_tinybird(events):
+        line = json.dumps(tinybird_event)
+        if chunks[-1] and size + len(line) + 1 > MAX_PAYLOAD_BYTES:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(line)
+        size += len(line) + 1
+    return sum(len("\n".join(chunk)) for chunk in chunks)
+
+
+def _encoder(events: list[Event]) -> int:
+    return sum(
+        len(chunk.ndjson)
+        for chunk in encode_events(events, max_chunk_bytes=MAX_PAYLOAD_BYTES)
+    )
+
+
+def _run(
+    encode: Callable[[list[Event]], int], events: list[Event]
+) -> tuple[float, int]:
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        encode(events)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+@cli.command()
+def benchmark(
+    events: int = typer.Option(100_000, help="Number of events to encode"),
+    seed: int = typer.Option(0, help="Seed of the random events"),
+) -> None:
+    configure_script_logging()
+    console = Console()
+
+    rng = random.Random(seed)
+    organization_id = uuid.uuid4()
+    batch = [_random_event(rng, organization_id) for _ in range(events)]
+
+    table = Table("Mode", "Events", "Seconds", "Events/s", "Peak memory (MiB)")
+    for mode, encode in (("legacy", _legacy), ("NDJSON encoder", _encoder)):
+        elapsed, peak = _run(encode, batch)
+        table.add_row(
+            mode,
+            str(events),
+            f"{elapsed:.2f}",
+            f"{events / elapsed:,.0f}",
+            f"{peak / 1024 / 1024:,.1f}",
+        )
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    cli()
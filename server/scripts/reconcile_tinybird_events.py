@@ -5,6 +5,7 @@ import typer
 from polar.integrations.tinybird.service import reconcile_events
 from polar.kit.db.postgres import create_async_sessionmaker
 from polar.postgres import create_async_engine
+from polar.redis import create_redis
 
 from .helper import configure_script_logging, typer_async
 
@@ -42,11 +43,12 @@ async def reconcile(
 
     engine = create_async_engine("script")
     sessionmaker = create_async_sessionmaker(engine)
+    redis = create_redis("script")
 
     try:
         async with sessionmaker() as session:
             total_checked, total_missing, missing_ids = await reconcile_events(
-                session, parsed_start, parsed_end, dry_run=dry_run
+                session, redis, parsed_start, parsed_end, dry_run=dry_run
             )
 
         if dry_run:
@@ -60,6 +62,7 @@ async def reconcile(
                 f"Done. Checked {total_checked} events, re-ingested {total_missing}."
             )
     finally:
+        await redis.close()
         await engine.dispose()
 
 
@@ -177,11 +177,14 @@ class SeedPhase(StrEnum):
 async def _flush_tinybird_events(
     events: Sequence[EventModel],
     ancestors_by_event: dict[UUID, list[str]],
+    redis: Redis,
 ) -> None:
     """Send accumulated events to Tinybird, chunked under the payload limit."""
     for start in range(0, len(events), TINYBIRD_FLUSH_CHUNK):
         await tinybird_ingest_events(
-            events[start : start + TINYBIRD_FLUSH_CHUNK], ancestors_by_event
+            events[start : start + TINYBIRD_FLUSH_CHUNK],
+            ancestors_by_event,
+            redis=redis,
         )
 
 
@@ -2491,7 +2494,7 @@ async def _simple_complement_seed_is_complete(session: AsyncSession) -> bool:
 
 
 async def _create_simple_complement_event_history(
-    session: AsyncSession, organizations: Sequence[Organization]
+    session: AsyncSession, redis: Redis, organizations: Sequence[Organization]
 ) -> int:
     organization_ids = {organization.id for organization in organizations}
     products = (
@@ -2601,7 +2604,7 @@ async def _create_simple_complement_event_history(
         )
         await event_service._create_meter_events(session, inserted)
         ancestors_by_event = await event_repository.get_ancestors_batch(event_ids)
-        await _flush_tinybird_events(inserted, ancestors_by_event)
+        await _flush_tinybird_events(inserted, ancestors_by_event, redis)
         event_count += len(event_ids)
 
     return event_count
@@ -2729,7 +2732,9 @@ async def _create_compass_seed(session: AsyncSession, acme: Organization) -> Non
             )
 
 
-async def create_simple_complement_seed_data(session: AsyncSession) -> bool:
+async def create_simple_complement_seed_data(
+    session: AsyncSession, redis: Redis
+) -> bool:
     if not await _simple_seed_is_complete(session):
         raise RuntimeError("Simple-complement seed requires the simple seed phase")
     if await _simple_complement_seed_is_complete(session):
@@ -2757,7 +2762,7 @@ async def create_simple_complement_seed_data(session: AsyncSession) -> bool:
         organizations = await _get_seeded_organizations(session)
         acme = organizations["acme-corp"]
         event_count = await _create_simple_complement_event_history(
-            session, list(organizations.values())
+            session, redis, list(organizations.values())
         )
         await _create_compass_seed(session, acme)
         await create_support_cases_seed(session)
@@ -2785,7 +2790,7 @@ async def create_seed_data(session: AsyncSession, redis: Redis) -> None:
     started_at = monotonic()
     print("seed.phase.all status=pending")
     simple_created = await create_simple_seed_data(session, redis)
-    simple_complement_created = await create_simple_complement_seed_data(session)
+    simple_complement_created = await create_simple_complement_seed_data(session, redis)
     if not simple_created and not simple_complement_created:
         raise typer.Exit(2)
     print(
@@ -3006,7 +3011,7 @@ async def create_single_org_seed(
                 select(EventModel).where(EventModel.id.in_(event_ids))
             )
             ancestors_by_event = await event_repository.get_ancestors_batch(event_ids)
-            await _flush_tinybird_events(inserted, ancestors_by_event)
+            await _flush_tinybird_events(inserted, ancestors_by_event, redis)
 
     await session.commit()
     print(f"✅ Created organization '{name}' ({slug})")
@@ -3057,7 +3062,7 @@ def seeds_load(
                     elif phase is SeedPhase.simple:
                         await create_simple_seed_data(session, redis)
                     elif phase is SeedPhase.simple_complement:
-                        await create_simple_complement_seed_data(session)
+                        await create_simple_complement_seed_data(session, redis)
                     else:
                         await create_seed_data(session, redis)
             finally:
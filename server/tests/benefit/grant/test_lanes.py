@@ -0,0 +1,61 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.benefit.grant.lanes import BenefitLane, benefit_lane
+from polar.models.benefit import BenefitType
+from polar.redis import Redis
+from polar.worker import Defer
+
+
+def _set_lane(mocker: MockerFixture, lane: BenefitLane) -> None:
+    mocker.patch.dict(
+        "polar.benefit.grant.lanes._LANES", {BenefitType.custom: lane}, clear=True
+    )
+
+
+@pytest.mark.asyncio
+class TestBenefitLane:
+    async def test_unbounded(self, mocker: MockerFixture, redis: Redis) -> None:
+        eval_spy = mocker.spy(redis, "eval")
+
+        for _ in range(10):
+            async with benefit_lane(redis, BenefitType.custom, "grant"):
+                pass
+
+        eval_spy.assert_not_called()
+
+    async def test_rate_limited(self, mocker: MockerFixture, redis: Redis) -> None:
+        _set_lane(mocker, BenefitLane("test", rate=0.001, burst=2))
+
+        for _ in range(2):
+            async with benefit_lane(redis, BenefitType.custom, "grant"):
+                pass
+
+        with pytest.raises(Defer) as excinfo:
+            async with benefit_lane(redis, BenefitType.custom, "grant"):
+                pass
+
+        assert excinfo.value.delay is not None
+        assert excinfo.value.delay > 0
+
+    async def test_max_concurrency(self, mocker: MockerFixture, redis: Redis) -> None:
+        _set_lane(mocker, BenefitLane("test", max_concurrency=1))
+
+        async with benefit_lane(redis, BenefitType.custom, "grant"):
+            with pytest.raises(Defer):
+                async with benefit_lane(redis, BenefitType.custom, "grant"):
+                    pass
+
+        # Released once done
+        async with benefit_lane(redis, BenefitType.custom, "grant"):
+            pass
+
+    async def test_released_on_error(self, mocker: MockerFixture, redis: Redis) -> None:
+        _set_lane(mocker, BenefitLane("test", max_concurrency=1))
+
+        with pytest.raises(ValueError, match="Strategy failed"):
+            async with benefit_lane(redis, BenefitType.custom, "grant"):
+                raise ValueError("Strategy failed")
+
+        async with benefit_lane(redis, BenefitType.custom, "grant"):
+            pass
@@ -38,6 +38,7 @@ from tests.fixtures.random_objects import (
 def benefit_strategy_mock(mocker: MockerFixture) -> MagicMock:
     strategy_mock = MagicMock(spec=BenefitServiceProtocol)
     strategy_mock.should_revoke_individually = False
+    strategy_mock.can_update_in_bulk = False
     strategy_mock.grant.return_value = {}
     strategy_mock.revoke.return_value = {}
     strategy_mock.cycle.return_value = {}
@@ -217,6 +218,136 @@ class TestGrantBenefit:
         assert grant.properties == {}
 
 
+@pytest.mark.asyncio
+class TestGrantBenefits:
+    async def test_grants(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        subscription: Subscription,
+        customer: Customer,
+        benefit_organization: Benefit,
+        benefit_organization_second: Benefit,
+        benefit_strategy_mock: MagicMock,
+    ) -> None:
+        existing_grant = BenefitGrant(
+            subscription=subscription, customer=customer, benefit=benefit_organization
+        )
+        existing_grant.set_revoked()
+        await save_fixture(existing_grant)
+        benefit_strategy_mock.grant.return_value = {"external_id": "abc"}
+
+        grants = await benefit_grant_service.grant_benefits(
+            session,
+            redis,
+            customer,
+            [benefit_organization, benefit_organization_second],
+            subscription=subscription,
+        )
+
+        assert len(grants) == 2
+        assert existing_grant.id in {grant.id for grant in grants}
+        for grant in grants:
+            assert grant.subscription_id == subscription.id
+            assert grant.is_granted
+            assert cast(Any, grant.properties) == {"external_id": "abc"}
+        assert benefit_strategy_mock.grant.call_count == 2
+
+        # Written to the database
+        session.expunge_all()
+        repository = BenefitGrantRepository.from_session(session)
+        for grant in grants:
+            loaded = await repository.get_by_id(grant.id)
+            assert loaded is not None
+            assert loaded.is_granted
+            assert cast(Any, loaded.properties) == {"external_id": "abc"}
+
+    async def test_already_granted(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        subscription: Subscription,
+        customer: Customer,
+        benefit_organization: Benefit,
+        benefit_strategy_mock: MagicMock,
+    ) -> None:
+        grant = BenefitGrant(
+            subscription=subscription, customer=customer, benefit=benefit_organization
+        )
+        grant.set_granted()
+        await save_fixture(grant)
+
+        grants = await benefit_grant_service.grant_benefits(
+            session, redis, customer, [benefit_organization], subscription=subscription
+        )
+
+        assert [updated_grant.id for updated_grant in grants] == [grant.id]
+        benefit_strategy_mock.grant.assert_not_called()
+
+    async def test_action_required_error(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        subscription: Subscription,
+        customer: Customer,
+        benefit_organization: Benefit,
+        benefit_strategy_mock: MagicMock,
+    ) -> None:
+        error_message = "Action required error message"
+        benefit_strategy_mock.grant.side_effect = BenefitActionRequiredError(
+            error_message
+        )
+
+        [grant] = await benefit_grant_service.grant_benefits(
+            session, redis, customer, [benefit_organization], subscription=subscription
+        )
+
+        assert not grant.is_granted
+        assert grant.error is not None
+        assert grant.error["message"] == error_message
+
+    async def test_failed_benefit_granted_on_its_own(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        subscription: Subscription,
+        customer: Customer,
+        benefit_organization: Benefit,
+        benefit_organization_second: Benefit,
+        benefit_strategy_mock: MagicMock,
+    ) -> None:
+        enqueue_job_mock = mocker.patch("polar.benefit.grant.service.enqueue_job")
+
+        async def grant(benefit: Benefit, *args: Any, **kwargs: Any) -> Any:
+            if benefit.id == benefit_organization.id:
+                raise BenefitRetriableError(10)
+            return {"external_id": "abc"}
+
+        benefit_strategy_mock.grant.side_effect = grant
+
+        grants = await benefit_grant_service.grant_benefits(
+            session,
+            redis,
+            customer,
+            [benefit_organization, benefit_organization_second],
+            subscription=subscription,
+        )
+
+        grants_by_benefit = {grant.benefit_id: grant for grant in grants}
+        assert not grants_by_benefit[benefit_organization.id].is_granted
+        assert grants_by_benefit[benefit_organization_second.id].is_granted
+        enqueue_job_mock.assert_any_call(
+            "benefit.grant",
+            customer_id=customer.id,
+            benefit_id=benefit_organization.id,
+            member_id=None,
+            subscription_id=subscription.id,
+        )
+
+
 @pytest.mark.asyncio
 class TestRevokeBenefit:
     async def test_not_existing_grant(
@@ -776,6 +907,140 @@ class TestEnqueueBenefitGrantUpdates:
 
         enqueue_job_mock.assert_not_called()
 
+    async def test_required_update_in_bulk(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        subscription: Subscription,
+        customer: Customer,
+        benefit_organization: Benefit,
+        benefit_strategy_mock: MagicMock,
+    ) -> None:
+        grant = BenefitGrant(
+            subscription=subscription, customer=customer, benefit=benefit_organization
+        )
+        grant.set_granted()
+        await save_fixture(grant)
+
+        enqueue_job_mock = mocker.patch("polar.benefit.grant.service.enqueue_job")
+        benefit_strategy_mock.requires_update.return_value = True
+        benefit_strategy_mock.can_update_in_bulk = True
+
+        await benefit_grant_service.enqueue_benefit_grant_updates(
+            session, redis, benefit_organization, {}
+        )
+
+        enqueue_job_mock.assert_called_once_with(
+            "benefit.update_bulk",
+            benefit_id=benefit_organization.id,
+            requested_at=mocker.ANY,
+        )
+
+
+@pytest.mark.asyncio
+class TestUpdateBenefitGrantsInBulk:
+    async def _create_grants(
+        self,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        benefit: Benefit,
+        count: int,
+    ) -> list[BenefitGrant]:
+        grants: list[BenefitGrant] = []
+        for i in range(count):
+            customer = await create_customer(
+                save_fixture,
+                organization=organization,
+                email=f"customer-{i}@example.com",
+                stripe_customer_id=f"STRIPE_CUSTOMER_ID_{i}",
+            )
+            grants.append(
+                await create_benefit_grant(
+                    save_fixture,
+                    customer,
+                    benefit,
+                    granted=True,
+                    properties={"version": 1},
+                )
+            )
+        return sorted(grants, key=lambda grant: grant.id)
+
+    async def test_chunks(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        benefit_organization: Benefit,
+        benefit_strategy_mock: MagicMock,
+    ) -> None:
+        grants = await self._create_grants(
+            save_fixture, organization, benefit_organization, 3
+        )
+        revoked_grant = await create_benefit_grant(
+            save_fixture,
+            grants[0].customer,
+            benefit_organization,
+            granted=False,
+        )
+        enqueue_job_mock = mocker.patch("polar.benefit.grant.service.enqueue_job")
+        benefit_strategy_mock.update_in_bulk.side_effect = lambda benefit, grants: {
+            grant.id: {"version": 2} for grant in grants
+        }
+
+        first_chunk = await benefit_grant_service.update_benefit_grants_in_bulk(
+            session, redis, benefit_organization, after=None, limit=2
+        )
+        assert [grant.id for grant in first_chunk] == [g.id for g in grants[:2]]
+
+        second_chunk = await benefit_grant_service.update_benefit_grants_in_bulk(
+            session, redis, benefit_organization, after=first_chunk[-1].id, limit=2
+        )
+        assert [grant.id for grant in second_chunk] == [grants[2].id]
+        assert revoked_grant.id not in {grant.id for grant in second_chunk}
+
+        for grant in grants:
+            await session.refresh(grant)
+            assert grant.properties == {"version": 2}
+            assert grant.previous_properties == {"version": 1}
+            assert grant.is_granted
+
+        enqueue_job_mock.assert_has_calls(
+            [call("customer.state_changed", grant.customer_id) for grant in grants],
+            any_order=True,
+        )
+
+    async def test_not_handled_in_bulk(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        benefit_organization: Benefit,
+        benefit_strategy_mock: MagicMock,
+    ) -> None:
+        grants = await self._create_grants(
+            save_fixture, organization, benefit_organization, 2
+        )
+        enqueue_job_mock = mocker.patch("polar.benefit.grant.service.enqueue_job")
+        benefit_strategy_mock.update_in_bulk.return_value = {
+            grants[0].id: {"version": 2}
+        }
+
+        await benefit_grant_service.update_benefit_grants_in_bulk(
+            session, redis, benefit_organization, after=None, limit=10
+        )
+
+        enqueue_job_mock.assert_any_call(
+            "benefit.update", benefit_grant_id=grants[1].id
+        )
+        await session.refresh(grants[1])
+        assert grants[1].properties == {"version": 1}
+
 
 @pytest.mark.asyncio
 class TestUpdateBenefitGrant:
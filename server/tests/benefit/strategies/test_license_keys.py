@@ -13,10 +13,18 @@ from polar.benefit.strategies.license_keys.schemas import (
     BenefitLicenseKeyExpirationProperties,
     BenefitLicenseKeysCreateProperties,
 )
+from polar.benefit.strategies.license_keys.service import BenefitLicenseKeysService
 from polar.benefit.tasks import benefit_grant, benefit_revoke
 from polar.kit.utils import utc_now
 from polar.license_key.repository import LicenseKeyRepository
-from polar.models import BenefitGrant, Customer, LicenseKey, Organization, Product
+from polar.models import (
+    BenefitGrant,
+    Customer,
+    LicenseKey,
+    Member,
+    Organization,
+    Product,
+)
 from polar.models.benefit import BenefitType
 from polar.models.license_key import LicenseKeyStatus
 from polar.postgres import AsyncSession
@@ -134,6 +142,127 @@ class TestGrantExpiration:
         assert license_key.expires_at is None
 
 
+@pytest.mark.asyncio
+class TestUpdateInBulk:
+    async def test_applies_limits(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        benefit = await create_benefit(
+            save_fixture,
+            type=BenefitType.license_keys,
+            organization=organization,
+            properties=EXPIRING_PROPERTIES,
+        )
+        subscription = await create_subscription(
+            save_fixture, product=product, customer=customer
+        )
+        order = await create_order(save_fixture, customer=customer, product=product)
+        subscription_grant = await benefit_grant_service.grant_benefit(
+            session, redis, customer, benefit, subscription=subscription
+        )
+        order_grant = await benefit_grant_service.grant_benefit(
+            session, redis, customer, benefit, order=order
+        )
+
+        benefit.properties = {
+            **benefit.properties,
+            "limit_usage": 10,
+            "activations": {"limit": 3, "enable_customer_admin": False},
+        }
+        await save_fixture(benefit)
+
+        service = BenefitLicenseKeysService(session, redis)
+        updated = await service.update_in_bulk(
+            benefit, [subscription_grant, order_grant]
+        )
+        assert updated == {
+            subscription_grant.id: subscription_grant.properties,
+            order_grant.id: order_grant.properties,
+        }
+
+        session.expire_all()
+        subscription_license_key = await _get_license_key(session, subscription_grant)
+        order_license_key = await _get_license_key(session, order_grant)
+        for license_key in (subscription_license_key, order_license_key):
+            assert license_key.limit_usage == 10
+            assert license_key.limit_activations == 3
+        assert subscription_license_key.expires_at is None
+        assert order_license_key.expires_at is not None
+
+    async def test_scoped_to_grant(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        customer_second: Customer,
+        member: Member,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        benefit = await create_benefit(
+            save_fixture,
+            type=BenefitType.license_keys,
+            organization=organization,
+            properties=EXPIRING_PROPERTIES,
+        )
+        order = await create_order(save_fixture, customer=customer, product=product)
+        grant = await benefit_grant_service.grant_benefit(
+            session, redis, customer, benefit, order=order
+        )
+        other_order = await create_order(
+            save_fixture, customer=customer_second, product=product
+        )
+        other_grant = await benefit_grant_service.grant_benefit(
+            session, redis, customer_second, benefit, order=other_order
+        )
+        # The grant of the first customer now points to the key of the second one
+        other_grant.properties = grant.properties
+        grant.member = member
+        grant.member_id = member.id
+
+        benefit.properties = {**benefit.properties, "limit_usage": 10}
+        await save_fixture(benefit)
+
+        service = BenefitLicenseKeysService(session, redis)
+        updated = await service.update_in_bulk(benefit, [grant, other_grant])
+
+        assert updated == {grant.id: grant.properties}
+
+        session.expire_all()
+        license_key = await _get_license_key(session, grant)
+        assert license_key.limit_usage == 10
+        assert license_key.member_id == member.id
+
+    async def test_grant_without_license_key(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+    ) -> None:
+        benefit = await create_benefit(
+            save_fixture,
+            type=BenefitType.license_keys,
+            organization=organization,
+            properties=EXPIRING_PROPERTIES,
+        )
+        grant = BenefitGrant(customer=customer, benefit=benefit, properties={})
+        await save_fixture(grant)
+
+        service = BenefitLicenseKeysService(session, redis)
+        updated = await service.update_in_bulk(benefit, [grant])
+
+        assert updated == {}
+
+
 @pytest.mark.asyncio
 class TestRevokeRegrant:
     async def test_reuses_and_unrevokes_key(
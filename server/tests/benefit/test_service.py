@@ -38,13 +38,20 @@ from polar.exceptions import NotPermitted, PolarRequestValidationError
 from polar.kit.pagination import PaginationParams
 from polar.kit.schemas import Schema
 from polar.kit.visibility import Visibility
-from polar.models import Benefit, Organization, SlackApp, User, UserOrganization
+from polar.models import (
+    Benefit,
+    Organization,
+    Product,
+    SlackApp,
+    User,
+    UserOrganization,
+)
 from polar.models.benefit import BenefitType
 from polar.postgres import AsyncSession
 from polar.redis import Redis
 from tests.fixtures.auth import AuthSubjectFixture
 from tests.fixtures.database import SaveFixture
-from tests.fixtures.random_objects import create_benefit
+from tests.fixtures.random_objects import create_benefit, set_product_benefits
 
 
 async def create_slack_integration(
@@ -758,6 +765,39 @@ class TestUpdate:
 
         assert updated_benefit.visibility == Visibility.public
 
+    @pytest.mark.auth
+    async def test_invalidates_cached_products(
+        self,
+        mocker: MockerFixture,
+        auth_subject: AuthSubject[User],
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        product: Product,
+        benefit_organization: Benefit,
+        user_organization: UserOrganization,
+    ) -> None:
+        mocker.patch.object(
+            benefit_grant_service,
+            "enqueue_benefit_grant_updates",
+            spec=BenefitGrantService.enqueue_benefit_grant_updates,
+        )
+        invalidate_cached_products_mock = mocker.patch(
+            "polar.benefit.service.invalidate_cached_products"
+        )
+        await set_product_benefits(
+            save_fixture, product=product, benefits=[benefit_organization]
+        )
+
+        update_schema = BenefitCustomUpdate(
+            type=BenefitType.custom, description="Description update"
+        )
+        await benefit_service.update(
+            session, redis, benefit_organization, update_schema, auth_subject
+        )
+
+        invalidate_cached_products_mock.assert_called_once_with([product.id])
+
 
 @pytest.mark.asyncio
 class TestDelete:
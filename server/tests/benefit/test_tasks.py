@@ -1,9 +1,16 @@
 import uuid
+from datetime import timedelta
+from unittest.mock import MagicMock
 
 import pytest
 from dramatiq import Retry
 from pytest_mock import MockerFixture
 
+from polar.benefit.grant.progress import (
+    BulkUpdateProgress,
+    get_progress,
+    save_progress,
+)
 from polar.benefit.grant.service import BenefitGrantService
 from polar.benefit.strategies import BenefitRetriableError
 from polar.benefit.tasks import (  # type: ignore[attr-defined]
@@ -14,15 +21,21 @@ from polar.benefit.tasks import (  # type: ignore[attr-defined]
     benefit_delete_grant,
     benefit_enqueue_grants,
     benefit_grant,
+    benefit_grant_batch,
     benefit_grant_service,
     benefit_revoke,
     benefit_update,
+    benefit_update_bulk,
 )
-from polar.models import Benefit, BenefitGrant, Customer, Subscription
+from polar.kit.utils import utc_now
+from polar.models import Benefit, BenefitGrant, Customer, Organization, Subscription
+from polar.models.benefit import BenefitType
 from polar.postgres import AsyncSession
+from polar.redis import Redis
 from polar.subscription.service import SubscriptionService
 from polar.subscription.service import subscription as subscription_service
 from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import create_benefit
 
 
 @pytest.mark.asyncio
@@ -108,6 +121,83 @@ class TestBenefitGrant:
             )
 
 
+@pytest.mark.asyncio
+class TestBenefitGrantBatch:
+    async def test_not_existing_customer(
+        self,
+        subscription: Subscription,
+        benefit_organization: Benefit,
+        session: AsyncSession,
+    ) -> None:
+        # then
+        session.expunge_all()
+
+        with pytest.raises(CustomerDoesNotExist):
+            await benefit_grant_batch(
+                uuid.uuid4(),
+                [benefit_organization.id],
+                subscription_id=subscription.id,
+            )
+
+    async def test_grants_benefits_together(
+        self,
+        mocker: MockerFixture,
+        subscription: Subscription,
+        customer: Customer,
+        benefit_organization: Benefit,
+        benefit_organization_second: Benefit,
+        session: AsyncSession,
+    ) -> None:
+        grant_benefits_mock = mocker.patch.object(
+            benefit_grant_service,
+            "grant_benefits",
+            spec=BenefitGrantService.grant_benefits,
+        )
+
+        # then
+        session.expunge_all()
+
+        await benefit_grant_batch(
+            customer.id,
+            [benefit_organization.id, uuid.uuid4(), benefit_organization_second.id],
+            subscription_id=subscription.id,
+        )
+
+        grant_benefits_mock.assert_called_once()
+        granted_benefit_ids = {
+            benefit.id for benefit in grant_benefits_mock.call_args.args[3]
+        }
+        assert granted_benefit_ids == {
+            benefit_organization.id,
+            benefit_organization_second.id,
+        }
+
+    async def test_retry(
+        self,
+        mocker: MockerFixture,
+        subscription: Subscription,
+        customer: Customer,
+        benefit_organization: Benefit,
+        session: AsyncSession,
+    ) -> None:
+        grant_benefits_mock = mocker.patch.object(
+            benefit_grant_service,
+            "grant_benefits",
+            spec=BenefitGrantService.grant_benefits,
+        )
+        grant_benefits_mock.side_effect = BenefitRetriableError(10)
+
+        # then
+        session.expunge_all()
+
+        with pytest.raises(Retry):
+            await benefit_grant_batch(
+                customer.id,
+                [benefit_organization.id],
+                subscription_id=subscription.id,
+            )
+
+
 @pytest.mark.asyncio
 class TestBenefitRevoke:
     async def test_not_existing_customer(
@@ -287,6 +377,127 @@ class TestBenefitUpdate:
             await benefit_update(grant.id)
 
 
+@pytest.mark.asyncio
+class TestBenefitUpdateBulk:
+    async def test_not_existing_benefit(self, session: AsyncSession) -> None:
+        session.expunge_all()
+
+        with pytest.raises(BenefitDoesNotExist):
+            await benefit_update_bulk(uuid.uuid4(), utc_now().isoformat())
+
+    async def test_continues(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        benefit_organization: Benefit,
+    ) -> None:
+        mocker.patch("polar.benefit.tasks.settings.BENEFIT_BULK_UPDATE_CHUNK_SIZE", 2)
+        enqueue_job_mock = mocker.patch("polar.benefit.tasks.enqueue_job")
+        grants = [MagicMock(id=uuid.uuid4()), MagicMock(id=uuid.uuid4())]
+        update_mock = mocker.patch.object(
+            benefit_grant_service,
+            "update_benefit_grants_in_bulk",
+            spec=BenefitGrantService.update_benefit_grants_in_bulk,
+            return_value=grants,
+        )
+        requested_at = utc_now().isoformat()
+
+        session.expunge_all()
+
+        await benefit_update_bulk(benefit_organization.id, requested_at)
+
+        assert update_mock.call_args.kwargs["after"] is None
+        progress = await get_progress(redis, benefit_organization.id)
+        assert progress is not None
+        assert progress.cursor == grants[-1].id
+        assert progress.updated == 2
+        assert progress.completed is False
+        enqueue_job_mock.assert_called_once_with(
+            "benefit.update_bulk",
+            benefit_id=benefit_organization.id,
+            requested_at=requested_at,
+        )
+
+    async def test_resumes_and_completes(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        benefit_organization: Benefit,
+    ) -> None:
+        mocker.patch("polar.benefit.tasks.settings.BENEFIT_BULK_UPDATE_CHUNK_SIZE", 2)
+        enqueue_job_mock = mocker.patch("polar.benefit.tasks.enqueue_job")
+        requested_at = utc_now()
+        cursor = uuid.uuid4()
+        await save_progress(
+            redis,
+            benefit_organization.id,
+            BulkUpdateProgress(requested_at=requested_at, cursor=cursor, updated=2),
+        )
+        update_mock = mocker.patch.object(
+            benefit_grant_service,
+            "update_benefit_grants_in_bulk",
+            spec=BenefitGrantService.update_benefit_grants_in_bulk,
+            return_value=[MagicMock(id=uuid.uuid4())],
+        )
+
+        session.expunge_all()
+
+        await benefit_update_bulk(benefit_organization.id, requested_at.isoformat())
+
+        assert update_mock.call_args.kwargs["after"] == cursor
+        progress = await get_progress(redis, benefit_organization.id)
+        assert progress is not None
+        assert progress.updated == 3
+        assert progress.completed is True
+        enqueue_job_mock.assert_not_called()
+
+    async def test_superseded(
+        self,
+        mocker: MockerFixture,
+        redis: Redis,
+        benefit_organization: Benefit,
+    ) -> None:
+        requested_at = utc_now()
+        await save_progress(
+            redis,
+            benefit_organization.id,
+            BulkUpdateProgress(requested_at=requested_at + timedelta(minutes=1)),
+        )
+        update_mock = mocker.patch.object(
+            benefit_grant_service,
+            "update_benefit_grants_in_bulk",
+            spec=BenefitGrantService.update_benefit_grants_in_bulk,
+        )
+
+        await benefit_update_bulk(benefit_organization.id, requested_at.isoformat())
+
+        update_mock.assert_not_called()
+
+    async def test_already_completed(
+        self,
+        mocker: MockerFixture,
+        redis: Redis,
+        benefit_organization: Benefit,
+    ) -> None:
+        requested_at = utc_now()
+        await save_progress(
+            redis,
+            benefit_organization.id,
+            BulkUpdateProgress(requested_at=requested_at, completed=True),
+        )
+        update_mock = mocker.patch.object(
+            benefit_grant_service,
+            "update_benefit_grants_in_bulk",
+            spec=BenefitGrantService.update_benefit_grants_in_bulk,
+        )
+
+        await benefit_update_bulk(benefit_organization.id, requested_at.isoformat())
+
+        update_mock.assert_not_called()
+
+
 @pytest.mark.asyncio
 class TestBenefitDelete:
     async def test_soft_deleted_benefit(
@@ -431,18 +642,55 @@ class TestBenefitEnqueueGrants:
             subscription_id=subscription.id,
         )
 
+        enqueue_job_mock.assert_called_once_with(
+            "benefit.grant_batch",
+            customer_id=subscription.customer_id,
+            benefit_ids=benefit_ids,
+            member_id=None,
+            subscription_id=subscription.id,
+        )
+
+    async def test_enqueues_external_grants_individually(
+        self,
+        mocker: MockerFixture,
+        save_fixture: SaveFixture,
+        subscription: Subscription,
+        organization: Organization,
+        benefit_organization: Benefit,
+        session: AsyncSession,
+    ) -> None:
+        enqueue_job_mock = mocker.patch("polar.benefit.tasks.enqueue_job")
+        github_benefit = await create_benefit(
+            save_fixture,
+            organization=organization,
+            type=BenefitType.github_repository,
+            properties={
+                "repository_owner": "polarsource",
+                "repository_name": "polar",
+                "permission": "pull",
+            },
+        )
+
+        session.expunge_all()
+
+        await benefit_enqueue_grants(
+            subscription.customer_id,
+            [benefit_organization.id, github_benefit.id],
+            subscription_id=subscription.id,
+        )
+
         assert enqueue_job_mock.call_count == 2
         enqueue_job_mock.assert_any_call(
-            "benefit.grant",
+            "benefit.grant_batch",
             customer_id=subscription.customer_id,
-            benefit_id=benefit_organization.id,
+            benefit_ids=[benefit_organization.id],
             member_id=None,
             subscription_id=subscription.id,
         )
         enqueue_job_mock.assert_any_call(
             "benefit.grant",
             customer_id=subscription.customer_id,
-            benefit_id=benefit_organization_second.id,
+            benefit_id=github_benefit.id,
             member_id=None,
             subscription_id=subscription.id,
         )
@@ -0,0 +1,94 @@
+import os
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.checkout.ip_geolocation import IPGeolocationDatabase, get_ip_country
+
+
+class FakeClient:
+    def __init__(self, path: Path) -> None:
+        self.country = path.read_text()
+        self.lookups = 0
+        self.closed = False
+
+    def getCountry(self, ip: str) -> str:
+        if ip == "invalid":
+            raise ValueError(ip)
+        self.lookups += 1
+        return self.country
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def database_path(tmp_path: Path, mocker: MockerFixture) -> Path:
+    mocker.patch("polar.checkout.ip_geolocation.ipinfo_db.Client", new=FakeClient)
+    path = tmp_path / "ip-geolocation.mmdb"
+    path.write_text("FR")
+    return path
+
+
+def _replace_database(path: Path, country: str) -> None:
+    new_path = path.with_suffix(".tmp")
+    new_path.write_text(country)
+    os.replace(new_path, path)
+
+
+class TestIPGeolocationDatabase:
+    def test_lookups_are_cached(self, database_path: Path) -> None:
+        database = IPGeolocationDatabase(
+            database_path, cache_size=10, reload_check_interval=60
+        )
+
+        assert get_ip_country(database, "1.2.3.4") == "FR"
+        assert get_ip_country(database, "1.2.3.4") == "FR"
+        assert get_ip_country(database, "invalid") is None
+
+        client = database._generation.client
+        assert isinstance(client, FakeClient)
+        assert client.lookups == 1
+
+    def test_empty_country(self, database_path: Path) -> None:
+        database_path.write_text("")
+        database = IPGeolocationDatabase(
+            database_path, cache_size=10, reload_check_interval=60
+        )
+
+        assert get_ip_country(database, "1.2.3.4") is None
+
+    def test_reload(self, database_path: Path) -> None:
+        database = IPGeolocationDatabase(
+            database_path, cache_size=10, reload_check_interval=0
+        )
+        assert get_ip_country(database, "1.2.3.4") == "FR"
+
+        _replace_database(database_path, "DE")
+
+        assert get_ip_country(database, "1.2.3.4") == "DE"
+
+    def test_reload_waits_for_check_interval(self, database_path: Path) -> None:
+        database = IPGeolocationDatabase(
+            database_path, cache_size=10, reload_check_interval=3600
+        )
+        assert get_ip_country(database, "1.2.3.4") == "FR"
+
+        _replace_database(database_path, "DE")
+
+        assert get_ip_country(database, "1.2.3.4") == "FR"
+
+    def test_reload_failure_keeps_current_database(
+        self, database_path: Path, mocker: MockerFixture
+    ) -> None:
+        database = IPGeolocationDatabase(
+            database_path, cache_size=10, reload_check_interval=0
+        )
+        _replace_database(database_path, "DE")
+        mocker.patch(
+            "polar.checkout.ip_geolocation.ipinfo_db.Client",
+            side_effect=ValueError("Invalid database"),
+        )
+
+        assert get_ip_country(database, "1.2.3.4") == "FR"
@@ -99,6 +99,7 @@ from polar.product.guard import (
 )
 from polar.product.schemas import ProductPriceFixedCreate
 from polar.product.tiers import Tiers, TierType
+from polar.redis import Redis
 from polar.subscription.service import SubscriptionService
 from polar.tax.calculation import (
     TaxabilityReason,
@@ -3072,10 +3073,11 @@ class TestGetByClientSecret:
     async def test_returns_checkout_when_org_can_authenticate(
         self,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         result = await checkout_service.get_by_client_secret(
-            session, checkout_one_time_fixed.client_secret
+            session, redis, checkout_one_time_fixed.client_secret
         )
 
         assert result.id == checkout_one_time_fixed.id
@@ -3084,6 +3086,7 @@ class TestGetByClientSecret:
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         checkout_one_time_fixed.organization.set_status(OrganizationStatus.BLOCKED)
@@ -3091,13 +3094,14 @@ class TestGetByClientSecret:
 
         with pytest.raises(NotPermitted):
             await checkout_service.get_by_client_secret(
-                session, checkout_one_time_fixed.client_secret
+                session, redis, checkout_one_time_fixed.client_secret
             )
 
     async def test_raises_expired_before_not_permitted_for_blocked_organization(
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         checkout_one_time_fixed.expires_at = utc_now() - timedelta(days=1)
@@ -3107,13 +3111,14 @@ class TestGetByClientSecret:
 
         with pytest.raises(ExpiredCheckoutError):
             await checkout_service.get_by_client_secret(
-                session, checkout_one_time_fixed.client_secret
+                session, redis, checkout_one_time_fixed.client_secret
             )
 
     async def test_raises_not_permitted_for_soft_deleted_organization(
         self,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         checkout_one_time_fixed: Checkout,
     ) -> None:
         checkout_one_time_fixed.organization.deleted_at = utc_now()
@@ -3121,7 +3126,7 @@ class TestGetByClientSecret:
 
         with pytest.raises(NotPermitted):
             await checkout_service.get_by_client_secret(
-                session, checkout_one_time_fixed.client_secret
+                session, redis, checkout_one_time_fixed.client_secret
             )
 
 
@@ -1,5 +1,6 @@
 import pytest
 import pytest_asyncio
+from pytest_mock import MockerFixture
 
 from polar.auth.models import AuthSubject
 from polar.custom_field.schemas import CustomFieldCreateText, CustomFieldUpdateText
@@ -10,7 +11,11 @@ from polar.models.custom_field import CustomFieldText, CustomFieldType
 from polar.order.repository import OrderRepository
 from polar.postgres import AsyncSession
 from tests.fixtures.database import SaveFixture
-from tests.fixtures.random_objects import create_custom_field, create_order
+from tests.fixtures.random_objects import (
+    create_custom_field,
+    create_order,
+    create_product,
+)
 
 
 @pytest_asyncio.fixture
@@ -152,3 +157,33 @@ class TestUpdate:
         await session.flush()
 
         assert updated_field.slug == deleted_field.slug
+
+    @pytest.mark.auth
+    async def test_invalidates_cached_products(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        auth_subject: AuthSubject[User],
+        user_organization: UserOrganization,
+        organization: Organization,
+        text_field: CustomFieldText,
+    ) -> None:
+        invalidate_cached_products_mock = mocker.patch(
+            "polar.custom_field.service.invalidate_cached_products"
+        )
+        product = await create_product(
+            save_fixture,
+            organization=organization,
+            recurring_interval=None,
+            attached_custom_fields=[(text_field, False)],
+        )
+
+        await custom_field_service.update(
+            session,
+            text_field,
+            CustomFieldUpdateText(type=text_field.type, name="Updated name"),
+            auth_subject,
+        )
+
+        invalidate_cached_products_mock.assert_called_once_with([product.id])
@@ -68,9 +68,9 @@ class SchedulerSimulator:
         flow in one call.
 
         Mirrors the complete APScheduler path:
-        1. ``get_due_jobs(now)`` — find subscriptions past their period end
-        2. ``remove_job(job_id)`` — lock each and enqueue ``subscription.cycle``
-        3. Worker executes the cycle task
+        1. ``get_due_jobs(now)`` — claim subscriptions past their period end
+           and enqueue ``subscription.cycle`` for each
+        2. Worker executes the cycle task
 
         Args:
             drain: The task drain callable from the ``drain`` fixture.
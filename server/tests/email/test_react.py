@@ -0,0 +1,93 @@
+import sys
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.email.react import EmailRendererPool, EmailRenderError, _render_pooled
+
+# Stand-in for the react-email binary started with `--serve`
+FAKE_RENDERER = """
+import json
+import sys
+
+pings = 0
+for line in sys.stdin:
+    request = json.loads(line)
+    if request.get("ping"):
+        pings += 1
+        response = {"id": request["id"], "pong": True}
+    elif request["template"] == "desync":
+        response = {"id": request["id"] + 1, "html": "<p>stale</p>"}
+    elif request["template"] == "unknown":
+        response = {"id": request["id"], "error": "Template unknown not found"}
+    else:
+        html = f"<p>{request['template']} {request['props']['name']} {pings}</p>"
+        response = {"id": request["id"], "html": html}
+    sys.stdout.write(json.dumps(response) + "\\n")
+    sys.stdout.flush()
+"""
+
+
+class FakeEmailRendererPool(EmailRendererPool):
+    def get_command(self) -> list[str]:
+        return [sys.executable, "-c", FAKE_RENDERER]
+
+
+@pytest.mark.asyncio
+class TestEmailRendererPool:
+    async def test_render(self, mocker: MockerFixture) -> None:
+        pool = FakeEmailRendererPool(size=1, max_requests_per_process=10, timeout=10)
+        mocker.patch("polar.email.react.renderer_pool", pool)
+
+        try:
+            html = await _render_pooled("greetings", '{"name": "Jane"}')
+        finally:
+            await pool.close()
+
+        assert html == "<p>greetings Jane 0</p>"
+
+    async def test_render_error(self, mocker: MockerFixture) -> None:
+        pool = FakeEmailRendererPool(size=1, max_requests_per_process=10, timeout=10)
+        mocker.patch("polar.email.react.renderer_pool", pool)
+
+        try:
+            with pytest.raises(EmailRenderError, match="Template unknown not found"):
+                await _render_pooled("unknown", '{"name": "Jane"}')
+            # The renderer keeps serving after a template error
+            assert len(pool._processes) == 1
+        finally:
+            await pool.close()
+
+    async def test_response_id_mismatch(self, mocker: MockerFixture) -> None:
+        pool = FakeEmailRendererPool(size=1, max_requests_per_process=10, timeout=10)
+        mocker.patch("polar.email.react.renderer_pool", pool)
+
+        try:
+            with pytest.raises(EmailRenderError):
+                await _render_pooled("desync", '{"name": "Jane"}')
+            # The out-of-sync renderer is replaced
+            assert pool._processes == set()
+
+            html = await _render_pooled("greetings", '{"name": "Jane"}')
+        finally:
+            await pool.close()
+
+        assert html == "<p>greetings Jane 0</p>"
+
+    async def test_health_check(self, mocker: MockerFixture) -> None:
+        pool = FakeEmailRendererPool(
+            size=1,
+            max_requests_per_process=10,
+            timeout=10,
+            health_check_interval=0,
+        )
+        mocker.patch("polar.email.react.renderer_pool", pool)
+
+        try:
+            await _render_pooled("greetings", '{"name": "Jane"}')
+            html = await _render_pooled("greetings", '{"name": "Jane"}')
+        finally:
+            await pool.close()
+
+        # The idle process was pinged before the second render
+        assert html == "<p>greetings Jane 1</p>"
@@ -97,6 +97,25 @@ class TestGetAncestorsBatch:
         # Should have 2 ancestors: parent (depth 1), grandparent (depth 2)
         assert result[grandchild.id] == [str(child.id), str(root.id)]
 
+    async def test_materialized_path(
+        self, save_fixture: SaveFixture, session: AsyncSession, account: Account
+    ) -> None:
+        """Test that the materialized path is preferred over the parent chain."""
+        organization = await create_organization(save_fixture, account)
+
+        root = await create_event(save_fixture, organization=organization)
+        child = await create_event(
+            save_fixture, organization=organization, parent_id=root.id
+        )
+        other = await create_event(save_fixture, organization=organization)
+        child.ancestors = [root.id, other.id]
+        await save_fixture(child)
+
+        repository = EventRepository.from_session(session)
+        result = await repository.get_ancestors_batch([child.id])
+
+        assert result[child.id] == [str(root.id), str(other.id)]
+
     async def test_batch_with_multiple_events(
         self, save_fixture: SaveFixture, session: AsyncSession, account: Account
     ) -> None:
@@ -257,6 +276,12 @@ class TestGetAncestorsBatch:
         assert ancestors[grandchild1.id] == [str(child1.id), str(root.id)]
         assert ancestors[grandchild2.id] == [str(child2.id), str(root.id)]
 
+        # Verify the materialized paths
+        assert root.ancestors == []
+        assert child1.ancestors == [root.id]
+        assert grandchild1.ancestors == [child1.id, root.id]
+        assert grandchild2.ancestors == [child2.id, root.id]
+
     async def test_self_referential_event_does_not_hang(
         self, save_fixture: SaveFixture, session: AsyncSession, account: Account
     ) -> None:
@@ -285,3 +310,71 @@ class TestGetAncestorsBatch:
         # should not contain infinitely many entries.
         ancestors = result.get(event.id, [])
         assert len(ancestors) <= 100
+
+
+@pytest.mark.asyncio
+class TestBackfillAncestors:
+    async def test_backfill(
+        self, save_fixture: SaveFixture, session: AsyncSession, account: Account
+    ) -> None:
+        organization = await create_organization(save_fixture, account)
+
+        root = await create_event(save_fixture, organization=organization)
+        child = await create_event(
+            save_fixture, organization=organization, parent_id=root.id
+        )
+        grandchild = await create_event(
+            save_fixture,
+            organization=organization,
+            parent_id=child.id,
+            root_id=root.id,
+        )
+        pending = await create_event(save_fixture, organization=organization)
+        pending.root_id = None
+        await save_fixture(pending)
+
+        repository = EventRepository.from_session(session)
+        after = None
+        for _ in range(10):
+            after = await repository.backfill_ancestors(after=after, limit=2)
+            if after is None:
+                break
+        assert after is None
+
+        result = await session.execute(
+            select(Event.id, Event.ancestors).where(
+                Event.organization_id == organization.id
+            )
+        )
+        ancestors = dict(result.tuples().all())
+        assert ancestors == {
+            root.id: [],
+            child.id: [root.id],
+            grandchild.id: [child.id, root.id],
+            pending.id: None,
+        }
+
+    async def test_descendants(
+        self, save_fixture: SaveFixture, session: AsyncSession, account: Account
+    ) -> None:
+        organization = await create_organization(save_fixture, account)
+
+        root = await create_event(save_fixture, organization=organization)
+        child = await create_event(
+            save_fixture, organization=organization, parent_id=root.id
+        )
+        grandchild = await create_event(
+            save_fixture,
+            organization=organization,
+            parent_id=child.id,
+            root_id=root.id,
+        )
+        await create_event(save_fixture, organization=organization)
+
+        repository = EventRepository.from_session(session)
+        await repository.backfill_ancestors(after=None, limit=10)
+
+        descendants = await repository.get_all(
+            repository.get_descendants_statement(root.id)
+        )
+        assert {event.id for event in descendants} == {child.id, grandchild.id}
@@ -0,0 +1,135 @@
+"""
+Benchmarks for the materialized ancestors path of events.
+
+Every `event.ingested` batch reads the ancestors of its events to send them to
+Tinybird. Walking up the `parent_id` chain costs one recursive CTE step per
+level, so deep LLM-trace style hierarchies make it expensive, while the
+materialized path is a single indexed read.
+
+- `test_get_ancestors_batch` reads the ancestors of a batch of events, deep in
+  10-level trees, by walking up the chain and from the materialized path.
+- `test_get_descendants` lists the descendants of roots, with a recursive CTE
+  down the `parent_id` edges and with the GIN index on the path.
+
+Deselected by default (marked `benchmark`); run explicitly with:
+
+    uv run pytest tests/event/test_ancestors_benchmark.py \
+        -m benchmark -s -p no:randomly
+"""
+
+import time
+import uuid
+from itertools import batched
+
+import pytest
+from sqlalchemy import insert, select
+
+from polar.event.repository import EventRepository
+from polar.models import Event, Organization
+from polar.models.event import EventSource
+from polar.postgres import AsyncSession
+
+TREES = 1000
+DEPTH = 10
+BATCH_SIZE = 1000
+
+
+async def _seed_trees(
+    session: AsyncSession, organization: Organization
+) -> list[list[uuid.UUID]]:
+    """Bulk-insert `TREES` chains of `DEPTH` events, without ancestors paths."""
+    trees = [[uuid.uuid4() for _ in range(DEPTH)] for _ in range(TREES)]
+    # Level by level, so parents are inserted before their children
+    events = [
+        {
+            "id": chain[depth],
+            "source": EventSource.user,
+            "name": f"span.{depth}",
+            "organization_id": organization.id,
+            "parent_id": chain[depth - 1] if depth > 0 else None,
+            "root_id": chain[0],
+            "user_metadata": {},
+        }
+        for depth in range(DEPTH)
+        for chain in trees
+    ]
+    for chunk in batched(events, 5000):
+        await session.execute(insert(Event), list(chunk))
+    await session.flush()
+    return trees
+
+
+async def _backfill(repository: EventRepository) -> None:
+    after = None
+    while True:
+        after = await repository.backfill_ancestors(after=after, limit=BATCH_SIZE)
+        if after is None:
+            return
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_get_ancestors_batch(
+    session: AsyncSession, organization: Organization
+) -> None:
+    trees = await _seed_trees(session, organization)
+    repository = EventRepository.from_session(session)
+    # The deepest events, like an `event.ingested` batch of LLM spans
+    event_ids = [chain[-1] for chain in trees][:BATCH_SIZE]
+
+    start = time.perf_counter()
+    walked = await repository.get_ancestors_batch(event_ids)
+    walk_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    await _backfill(repository)
+    backfill_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    materialized = await repository.get_ancestors_batch(event_ids)
+    materialized_ms = (time.perf_counter() - start) * 1000
+
+    print(
+        f"\n{len(event_ids)} events at depth {DEPTH} | "
+        f"walk {walk_ms:8.1f} ms | path {materialized_ms:8.1f} ms | "
+        f"speedup {walk_ms / materialized_ms:5.1f}x | "
+        f"backfill of {TREES * DEPTH} events {backfill_ms:8.1f} ms"
+    )
+    assert materialized == walked
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_get_descendants(
+    session: AsyncSession, organization: Organization
+) -> None:
+    trees = await _seed_trees(session, organization)
+    repository = EventRepository.from_session(session)
+    await _backfill(repository)
+    roots = [chain[0] for chain in trees][:100]
+
+    start = time.perf_counter()
+    walked: dict[uuid.UUID, set[uuid.UUID]] = {}
+    for root_id in roots:
+        anchor = select(Event.id).where(Event.parent_id == root_id)
+        cte = anchor.cte("descendants", recursive=True)
+        cte = cte.union_all(select(Event.id).where(Event.parent_id == cte.c.id))
+        result = await session.execute(select(cte.c.id))
+        walked[root_id] = set(result.scalars().all())
+    walk_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    materialized: dict[uuid.UUID, set[uuid.UUID]] = {}
+    for root_id in roots:
+        result = await session.execute(
+            repository.get_descendants_statement(root_id).with_only_columns(Event.id)
+        )
+        materialized[root_id] = set(result.scalars().all())
+    materialized_ms = (time.perf_counter() - start) * 1000
+
+    print(
+        f"\ndescendants of {len(roots)} roots, {DEPTH - 1} levels deep | "
+        f"recursive {walk_ms:8.1f} ms | path {materialized_ms:8.1f} ms | "
+        f"speedup {walk_ms / materialized_ms:5.1f}x"
+    )
+    assert materialized == walked
@@ -456,3 +456,64 @@ class TestResolvePendingParents:
         assert self_event.parent_id is None
         assert self_event.pending_parent_external_id == "self"
         assert self_event.root_id is None
+
+    async def test_external_id_takes_precedence_over_uuid(
+        self, save_fixture: SaveFixture, session: AsyncSession, account: Account
+    ) -> None:
+        """A ref matching both an external_id and a Polar ID links to the former."""
+        organization = await create_organization(save_fixture, account)
+        repository = EventRepository.from_session(session)
+
+        by_uuid = _make_event(organization, "by_uuid")
+        ref = str(by_uuid["id"])
+        events = [
+            _make_event(organization, "child", pending_parent_external_id=ref),
+            by_uuid,
+            _make_event(organization, ref),
+        ]
+        event_ids, _ = await repository.insert_batch(events)
+        resolved = await _resolve(repository, event_ids)
+
+        assert len(resolved) == 1
+        by_ext = await _get_events(session, organization)
+        assert by_ext["child"].parent_id == by_ext[ref].id
+
+    async def test_deep_chain_in_two_statements(
+        self, save_fixture: SaveFixture, session: AsyncSession, account: Account
+    ) -> None:
+        """A 10-level chain, in reverse order, resolves in two UPDATEs."""
+        organization = await create_organization(save_fixture, account)
+        repository = EventRepository.from_session(session)
+
+        events = [
+            _make_event(
+                organization,
+                f"level{depth}",
+                pending_parent_external_id=f"level{depth - 1}" if depth else None,
+            )
+            for depth in reversed(range(10))
+        ]
+        event_ids, _ = await repository.insert_batch(events)
+
+        statements: list[str] = []
+
+        def record_statement(*args: Any) -> None:
+            statements.append(args[2])
+
+        bind = session.sync_session.bind
+        assert bind is not None
+        sqlalchemy_event.listen(bind, "before_cursor_execute", record_statement)
+        try:
+            resolved = await _resolve(repository, event_ids)
+        finally:
+            sqlalchemy_event.remove(bind, "before_cursor_execute", record_statement)
+
+        assert len(resolved) == 9
+        assert len(statements) == 2
+        by_ext = await _get_events(session, organization)
+        root = by_ext["level0"]
+        leaf = by_ext["level9"]
+        assert leaf.root_id == root.id
+        assert leaf.ancestors == [
+            by_ext[f"level{depth}"].id for depth in range(8, -1, -1)
+        ]
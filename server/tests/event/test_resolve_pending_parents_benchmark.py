@@ -0,0 +1,192 @@
+"""
+Benchmarks for `EventRepository.resolve_pending_parents`.
+
+It used to link pending parents with four UPDATEs, plus a SELECT to find
+UUID-shaped refs, then propagate `root_id` with one UPDATE per level of the
+hierarchy, all while holding row locks on `events`. It now runs two statements:
+a linking UPDATE and a recursive propagating one.
+
+- `test_deep_batch` resolves a 10k events batch of 10-level chains, ingested
+  out of order, and reports the duration and number of statements of both
+  implementations.
+
+Deselected by default (marked `benchmark`); run explicitly with:
+
+    uv run pytest tests/event/test_resolve_pending_parents_benchmark.py \
+        -m benchmark -s -p no:randomly
+"""
+
+import time
+from collections.abc import Sequence
+from itertools import batched
+from typing import Any
+from uuid import UUID
+
+import pytest
+from sqlalchemy import UUID as SA_UUID
+from sqlalchemy import String, cast, or_, select, update
+from sqlalchemy import event as sqlalchemy_event
+
+from polar.event.repository import EventRepository
+from polar.models import Event, Organization
+from polar.models.event import EventSource
+from polar.postgres import AsyncSession
+
+CHAINS = 1000
+DEPTH = 10
+
+
+async def _insert_batch(
+    repository: EventRepository, organization: Organization
+) -> list[UUID]:
+    """Insert `CHAINS` chains of `DEPTH` events, children first."""
+    events: list[dict[str, Any]] = []
+    for chain in range(CHAINS):
+        for depth in reversed(range(DEPTH)):
+            events.append(
+                {
+                    "name": f"span.{depth}",
+                    "source": EventSource.user,
+                    "organization_id": organization.id,
+                    "external_id": f"{chain}.{depth}",
+                    "pending_parent_external_id": (
+                        f"{chain}.{depth - 1}" if depth > 0 else None
+                    ),
+                }
+            )
+    event_ids: list[UUID] = []
+    for chunk in batched(events, 5000):
+        inserted_ids, _ = await repository.insert_batch(list(chunk))
+        event_ids.extend(inserted_ids)
+    return event_ids
+
+
+async def _link_legacy(
+    session: AsyncSession,
+    parent: Any,
+    *criteria: Any,
+) -> None:
+    await session.execute(
+        update(Event)
+        .values(parent_id=parent.c.id, pending_parent_external_id=None)
+        .where(
+            Event.organization_id == parent.c.organization_id,
+            Event.id != parent.c.id,
+            *criteria,
+        )
+    )
+
+
+async def _resolve_legacy(
+    session: AsyncSession, inserted_ids: Sequence[UUID]
+) -> Sequence[UUID]:
+    """The resolution as it was, with one UPDATE per step and level."""
+    parent_1a = Event.__table__.alias("parent_1a")
+    await _link_legacy(
+        session,
+        parent_1a,
+        Event.pending_parent_external_id == parent_1a.c.external_id,
+        Event.id.in_(inserted_ids),
+    )
+
+    result = await session.execute(
+        select(Event.id, Event.pending_parent_external_id).where(
+            Event.id.in_(inserted_ids),
+            Event.pending_parent_external_id.is_not(None),
+        )
+    )
+    uuid_pending: list[UUID] = []
+    for event_id, pending_ref in result.all():
+        try:
+            UUID(pending_ref)
+        except ValueError, TypeError:
+            continue
+        uuid_pending.append(event_id)
+    if uuid_pending:
+        parent_1b = Event.__table__.alias("parent_1b")
+        await _link_legacy(
+            session,
+            parent_1b,
+            cast(Event.pending_parent_external_id, SA_UUID) == parent_1b.c.id,
+            Event.id.in_(uuid_pending),
+        )
+
+    parent_1c = Event.__table__.alias("parent_1c")
+    await _link_legacy(
+        session,
+        parent_1c,
+        Event.pending_parent_external_id.is_not(None),
+        Event.pending_parent_external_id == parent_1c.c.external_id,
+        parent_1c.c.id.in_(inserted_ids),
+    )
+    parent_1d = Event.__table__.alias("parent_1d")
+    await _link_legacy(
+        session,
+        parent_1d,
+        Event.pending_parent_external_id.is_not(None),
+        Event.pending_parent_external_id == cast(parent_1d.c.id, String),
+        parent_1d.c.id.in_(inserted_ids),
+    )
+
+    frontier: set[UUID] = set(inserted_ids)
+    newly_rooted: list[UUID] = []
+    while frontier:
+        parent = Event.__table__.alias("p_root")
+        result = await session.execute(
+            update(Event)
+            .values(root_id=parent.c.root_id)
+            .where(
+                or_(Event.id.in_(frontier), Event.parent_id.in_(frontier)),
+                Event.root_id.is_(None),
+                Event.parent_id == parent.c.id,
+                parent.c.root_id.is_not(None),
+            )
+            .returning(Event.id)
+        )
+        frontier = {row[0] for row in result.all()}
+        newly_rooted.extend(frontier)
+    return newly_rooted
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+@pytest.mark.parametrize("legacy", [True, False], ids=["before", "after"])
+async def test_deep_batch(
+    session: AsyncSession, organization: Organization, legacy: bool
+) -> None:
+    repository = EventRepository.from_session(session)
+    event_ids = await _insert_batch(repository, organization)
+    await session.flush()
+
+    statements = 0
+
+    def count_statement(*args: Any) -> None:
+        nonlocal statements
+        statements += 1
+
+    bind = session.sync_session.bind
+    assert bind is not None
+    sqlalchemy_event.listen(bind, "before_cursor_execute", count_statement)
+    start = time.perf_counter()
+    try:
+        if legacy:
+            resolved = await _resolve_legacy(session, event_ids)
+        else:
+            resolved = await repository.resolve_pending_parents(event_ids)
+    finally:
+        seconds = time.perf_counter() - start
+        sqlalchemy_event.remove(bind, "before_cursor_execute", count_statement)
+
+    print(
+        f"\n{'before' if legacy else 'after '} | {len(event_ids)} events, "
+        f"{CHAINS} chains of {DEPTH} | {statements:3d} statements | "
+        f"{seconds * 1000:8.1f} ms"
+    )
+    assert len(resolved) == CHAINS * (DEPTH - 1)
+
+    result = await session.execute(
+        select(Event.id).where(
+            Event.organization_id == organization.id, Event.root_id.is_(None)
+        )
+    )
+    assert result.all() == []
@@ -1,3 +1,4 @@
+import json
 import uuid
 from collections.abc import Awaitable, Callable
 from datetime import timedelta
@@ -62,6 +63,10 @@ from tests.fixtures.random_objects import (
 )
 
 
+def _decode_ndjson(ndjson: str) -> list[dict[str, Any]]:
+    return [json.loads(line) for line in ndjson.splitlines()]
+
+
 @pytest.fixture
 def enqueue_job_mock(mocker: MockerFixture) -> MagicMock:
     return mocker.patch("polar.event.service.enqueue_job")
@@ -991,7 +996,7 @@ class TestIngest:
             c for c in enqueue_job_mock.call_args_list if c.args[0] == "tinybird.ingest"
         ]
         assert len(tinybird_calls) == 1
-        tinybird_payload = tinybird_calls[0].args[1]
+        tinybird_payload = _decode_ndjson(tinybird_calls[0].args[1])
         assert {tb["id"] for tb in tinybird_payload} == {str(parent.id), str(child.id)}
 
     @pytest.mark.auth(AuthSubjectFixture(subject="organization"))
@@ -1093,7 +1098,7 @@ class TestIngest:
             for c in reversed(enqueue_job_mock.call_args_list)
             if c.args[0] == "tinybird.ingest"
         )
-        assert {tb["id"] for tb in last_tinybird_call.args[1]} == {
+        assert {tb["id"] for tb in _decode_ndjson(last_tinybird_call.args[1])} == {
             str(p.id),
             str(c.id),
             str(gc.id),
@@ -1827,9 +1832,12 @@ class TestIngested:
             c for c in enqueue_job_mock.call_args_list if c.args[0] == "tinybird.ingest"
         ]
         assert len(tinybird_calls) == 1
-        tinybird_payload = tinybird_calls[0].args[1]
+        tinybird_payload = _decode_ndjson(tinybird_calls[0].args[1])
         assert len(tinybird_payload) == len(events)
         assert {tb["id"] for tb in tinybird_payload} == {str(e.id) for e in events}
+        assert tinybird_calls[0].kwargs["organizations"].keys() == {
+            str(e.organization_id) for e in events
+        }
 
     async def test_activates_matching_customer_meter(
         self,
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.eventstream.pubsub import PubSubMultiplexer, SlowConsumer
+from polar.redis import Redis
+
+
+async def _wait_for_subscribers(redis: Redis, channel: str, count: int) -> None:
+    for _ in range(50):
+        ((_, subscribers),) = await redis.pubsub_numsub(channel)
+        if subscribers == count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Expected {count} subscribers on {channel}")
+
+
+@pytest.mark.asyncio
+class TestPubSubMultiplexer:
+    async def test_dispatch(self, redis: Redis) -> None:
+        multiplexer = PubSubMultiplexer(redis)
+        first = await multiplexer.subscribe(["test:a", "test:b"])
+        second = await multiplexer.subscribe(["test:b"])
+
+        await redis.publish("test:a", "message_a")
+        await redis.publish("test:b", "message_b")
+
+        assert await first.get(timeout=1) in {b"message_a", "message_a"}
+        assert await first.get(timeout=1) in {b"message_b", "message_b"}
+        assert await second.get(timeout=1) in {b"message_b", "message_b"}
+        assert await second.get(timeout=0.1) is None
+
+        await multiplexer.close()
+
+    async def test_shared_connection_reference_counting(self, redis: Redis) -> None:
+        multiplexer = PubSubMultiplexer(redis)
+        first = await multiplexer.subscribe(["test:shared"])
+        second = await multiplexer.subscribe(["test:shared"])
+
+        # A single connection is subscribed, whatever the number of clients
+        await _wait_for_subscribers(redis, "test:shared", 1)
+
+        await first.close()
+        await _wait_for_subscribers(redis, "test:shared", 1)
+
+        await redis.publish("test:shared", "message")
+        assert await second.get(timeout=1) in {b"message", "message"}
+
+        await second.close()
+        await _wait_for_subscribers(redis, "test:shared", 0)
+
+        await multiplexer.close()
+
+    async def test_slow_consumer(self, redis: Redis, mocker: MockerFixture) -> None:
+        mocker.patch("polar.eventstream.pubsub.SUBSCRIPTION_QUEUE_SIZE", 2)
+        multiplexer = PubSubMultiplexer(redis)
+        slow = await multiplexer.subscribe(["test:slow"])
+        fast = await multiplexer.subscribe(["test:slow"])
+
+        for i in range(3):
+            await redis.publish("test:slow", f"message{i}")
+            await fast.get(timeout=1)
+
+        with pytest.raises(SlowConsumer):
+            await slow.get(timeout=1)
+
+        await slow.close()
+        await fast.close()
+        await multiplexer.close()
+
+    async def test_reader_error(self, redis: Redis, mocker: MockerFixture) -> None:
+        multiplexer = PubSubMultiplexer(redis)
+        subscription = await multiplexer.subscribe(["test:error"])
+        mocker.patch.object(
+            multiplexer,
+            "_dispatch",
+            side_effect=UnicodeDecodeError("utf-8", b"", 0, 1, ""),
+        )
+
+        await redis.publish("test:error", "message")
+
+        # Subscribers are closed instead of waiting on a dead reader
+        with pytest.raises(UnicodeDecodeError):
+            await subscription.get(timeout=1)
+
+        # New subscribers get a working connection
+        mocker.stopall()
+        subscription = await multiplexer.subscribe(["test:error"])
+        await redis.publish("test:error", "message")
+        assert await subscription.get(timeout=1) in {b"message", "message"}
+
+        await multiplexer.close()
@@ -3,62 +3,70 @@ from unittest.mock import AsyncMock
 
 import pytest
 from pytest_mock import MockerFixture
+from redis.exceptions import ConnectionError
 
 from polar.eventstream.endpoints import subscribe
+from polar.eventstream.pubsub import Subscription, get_multiplexer
 from polar.redis import Redis
 
 
 @pytest.fixture(autouse=True)
-def _no_uvicorn_exit(mocker: MockerFixture) -> None:
-    """Ensure _uvicorn_should_exit always returns False during tests."""
+def _short_iterations(mocker: MockerFixture) -> None:
+    mocker.patch("polar.eventstream.endpoints.ITERATION_INTERVAL", 0.05)
+
+
+def _stop_after(mocker: MockerFixture, iterations: int) -> None:
+    """Have the stream end after N iterations, like on server shutdown."""
     mocker.patch(
         "polar.eventstream.endpoints._uvicorn_should_exit",
-        return_value=False,
+        side_effect=[False] * iterations + [True],
     )
 
 
-def _make_request(disconnect_after: int) -> AsyncMock:
-    """Create a mock request that disconnects after N iterations."""
+def _make_request() -> AsyncMock:
     request = AsyncMock()
     request.scope = {"path": "/endpoint"}
-    request.is_disconnected = AsyncMock(side_effect=[False] * disconnect_after + [True])
     return request
 
 
 @pytest.mark.asyncio
 class TestSubscribeOnIteration:
-    async def test_on_iteration_called_each_loop(self, redis: Redis) -> None:
+    async def test_on_iteration_called_each_loop(
+        self, redis: Redis, mocker: MockerFixture
+    ) -> None:
         """on_iteration callback is invoked on every loop iteration."""
         channel = "test:on_iter"
         iterations = 3
         callback = AsyncMock()
-        request = _make_request(disconnect_after=iterations)
+        _stop_after(mocker, iterations)
 
-        async for _ in subscribe(redis, [channel], request, on_iteration=callback):
+        async for _ in subscribe(
+            redis, [channel], _make_request(), on_iteration=callback
+        ):
             pass
 
         assert callback.call_count == iterations
 
-    async def test_on_iteration_none_does_not_error(self, redis: Redis) -> None:
+    async def test_on_iteration_none_does_not_error(
+        self, redis: Redis, mocker: MockerFixture
+    ) -> None:
         """subscribe works without an on_iteration callback."""
         channel = "test:no_cb"
-        request = _make_request(disconnect_after=1)
+        _stop_after(mocker, 1)
 
-        # Should complete without error
         messages = []
-        async for msg in subscribe(redis, [channel], request):
+        async for msg in subscribe(redis, [channel], _make_request()):
             messages.append(msg)
 
-        # No messages expected — just verifying no crash
-        assert isinstance(messages, list)
+        assert messages == []
 
-    async def test_yields_published_messages(self, redis: Redis) -> None:
+    async def test_yields_published_messages(
+        self, redis: Redis, mocker: MockerFixture
+    ) -> None:
         """Messages published to the channel are yielded by subscribe."""
         channel = "test:msgs"
         callback = AsyncMock()
-
-        # Allow enough iterations to receive messages + disconnect
-        request = _make_request(disconnect_after=4)
+        _stop_after(mocker, 20)
 
         async def publish_after_subscribe() -> None:
             # Small delay to let subscribe register
@@ -70,7 +78,9 @@ class TestSubscribeOnIteration:
         task = asyncio.create_task(publish_after_subscribe())
 
         messages = []
-        async for msg in subscribe(redis, [channel], request, on_iteration=callback):
+        async for msg in subscribe(
+            redis, [channel], _make_request(), on_iteration=callback
+        ):
             messages.append(msg)
 
         await task
@@ -80,7 +90,9 @@ class TestSubscribeOnIteration:
         assert b"msg2" in messages or "msg2" in messages
         assert callback.call_count >= 1
 
-    async def test_on_iteration_called_before_get_message(self, redis: Redis) -> None:
+    async def test_on_iteration_called_before_get_message(
+        self, redis: Redis, mocker: MockerFixture
+    ) -> None:
         """on_iteration is called before waiting for messages, not after."""
         channel = "test:order"
         call_order: list[str] = []
@@ -88,12 +100,68 @@ class TestSubscribeOnIteration:
         async def track_callback() -> None:
             call_order.append("callback")
 
-        request = _make_request(disconnect_after=1)
+        _stop_after(mocker, 1)
 
         async for _ in subscribe(
-            redis, [channel], request, on_iteration=track_callback
+            redis, [channel], _make_request(), on_iteration=track_callback
         ):
             call_order.append("message")
 
         # callback should have been called even though no messages arrived
         assert "callback" in call_order
+
+
+@pytest.mark.asyncio
+class TestSubscribeDisconnect:
+    async def test_not_polled(self, redis: Redis, mocker: MockerFixture) -> None:
+        request = _make_request()
+        _stop_after(mocker, 3)
+
+        async for _ in subscribe(redis, ["test:not_polled"], request):
+            pass
+
+        request.is_disconnected.assert_not_awaited()
+
+    async def test_cancellation_closes_subscription(
+        self, redis: Redis, mocker: MockerFixture
+    ) -> None:
+        mocker.patch(
+            "polar.eventstream.endpoints._uvicorn_should_exit", return_value=False
+        )
+        channel = "test:cancelled"
+
+        async def consume() -> None:
+            async for _ in subscribe(redis, [channel], _make_request()):
+                pass
+
+        # Like `EventSourceResponse` does when the client disconnects
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.1)
+        assert channel in get_multiplexer(redis)._subscriptions
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert channel not in get_multiplexer(redis)._subscriptions
+
+
+@pytest.mark.asyncio
+class TestSubscribeErrors:
+    @pytest.mark.parametrize(
+        "error", [ConnectionError("Connection lost"), ValueError("Reader failed")]
+    )
+    async def test_reconnect(
+        self, error: Exception, redis: Redis, mocker: MockerFixture
+    ) -> None:
+        mocker.patch(
+            "polar.eventstream.endpoints._uvicorn_should_exit", return_value=False
+        )
+        mocker.patch.object(Subscription, "get", side_effect=error)
+        channel = "test:errors"
+
+        messages = [
+            message async for message in subscribe(redis, [channel], _make_request())
+        ]
+
+        assert messages == ['{"type": "reconnect"}']
+        assert channel not in get_multiplexer(redis)._subscriptions
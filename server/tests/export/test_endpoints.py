@@ -0,0 +1,64 @@
+import pytest
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+
+from polar.auth.models import AuthSubject
+from polar.auth.scope import Scope
+from polar.export.schemas import ExportJobType
+from polar.export.service import export_job as export_job_service
+from polar.kit.utils import generate_uuid
+from polar.models import User
+from polar.redis import Redis
+from polar.transaction.export import TransactionExportParameters
+from tests.fixtures.auth import AuthSubjectFixture
+
+
+@pytest.mark.asyncio
+class TestGet:
+    async def test_anonymous(self, client: AsyncClient) -> None:
+        response = await client.get(f"/v1/exports/{generate_uuid()}")
+
+        assert response.status_code == 401
+
+    @pytest.mark.auth(AuthSubjectFixture(scopes={Scope.orders_read}))
+    async def test_missing_type_scope(
+        self,
+        mocker: MockerFixture,
+        client: AsyncClient,
+        redis: Redis,
+        user: User,
+    ) -> None:
+        mocker.patch("polar.export.service.enqueue_job")
+        job = await export_job_service.create(
+            redis,
+            AuthSubject(user, {Scope.transactions_read}, None),
+            ExportJobType.transactions,
+            filename="polar-transactions.csv",
+            parameters=TransactionExportParameters(account_id=generate_uuid()),
+        )
+
+        response = await client.get(f"/v1/exports/{job.id}")
+
+        assert response.status_code == 404
+
+    @pytest.mark.auth(AuthSubjectFixture(scopes={Scope.transactions_read}))
+    async def test_valid(
+        self,
+        mocker: MockerFixture,
+        client: AsyncClient,
+        redis: Redis,
+        user: User,
+    ) -> None:
+        mocker.patch("polar.export.service.enqueue_job")
+        job = await export_job_service.create(
+            redis,
+            AuthSubject(user, {Scope.transactions_read}, None),
+            ExportJobType.transactions,
+            filename="polar-transactions.csv",
+            parameters=TransactionExportParameters(account_id=generate_uuid()),
+        )
+
+        response = await client.get(f"/v1/exports/{job.id}")
+
+        assert response.status_code == 200
+        assert response.json()["id"] == str(job.id)
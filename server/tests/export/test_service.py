@@ -0,0 +1,172 @@
+import gzip
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.auth.models import AuthSubject
+from polar.auth.scope import Scope
+from polar.config import settings
+from polar.customer.export import CustomerExportParameters
+from polar.export.schemas import ExportJobStatus, ExportJobType
+from polar.export.service import ExportJobDoesNotExist
+from polar.export.service import export_job as export_job_service
+from polar.integrations.aws.s3 import S3Service
+from polar.kit.utils import generate_uuid
+from polar.models import Customer, User, UserOrganization
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from polar.transaction.export import TransactionExportParameters
+from tests.fixtures.auth import AuthSubjectFixture
+
+
+@pytest.fixture(autouse=True)
+def enqueue_job_mock(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch("polar.export.service.enqueue_job")
+
+
+@pytest.mark.asyncio
+class TestCreate:
+    @pytest.mark.auth
+    async def test_valid(
+        self,
+        redis: Redis,
+        auth_subject: AuthSubject[User],
+        enqueue_job_mock: MagicMock,
+    ) -> None:
+        job = await export_job_service.create(
+            redis,
+            auth_subject,
+            ExportJobType.customers,
+            filename="polar-customers.csv",
+            parameters=CustomerExportParameters(),
+        )
+
+        assert job.status == ExportJobStatus.pending
+        assert job.filename == "polar-customers.csv.gz"
+        assert job.url is None
+        enqueue_job_mock.assert_called_once_with("export.generate", job_id=job.id)
+
+        assert await export_job_service.get(redis, auth_subject, job.id) == job
+
+
+@pytest.mark.asyncio
+class TestGet:
+    @pytest.mark.auth
+    async def test_not_existing(
+        self, redis: Redis, auth_subject: AuthSubject[User]
+    ) -> None:
+        assert (
+            await export_job_service.get(redis, auth_subject, generate_uuid()) is None
+        )
+
+    @pytest.mark.auth(AuthSubjectFixture(subject="user_second"))
+    async def test_other_subject(
+        self,
+        redis: Redis,
+        auth_subject: AuthSubject[User],
+        user: User,
+    ) -> None:
+        job = await export_job_service.create(
+            redis,
+            AuthSubject(user, auth_subject.scopes, None),
+            ExportJobType.customers,
+            filename="polar-customers.csv",
+            parameters=CustomerExportParameters(),
+        )
+
+        assert await export_job_service.get(redis, auth_subject, job.id) is None
+
+    @pytest.mark.auth(AuthSubjectFixture(scopes={Scope.orders_read}))
+    async def test_missing_type_scope(
+        self, redis: Redis, auth_subject: AuthSubject[User]
+    ) -> None:
+        job = await export_job_service.create(
+            redis,
+            AuthSubject(auth_subject.subject, {Scope.transactions_read}, None),
+            ExportJobType.transactions,
+            filename="polar-transactions.csv",
+            parameters=TransactionExportParameters(account_id=generate_uuid()),
+        )
+
+        assert await export_job_service.get(redis, auth_subject, job.id) is None
+
+
+@pytest.mark.asyncio
+class TestGenerate:
+    async def test_not_existing(self, session: AsyncSession, redis: Redis) -> None:
+        with pytest.raises(ExportJobDoesNotExist):
+            await export_job_service.generate(session, redis, generate_uuid())
+
+    @pytest.mark.auth
+    async def test_subject_deleted(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        auth_subject: AuthSubject[User],
+    ) -> None:
+        job = await export_job_service.create(
+            redis,
+            auth_subject,
+            ExportJobType.customers,
+            filename="polar-customers.csv",
+            parameters=CustomerExportParameters(),
+        )
+        state = await export_job_service._load(redis, job.id)
+        assert state is not None
+        state.subject_id = generate_uuid()
+        await export_job_service._save(redis, state)
+
+        generated = await export_job_service.generate(session, redis, job.id)
+
+        assert generated.status == ExportJobStatus.failed
+        stored = await export_job_service._load(redis, job.id)
+        assert stored is not None
+        assert stored.status == ExportJobStatus.failed
+
+    @pytest.mark.auth
+    async def test_valid(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        auth_subject: AuthSubject[User],
+        user_organization: UserOrganization,
+        customer: Customer,
+        customer_second: Customer,
+    ) -> None:
+        await redis.flushall()
+        pubsub = redis.pubsub()
+        await pubsub.subscribe(f"user:{auth_subject.subject.id}")
+
+        job = await export_job_service.create(
+            redis,
+            auth_subject,
+            ExportJobType.customers,
+            filename="polar-customers.csv",
+            parameters=CustomerExportParameters(),
+        )
+
+        generated = await export_job_service.generate(session, redis, job.id)
+
+        assert generated.status == ExportJobStatus.succeeded
+        assert generated.row_count == 2
+        assert generated.url is not None
+        assert generated.url_expires_at is not None
+
+        s3 = S3Service(settings.S3_EXPORTS_BUCKET_NAME)
+        obj = s3.get_object_or_raise(
+            f"user/{auth_subject.subject.id}/{job.id}/polar-customers.csv.gz"
+        )
+        content = gzip.decompress(obj["Body"].read()).decode("utf-8")
+        lines = content.strip().split("\r\n")
+        assert len(lines) == 3
+        assert lines[0].startswith("ID,External ID,Created At,Email")
+
+        messages = []
+        while (
+            message := await pubsub.get_message(ignore_subscribe_messages=True)
+        ) is not None:
+            messages.append(json.loads(message["data"]))
+        assert messages[-1]["key"] == "export.succeeded"
+        assert messages[-1]["payload"]["id"] == str(job.id)
@@ -5,12 +5,15 @@ import pytest_asyncio
 from fakeredis import FakeAsyncRedis
 from pytest_mock import MockerFixture
 
+from polar.eventstream.pubsub import close_multiplexer
 from polar.redis import Redis
 
 
 @pytest_asyncio.fixture(autouse=True)
 async def redis() -> AsyncIterator[Redis]:
-    yield FakeAsyncRedis()
+    redis = FakeAsyncRedis()
+    yield redis
+    await close_multiplexer(redis)
 
 
 @pytest.fixture(autouse=True)
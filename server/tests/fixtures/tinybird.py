@@ -3,6 +3,7 @@ import time
 import uuid
 from collections.abc import Generator
 from pathlib import Path
+from typing import TYPE_CHECKING
 from unittest.mock import patch
 
 import httpx
@@ -13,6 +14,9 @@ from polar.integrations.tinybird import service as tinybird_service
 from polar.integrations.tinybird.client import TinybirdClient
 from polar.metrics import queries_tinybird
 
+if TYPE_CHECKING:
+    from polar.integrations.tinybird.local import LocalTinybirdClient
+
 TINYBIRD_DIR = Path(__file__).parent.parent.parent / "tinybird"
 
 
@@ -162,8 +166,21 @@ def tinybird_client(
         yield client
 
 
+@pytest.fixture
+def local_tinybird_client(tmp_path: Path) -> Generator["LocalTinybirdClient"]:
+    from polar.integrations.tinybird.local import LocalTinybirdClient
+
+    client = LocalTinybirdClient(directory=tmp_path)
+    with (
+        patch.object(tinybird_service, "client", client),
+        patch.object(queries_tinybird, "tinybird_client", client),
+    ):
+        yield client
+
+
 __all__ = [
     "get_tinybird_tokens",
+    "local_tinybird_client",
     "tinybird_available",
     "tinybird_clickhouse_token",
     "tinybird_client",
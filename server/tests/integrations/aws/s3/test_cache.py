@@ -0,0 +1,61 @@
+from datetime import UTC, datetime
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.integrations.aws.s3.cache import PresignedURLCache
+
+
+@pytest.fixture
+def clock(mocker: MockerFixture) -> MagicMock:
+    clock = mocker.patch("polar.integrations.aws.s3.cache.time.time", return_value=0)
+    mocker.patch("polar.kit.ttl_cache.time.monotonic", new=clock)
+    return clock
+
+
+def _signer() -> MagicMock:
+    signer = MagicMock()
+    signer.side_effect = lambda: (
+        f"https://example.com/{signer.call_count}",
+        datetime.now(UTC),
+    )
+    return signer
+
+
+class TestPresignedURLCache:
+    def test_reused_for_half_lifetime(self, clock: MagicMock) -> None:
+        cache = PresignedURLCache(maxsize=10)
+        signer = _signer()
+
+        clock.return_value = 100
+        url, _ = cache.get_or_sign("file", 600, signer)
+
+        clock.return_value = 299
+        assert cache.get_or_sign("file", 600, signer)[0] == url
+        signer.assert_called_once()
+
+        # Next bucket: less than half of the lifetime would be left
+        clock.return_value = 300
+        assert cache.get_or_sign("file", 600, signer)[0] != url
+        assert signer.call_count == 2
+
+    def test_keys(self, clock: MagicMock) -> None:
+        cache = PresignedURLCache(maxsize=10)
+        signer = _signer()
+
+        first_url, _ = cache.get_or_sign("a", 600, signer)
+        second_url, _ = cache.get_or_sign("b", 600, signer)
+
+        assert first_url != second_url
+        assert cache.get_or_sign("a", 600, signer)[0] == first_url
+        assert signer.call_count == 2
+
+    def test_no_ttl(self, clock: MagicMock) -> None:
+        cache = PresignedURLCache(maxsize=10)
+        signer = _signer()
+
+        cache.get_or_sign("a", 0, signer)
+        cache.get_or_sign("a", 0, signer)
+
+        assert signer.call_count == 2
@@ -0,0 +1,178 @@
+import uuid
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from pydantic import TypeAdapter
+from pytest_mock import MockerFixture
+
+from polar.integrations.tinybird.cache import TinybirdQueryCache, record_ingestion
+from polar.integrations.tinybird.service import TinybirdCustomerStat
+from polar.redis import Redis
+
+NOW = datetime(2025, 6, 1, 12, 0, tzinfo=UTC)
+SQL = "SELECT count() FROM events_by_ingested_at WHERE organization_id IN (%(p)s)"
+
+
+@pytest.fixture(autouse=True)
+def patch_settings(mocker: MockerFixture) -> None:
+    for name, value in (
+        ("TINYBIRD_QUERY_CACHE_HISTORICAL_TTL_SECONDS", 3600),
+        ("TINYBIRD_QUERY_CACHE_RECENT_TTL_SECONDS", 30),
+        ("TINYBIRD_QUERY_CACHE_GRACE_SECONDS", 300),
+    ):
+        mocker.patch(f"polar.integrations.tinybird.cache.settings.{name}", value)
+
+
+async def _ingest(
+    redis: Redis,
+    organization_id: uuid.UUID,
+    oldest: datetime,
+    newest: datetime,
+    now: datetime,
+) -> None:
+    await record_ingestion(
+        redis, organization_id, oldest=oldest, newest=newest, now=now
+    )
+
+
+@pytest.mark.asyncio
+class TestGetKey:
+    async def test_no_organization(self, redis: Redis) -> None:
+        cache = TinybirdQueryCache(redis)
+
+        assert await cache.get_key(SQL, {}, organization_ids=[], end=None) is None
+
+    async def test_not_ingested(self, redis: Redis) -> None:
+        cache = TinybirdQueryCache(redis)
+        organization_id = uuid.uuid4()
+
+        key = await cache.get_key(
+            SQL,
+            {},
+            organization_ids=[str(organization_id)],
+            end=NOW - timedelta(days=30),
+        )
+
+        assert key is not None
+        assert key[1] == 30
+
+    async def test_params(self, redis: Redis) -> None:
+        cache = TinybirdQueryCache(redis)
+        organization_ids = [str(uuid.uuid4())]
+
+        first = await cache.get_key(
+            SQL, {"p": "a"}, organization_ids=organization_ids, end=None
+        )
+        second = await cache.get_key(
+            SQL, {"p": "b"}, organization_ids=organization_ids, end=None
+        )
+
+        assert first is not None
+        assert second is not None
+        assert first[0] != second[0]
+
+    async def test_recent_window(self, redis: Redis) -> None:
+        cache = TinybirdQueryCache(redis)
+        organization_id = uuid.uuid4()
+        organization_ids = [str(organization_id)]
+        await _ingest(redis, organization_id, NOW, NOW, NOW)
+
+        key = await cache.get_key(SQL, {}, organization_ids=organization_ids, end=NOW)
+        assert key is not None
+        assert key[1] == 30
+
+        # Invalidated by any ingestion
+        later = NOW + timedelta(seconds=1)
+        await _ingest(redis, organization_id, later, later, later)
+        assert (
+            await cache.get_key(SQL, {}, organization_ids=organization_ids, end=NOW)
+        ) != key
+
+    async def test_unbounded_window(self, redis: Redis) -> None:
+        cache = TinybirdQueryCache(redis)
+        organization_id = uuid.uuid4()
+        await _ingest(redis, organization_id, NOW, NOW, NOW)
+
+        key = await cache.get_key(
+            SQL, {}, organization_ids=[str(organization_id)], end=None
+        )
+
+        assert key is not None
+        assert key[1] == 30
+
+    async def test_historical_window(self, redis: Redis) -> None:
+        cache = TinybirdQueryCache(redis)
+        organization_id = uuid.uuid4()
+        organization_ids = [str(organization_id)]
+        end = NOW - timedelta(days=1)
+        await _ingest(redis, organization_id, NOW, NOW, NOW)
+
+        key = await cache.get_key(SQL, {}, organization_ids=organization_ids, end=end)
+        assert key is not None
+        assert key[1] == 3600
+
+        # Not invalidated by newer events, even slightly out of order
+        later = NOW + timedelta(minutes=1)
+        await _ingest(redis, organization_id, NOW - timedelta(minutes=4), later, later)
+        assert (
+            await cache.get_key(SQL, {}, organization_ids=organization_ids, end=end)
+        ) == key
+
+        # Invalidated by events older than the watermark
+        await _ingest(redis, organization_id, end - timedelta(hours=1), later, later)
+        assert (
+            await cache.get_key(SQL, {}, organization_ids=organization_ids, end=end)
+        ) != key
+
+    async def test_window_within_grace_period(self, redis: Redis) -> None:
+        cache = TinybirdQueryCache(redis)
+        organization_id = uuid.uuid4()
+        await _ingest(redis, organization_id, NOW, NOW, NOW)
+
+        key = await cache.get_key(
+            SQL,
+            {},
+            organization_ids=[str(organization_id)],
+            end=NOW - timedelta(minutes=1),
+        )
+
+        assert key is not None
+        assert key[1] == 30
+
+    async def test_historical_for_all_organizations(self, redis: Redis) -> None:
+        cache = TinybirdQueryCache(redis)
+        ingested_organization_id = uuid.uuid4()
+        await _ingest(redis, ingested_organization_id, NOW, NOW, NOW)
+
+        key = await cache.get_key(
+            SQL,
+            {},
+            organization_ids=[str(ingested_organization_id), str(uuid.uuid4())],
+            end=NOW - timedelta(days=1),
+        )
+
+        assert key is not None
+        assert key[1] == 30
+
+
+@pytest.mark.asyncio
+class TestGetSet:
+    async def test_round_trip(self, redis: Redis) -> None:
+        cache = TinybirdQueryCache(redis)
+        adapter = TypeAdapter(list[TinybirdCustomerStat])
+        value = [
+            TinybirdCustomerStat(
+                customer_id=str(uuid.uuid4()),
+                external_customer_id=None,
+                occurrences=10,
+                totals={"_cost_amount": 1.5},
+                share=0.5,
+            )
+        ]
+
+        assert await cache.get("key", adapter) is None
+
+        await cache.set("key", 60, adapter, value)
+
+        assert await cache.get("key", adapter) == value
+        assert 0 < await redis.ttl("key") <= 60
@@ -0,0 +1,197 @@
+import json
+import uuid
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+
+from polar.integrations.tinybird.encoder import (
+    ORGANIZATION_BYTES,
+    encode_event,
+    encode_events,
+    event_to_tinybird,
+)
+from polar.integrations.tinybird.schemas import TinybirdEvent
+from polar.models import Event
+from polar.models.event import EventSource
+from polar.worker import MAX_JOB_PAYLOAD_BYTES
+
+
+def create_test_event(
+    *,
+    source: EventSource = EventSource.system,
+    name: str = "test.event",
+    user_metadata: dict[str, Any] | None = None,
+    customer_id: uuid.UUID | None = None,
+) -> Event:
+    now = datetime.now(UTC)
+    return Event(
+        id=uuid.uuid4(),
+        ingested_at=now,
+        timestamp=now,
+        name=name,
+        source=source,
+        organization_id=uuid.uuid4(),
+        customer_id=customer_id,
+        user_metadata=user_metadata or {},
+    )
+
+
+def _decode(line: str) -> dict[str, Any]:
+    row = json.loads(line)
+    row["user_metadata"] = json.loads(row["user_metadata"])
+    return row
+
+
+def _expected(event: Event, ancestors: list[str] | None = None) -> dict[str, Any]:
+    row = dict(event_to_tinybird(event, ancestors))
+    row["user_metadata"] = json.loads(row["user_metadata"])
+    return row
+
+
+class TestEncodeEvent:
+    @pytest.mark.parametrize(
+        "event",
+        [
+            pytest.param(create_test_event(), id="empty system event"),
+            pytest.param(
+                create_test_event(
+                    name="order.paid",
+                    customer_id=uuid.uuid4(),
+                    user_metadata={
+                        "amount": 1000.0,
+                        "currency": "usd",
+                        "order_id": "order_123",
+                        "order_created_at": "2025-01-15T10:00:00.123456+00:00",
+                        "extra": "kept",
+                    },
+                ),
+                id="system event",
+            ),
+            pytest.param(
+                create_test_event(
+                    source=EventSource.user,
+                    user_metadata={
+                        "meter_id": "meter_credits_usage",
+                        "amount": 0.24,
+                        "_cost": {"amount": 0.05, "currency": "usd"},
+                        "_llm": {
+                            "vendor": "openai",
+                            "model": "gpt-4",
+                            "input_tokens": 100,
+                            "output_tokens": 50,
+                        },
+                    },
+                ),
+                id="user event",
+            ),
+            pytest.param(
+                create_test_event(
+                    source=EventSource.user,
+                    user_metadata={"label": 'quote " and unicode é'},
+                ),
+                id="escaped characters",
+            ),
+        ],
+    )
+    def test_matches_tinybird_event(self, event: Event) -> None:
+        line = encode_event(event)
+
+        assert line.isascii()
+        assert "\n" not in line
+        assert _decode(line) == _expected(event)
+
+    @pytest.mark.parametrize("source", list(EventSource))
+    def test_all_columns(self, source: EventSource) -> None:
+        event = create_test_event(source=source)
+
+        assert set(event_to_tinybird(event)) == set(TinybirdEvent.__annotations__)
+        assert set(_decode(encode_event(event))) == set(TinybirdEvent.__annotations__)
+
+    def test_ancestors(self) -> None:
+        event = create_test_event(source=EventSource.user)
+        ancestors = [str(uuid.uuid4()), str(uuid.uuid4())]
+
+        assert _decode(encode_event(event, ancestors)) == _expected(event, ancestors)
+
+
+class TestEncodeEvents:
+    def make_events(self, count: int, metadata_bytes: int) -> list[Event]:
+        return [
+            create_test_event(
+                name="usage",
+                source=EventSource.user,
+                user_metadata={"blob": "x" * metadata_bytes},
+            )
+            for _ in range(count)
+        ]
+
+    def test_empty(self) -> None:
+        assert list(encode_events([], max_chunk_bytes=MAX_JOB_PAYLOAD_BYTES)) == []
+
+    def test_small_batch_stays_in_one_chunk(self) -> None:
+        events = self.make_events(50, 100)
+
+        chunks = list(encode_events(events, max_chunk_bytes=MAX_JOB_PAYLOAD_BYTES))
+
+        assert len(chunks) == 1
+        assert chunks[0].ndjson.splitlines() == [
+            encode_event(event) for event in events
+        ]
+
+    @pytest.mark.parametrize("json_escaped", [False, True])
+    def test_large_batch_is_split_below_the_budget(self, json_escaped: bool) -> None:
+        events = self.make_events(20, 50_000)
+
+        chunks = list(
+            encode_events(
+                events,
+                max_chunk_bytes=MAX_JOB_PAYLOAD_BYTES,
+                json_escaped=json_escaped,
+            )
+        )
+
+        assert len(chunks) > 1
+        for chunk in chunks:
+            ndjson = chunk.ndjson
+            size = len(json.dumps(ndjson)) if json_escaped else len(ndjson)
+            assert size <= MAX_JOB_PAYLOAD_BYTES
+
+    def test_every_event_is_kept_exactly_once_and_in_order(self) -> None:
+        events = self.make_events(20, 50_000)
+
+        chunks = list(encode_events(events, max_chunk_bytes=MAX_JOB_PAYLOAD_BYTES))
+
+        assert [
+            json.loads(line)["id"] for c in chunks for line in c.ndjson.splitlines()
+        ] == [str(event.id) for event in events]
+
+    def test_event_larger_than_the_budget_is_not_dropped(self) -> None:
+        events = self.make_events(1, MAX_JOB_PAYLOAD_BYTES * 2)
+
+        chunks = list(encode_events(events, max_chunk_bytes=MAX_JOB_PAYLOAD_BYTES))
+
+        assert [chunk.ndjson for chunk in chunks] == [encode_event(events[0])]
+
+    def test_organizations_of_each_chunk(self) -> None:
+        events = self.make_events(2, 100)
+        line_size = len(encode_event(events[0])) + 1
+
+        chunks = list(encode_events(events, max_chunk_bytes=2 * line_size))
+        assert len(chunks) == 1
+        assert chunks[0].organizations == {
+            str(event.organization_id): (event.timestamp, event.timestamp)
+            for event in events
+        }
+
+        chunks = list(
+            encode_events(
+                events,
+                max_chunk_bytes=2 * line_size + ORGANIZATION_BYTES,
+                organization_bytes=ORGANIZATION_BYTES,
+            )
+        )
+        assert [chunk.organizations for chunk in chunks] == [
+            {str(event.organization_id): (event.timestamp, event.timestamp)}
+            for event in events
+        ]
@@ -0,0 +1,260 @@
+import uuid
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from polar.integrations.tinybird.client import TinybirdRequestError
+from polar.integrations.tinybird.local import LocalTinybirdClient, _translate
+from polar.integrations.tinybird.service import (
+    DATASOURCE_EVENTS,
+    TinybirdEventsQuery,
+    _event_to_tinybird,
+    _get_tinybird_digests,
+    _get_tinybird_ids,
+    count_user_events_by_organization,
+    get_first_user_event_at,
+)
+from polar.models import Event
+from polar.models.event import EventSource
+
+NOW = datetime(2025, 6, 1, 12, 0, tzinfo=UTC)
+
+
+def create_test_event(
+    *,
+    organization_id: uuid.UUID,
+    name: str = "test.event",
+    source: EventSource = EventSource.user,
+    customer_id: uuid.UUID | None = None,
+    user_metadata: dict[str, object] | None = None,
+    ingested_at: datetime = NOW,
+) -> Event:
+    return Event(
+        id=uuid.uuid4(),
+        ingested_at=ingested_at,
+        timestamp=ingested_at,
+        name=name,
+        source=source,
+        organization_id=organization_id,
+        customer_id=customer_id,
+        user_metadata=user_metadata or {},
+    )
+
+
+async def _ingest(client: LocalTinybirdClient, events: list[Event]) -> None:
+    await client.ingest(DATASOURCE_EVENTS, [_event_to_tinybird(e) for e in events])
+
+
+class TestTranslate:
+    def test_parameters(self) -> None:
+        sql, parameters = _translate(
+            "SELECT count() FROM events_by_ingested_at "
+            "WHERE organization_id = {organization_id:UUID} "
+            "AND name IN {names:Array(String)}",
+            {"organization_id": "org", "names": ["a", "b"], "unused": 1},
+        )
+
+        assert "CAST($organization_id AS VARCHAR)" in sql
+        assert "(SELECT unnest(CAST($names AS VARCHAR[])))" in sql
+        assert parameters == {"organization_id": "org", "names": ["a", "b"]}
+
+    def test_string_literals_are_kept(self) -> None:
+        sql, _ = _translate("SELECT 'uniqExact({x:String})' AS literal")
+
+        assert sql == "SELECT 'uniqExact({x:String})' AS literal"
+
+    def test_functions(self) -> None:
+        sql, _ = _translate(
+            "SELECT uniqExact(customer_id), quantile(0.5)(cost_amount) "
+            "FROM events_by_ingested_at"
+        )
+
+        assert "count(DISTINCT customer_id)" in sql
+        assert "quantile_cont(cost_amount, 0.5)" in sql
+
+    def test_array_join(self) -> None:
+        sql, _ = _translate(
+            "SELECT arrayJoin(ancestors) AS ancestor, count() "
+            "FROM events_by_ingested_at GROUP BY ancestor"
+        )
+
+        assert "unnest(ancestors) AS array_join_0(array_join_0)" in sql
+        assert "SELECT array_join_0 AS ancestor" in sql
+
+    def test_missing_parameter(self) -> None:
+        with pytest.raises(ValueError, match="Missing parameters: missing"):
+            _translate("SELECT {missing:String}", {})
+
+
+@pytest.mark.asyncio
+class TestLocalTinybirdClient:
+    async def test_get_event_type_stats(
+        self, local_tinybird_client: LocalTinybirdClient
+    ) -> None:
+        organization_id = uuid.uuid4()
+        await _ingest(
+            local_tinybird_client,
+            [
+                create_test_event(organization_id=organization_id, name="a"),
+                create_test_event(organization_id=organization_id, name="a"),
+                create_test_event(
+                    organization_id=organization_id,
+                    name="b",
+                    source=EventSource.system,
+                ),
+                create_test_event(organization_id=uuid.uuid4(), name="a"),
+            ],
+        )
+
+        stats = await TinybirdEventsQuery([organization_id]).get_event_type_stats()
+
+        assert {(s.name, s.source): s.occurrences for s in stats} == {
+            ("a", EventSource.user): 2,
+            ("b", EventSource.system): 1,
+        }
+
+    async def test_get_property_group_stats(
+        self, local_tinybird_client: LocalTinybirdClient
+    ) -> None:
+        organization_id = uuid.uuid4()
+        await _ingest(
+            local_tinybird_client,
+            [
+                create_test_event(
+                    organization_id=organization_id,
+                    user_metadata={"tier": tier, "tokens": tokens},
+                )
+                for tier, tokens in (("free", 1), ("free", 2), ("pro", 10))
+            ],
+        )
+
+        stats = await TinybirdEventsQuery([organization_id]).get_property_group_stats(
+            "tier", ["tokens"]
+        )
+
+        assert {s.value: s.occurrences for s in stats} == {"free": 2, "pro": 1}
+
+    async def test_filter_by_metadata(
+        self, local_tinybird_client: LocalTinybirdClient
+    ) -> None:
+        organization_id = uuid.uuid4()
+        pro = create_test_event(
+            organization_id=organization_id, user_metadata={"tier": "pro"}
+        )
+        await _ingest(
+            local_tinybird_client,
+            [
+                pro,
+                create_test_event(
+                    organization_id=organization_id, user_metadata={"tier": "free"}
+                ),
+            ],
+        )
+
+        ids, count = (
+            await TinybirdEventsQuery([organization_id])
+            .filter_by_metadata({"tier": ["pro"]})
+            .get_event_ids_and_count(10, 0)
+        )
+
+        assert ids == [str(pro.id)]
+        assert count == 1
+
+    async def test_get_first_user_event_at(
+        self, local_tinybird_client: LocalTinybirdClient
+    ) -> None:
+        organization_id = uuid.uuid4()
+        customer_id = uuid.uuid4()
+        await _ingest(
+            local_tinybird_client,
+            [
+                create_test_event(
+                    organization_id=organization_id,
+                    customer_id=customer_id,
+                    ingested_at=NOW + timedelta(hours=hours),
+                )
+                for hours in (2, 1, 3)
+            ],
+        )
+
+        assert await get_first_user_event_at(
+            organization_id=organization_id,
+            customer_id=customer_id,
+            external_customer_id=None,
+        ) == NOW + timedelta(hours=1)
+
+    async def test_count_user_events_by_organization(
+        self, local_tinybird_client: LocalTinybirdClient
+    ) -> None:
+        organization_id = uuid.uuid4()
+        excluded_organization_id = uuid.uuid4()
+        await _ingest(
+            local_tinybird_client,
+            [
+                create_test_event(organization_id=organization_id),
+                create_test_event(organization_id=organization_id),
+                create_test_event(
+                    organization_id=organization_id, source=EventSource.system
+                ),
+                create_test_event(organization_id=excluded_organization_id),
+            ],
+        )
+
+        counts = await count_user_events_by_organization(
+            after=None,
+            until=NOW + timedelta(days=1),
+            exclude_organization_id=excluded_organization_id,
+        )
+
+        assert counts == {organization_id: 2}
+
+    async def test_reconciliation_queries(
+        self, local_tinybird_client: LocalTinybirdClient
+    ) -> None:
+        organization_id = uuid.uuid4()
+        events = [
+            create_test_event(
+                organization_id=organization_id,
+                ingested_at=NOW + timedelta(seconds=seconds),
+            )
+            for seconds in (0, 1, 90)
+        ]
+        await _ingest(local_tinybird_client, events)
+
+        digests = await _get_tinybird_digests(NOW, NOW + timedelta(minutes=5), 60_000)
+        expected: dict[int, tuple[int, int]] = {}
+        for event in events:
+            bucket = int(event.ingested_at.timestamp() * 1000) // 60_000
+            count, hash = expected.get(bucket, (0, 0))
+            expected[bucket] = (count + 1, hash + int(event.id.hex[-8:], 16))
+        assert digests == expected
+
+        unknown_id = uuid.uuid4()
+        assert await _get_tinybird_ids(
+            NOW, NOW + timedelta(minutes=5), [events[0].id, unknown_id]
+        ) == {events[0].id}
+
+    async def test_delete(self, local_tinybird_client: LocalTinybirdClient) -> None:
+        organization_id = uuid.uuid4()
+        kept = create_test_event(organization_id=organization_id)
+        deleted = create_test_event(organization_id=organization_id)
+        await _ingest(local_tinybird_client, [kept, deleted])
+
+        result = await local_tinybird_client.delete(
+            DATASOURCE_EVENTS, f"id = '{deleted.id}'"
+        )
+
+        assert result["status"] == "done"
+        ids, count = await TinybirdEventsQuery(
+            [organization_id]
+        ).get_event_ids_and_count(10, 0)
+        assert ids == [str(kept.id)]
+        assert count == 1
+
+    async def test_unknown_endpoint(
+        self, local_tinybird_client: LocalTinybirdClient
+    ) -> None:
+        with pytest.raises(TinybirdRequestError) as e:
+            await local_tinybird_client.endpoint("metrics_events", {})
+
+        assert e.value.status_code == 404
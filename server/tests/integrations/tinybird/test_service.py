@@ -3,10 +3,12 @@ import json
 import uuid
 from datetime import UTC, datetime, timedelta
 from typing import Any
+from unittest.mock import MagicMock
 
 import httpx
 import pytest
 import respx
+from pytest_mock import MockerFixture
 from sqlalchemy import select
 
 from polar.integrations.tinybird.client import (
@@ -15,17 +17,16 @@ from polar.integrations.tinybird.client import (
     TinybirdOperationalError,
     TinybirdRequestError,
 )
-from polar.integrations.tinybird.schemas import TinybirdEvent
 from polar.integrations.tinybird.service import (
     DATASOURCE_EVENTS,
     TinybirdEventsQuery,
     TinybirdEventTypesQuery,
     _compile,
     _event_to_tinybird,
-    chunk_tinybird_events,
     clickhouse_dialect,
     count_user_events_by_organization,
     events_table,
+    reconcile_events,
 )
 from polar.meter.filter import (
     Filter,
@@ -33,13 +34,18 @@ from polar.meter.filter import (
     FilterConjunction,
     FilterOperator,
 )
-from polar.models import Event
+from polar.models import Event, Organization
 from polar.models.event import EventSource
-from polar.worker import MAX_JOB_PAYLOAD_BYTES
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import create_event
 from tests.fixtures.tinybird import tinybird_available
 
 pytestmark = pytest.mark.xdist_group(name="tinybird")
 
+RECONCILE_START = datetime(2025, 1, 15, 10, 0, tzinfo=UTC)
+
 
 def create_test_event(
     *,
@@ -153,51 +159,138 @@ def compile_clause(clause: Any) -> tuple[str, dict[str, Any]]:
     return str(compiled), dict(compiled.params)
 
 
-class TestChunkTinybirdEvents:
-    def make_events(self, count: int, metadata_bytes: int) -> list[TinybirdEvent]:
-        return [
-            _event_to_tinybird(
-                create_test_event(
-                    name="usage",
-                    source=EventSource.user,
-                    user_metadata={"blob": "x" * metadata_bytes},
-                )
-            )
-            for _ in range(count)
-        ]
-
-    def test_empty(self) -> None:
-        assert list(chunk_tinybird_events([])) == []
+class FakeTinybirdEvents:
+    """Tinybird side of the reconciliation, computed from a list of events."""
 
-    def test_small_batch_stays_in_one_chunk(self) -> None:
-        events = self.make_events(50, 100)
+    def __init__(self, events: list[Event]) -> None:
+        self.events = [(event.ingested_at, event.id) for event in events]
 
-        chunks = list(chunk_tinybird_events(events))
+    def _in_range(self, start: datetime, end: datetime) -> list[tuple[int, uuid.UUID]]:
+        # Tinybird stores `ingested_at` with a millisecond precision
+        return [
+            (int(ingested_at.timestamp() * 1000), id)
+            for ingested_at, id in self.events
+            if start <= ingested_at < end
+        ]
 
-        assert chunks == [events]
+    async def get_digests(
+        self, start: datetime, end: datetime, bucket_milliseconds: int
+    ) -> dict[int, tuple[int, int]]:
+        digests: dict[int, tuple[int, int]] = {}
+        for milliseconds, id in self._in_range(start, end):
+            bucket = milliseconds // bucket_milliseconds
+            count, hash = digests.get(bucket, (0, 0))
+            digests[bucket] = (count + 1, hash + int(str(id)[28:], 16))
+        return digests
 
-    def test_large_batch_is_split_below_the_payload_budget(self) -> None:
-        events = self.make_events(20, 50_000)
+    async def get_ids(
+        self, start: datetime, end: datetime, ids: list[uuid.UUID]
+    ) -> set[uuid.UUID]:
+        return {id for _, id in self._in_range(start, end) if id in ids}
 
-        chunks = list(chunk_tinybird_events(events))
 
-        assert len(chunks) > 1
-        for chunk in chunks:
-            assert len(json.dumps(chunk).encode("utf-8")) <= MAX_JOB_PAYLOAD_BYTES
+@pytest.mark.asyncio
+class TestReconcileEvents:
+    async def _create_events(
+        self, save_fixture: SaveFixture, organization: Organization, count: int
+    ) -> list[Event]:
+        return [
+            await create_event(
+                save_fixture,
+                organization=organization,
+                ingested_at=RECONCILE_START
+                + timedelta(seconds=index, microseconds=123),
+            )
+            for index in range(count)
+        ]
 
-    def test_every_event_is_kept_exactly_once_and_in_order(self) -> None:
-        events = self.make_events(20, 50_000)
+    def _patch_tinybird(self, mocker: MockerFixture, events: list[Event]) -> MagicMock:
+        fake = FakeTinybirdEvents(events)
+        mocker.patch(
+            "polar.integrations.tinybird.service._get_tinybird_digests",
+            side_effect=fake.get_digests,
+        )
+        mocker.patch(
+            "polar.integrations.tinybird.service._get_tinybird_ids",
+            side_effect=fake.get_ids,
+        )
+        return mocker.patch("polar.integrations.tinybird.service.ingest_events")
+
+    async def test_in_sync(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        events = await self._create_events(save_fixture, organization, 90)
+        ingest_events_mock = self._patch_tinybird(mocker, events)
 
-        chunks = list(chunk_tinybird_events(events))
+        total_checked, total_missing, missing_ids = await reconcile_events(
+            session, redis, RECONCILE_START, RECONCILE_START + timedelta(hours=1)
+        )
 
-        assert [event for chunk in chunks for event in chunk] == events
+        assert total_checked == 90
+        assert total_missing == 0
+        assert missing_ids == []
+        ingest_events_mock.assert_not_called()
+
+    @pytest.mark.parametrize("leaf_size", [1000, 2])
+    async def test_missing_events(
+        self,
+        leaf_size: int,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        mocker.patch(
+            "polar.integrations.tinybird.service.RECONCILE_LEAF_SIZE", leaf_size
+        )
+        events = await self._create_events(save_fixture, organization, 90)
+        missing = [events[5], events[70]]
+        ingest_events_mock = self._patch_tinybird(
+            mocker, [event for event in events if event not in missing]
+        )
 
-    def test_event_larger_than_the_budget_is_not_dropped(self) -> None:
-        events = self.make_events(1, MAX_JOB_PAYLOAD_BYTES * 2)
+        total_checked, total_missing, missing_ids = await reconcile_events(
+            session, redis, RECONCILE_START, RECONCILE_START + timedelta(hours=1)
+        )
 
-        chunks = list(chunk_tinybird_events(events))
+        assert total_checked == 90
+        assert total_missing == 2
+        assert missing_ids == [str(event.id) for event in missing]
+        ingested = [
+            event.id
+            for call in ingest_events_mock.call_args_list
+            for event in call.args[0]
+        ]
+        assert sorted(ingested) == sorted(event.id for event in missing)
+
+    async def test_dry_run(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        events = await self._create_events(save_fixture, organization, 3)
+        ingest_events_mock = self._patch_tinybird(mocker, events[1:])
+
+        _, total_missing, missing_ids = await reconcile_events(
+            session,
+            redis,
+            RECONCILE_START,
+            RECONCILE_START + timedelta(hours=1),
+            dry_run=True,
+        )
 
-        assert chunks == [events]
+        assert total_missing == 1
+        assert missing_ids == [str(events[0].id)]
+        ingest_events_mock.assert_not_called()
 
 
 class TestQueryWildcardsAreLiteral:
@@ -1,4 +1,6 @@
+from datetime import UTC, datetime, timedelta
 from typing import cast
+from unittest.mock import MagicMock
 
 import pytest
 from pytest_mock import MockerFixture
@@ -6,9 +8,18 @@ from pytest_mock import MockerFixture
 from polar.integrations.tinybird.client import TinybirdPayloadTooLargeError
 from polar.integrations.tinybird.schemas import TinybirdEvent
 from polar.integrations.tinybird.service import DATASOURCE_EVENTS
-from polar.integrations.tinybird.tasks import MAX_BATCH_EVENTS, ingest
+from polar.integrations.tinybird.tasks import (
+    MAX_BATCH_EVENTS,
+    RECONCILE_WATERMARK_KEY,
+    ingest,
+    reconcile,
+)
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from polar.worker._sqlalchemy import SQLAlchemyMiddleware
 
 _ingest = ingest.__wrapped__  # type: ignore[attr-defined]
+_reconcile = reconcile.__wrapped__  # type: ignore[attr-defined]
 
 
 def _event(event_id: str) -> TinybirdEvent:
@@ -19,7 +30,7 @@ def _event(event_id: str) -> TinybirdEvent:
 class TestIngest:
     async def test_chunks_large_batches(self, mocker: MockerFixture) -> None:
         ingest_mock = mocker.patch(
-            "polar.integrations.tinybird.tasks.client.ingest",
+            "polar.integrations.tinybird.service.client.ingest",
         )
         events = [_event(f"event-{index}") for index in range(MAX_BATCH_EVENTS + 1)]
 
@@ -33,17 +44,68 @@ class TestIngest:
         assert len(first_call_args[1]) == MAX_BATCH_EVENTS
         assert len(second_call_args[1]) == 1
 
+    async def test_ndjson(self, mocker: MockerFixture) -> None:
+        ingest_ndjson_mock = mocker.patch(
+            "polar.integrations.tinybird.service.client.ingest_ndjson",
+        )
+        ndjson = '{"id":"event-1"}\n{"id":"event-2"}'
+
+        await _ingest(ndjson)
+
+        ingest_ndjson_mock.assert_awaited_once_with(
+            DATASOURCE_EVENTS, ndjson, wait=True
+        )
+
+    async def test_records_ingestion(self, mocker: MockerFixture, redis: Redis) -> None:
+        mocker.patch("polar.integrations.tinybird.service.client.ingest_ndjson")
+        organization_id = "8f4b0e4c-6f5c-4c55-9f5a-0d0b7f6c1a2e"
+
+        await _ingest(
+            '{"id":"event-1"}',
+            organizations={
+                organization_id: [
+                    "2025-01-01T00:00:00+00:00",
+                    "2025-01-01T01:00:00+00:00",
+                ]
+            },
+        )
+
+        state = await redis.hgetall(f"tinybird:query:organization:{organization_id}")
+        assert state
+
+    async def test_ingestion_not_recorded_on_failure(
+        self, mocker: MockerFixture, redis: Redis
+    ) -> None:
+        mocker.patch(
+            "polar.integrations.tinybird.service.client.ingest_ndjson",
+            side_effect=RuntimeError(),
+        )
+        organization_id = "8f4b0e4c-6f5c-4c55-9f5a-0d0b7f6c1a2e"
+
+        with pytest.raises(RuntimeError):
+            await _ingest(
+                '{"id":"event-1"}',
+                organizations={
+                    organization_id: [
+                        "2025-01-01T00:00:00+00:00",
+                        "2025-01-01T01:00:00+00:00",
+                    ]
+                },
+            )
+
+        assert not await redis.exists(f"tinybird:query:organization:{organization_id}")
+
     async def test_splits_batches_on_payload_too_large(
         self, mocker: MockerFixture
     ) -> None:
         async def ingest_side_effect(
-            datasource: str, events: list[TinybirdEvent]
+            datasource: str, events: list[TinybirdEvent], *, wait: bool
         ) -> None:
             if len(events) > 2:
                 raise TinybirdPayloadTooLargeError(size=11, max_size=10)
 
         ingest_mock = mocker.patch(
-            "polar.integrations.tinybird.tasks.client.ingest",
+            "polar.integrations.tinybird.service.client.ingest",
             side_effect=ingest_side_effect,
         )
 
@@ -57,16 +119,16 @@ class TestIngest:
         self, mocker: MockerFixture
     ) -> None:
         async def ingest_side_effect(
-            datasource: str, events: list[TinybirdEvent]
+            datasource: str, events: list[TinybirdEvent], *, wait: bool
         ) -> None:
             if any(event.get("id") == "too-large" for event in events):
                 raise TinybirdPayloadTooLargeError(size=11, max_size=10)
 
         ingest_mock = mocker.patch(
-            "polar.integrations.tinybird.tasks.client.ingest",
+            "polar.integrations.tinybird.service.client.ingest",
             side_effect=ingest_side_effect,
         )
-        log_error_mock = mocker.patch("polar.integrations.tinybird.tasks.log.error")
+        log_error_mock = mocker.patch("polar.integrations.tinybird.service.log.error")
 
         await _ingest([_event("ok"), _event("too-large")])
 
@@ -77,3 +139,112 @@ class TestIngest:
             payload_bytes=11,
             max_payload_bytes=10,
         )
+
+    async def test_splits_ndjson_on_payload_too_large(
+        self, mocker: MockerFixture
+    ) -> None:
+        async def ingest_ndjson_side_effect(
+            datasource: str, ndjson: str, *, wait: bool
+        ) -> None:
+            if '"too-large"' in ndjson:
+                raise TinybirdPayloadTooLargeError(size=11, max_size=10)
+
+        ingest_ndjson_mock = mocker.patch(
+            "polar.integrations.tinybird.service.client.ingest_ndjson",
+            side_effect=ingest_ndjson_side_effect,
+        )
+        log_error_mock = mocker.patch("polar.integrations.tinybird.service.log.error")
+
+        await _ingest('{"id":"ok-1"}\n{"id":"ok-2"}\n{"id":"too-large"}')
+
+        assert [call.args[1] for call in ingest_ndjson_mock.await_args_list] == [
+            '{"id":"ok-1"}\n{"id":"ok-2"}\n{"id":"too-large"}',
+            '{"id":"ok-1"}',
+            '{"id":"ok-2"}\n{"id":"too-large"}',
+            '{"id":"ok-2"}',
+            '{"id":"too-large"}',
+        ]
+        log_error_mock.assert_called_once_with(
+            "tinybird.ingest.event_too_large",
+            event_id="too-large",
+            payload_bytes=11,
+            max_payload_bytes=10,
+        )
+
+
+NOW = datetime(2025, 1, 15, 12, 5, 30, tzinfo=UTC)
+
+
+@pytest.mark.asyncio
+class TestReconcile:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture, session: AsyncSession) -> None:
+        mocker.patch.object(
+            SQLAlchemyMiddleware, "get_async_read_session", return_value=session
+        )
+        mocker.patch("polar.integrations.tinybird.tasks.utc_now", return_value=NOW)
+        mocker.patch(
+            "polar.integrations.tinybird.tasks.settings.TINYBIRD_RECONCILE_LAG_SECONDS",
+            600,
+        )
+        mocker.patch(
+            "polar.integrations.tinybird.tasks.settings.TINYBIRD_RECONCILE_MAX_WINDOW_SECONDS",
+            3600,
+        )
+
+    @pytest.fixture
+    def reconcile_events_mock(self, mocker: MockerFixture) -> MagicMock:
+        return mocker.patch(
+            "polar.integrations.tinybird.tasks.reconcile_events",
+            return_value=(10, 0, []),
+        )
+
+    @pytest.fixture
+    def enqueue_job_mock(self, mocker: MockerFixture) -> MagicMock:
+        return mocker.patch("polar.integrations.tinybird.tasks.enqueue_job")
+
+    async def test_first_run(
+        self,
+        redis: Redis,
+        reconcile_events_mock: MagicMock,
+        enqueue_job_mock: MagicMock,
+    ) -> None:
+        await _reconcile()
+
+        target = datetime(2025, 1, 15, 11, 55, tzinfo=UTC)
+        _, _, start, end = reconcile_events_mock.call_args.args
+        assert start == target - timedelta(hours=1)
+        assert end == target
+        assert await redis.get(RECONCILE_WATERMARK_KEY) == target.isoformat().encode()
+        enqueue_job_mock.assert_not_called()
+
+    async def test_catches_up(
+        self,
+        redis: Redis,
+        reconcile_events_mock: MagicMock,
+        enqueue_job_mock: MagicMock,
+    ) -> None:
+        watermark = datetime(2025, 1, 15, 8, 0, tzinfo=UTC)
+        await redis.set(RECONCILE_WATERMARK_KEY, watermark.isoformat())
+
+        await _reconcile()
+
+        _, _, start, end = reconcile_events_mock.call_args.args
+        assert start == watermark
+        assert end == watermark + timedelta(hours=1)
+        assert await redis.get(RECONCILE_WATERMARK_KEY) == end.isoformat().encode()
+        enqueue_job_mock.assert_called_once_with("tinybird.reconcile")
+
+    async def test_up_to_date(
+        self,
+        redis: Redis,
+        reconcile_events_mock: MagicMock,
+        enqueue_job_mock: MagicMock,
+    ) -> None:
+        watermark = datetime(2025, 1, 15, 11, 55, tzinfo=UTC)
+        await redis.set(RECONCILE_WATERMARK_KEY, watermark.isoformat())
+
+        await _reconcile()
+
+        reconcile_events_mock.assert_not_called()
+        enqueue_job_mock.assert_not_called()
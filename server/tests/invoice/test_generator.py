@@ -260,6 +260,21 @@ def test_generator(overrides: dict[str, Any], id: str, invoice: Invoice) -> None
     assert path.exists()
 
 
+def test_generator_renders_documents_in_a_row(invoice: Invoice) -> None:
+    assert (
+        InvoiceGenerator.get_available_font_files()
+        is InvoiceGenerator.get_available_font_files()
+    )
+
+    # Fonts are subset on output: each document must embed its own glyphs
+    for customer_name in ("First Customer", "שלום עולם"):
+        generator = InvoiceGenerator(
+            invoice.model_copy(update={"customer_name": customer_name})
+        )
+        generator.generate()
+        assert generator.output()
+
+
 def test_generator_registers_unicode_fallback_fonts(invoice: Invoice) -> None:
     generator = InvoiceGenerator(
         invoice.model_copy(
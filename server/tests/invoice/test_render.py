@@ -6,9 +6,11 @@ from collections.abc import Mapping
 
 import pytest
 
+from polar.config import settings
 from polar.invoice.generator import Invoice, InvoiceItem
 from polar.invoice.render import (
     SERVER_DIRECTORY,
+    InvoiceRendererPool,
     InvoiceRenderError,
     build_invoice_renderer_env,
     render_invoice_pdf,
@@ -61,6 +63,63 @@ async def test_render_invoice_pdf(invoice: Invoice) -> None:
     assert pdf.startswith(b"%PDF")
 
 
+@pytest.mark.asyncio
+async def test_render_invoice_pdf_one_off_process(
+    invoice: Invoice, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "INVOICE_RENDERER_POOL_SIZE", 0)
+
+    pdf = await render_invoice_pdf(invoice)
+
+    assert pdf.startswith(b"%PDF")
+
+
+@pytest.mark.asyncio
+class TestInvoiceRendererPool:
+    async def test_reuses_process(self, invoice: Invoice) -> None:
+        pool = InvoiceRendererPool(size=1, max_requests_per_process=10, timeout=60)
+        payload = invoice.model_dump_json().encode("utf-8")
+        request = b'{"invoice": ' + payload + b"}"
+
+        try:
+            (first_status, first_pdf) = await pool.request(request)
+            (first_process,) = pool._processes
+            (second_status, second_pdf) = await pool.request(request)
+            (second_process,) = pool._processes
+        finally:
+            await pool.close()
+
+        assert first_status == second_status == 0
+        assert first_pdf.startswith(b"%PDF")
+        assert second_pdf.startswith(b"%PDF")
+        assert first_process is second_process
+
+    async def test_recycles_process(self, invoice: Invoice) -> None:
+        pool = InvoiceRendererPool(size=1, max_requests_per_process=1, timeout=60)
+        payload = invoice.model_dump_json().encode("utf-8")
+        request = b'{"invoice": ' + payload + b"}"
+
+        try:
+            await pool.request(request)
+            assert pool._processes == set()
+            await pool.request(request)
+        finally:
+            await pool.close()
+
+    async def test_render_error(self) -> None:
+        pool = InvoiceRendererPool(size=1, max_requests_per_process=10, timeout=60)
+
+        try:
+            status, output = await pool.request(b"{}")
+            # The process survives errors and keeps serving
+            assert len(pool._processes) == 1
+        finally:
+            await pool.close()
+
+        assert status == 1
+        assert b"ValidationError" in output
+
+
 def test_build_invoice_renderer_env(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setenv("PATH", os.environ.get("PATH", ""))
     monkeypatch.setenv("POLAR_ENV", "testing")
@@ -84,6 +143,7 @@ async def test_render_invoice_pdf_raises_on_subprocess_failure(
     monkeypatch.setenv("POLAR_ENV", "testing")
     monkeypatch.setenv("POLAR_CUSTOM_OVERRIDE", "1")
     monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", "/tmp/does-not-exist")
+    monkeypatch.setattr(settings, "INVOICE_RENDERER_POOL_SIZE", 0)
 
     async def run_process(
         command: list[str], **kwargs: object
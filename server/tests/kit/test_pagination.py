@@ -0,0 +1,172 @@
+import uuid
+from datetime import UTC, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Column, DateTime, MetaData, String, Table, Uuid, select
+from sqlalchemy.dialects import postgresql
+
+from polar.exceptions import PolarRequestValidationError
+from polar.kit.pagination import (
+    CountStrategy,
+    ListResource,
+    PaginationParams,
+    TotalCount,
+    _get_keyset_clause,
+    _get_keyset_keys,
+    count,
+    decode_cursor,
+    encode_cursor,
+)
+from polar.models import Customer, Organization
+from polar.postgres import AsyncSession
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import create_customer
+
+table = Table(
+    "items",
+    MetaData(),
+    Column("id", Uuid, primary_key=True),
+    Column("created_at", DateTime(timezone=True)),
+    Column("name", String, nullable=True),
+)
+
+
+def _compile(clause: object) -> str:
+    return str(
+        clause.compile(  # type: ignore[attr-defined]
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+class TestCursor:
+    def test_round_trip(self) -> None:
+        values = [
+            datetime(2024, 1, 1, 12, tzinfo=UTC),
+            uuid.uuid4(),
+            Decimal("1.50"),
+            "name",
+            42,
+            None,
+        ]
+
+        assert decode_cursor(encode_cursor(values)) == values
+
+    @pytest.mark.parametrize("cursor", ["invalid", "e30=", "W3siZm9vIjoxfV0="])
+    def test_invalid(self, cursor: str) -> None:
+        with pytest.raises(PolarRequestValidationError):
+            decode_cursor(cursor)
+
+
+class TestKeyset:
+    def test_keys_with_tiebreaker(self) -> None:
+        keys = _get_keyset_keys(
+            [(table.c.created_at, True), (table.c.name, False)], table.c.id
+        )
+
+        assert [(column.name, is_desc) for column, is_desc in keys] == [  # type: ignore[attr-defined]
+            ("created_at", True),
+            ("name", False),
+            ("id", False),
+        ]
+
+    def test_tiebreaker_follows_last_direction(self) -> None:
+        keys = _get_keyset_keys([(table.c.created_at, True)], table.c.id)
+
+        assert keys[-1] == (table.c.id, True)
+
+    def test_clause(self) -> None:
+        keys = [(table.c.created_at, True), (table.c.id, True)]
+        id = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+        clause = _get_keyset_clause(keys, [datetime(2024, 1, 1, tzinfo=UTC), id])
+
+        compiled = _compile(clause)
+        assert "items.created_at < '2024-01-01 00:00:00+00:00'" in compiled
+        assert "items.created_at = '2024-01-01 00:00:00+00:00'" in compiled
+        assert "items.id < '00000000-0000-0000-0000-000000000001'" in compiled
+
+    def test_clause_nulls(self) -> None:
+        asc_clause = _get_keyset_clause(
+            [(table.c.name, False), (table.c.id, False)], [None, uuid.uuid4()]
+        )
+        assert "items.name IS NULL" in _compile(asc_clause)
+
+        desc_clause = _get_keyset_clause(
+            [(table.c.name, True), (table.c.id, True)], [None, uuid.uuid4()]
+        )
+        assert "items.name IS NOT NULL" in _compile(desc_clause)
+
+
+@pytest.mark.asyncio
+class TestCount:
+    async def _create_customers(
+        self, save_fixture: SaveFixture, organization: Organization
+    ) -> None:
+        for i in range(3):
+            await create_customer(
+                save_fixture,
+                organization=organization,
+                email=f"customer{i}@example.com",
+                stripe_customer_id=f"STRIPE_CUSTOMER_ID_{i}",
+            )
+
+    async def test_exact(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        await self._create_customers(save_fixture, organization)
+        statement = select(Customer).where(Customer.organization_id == organization.id)
+
+        result = await count(session, statement, threshold=1)
+
+        assert result == TotalCount(3, estimated=False)
+
+    async def test_estimated_below_threshold(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        await self._create_customers(save_fixture, organization)
+        statement = select(Customer).where(Customer.organization_id == organization.id)
+
+        result = await count(
+            session, statement, strategy=CountStrategy.estimated, threshold=10
+        )
+
+        assert result == TotalCount(3, estimated=False)
+
+    async def test_estimated_above_threshold(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        await self._create_customers(save_fixture, organization)
+        statement = select(Customer).where(Customer.organization_id == organization.id)
+
+        result = await count(
+            session, statement, strategy=CountStrategy.estimated, threshold=1
+        )
+
+        assert result.estimated
+        # Never less than what was counted before reaching the threshold
+        assert result.count >= 2
+
+
+def test_list_resource_estimated_total() -> None:
+    pagination = PaginationParams(page=1, limit=10)
+
+    exact = ListResource[int].from_paginated_results([], 25, pagination)
+    assert exact.pagination.total_count_estimated is False
+
+    estimated = ListResource[int].from_paginated_results(
+        [], 25, pagination, total_count_estimated=True
+    )
+    assert estimated.pagination.total_count == 25
+    assert estimated.pagination.max_page == 3
+    assert estimated.pagination.total_count_estimated is True
@@ -0,0 +1,102 @@
+import asyncio
+import sys
+import weakref
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.kit.subprocess_pool import (
+    SubprocessPool,
+    SubprocessPoolError,
+    close_pools,
+    start_pools,
+)
+
+ECHO_PROCESS = """
+import sys
+for line in sys.stdin:
+    if line.strip() == "exit":
+        sys.exit(1)
+    sys.stdout.write(line.upper())
+    sys.stdout.flush()
+"""
+
+
+class EchoPool(SubprocessPool[str, str]):
+    name = "echo"
+
+    def get_command(self) -> list[str]:
+        return [sys.executable, "-c", ECHO_PROCESS]
+
+    async def write_request(self, stdin: asyncio.StreamWriter, request: str) -> None:
+        stdin.write(f"{request}\n".encode())
+
+    async def read_response(self, stdout: asyncio.StreamReader) -> str:
+        line = await stdout.readline()
+        if not line:
+            raise asyncio.IncompleteReadError(line, None)
+        return line.decode().strip()
+
+
+class MissingCommandPool(EchoPool):
+    name = "missing"
+
+    def get_command(self) -> list[str]:
+        return ["/nonexistent/renderer"]
+
+
+@pytest.mark.asyncio
+class TestSubprocessPool:
+    async def test_concurrent_requests(self) -> None:
+        pool = EchoPool(size=2, max_requests_per_process=100, timeout=10)
+        try:
+            responses = await asyncio.gather(
+                *(pool.request(f"message{i}") for i in range(10))
+            )
+            assert responses == [f"MESSAGE{i}" for i in range(10)]
+            assert len(pool._processes) <= 2
+        finally:
+            await pool.close()
+
+    async def test_recycles_processes(self) -> None:
+        pool = EchoPool(size=1, max_requests_per_process=2, timeout=10)
+        try:
+            await pool.request("first")
+            (process,) = pool._processes
+            await pool.request("second")
+            assert pool._processes == set()
+
+            await pool.request("third")
+            assert process not in pool._processes
+        finally:
+            await pool.close()
+
+    async def test_replaces_crashed_process(self) -> None:
+        pool = EchoPool(size=1, max_requests_per_process=100, timeout=10)
+        try:
+            with pytest.raises(SubprocessPoolError):
+                await pool.request("exit")
+            assert pool._processes == set()
+
+            assert await pool.request("alive") == "ALIVE"
+        finally:
+            await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_start_and_close_pools(mocker: MockerFixture) -> None:
+    pool = EchoPool(size=2, max_requests_per_process=100, timeout=10)
+    disabled_pool = EchoPool(size=0, max_requests_per_process=100, timeout=10)
+    missing_pool = MissingCommandPool(size=1, max_requests_per_process=100, timeout=10)
+    mocker.patch(
+        "polar.kit.subprocess_pool._pools",
+        weakref.WeakSet([pool, disabled_pool, missing_pool]),
+    )
+
+    await start_pools(pool, disabled_pool, missing_pool)
+    assert len(pool._processes) == 2
+    assert disabled_pool._processes == set()
+    assert missing_pool._processes == set()
+
+    await close_pools()
+    assert pool._processes == set()
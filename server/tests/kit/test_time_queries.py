@@ -0,0 +1,75 @@
+from datetime import UTC, datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from polar.kit.time_queries import TimeInterval, get_timestamp_series
+
+
+class TestGetTimestampSeries:
+    def test_bounds_included(self) -> None:
+        assert get_timestamp_series(
+            datetime(2025, 1, 1, tzinfo=UTC),
+            datetime(2025, 1, 3, tzinfo=UTC),
+            TimeInterval.day,
+        ) == [
+            datetime(2025, 1, 1, tzinfo=UTC),
+            datetime(2025, 1, 2, tzinfo=UTC),
+            datetime(2025, 1, 3, tzinfo=UTC),
+        ]
+
+    def test_empty(self) -> None:
+        assert (
+            get_timestamp_series(
+                datetime(2025, 1, 2, tzinfo=UTC),
+                datetime(2025, 1, 1, tzinfo=UTC),
+                TimeInterval.day,
+            )
+            == []
+        )
+
+    @pytest.mark.parametrize(
+        ("interval", "expected_count"),
+        [
+            (TimeInterval.hour, 24 * 366),
+            (TimeInterval.day, 366),
+            (TimeInterval.week, 53),
+            (TimeInterval.month, 12),
+            (TimeInterval.year, 1),
+        ],
+    )
+    def test_intervals(self, interval: TimeInterval, expected_count: int) -> None:
+        timestamps = get_timestamp_series(
+            datetime(2024, 1, 1, tzinfo=UTC),
+            datetime(2024, 12, 31, 23, 59, 59, 999999, tzinfo=UTC),
+            interval,
+        )
+
+        assert len(timestamps) == expected_count
+        assert timestamps[0] == datetime(2024, 1, 1, tzinfo=UTC)
+
+    def test_month_end_clamped(self) -> None:
+        assert get_timestamp_series(
+            datetime(2025, 1, 31, tzinfo=UTC),
+            datetime(2025, 4, 1, tzinfo=UTC),
+            TimeInterval.month,
+        ) == [
+            datetime(2025, 1, 31, tzinfo=UTC),
+            datetime(2025, 2, 28, tzinfo=UTC),
+            datetime(2025, 3, 28, tzinfo=UTC),
+        ]
+
+    def test_timezone(self) -> None:
+        timezone = ZoneInfo("Europe/Paris")
+
+        timestamps = get_timestamp_series(
+            datetime(2025, 1, 1, tzinfo=timezone),
+            datetime(2025, 1, 2, 23, 59, 59, 999999, tzinfo=timezone),
+            TimeInterval.day,
+        )
+
+        assert timestamps == [
+            datetime(2024, 12, 31, 23, tzinfo=UTC),
+            datetime(2025, 1, 1, 23, tzinfo=UTC),
+        ]
+        assert all(timestamp.tzinfo == UTC for timestamp in timestamps)
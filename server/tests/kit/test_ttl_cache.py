@@ -0,0 +1,47 @@
+from pytest_mock import MockerFixture
+
+from polar.kit.ttl_cache import TTLCache
+
+
+class TestTTLCache:
+    def test_get_set(self) -> None:
+        cache = TTLCache[str, int](maxsize=10)
+
+        assert cache.get("a") is None
+        cache.set("a", 1, ttl=60)
+        assert cache.get("a") == 1
+
+        cache.delete("a")
+        assert cache.get("a") is None
+
+    def test_expiry(self, mocker: MockerFixture) -> None:
+        monotonic = mocker.patch("polar.kit.ttl_cache.time.monotonic", return_value=0)
+        cache = TTLCache[str, int](maxsize=10)
+        cache.set("a", 1, ttl=60)
+
+        monotonic.return_value = 59
+        assert cache.get("a") == 1
+
+        monotonic.return_value = 60
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = TTLCache[str, int](maxsize=2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_disabled(self) -> None:
+        cache = TTLCache[str, int](maxsize=10)
+        cache.set("a", 1, ttl=0)
+        assert cache.get("a") is None
+
+        cache = TTLCache[str, int](maxsize=0)
+        cache.set("a", 1, ttl=60)
+        assert cache.get("a") is None
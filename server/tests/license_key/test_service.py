@@ -7,6 +7,7 @@ from pytest_mock import MockerFixture
 from sqlalchemy import delete, func, select
 
 from polar.benefit.grant.repository import BenefitGrantRepository
+from polar.benefit.repository import BenefitRepository
 from polar.benefit.strategies.license_keys.properties import (
     BenefitGrantLicenseKeysProperties,
 )
@@ -20,6 +21,11 @@ from polar.kit.db.postgres import (
     create_async_engine,
     create_async_sessionmaker,
 )
+from polar.license_key.cache import (
+    build_cache_key,
+    get_cached_license_key,
+    pop_pending_validations,
+)
 from polar.license_key.repository import LicenseKeyRepository
 from polar.license_key.schemas import (
     LicenseKeyActivate,
@@ -41,6 +47,7 @@ from polar.models import (
 from polar.models.license_key import LicenseKeyStatus
 from polar.postgres import AsyncSession
 from polar.redis import Redis
+from polar.worker import JobQueueManager
 from tests.fixtures.database import SaveFixture, get_database_url, save_fixture_factory
 from tests.fixtures.license_key import TestLicenseKey
 from tests.fixtures.random_objects import (
@@ -140,7 +147,7 @@ class TestConcurrentActivation:
 
 
 async def _attempt_validation(
-    sessionmaker: AsyncSessionMaker, license_key_id: UUID
+    sessionmaker: AsyncSessionMaker, redis: Redis, license_key_id: UUID
 ) -> bool:
     async with sessionmaker() as session:
         repository = LicenseKeyRepository.from_session(session)
@@ -149,6 +156,7 @@ async def _attempt_validation(
         try:
             await license_key_service.validate(
                 session,
+                redis,
                 license_key=license_key,
                 validate=LicenseKeyValidate(
                     key=license_key.key,
@@ -166,7 +174,9 @@ async def _attempt_validation(
 
 @pytest.mark.asyncio
 class TestConcurrentValidation:
-    async def test_usage_limit_enforced_under_concurrency(self, worker_id: str) -> None:
+    async def test_usage_limit_enforced_under_concurrency(
+        self, worker_id: str, redis: Redis
+    ) -> None:
         engine = create_async_engine(
             dsn=get_database_url(worker_id),
             application_name=f"test_{worker_id}_lk_validate_concurrency",
@@ -195,7 +205,10 @@ class TestConcurrentValidation:
 
         try:
             results = await asyncio.gather(
-                *(_attempt_validation(sessionmaker, license_key.id) for _ in range(5))
+                *(
+                    _attempt_validation(sessionmaker, redis, license_key.id)
+                    for _ in range(5)
+                )
             )
 
             async with sessionmaker() as session:
@@ -254,6 +267,170 @@ async def _license_key_and_grant(
     return license_key, grant
 
 
+@pytest.mark.asyncio
+class TestValidateByKey:
+    async def test_read_only_served_from_cache(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        license_key, _ = await _license_key_and_grant(
+            session, redis, save_fixture, customer, organization, product
+        )
+        validate = LicenseKeyValidate(
+            key=license_key.key, organization_id=organization.id
+        )
+
+        assert (
+            await get_cached_license_key(redis, organization.id, license_key.key)
+            is None
+        )
+        await license_key_service.validate_by_key(session, redis, validate=validate)
+        assert (
+            await get_cached_license_key(redis, organization.id, license_key.key)
+            is not None
+        )
+
+        # Changes made after the snapshot are only seen once it expires
+        license_key.status = LicenseKeyStatus.revoked
+        await save_fixture(license_key)
+
+        validated = await license_key_service.validate_by_key(
+            session, redis, validate=validate
+        )
+        assert validated.status == LicenseKeyStatus.granted
+        assert validated.validations == 2
+
+    async def test_validations_counted_in_redis(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        license_key, _ = await _license_key_and_grant(
+            session, redis, save_fixture, customer, organization, product
+        )
+        validate = LicenseKeyValidate(
+            key=license_key.key, organization_id=organization.id
+        )
+
+        for _ in range(3):
+            await license_key_service.validate_by_key(session, redis, validate=validate)
+
+        pending = await pop_pending_validations(redis)
+        count, _ = pending[license_key.id]
+        assert count == 3
+
+        repository = LicenseKeyRepository.from_session(session)
+        await repository.increment_validations(pending)
+        await session.refresh(license_key, attribute_names=["validations"])
+        assert license_key.validations == 3
+
+    async def test_increment_usage_invalidates_cache(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        license_key, _ = await _license_key_and_grant(
+            session, redis, save_fixture, customer, organization, product
+        )
+        await license_key_service.validate_by_key(
+            session,
+            redis,
+            validate=LicenseKeyValidate(
+                key=license_key.key, organization_id=organization.id
+            ),
+        )
+
+        validated = await license_key_service.validate_by_key(
+            session,
+            redis,
+            validate=LicenseKeyValidate(
+                key=license_key.key, organization_id=organization.id, increment_usage=2
+            ),
+        )
+
+        assert validated.usage == 2
+        assert (
+            await get_cached_license_key(redis, organization.id, license_key.key)
+            is None
+        )
+
+    async def test_activation_missing_from_cache(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        license_key, _ = await _license_key_and_grant(
+            session, redis, save_fixture, customer, organization, product
+        )
+        await license_key_service.validate_by_key(
+            session,
+            redis,
+            validate=LicenseKeyValidate(
+                key=license_key.key, organization_id=organization.id
+            ),
+        )
+
+        activation = LicenseKeyActivation(
+            license_key_id=license_key.id, label="new", conditions={}, meta={}
+        )
+        await save_fixture(activation)
+
+        validated = await license_key_service.validate_by_key(
+            session,
+            redis,
+            validate=LicenseKeyValidate(
+                key=license_key.key,
+                organization_id=organization.id,
+                activation_id=activation.id,
+            ),
+        )
+
+        assert validated.activation is not None
+        assert validated.activation.id == activation.id
+
+    async def test_revoke_invalidates_cache(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        license_key, _ = await _license_key_and_grant(
+            session, redis, save_fixture, customer, organization, product
+        )
+        benefit_repository = BenefitRepository.from_session(session)
+        benefit = await benefit_repository.get_by_id(license_key.benefit_id)
+        assert benefit is not None
+
+        await license_key_service.customer_revoke(
+            session, customer, benefit, license_key.id
+        )
+
+        assert (
+            build_cache_key(organization.id, license_key.key)
+            in JobQueueManager.get()._invalidated_cache_keys
+        )
+
+
 @pytest.mark.asyncio
 class TestUpdate:
     @pytest.mark.parametrize(
@@ -363,6 +540,32 @@ class TestUpdate:
         assert license_key.limit_activations == 5
         enqueue_job_mock.assert_not_called()
 
+    async def test_invalidates_cache(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        product: Product,
+        customer: Customer,
+    ) -> None:
+        mocker.patch("polar.license_key.service.enqueue_job")
+        license_key, _ = await _license_key_and_grant(
+            session, redis, save_fixture, customer, organization, product
+        )
+
+        await license_key_service.update(
+            session,
+            license_key=license_key,
+            updates=LicenseKeyUpdate(status=LicenseKeyStatus.disabled),
+        )
+
+        assert (
+            build_cache_key(organization.id, license_key.key)
+            in JobQueueManager.get()._invalidated_cache_keys
+        )
+
 
 @pytest.mark.asyncio
 class TestRotate:
@@ -11,9 +11,12 @@ from polar.benefit.grant.service import benefit_grant as benefit_grant_service
 from polar.benefit.strategies.license_keys.schemas import (
     BenefitLicenseKeysCreateProperties,
 )
+from polar.kit.utils import utc_now
+from polar.license_key.cache import pop_pending_validations, record_validation
 from polar.license_key.repository import LicenseKeyRepository
 from polar.license_key.tasks import (
     LicenseKeyDoesNotExist,
+    flush_validations,
     sync_benefit_grant,
 )
 from polar.models import BenefitGrant, Customer, LicenseKey, Organization, Product
@@ -265,3 +268,61 @@ class TestSyncBenefitGrant:
 
         revoke_benefit_mock.assert_called_once()
         grant_benefit_mock.assert_not_called()
+
+
+@pytest.mark.asyncio
+class TestFlushValidations:
+    async def test_flush(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        product: Product,
+        customer: Customer,
+    ) -> None:
+        mocker.patch("polar.license_key.tasks.RedisMiddleware.get", return_value=redis)
+        license_key, _ = await _license_key_and_grant(
+            session, redis, save_fixture, customer, organization, product
+        )
+        validated_at = utc_now()
+        await record_validation(redis, license_key.id, validated_at)
+        await record_validation(redis, license_key.id, validated_at)
+
+        await flush_validations()
+
+        await session.refresh(
+            license_key, attribute_names=["validations", "last_validated_at"]
+        )
+        assert license_key.validations == 2
+        assert license_key.last_validated_at == validated_at
+        assert await pop_pending_validations(redis) == {}
+
+    async def test_restores_on_failure(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        product: Product,
+        customer: Customer,
+    ) -> None:
+        mocker.patch("polar.license_key.tasks.RedisMiddleware.get", return_value=redis)
+        mocker.patch.object(
+            LicenseKeyRepository,
+            "increment_validations",
+            side_effect=RuntimeError("boom"),
+        )
+        license_key, _ = await _license_key_and_grant(
+            session, redis, save_fixture, customer, organization, product
+        )
+        await record_validation(redis, license_key.id, utc_now())
+
+        with pytest.raises(RuntimeError):
+            await flush_validations()
+
+        pending = await pop_pending_validations(redis)
+        count, _ = pending[license_key.id]
+        assert count == 1
@@ -0,0 +1,143 @@
+from datetime import UTC, datetime
+
+import pytest
+from sqlalchemy import text
+
+from polar.kit.utils import utc_now
+from polar.meter.partitions import (
+    DEFAULT_PARTITION,
+    add_months,
+    count_default_events,
+    create_partitions,
+    detach_partitions,
+    get_month_start,
+    get_partition_name,
+    list_partitions,
+)
+from polar.models import Meter, MeterEvent, Organization
+from polar.postgres import AsyncSession
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import create_event
+
+
+def test_add_months() -> None:
+    month = datetime(2026, 11, 1, tzinfo=UTC)
+
+    assert add_months(month, 1) == datetime(2026, 12, 1, tzinfo=UTC)
+    assert add_months(month, 2) == datetime(2027, 1, 1, tzinfo=UTC)
+    assert add_months(month, -11) == datetime(2025, 12, 1, tzinfo=UTC)
+    assert get_partition_name(add_months(month, 2)) == "meter_events_y2027m01"
+
+
+@pytest.mark.asyncio
+class TestCreatePartitions:
+    async def test_migrated_partitions(self, session: AsyncSession) -> None:
+        current_month = get_month_start(utc_now())
+
+        partitions = await list_partitions(session)
+
+        legacy, *monthly = partitions
+        assert legacy.name == "meter_events_legacy"
+        assert legacy.start is None
+        assert legacy.end == add_months(current_month, 1)
+        assert [partition.name for partition in monthly] == [
+            get_partition_name(add_months(current_month, offset))
+            for offset in range(1, 4)
+        ]
+
+    async def test_idempotent(self, session: AsyncSession) -> None:
+        now = utc_now()
+        current_month = get_month_start(now)
+
+        assert await create_partitions(session, now=now, months_ahead=3) == []
+
+        created = await create_partitions(session, now=now, months_ahead=5)
+        assert created == [
+            get_partition_name(add_months(current_month, 4)),
+            get_partition_name(add_months(current_month, 5)),
+        ]
+
+        assert await create_partitions(session, now=now, months_ahead=5) == []
+
+        partitions = await list_partitions(session)
+        assert partitions[-1].end == add_months(current_month, 6)
+
+    async def test_moves_default_events(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        organization: Organization,
+        meter: Meter,
+    ) -> None:
+        now = utc_now()
+        month = add_months(get_month_start(now), 5)
+        event = await create_event(save_fixture, organization=organization)
+        await save_fixture(
+            MeterEvent(
+                meter_id=meter.id,
+                event_id=event.id,
+                organization_id=organization.id,
+                ingested_at=month,
+                timestamp=event.timestamp,
+            )
+        )
+        assert await count_default_events(session) == 1
+
+        created = await create_partitions(session, now=now, months_ahead=5)
+
+        assert created[-1] == get_partition_name(month)
+        assert await count_default_events(session) == 0
+        result = await session.execute(
+            text(f'SELECT event_id FROM "{get_partition_name(month)}"')
+        )
+        assert result.scalars().all() == [event.id]
+        result = await session.execute(
+            text(
+                "SELECT count(*) FROM pg_inherits "
+                "WHERE inhrelid = CAST(:partition AS regclass)"
+            ),
+            {"partition": DEFAULT_PARTITION},
+        )
+        assert result.scalar_one() == 1
+
+
+@pytest.mark.asyncio
+class TestDetachPartitions:
+    async def test_not_ended(self, session: AsyncSession) -> None:
+        current_month = get_month_start(utc_now())
+
+        assert await detach_partitions(session, before=current_month) == []
+
+    async def test_billed(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        organization: Organization,
+        meter: Meter,
+    ) -> None:
+        current_month = get_month_start(utc_now())
+        event = await create_event(save_fixture, organization=organization)
+        await save_fixture(
+            MeterEvent(
+                meter_id=meter.id,
+                event_id=event.id,
+                organization_id=organization.id,
+                ingested_at=event.ingested_at,
+                timestamp=event.timestamp,
+            )
+        )
+        before = add_months(current_month, 2)
+
+        # The meter hasn't billed the event yet
+        assert await detach_partitions(session, before=before) == []
+
+        meter.last_billed_event = event
+        await save_fixture(meter)
+
+        detached = await detach_partitions(session, before=before)
+        assert detached == [
+            "meter_events_legacy",
+            get_partition_name(add_months(current_month, 1)),
+        ]
+        partitions = await list_partitions(session)
+        assert partitions[0].start == add_months(current_month, 2)
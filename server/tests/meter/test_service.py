@@ -12,6 +12,7 @@ from pydantic import ValidationError
 from pytest_mock import MockerFixture
 
 from polar.auth.models import AuthSubject
+from polar.billing_entry.repository import BillingEntryRepository
 from polar.enums import SubscriptionRecurringInterval
 from polar.event.repository import EventRepository
 from polar.event.service import event as event_service
@@ -27,6 +28,7 @@ from polar.meter.aggregation import (
     UniqueAggregation,
 )
 from polar.meter.filter import Filter, FilterClause, FilterConjunction, FilterOperator
+from polar.meter.repository import MeterRepository
 from polar.meter.schemas import MeterCreate, MeterUpdate
 from polar.meter.service import meter as meter_service
 from polar.meter.unit import MeterUnit
@@ -1369,6 +1371,92 @@ async def metered_subscription(
     )
 
 
+async def _create_meter_event(
+    save_fixture: SaveFixture, meter: Meter, event: Event
+) -> None:
+    await save_fixture(
+        MeterEvent(
+            meter_id=meter.id,
+            event_id=event.id,
+            customer_id=event.customer_id,
+            organization_id=event.organization_id,
+            ingested_at=event.ingested_at,
+            timestamp=event.timestamp,
+        )
+    )
+
+
+@pytest.mark.asyncio
+class TestEnqueueBilling:
+    async def test_skips_idle_meters(
+        self,
+        enqueue_job_mock: AsyncMock,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        organization: Organization,
+    ) -> None:
+        events = [
+            await create_event(save_fixture, organization=organization)
+            for _ in range(4)
+        ]
+        # Idle: no meter events at all
+        await create_meter(save_fixture, id=uuid.uuid4(), organization=organization)
+        billed_meter = await create_meter(
+            save_fixture,
+            id=uuid.uuid4(),
+            organization=organization,
+            last_billed_event=events[-1],
+        )
+        archived_meter = await create_meter(
+            save_fixture, id=uuid.uuid4(), organization=organization
+        )
+        archived_meter.archived_at = utc_now()
+        await save_fixture(archived_meter)
+        small_backlog_meter = await create_meter(
+            save_fixture,
+            id=uuid.uuid4(),
+            organization=organization,
+            last_billed_event=events[2],
+        )
+        large_backlog_meter = await create_meter(
+            save_fixture, id=uuid.uuid4(), organization=organization
+        )
+        for event in events:
+            for meter in (
+                billed_meter,
+                archived_meter,
+                small_backlog_meter,
+                large_backlog_meter,
+            ):
+                await _create_meter_event(save_fixture, meter, event)
+
+        await meter_service.enqueue_billing(session)
+
+        assert [call.args for call in enqueue_job_mock.call_args_list] == [
+            ("meter.billing_entries", large_backlog_meter.id),
+            ("meter.billing_entries", small_backlog_meter.id),
+        ]
+
+    async def test_backlog_count_limit(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        organization: Organization,
+    ) -> None:
+        events = [
+            await create_event(save_fixture, organization=organization)
+            for _ in range(3)
+        ]
+        meter = await create_meter(save_fixture, organization=organization)
+        for event in events:
+            await _create_meter_event(save_fixture, meter, event)
+
+        repository = MeterRepository.from_session(session)
+        backlogs = await repository.get_billing_backlogs(limit=2)
+
+        assert backlogs == [(meter.id, 2, events[0].ingested_at)]
+
+
 @pytest.mark.asyncio
 class TestCreateBillingEntries:
     async def test_no_subscription(
@@ -1592,6 +1680,8 @@ class TestCreateBillingEntries:
         metered_subscription: Subscription,
     ) -> None:
         mocker.patch("polar.meter.service._BILLING_ENTRY_BATCH_SIZE", 2)
+        # One page per task invocation
+        mocker.patch("polar.meter.service._BILLING_TIME_BUDGET_SECONDS", 0)
         events = [
             await create_event(
                 save_fixture,
@@ -1636,6 +1726,8 @@ class TestCreateBillingEntries:
         organization: Organization,
     ) -> None:
         mocker.patch("polar.meter.service._BILLING_ENTRY_BATCH_SIZE", 2)
+        # One page per task invocation
+        mocker.patch("polar.meter.service._BILLING_TIME_BUDGET_SECONDS", 0)
         price_lookup_spy = mocker.spy(
             SubscriptionProductPriceRepository, "get_by_customers_and_meter"
         )
@@ -1725,6 +1817,127 @@ class TestCreateBillingEntries:
             )
         )
 
+    async def test_drains_backlog_within_time_budget(
+        self,
+        enqueue_job_mock: AsyncMock,
+        mocker: MockerFixture,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        meter: Meter,
+        organization: Organization,
+    ) -> None:
+        mocker.patch("polar.meter.service._BILLING_ENTRY_BATCH_SIZE", 2)
+        price_lookup_spy = mocker.spy(
+            SubscriptionProductPriceRepository, "get_by_customers_and_meter"
+        )
+        insert_batch_spy = mocker.spy(BillingEntryRepository, "insert_batch")
+
+        product = await create_product(
+            save_fixture,
+            organization=organization,
+            recurring_interval=SubscriptionRecurringInterval.month,
+            prices=[(meter, Decimal(100), None, "usd")],
+        )
+        customers: list[Customer] = []
+        subscriptions: list[Subscription] = []
+        for i in range(3):
+            customer = await create_customer(
+                save_fixture,
+                organization=organization,
+                email=f"drain-customer-{i}@example.com",
+            )
+            subscriptions.append(
+                await create_active_subscription(
+                    save_fixture, customer=customer, product=product
+                )
+            )
+            customers.append(customer)
+
+        events = [
+            await create_event(
+                save_fixture,
+                organization=organization,
+                customer=customers[i % 3],
+                metadata={"tokens": 10, "model": "lite"},
+            )
+            for i in range(5)
+        ]
+        await event_service._create_meter_events(session, events)
+
+        entries = await meter_service.create_billing_entries(session, meter)
+
+        assert [
+            (entry.event, entry.customer, entry.subscription) for entry in entries
+        ] == [(events[i], customers[i % 3], subscriptions[i % 3]) for i in range(5)]
+        assert meter.last_billed_event == events[-1]
+
+        # One multi-row insert per page
+        assert [len(call.args[1]) for call in insert_batch_spy.call_args_list] == [
+            2,
+            2,
+            1,
+        ]
+        billing_entry_repository = BillingEntryRepository.from_session(session)
+        for subscription in subscriptions:
+            persisted = await billing_entry_repository.get_all_by_subscription(
+                subscription.id
+            )
+            assert {entry.event_id for entry in persisted} == {
+                entry.event_id
+                for entry in entries
+                if entry.subscription_id == subscription.id
+            }
+
+        # Prices are only looked up for customers not seen on a previous page
+        assert [call.args[1] for call in price_lookup_spy.call_args_list] == [
+            [customers[0].id, customers[1].id],
+            [customers[2].id],
+        ]
+
+        assert Counter(
+            call.args for call in enqueue_job_mock.call_args_list
+        ) == Counter(
+            ("subscription.update_meters", subscription.id)
+            for subscription in subscriptions
+        )
+
+    async def test_commits_each_page(
+        self,
+        enqueue_job_mock: AsyncMock,
+        mocker: MockerFixture,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        customer: Customer,
+        meter: Meter,
+        metered_subscription: Subscription,
+    ) -> None:
+        mocker.patch("polar.meter.service._BILLING_ENTRY_BATCH_SIZE", 2)
+        commit_spy = mocker.spy(session, "commit")
+        get_for_billing_spy = mocker.spy(MeterRepository, "get_for_billing")
+
+        events = [
+            await create_event(
+                save_fixture,
+                organization=customer.organization,
+                customer=customer,
+                metadata={"tokens": 10, "model": "lite"},
+            )
+            for _ in range(5)
+        ]
+        await event_service._create_meter_events(session, events)
+
+        entries = await meter_service.create_billing_entries(session, meter)
+
+        assert len(entries) == 5
+        assert commit_spy.call_count == 3
+        # The meter is locked again before each following page
+        assert [call.args[1] for call in get_for_billing_spy.call_args_list] == [
+            meter.id,
+            meter.id,
+        ]
+
+        assert meter.last_billed_event == events[-1]
+
 
 @pytest.mark.asyncio
 class TestCreateBillingEntriesWithSeats:
@@ -2049,6 +2262,8 @@ class TestCreateBillingEntriesWithSeats:
         account: Account,
     ) -> None:
         mocker.patch("polar.meter.service._BILLING_ENTRY_BATCH_SIZE", 2)
+        # One page per task invocation
+        mocker.patch("polar.meter.service._BILLING_TIME_BUDGET_SECONDS", 0)
         price_lookup_spy = mocker.spy(
             SubscriptionProductPriceRepository, "get_by_customers_and_meter"
         )
@@ -207,6 +207,56 @@ class TestListOrders:
         assert returned_ids == {str(order.id) for order in orders}
         assert str(order_organization_second.id) not in returned_ids
 
+    @pytest.mark.auth
+    async def test_cursor_pagination(
+        self,
+        save_fixture: SaveFixture,
+        client: AsyncClient,
+        user_organization: UserOrganization,
+        product: Product,
+        customer: Customer,
+    ) -> None:
+        created_at = datetime(2024, 6, 15, tzinfo=UTC)
+        orders = [
+            await create_order(
+                save_fixture, product=product, customer=customer, created_at=created_at
+            )
+            for _ in range(3)
+        ]
+        orders.append(
+            await create_order(
+                save_fixture,
+                product=product,
+                customer=customer,
+                created_at=datetime(2024, 3, 15, tzinfo=UTC),
+            )
+        )
+
+        returned_ids: list[str] = []
+        params: dict[str, str | int] = {"cursor_pagination": "true", "limit": 3}
+        for _ in range(len(orders)):
+            response = await client.get("/v1/orders/", params=params)
+            assert response.status_code == 200
+            json = response.json()
+            assert "total_count" not in json["pagination"]
+            returned_ids.extend(item["id"] for item in json["items"])
+            if not json["pagination"]["has_next_page"]:
+                assert json["pagination"]["next_cursor"] is None
+                break
+            params = {"cursor": json["pagination"]["next_cursor"], "limit": 3}
+
+        # Orders sharing the same created_at are split across pages by ID
+        assert len(returned_ids) == len(set(returned_ids)) == len(orders)
+        assert returned_ids[-1] == str(orders[-1].id)
+
+    @pytest.mark.auth
+    async def test_invalid_cursor(
+        self, client: AsyncClient, user_organization: UserOrganization
+    ) -> None:
+        response = await client.get("/v1/orders/", params={"cursor": "invalid"})
+
+        assert response.status_code == 422
+
 
 @pytest.mark.asyncio
 class TestGetOrder:
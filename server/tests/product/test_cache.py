@@ -0,0 +1,64 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.models import Product
+from polar.postgres import AsyncSession
+from polar.product.cache import ProductCache, get_version_key
+from polar.redis import Redis
+
+
+@pytest.mark.asyncio
+class TestProductCache:
+    async def test_miss_then_hit(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        product: Product,
+    ) -> None:
+        cache = ProductCache(maxsize=10)
+        load_spy = mocker.spy(cache, "_load")
+
+        first = await cache.get(session, redis, [product.id])
+        second = await cache.get(session, redis, [product.id])
+
+        assert load_spy.call_count == 1
+        for products in (first, second):
+            cached_product = products[product.id]
+            assert cached_product in session
+            assert len(cached_product.prices) > 0
+            assert cached_product.product_medias == []
+            assert cached_product.attached_custom_fields == []
+
+    async def test_version_invalidated(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        product: Product,
+    ) -> None:
+        cache = ProductCache(maxsize=10)
+        load_spy = mocker.spy(cache, "_load")
+
+        await cache.get(session, redis, [product.id])
+        await redis.delete(get_version_key(product.id))
+        await cache.get(session, redis, [product.id])
+
+        assert load_spy.call_count == 2
+
+    async def test_redis_unavailable(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        product: Product,
+    ) -> None:
+        cache = ProductCache(maxsize=10)
+        load_spy = mocker.spy(cache, "_load")
+        mocker.patch.object(cache, "_get_versions", return_value={})
+
+        await cache.get(session, redis, [product.id])
+        products = await cache.get(session, redis, [product.id])
+
+        assert load_spy.call_count == 2
+        assert products[product.id].id == product.id
@@ -80,7 +80,10 @@ class TestSeedsLoad:
         ingested_event_ids: list[UUID] = []
 
         async def track_ingestion(
-            events: Sequence[Event], _ancestors_by_event: dict[UUID, list[str]]
+            events: Sequence[Event],
+            _ancestors_by_event: dict[UUID, list[str]],
+            *,
+            redis: Redis,
         ) -> None:
             ingested_event_ids.extend(event.id for event in events)
 
@@ -328,7 +331,10 @@ class TestSeedsLoad:
         ingest_attempt = 0
 
         async def fail_during_ingestion(
-            events: Sequence[Event], _ancestors_by_event: dict[UUID, list[str]]
+            events: Sequence[Event],
+            _ancestors_by_event: dict[UUID, list[str]],
+            *,
+            redis: Redis,
         ) -> None:
             nonlocal ingest_attempt
             ingest_attempt += 1
@@ -347,7 +353,7 @@ class TestSeedsLoad:
             side_effect=fail_during_ingestion,
         )
         with pytest.raises(RuntimeError, match="Tinybird unavailable"):
-            await create_simple_complement_seed_data(session)
+            await create_simple_complement_seed_data(session, redis)
 
         assert first_attempt_events
         assert (
@@ -371,7 +377,10 @@ class TestSeedsLoad:
         successful_external_ids: list[str] = []
 
         async def record_ingestion(
-            events: Sequence[Event], _ancestors_by_event: dict[UUID, list[str]]
+            events: Sequence[Event],
+            _ancestors_by_event: dict[UUID, list[str]],
+            *,
+            redis: Redis,
         ) -> None:
             successful_external_ids.extend(
                 event.external_id for event in events if event.external_id is not None
@@ -386,7 +395,7 @@ class TestSeedsLoad:
 
         ingest_events_mock.reset_mock(side_effect=True)
         ingest_events_mock.side_effect = record_ingestion
-        assert await create_simple_complement_seed_data(session) is True
+        assert await create_simple_complement_seed_data(session, redis) is True
 
         event_rows = (
             await session.execute(
@@ -425,7 +434,7 @@ class TestSeedsLoad:
 
         successful_call_count = ingest_events_mock.await_count
         event_count = len(postgres_events)
-        assert await create_simple_complement_seed_data(session) is False
+        assert await create_simple_complement_seed_data(session, redis) is False
         assert ingest_events_mock.await_count == successful_call_count
         assert (
             await session.scalar(
@@ -438,10 +447,10 @@ class TestSeedsLoad:
         await phase_session.close()
 
     async def test_simple_complement_seed_requires_simple_seed(
-        self, session: AsyncSession
+        self, session: AsyncSession, redis: Redis
     ) -> None:
         with pytest.raises(RuntimeError, match="requires the simple seed"):
-            await create_simple_complement_seed_data(session)
+            await create_simple_complement_seed_data(session, redis)
 
     async def test_create_seed_data_default_all_compatibility(
         self,
@@ -457,7 +466,10 @@ class TestSeedsLoad:
         original_insert_batch = EventRepository.insert_batch
 
         async def track_ingestion(
-            events: Sequence[Event], _ancestors_by_event: dict[UUID, list[str]]
+            events: Sequence[Event],
+            _ancestors_by_event: dict[UUID, list[str]],
+            *,
+            redis: Redis,
         ) -> None:
             ingested_event_ids.extend(event.id for event in events)
 
@@ -2,7 +2,9 @@ from datetime import timedelta
 
 import pytest
 from pytest_mock import MockerFixture
+from sqlalchemy.dialects import postgresql
 
+from polar.config import settings
 from polar.kit.db.postgres import AsyncSession
 from polar.kit.utils import utc_now
 from polar.models import Customer, Product, Subscription
@@ -77,17 +79,24 @@ async def test_get_due_jobs_does_not_raise(
     store_class: type[_SubscriptionScheduleJobStore],
     mocker: MockerFixture,
 ) -> None:
-    """``get_due_jobs`` must build and run its query without raising.
+    """``get_due_jobs`` must build and run its claim query without raising.
 
     Guards each store's instance query path — previously uncovered, since
     tests only exercised the class-level ``scheduling_statement()``.
     """
     store = store_class()
-    mocker.patch.object(store, "_list_jobs_from_statement", return_value=[])
+    engine = mocker.patch.object(store, "engine")
+    execute = engine.begin.return_value.__enter__.return_value.execute
+    execute.return_value.all.return_value = []
 
     jobs = store.get_due_jobs(utc_now())
 
     assert jobs == []
+    execute.assert_called_once()
+    (statement,) = execute.call_args.args
+    assert "FOR UPDATE OF subscriptions SKIP LOCKED" in str(
+        statement.compile(dialect=postgresql.dialect())
+    )
 
 
 @pytest.mark.asyncio
@@ -107,3 +116,83 @@ async def test_get_due_jobs_reports_failures_to_sentry(
         store.get_due_jobs(utc_now())
 
     capture_exception.assert_called_once_with(error)
+
+
+@pytest.mark.asyncio
+async def test_claim_statement_claims_due_subscriptions(
+    session: AsyncSession,
+    save_fixture: SaveFixture,
+    product: Product,
+    customer: Customer,
+) -> None:
+    now = utc_now()
+    past_period_end = now - timedelta(days=1)
+
+    due_subscriptions = [
+        await create_subscription(
+            save_fixture,
+            product=product,
+            customer=customer,
+            status=SubscriptionStatus.active,
+            current_period_start=past_period_end - timedelta(days=30),
+            current_period_end=past_period_end + timedelta(minutes=i),
+        )
+        for i in range(3)
+    ]
+    await create_subscription(
+        save_fixture,
+        product=product,
+        customer=customer,
+        status=SubscriptionStatus.active,
+        current_period_end=now + timedelta(days=1),
+    )
+
+    store = SubscriptionJobStore()
+
+    result = await session.execute(store.claim_statement(now, 2))
+    claimed = result.all()
+    assert {subscription_id for subscription_id, _ in claimed} == {
+        due_subscriptions[0].id,
+        due_subscriptions[1].id,
+    }
+    assert {run_date for _, run_date in claimed} == {
+        due_subscriptions[0].current_period_end,
+        due_subscriptions[1].current_period_end,
+    }
+
+    # Claimed subscriptions are locked and no longer due
+    result = await session.execute(store.claim_statement(now, 10))
+    assert [subscription_id for subscription_id, _ in result.all()] == [
+        due_subscriptions[2].id
+    ]
+    result = await session.execute(store.claim_statement(now, 10))
+    assert result.all() == []
+
+
+@pytest.mark.asyncio
+async def test_get_due_jobs_caps_claims_per_tick(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "SUBSCRIPTION_SCHEDULER_CLAIM_BATCH_SIZE", 2)
+    mocker.patch.object(settings, "SUBSCRIPTION_SCHEDULER_MAX_CLAIMS_PER_TICK", 5)
+    store = SubscriptionJobStore()
+    claim_and_dispatch = mocker.patch.object(
+        store, "_claim_and_dispatch", side_effect=lambda now, limit: limit
+    )
+
+    jobs = store.get_due_jobs(utc_now())
+
+    assert jobs == []
+    assert [call.args[1] for call in claim_and_dispatch.call_args_list] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_get_due_jobs_stops_when_drained(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "SUBSCRIPTION_SCHEDULER_CLAIM_BATCH_SIZE", 2)
+    mocker.patch.object(settings, "SUBSCRIPTION_SCHEDULER_MAX_CLAIMS_PER_TICK", 10)
+    store = SubscriptionJobStore()
+    claim_and_dispatch = mocker.patch.object(
+        store, "_claim_and_dispatch", side_effect=[2, 1]
+    )
+
+    store.get_due_jobs(utc_now())
+
+    assert claim_and_dispatch.call_count == 2
@@ -0,0 +1,266 @@
+import asyncio
+import uuid
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.config import settings
+from polar.enums import TaxBehavior, TaxBehaviorOption, TaxProcessor
+from polar.kit.address import Address, CountryAlpha2
+from polar.tax.calculation import (
+    InvalidTaxIDError,
+    TaxCalculation,
+    TaxCalculationService,
+    TaxCalculationTechnicalError,
+    TaxCode,
+)
+from polar.tax.tax_id import TaxIDFormat
+
+
+class StubTaxService:
+    def __init__(
+        self,
+        processor_id: str,
+        *,
+        delay: float = 0,
+        error: Exception | None = None,
+    ) -> None:
+        self.processor_id = processor_id
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def calculate(self, **kwargs: Any) -> TaxCalculation:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return {
+            "processor_id": self.processor_id,
+            "amount": 20_00,
+            "currency": kwargs["currency"],
+            "tax_behavior": kwargs["tax_behavior"],
+            "tax_breakdown": [],
+        }
+
+
+@pytest.fixture
+def address() -> Address:
+    return Address(
+        line1="1 Rue de Rivoli", postal_code="75001", country=CountryAlpha2("FR")
+    )
+
+
+@pytest.fixture
+def stripe_stub() -> StubTaxService:
+    return StubTaxService("taxcalc_stripe")
+
+
+@pytest.fixture
+def numeral_stub() -> StubTaxService:
+    return StubTaxService("taxcalc_numeral")
+
+
+@pytest.fixture(autouse=True)
+def tax_services(
+    mocker: MockerFixture, stripe_stub: StubTaxService, numeral_stub: StubTaxService
+) -> None:
+    stubs = {TaxProcessor.stripe: stripe_stub, TaxProcessor.numeral: numeral_stub}
+    mocker.patch(
+        "polar.tax.calculation._get_tax_service", side_effect=lambda p: stubs[p]
+    )
+    mocker.patch.object(
+        settings, "TAX_PROCESSORS", [TaxProcessor.stripe, TaxProcessor.numeral]
+    )
+
+
+async def _calculate(
+    service: TaxCalculationService,
+    address: Address,
+    *,
+    identifier: uuid.UUID | str = "checkout_1",
+    tax_ids: list[tuple[str, TaxIDFormat]] | None = None,
+) -> tuple[TaxCalculation, TaxProcessor]:
+    return await service.calculate(
+        identifier,
+        "eur",
+        100_00,
+        TaxBehaviorOption.location,
+        TaxCode.general_electronically_supplied_services,
+        address,
+        tax_ids or [],
+        customer_exempt=False,
+    )
+
+
+@pytest.mark.asyncio
+class TestCalculateCache:
+    async def test_reuses_identical_calculation(
+        self, address: Address, stripe_stub: StubTaxService
+    ) -> None:
+        service = TaxCalculationService()
+
+        first = await _calculate(
+            service, address, tax_ids=[("FR61954506077", TaxIDFormat.eu_vat)]
+        )
+        second = await _calculate(
+            service,
+            Address(
+                line1="1  rue de rivoli",
+                postal_code="75001 ",
+                country=CountryAlpha2("FR"),
+            ),
+            tax_ids=[("FR 61954506077", TaxIDFormat.eu_vat)],
+        )
+
+        assert stripe_stub.calls == 1
+        assert first == second
+        # The cached calculation keeps what's needed to record it later
+        calculation, processor = second
+        assert calculation["processor_id"] == "taxcalc_stripe"
+        assert calculation["tax_behavior"] == TaxBehavior.inclusive
+        assert processor == TaxProcessor.stripe
+
+    async def test_distinct_inputs(
+        self, address: Address, stripe_stub: StubTaxService
+    ) -> None:
+        service = TaxCalculationService()
+
+        await _calculate(service, address)
+        await _calculate(service, address, identifier="checkout_2")
+        await _calculate(
+            service, address, tax_ids=[("FR61954506077", TaxIDFormat.eu_vat)]
+        )
+
+        assert stripe_stub.calls == 3
+
+    async def test_disabled(
+        self, mocker: MockerFixture, address: Address, stripe_stub: StubTaxService
+    ) -> None:
+        mocker.patch.object(settings, "TAX_CALCULATION_CACHE_TTL_SECONDS", 0)
+        service = TaxCalculationService()
+
+        await _calculate(service, address)
+        await _calculate(service, address)
+
+        assert stripe_stub.calls == 2
+
+    async def test_errors_not_cached(
+        self, address: Address, stripe_stub: StubTaxService
+    ) -> None:
+        stripe_stub.error = InvalidTaxIDError()
+        service = TaxCalculationService()
+
+        for _ in range(2):
+            with pytest.raises(InvalidTaxIDError):
+                await _calculate(service, address)
+
+        assert stripe_stub.calls == 2
+
+
+@pytest.mark.asyncio
+class TestCalculateSequential:
+    async def test_fallback(
+        self,
+        address: Address,
+        stripe_stub: StubTaxService,
+        numeral_stub: StubTaxService,
+    ) -> None:
+        stripe_stub.error = TaxCalculationTechnicalError()
+
+        _, processor = await _calculate(TaxCalculationService(), address)
+
+        assert processor == TaxProcessor.numeral
+        assert stripe_stub.calls == 1
+        assert numeral_stub.calls == 1
+
+    async def test_all_failed(
+        self,
+        address: Address,
+        stripe_stub: StubTaxService,
+        numeral_stub: StubTaxService,
+    ) -> None:
+        stripe_stub.error = TaxCalculationTechnicalError()
+        numeral_stub.error = TaxCalculationTechnicalError()
+
+        with pytest.raises(TaxCalculationTechnicalError):
+            await _calculate(TaxCalculationService(), address)
+
+
+@pytest.mark.asyncio
+class TestCalculateHedged:
+    @pytest.fixture(autouse=True)
+    def hedge_delay(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "TAX_CALCULATION_HEDGE_DELAY_SECONDS", 0.05)
+
+    async def test_fast_primary(
+        self,
+        address: Address,
+        stripe_stub: StubTaxService,
+        numeral_stub: StubTaxService,
+    ) -> None:
+        _, processor = await _calculate(TaxCalculationService(), address)
+
+        assert processor == TaxProcessor.stripe
+        assert numeral_stub.calls == 0
+
+    async def test_slow_primary(
+        self,
+        address: Address,
+        stripe_stub: StubTaxService,
+        numeral_stub: StubTaxService,
+    ) -> None:
+        stripe_stub.delay = 5
+
+        calculation, processor = await _calculate(TaxCalculationService(), address)
+
+        assert processor == TaxProcessor.numeral
+        assert calculation["processor_id"] == "taxcalc_numeral"
+        assert stripe_stub.cancelled
+
+    async def test_primary_failure_starts_secondary_immediately(
+        self,
+        address: Address,
+        stripe_stub: StubTaxService,
+        numeral_stub: StubTaxService,
+    ) -> None:
+        stripe_stub.error = TaxCalculationTechnicalError()
+        service = TaxCalculationService()
+
+        _, processor = await asyncio.wait_for(_calculate(service, address), 0.04)
+
+        assert processor == TaxProcessor.numeral
+
+    async def test_logical_error_propagates(
+        self,
+        address: Address,
+        stripe_stub: StubTaxService,
+        numeral_stub: StubTaxService,
+    ) -> None:
+        stripe_stub.delay = 0.1
+        stripe_stub.error = InvalidTaxIDError()
+        numeral_stub.delay = 5
+
+        with pytest.raises(InvalidTaxIDError):
+            await _calculate(TaxCalculationService(), address)
+
+        assert numeral_stub.cancelled
+
+    async def test_all_failed(
+        self,
+        address: Address,
+        stripe_stub: StubTaxService,
+        numeral_stub: StubTaxService,
+    ) -> None:
+        stripe_stub.delay = 0.1
+        stripe_stub.error = TaxCalculationTechnicalError()
+        numeral_stub.error = TaxCalculationTechnicalError()
+
+        with pytest.raises(TaxCalculationTechnicalError):
+            await _calculate(TaxCalculationService(), address)
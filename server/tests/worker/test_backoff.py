@@ -10,7 +10,7 @@ from pytest_mock import MockerFixture
 
 import polar.tasks  # noqa: F401  (registers actors with the broker)
 from polar.config import settings
-from polar.worker import _sqs
+from polar.worker import Defer, _sqs
 from polar.worker._runner import (
     RetryAction,
     compute_retry_backoff,
@@ -168,6 +168,14 @@ class TestPlanRetry:
         action, _ = plan_retry("dummy", max_retries, None, scheduler_available=True)
         assert action is not RetryAction.DEAD_LETTER
 
+    def test_deferred_never_dead_letters(self) -> None:
+        max_retries = get_actor_max_retries("dummy")
+        action, delay = plan_retry(
+            "dummy", max_retries + 1, Defer(5_000), scheduler_available=True
+        )
+        assert action is RetryAction.SET_VISIBILITY
+        assert delay == 5
+
     def test_sets_visibility_for_short_backoff(self) -> None:
         action, delay = plan_retry("dummy", 1, None, scheduler_available=True)
         assert action is RetryAction.SET_VISIBILITY
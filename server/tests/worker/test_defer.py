@@ -0,0 +1,43 @@
+import dramatiq
+from dramatiq import Retry
+from dramatiq.middleware import Retries
+from pytest_mock import MockerFixture
+
+from polar.worker import Defer
+from polar.worker._defer import DeferMiddleware
+
+
+def _process(
+    mocker: MockerFixture, message: dramatiq.MessageProxy, exception: Exception
+) -> None:
+    broker = mocker.MagicMock()
+    broker.get_actor.return_value = mocker.MagicMock(options={})
+    # Hooks after processing are called in reverse order of the middleware list
+    for middleware in reversed([Retries(max_retries=3), DeferMiddleware()]):
+        middleware.after_process_message(broker, message, exception=exception)
+
+
+def _get_message() -> dramatiq.MessageProxy:
+    return dramatiq.MessageProxy(
+        dramatiq.Message(
+            queue_name="default", actor_name="dummy", args=(), kwargs={}, options={}
+        )
+    )
+
+
+class TestDeferMiddleware:
+    def test_deferred(self, mocker: MockerFixture) -> None:
+        message = _get_message()
+
+        for _ in range(5):
+            _process(mocker, message, Defer(1_000))
+
+        assert message.options["retries"] == 0
+        assert not message.failed
+
+    def test_retried(self, mocker: MockerFixture) -> None:
+        message = _get_message()
+
+        _process(mocker, message, Retry(delay=1_000))
+
+        assert message.options["retries"] == 1
@@ -4,14 +4,16 @@ from uuid import UUID, uuid4
 
 import dramatiq
 import pytest
+from fakeredis import FakeRedis
 from pytest_mock import MockerFixture
+from redis import RedisError
 
 import polar.tasks  # noqa: F401  (registers actors with the broker)
 from polar.config import settings
 from polar.logging import CorrelationID
 from polar.models.webhook_endpoint import WebhookEventType
 from polar.redis import Redis
-from polar.worker import MAX_JOB_PAYLOAD_BYTES, JobQueueManager
+from polar.worker import MAX_JOB_PAYLOAD_BYTES, JobQueueManager, bulk_send
 from polar.worker._enqueue import EVENT_INGESTED_CHUNK_SIZE
 from polar.worker._sqs import (
     SQS_MAX_BATCH_BYTES,
@@ -171,6 +173,115 @@ class TestFlushIngestedEventsChunking:
         assert await redis.llen("dramatiq:low_priority") == 0
 
 
+@pytest.mark.asyncio
+class TestFlushEventstreamEvents:
+    @pytest.fixture(autouse=True)
+    def _reset_backoff(self, mocker: MockerFixture) -> None:
+        mocker.patch("polar.worker._enqueue._eventstream_direct_publish_resume_at", 0.0)
+
+    async def test_publishes_directly(self, redis: Redis) -> None:
+        CorrelationID.set()
+        pubsub = redis.pubsub()
+        await pubsub.subscribe("org:1", "user:1")
+
+        jqm = JobQueueManager()
+        jqm.enqueue_eventstream_event('{"key": "test"}', ["org:1", "user:1"])
+        await jqm.flush(dramatiq.get_broker(), redis)
+
+        received = []
+        for _ in range(4):
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=0.1
+            )
+            if message is not None:
+                received.append(message["channel"])
+        await pubsub.aclose()
+
+        assert sorted(c.decode() if isinstance(c, bytes) else c for c in received) == [
+            "org:1",
+            "user:1",
+        ]
+        assert await redis.llen("dramatiq:high_priority") == 0
+
+    async def test_falls_back_to_actor(
+        self, redis: Redis, mocker: MockerFixture
+    ) -> None:
+        pipeline = mocker.patch.object(redis, "pipeline")
+        pipeline.return_value.__aenter__.return_value.execute.side_effect = RedisError(
+            "boom"
+        )
+
+        CorrelationID.set()
+        jqm = JobQueueManager()
+        jqm.enqueue_eventstream_event('{"key": "test"}', ["org:1"])
+        await jqm.flush(dramatiq.get_broker(), redis)
+
+        message_ids = await redis.lrange("dramatiq:high_priority", 0, -1)
+        messages = await redis.hgetall("dramatiq:high_priority.msgs")
+        jobs = [json.loads(messages[message_id]) for message_id in message_ids]
+        assert [job["actor_name"] for job in jobs] == ["eventstream.publish"]
+        assert jobs[0]["args"] == ['{"key": "test"}', ["org:1"]]
+        assert "enqueued_at" in jobs[0]["kwargs"]
+
+    async def test_skips_direct_publish_after_failure(
+        self, redis: Redis, mocker: MockerFixture
+    ) -> None:
+        pipeline = mocker.patch.object(redis, "pipeline")
+        pipeline.return_value.__aenter__.return_value.execute.side_effect = RedisError(
+            "boom"
+        )
+
+        CorrelationID.set()
+        for _ in range(2):
+            jqm = JobQueueManager()
+            jqm.enqueue_eventstream_event('{"key": "test"}', ["org:1"])
+            await jqm.flush(dramatiq.get_broker(), redis)
+
+        # Only the first flush tried to publish directly
+        assert pipeline.call_count == 1
+        assert await redis.llen("dramatiq:high_priority") == 2
+
+    async def test_broker_unreachable(
+        self, redis: Redis, mocker: MockerFixture
+    ) -> None:
+        pipeline = mocker.patch.object(redis, "pipeline")
+        pipeline.return_value.__aenter__.return_value.execute.side_effect = RedisError(
+            "boom"
+        )
+        mocker.patch.object(redis, "hset", side_effect=RedisError("boom"))
+
+        CorrelationID.set()
+        jqm = JobQueueManager()
+        jqm.enqueue_eventstream_event('{"key": "test"}', ["org:1"])
+        await jqm.flush(dramatiq.get_broker(), redis)
+
+        assert jqm._enqueued_jobs == []
+
+
+@pytest.mark.asyncio
+class TestFlushCacheInvalidations:
+    async def test_deletes_keys(self, redis: Redis) -> None:
+        await redis.set("cache:1", "value")
+        await redis.set("cache:2", "value")
+
+        jqm = JobQueueManager()
+        jqm.invalidate_cache_keys("cache:1")
+        await jqm.flush(dramatiq.get_broker(), redis)
+
+        assert await redis.get("cache:1") is None
+        assert await redis.get("cache:2") is not None
+
+    async def test_discarded_on_reset(self, redis: Redis) -> None:
+        await redis.set("cache:1", "value")
+
+        jqm = JobQueueManager()
+        jqm.invalidate_cache_keys("cache:1")
+        jqm.reset()
+        await jqm.flush(dramatiq.get_broker(), redis)
+
+        assert await redis.get("cache:1") is not None
+
+
 class TestPackBatches:
     def make_entries(
         self, sizes: list[int]
@@ -213,3 +324,45 @@ class TestPackBatches:
         batches = list(pack_batches(entries))
 
         assert [entry for batch in batches for entry in batch] == entries
+
+
+class TestBulkSend:
+    def test_sends_to_redis_in_batches(self, mocker: MockerFixture) -> None:
+        mocker.patch("polar.worker._enqueue.FLUSH_BATCH_SIZE", 2)
+        broker = dramatiq.get_broker()
+        client = FakeRedis()
+        mocker.patch.object(broker, "client", client)
+
+        CorrelationID.set()
+        subscription_ids = [str(uuid4()) for _ in range(5)]
+        bulk_send(
+            broker,
+            "subscription.cycle",
+            [
+                {"subscription_id": subscription_id}
+                for subscription_id in subscription_ids
+            ],
+        )
+
+        message_ids = client.lrange("dramatiq:low_priority", 0, -1)
+        messages = client.hgetall("dramatiq:low_priority.msgs")
+        jobs = [json.loads(messages[message_id]) for message_id in message_ids]
+        assert [job["actor_name"] for job in jobs] == ["subscription.cycle"] * 5
+        assert [job["kwargs"]["subscription_id"] for job in jobs] == subscription_ids
+
+    def test_allowlisted_actor_routes_to_sqs(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "WORKER_SQS_ENABLED", True)
+        mocker.patch.object(settings, "WORKER_SQS_ACTORS", {"subscription.cycle"})
+        send_jobs_sync = mocker.patch("polar.worker._enqueue._sqs.send_jobs_sync")
+
+        CorrelationID.set()
+        bulk_send(
+            dramatiq.get_broker(),
+            "subscription.cycle",
+            [{"subscription_id": str(uuid4())} for _ in range(3)],
+        )
+
+        send_jobs_sync.assert_called_once()
+        sent = send_jobs_sync.call_args.args[0]
+        assert [job.actor for job in sent] == ["subscription.cycle"] * 3
+        assert len({job.message_id for job in sent}) == 3